@@ -3,7 +3,8 @@ import asyncio
 from app.utils.temas import GestorTemas
 from app.funciones.sesiones import SesionManager
 from app.utils.historial import GestorHistorial
-from conexiones.firebase import db
+from app.models import Movimiento
+from app.services import repositorio_movimientos, repositorio_productos, repositorio_ubicaciones
 from datetime import datetime
 import uuid
 
@@ -11,24 +12,17 @@ async def crear_movimiento_ubicacion_dialog(page, callback_actualizar=None):
     """Crear diálogo específico SOLO para traslados físicos entre ubicaciones"""
     tema = GestorTemas.obtener_tema()
     
-    # Variables para ubicaciones disponibles
-    ubicaciones_disponibles = []
+    # Ubicaciones con existencias (origen posible del traslado), del índice del cache
+    ubicaciones_disponibles = ()
     
     async def cargar_ubicaciones_disponibles():
-        """Cargar ubicaciones desde Firebase"""
+        """Cargar ubicaciones con stock desde el cache (revalidado por versión)"""
         nonlocal ubicaciones_disponibles
         try:
-            ubicaciones_ref = db.collection('ubicaciones')
-            ubicaciones = ubicaciones_ref.stream()
-            
-            ubicaciones_disponibles = []
-            for ubicacion in ubicaciones:
-                data = ubicacion.to_dict()
-                data['firebase_id'] = ubicacion.id
-                ubicaciones_disponibles.append(data)
+            ubicaciones_disponibles = await repositorio_ubicaciones.listar_con_existencias()
         except Exception as e:
             print(f"Error al cargar ubicaciones: {e}")
-            ubicaciones_disponibles = []
+            ubicaciones_disponibles = ()
     
     await cargar_ubicaciones_disponibles()
     
@@ -53,7 +47,7 @@ async def crear_movimiento_ubicacion_dialog(page, callback_actualizar=None):
             ft.dropdown.Option(
                 key=u.get('firebase_id', ''),
                 text=f"{u.get('modelo', '')} - Alm.{u.get('almacen', '')}/{u.get('estanteria', '')} (Stock: {u.get('cantidad', 0)})"
-            ) for u in ubicaciones_disponibles if u.get('cantidad', 0) > 0
+            ) for u in ubicaciones_disponibles
         ]
     )
     
@@ -173,34 +167,26 @@ async def crear_movimiento_ubicacion_dialog(page, callback_actualizar=None):
                 "usuario": SesionManager.obtener_usuario_actual().get('username', 'Usuario') if SesionManager.obtener_usuario_actual() else 'Sistema'
             }
             
-            # Guardar nueva ubicación
-            db.collection("ubicaciones").add(nueva_ubicacion)
-            
-            # Guardar registro de movimiento
-            db.collection("movimientos").add(movimiento)
-            
-            # *** INVALIDAR CACHE PARA FORZAR ACTUALIZACIÓN ***
-            from app.utils.cache_firebase import cache_firebase
-            cache_firebase.invalidar_cache_ubicaciones()
-            cache_firebase.invalidar_cache_movimientos()  # ¡IMPORTANTE! Invalidar movimientos para que aparezcan en la vista
+            # Guardar nueva ubicación y registro de movimiento (los repositorios invalidan su cache)
+            await repositorio_ubicaciones.crear(nueva_ubicacion, descripcion='Traslado: ubicación destino')
+            await repositorio_movimientos.crear(Movimiento.con_fecha_orden(movimiento), descripcion='Registrar traslado')
             
             # Actualizar ubicación origen
-            doc_ref = db.collection('ubicaciones').document(ubicacion_origen_id)
             nueva_cantidad = cantidad_actual - cantidad_a_mover
             
             if nueva_cantidad > 0:
-                doc_ref.update({
+                await repositorio_ubicaciones.actualizar(ubicacion_origen_id, {
                     'cantidad': nueva_cantidad,
                     'fecha_modificacion': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                })
+                }, descripcion='Traslado: ubicación origen')
             else:
                 # Si se movió todo, eliminar ubicación original
-                doc_ref.delete()
+                await repositorio_ubicaciones.eliminar(ubicacion_origen_id, descripcion='Traslado: ubicación origen vacía')
             
-            # Invalidar caches
-            from app.utils.cache_firebase import cache_firebase
-            cache_firebase.invalidar_cache_ubicaciones()
-            cache_firebase.invalidar_cache_movimientos()  # ¡IMPORTANTE! Invalidar movimientos para que aparezcan en la vista
+            # Recalcular la cantidad del modelo (un traslado no la cambia: solo se escribe si difiere)
+            from app.utils.sincronizacion_inventario import marcar_modelos_modificados, sincronizar_pendientes
+            marcar_modelos_modificados(ubicacion_origen.get('modelo', ''))
+            await sincronizar_pendientes()
             
             # Registrar en historial
             gestor_historial = GestorHistorial()
@@ -209,7 +195,8 @@ async def crear_movimiento_ubicacion_dialog(page, callback_actualizar=None):
             await gestor_historial.agregar_actividad(
                 tipo="movimiento_ubicacion",
                 descripcion=f"Movió {cantidad_a_mover}x {ubicacion_origen.get('modelo', '')} de {ubicacion_origen.get('almacen', '')}/{ubicacion_origen.get('estanteria', '')} → {campo_nuevo_almacen.value}/{campo_nueva_estanteria.value}",
-                usuario=usuario_actual.get('username', 'Usuario') if usuario_actual else 'Sistema'
+                usuario=usuario_actual.get('username', 'Usuario') if usuario_actual else 'Sistema',
+                detalles={"modelo": ubicacion_origen.get('modelo', ''), "cantidad": cantidad_a_mover}
             )
             
             page.close(dialogo_movimiento)
@@ -285,14 +272,7 @@ async def crear_movimiento_dialog(page, callback_actualizar=None):
         """Cargar productos desde Firebase"""
         nonlocal productos_disponibles
         try:
-            productos_ref = db.collection('productos')
-            productos = productos_ref.stream()
-            
-            productos_disponibles = []
-            for producto in productos:
-                data = producto.to_dict()
-                data['firebase_id'] = producto.id
-                productos_disponibles.append(data)
+            productos_disponibles = await repositorio_productos.listar()
         except Exception as e:
             print(f"Error al cargar productos: {e}")
             # Datos de ejemplo
@@ -305,14 +285,7 @@ async def crear_movimiento_dialog(page, callback_actualizar=None):
         """Cargar ubicaciones desde Firebase"""
         nonlocal ubicaciones_disponibles
         try:
-            ubicaciones_ref = db.collection('ubicaciones')
-            ubicaciones = ubicaciones_ref.stream()
-            
-            ubicaciones_disponibles = []
-            for ubicacion in ubicaciones:
-                data = ubicacion.to_dict()
-                data['firebase_id'] = ubicacion.id
-                ubicaciones_disponibles.append(data)
+            ubicaciones_disponibles = await repositorio_ubicaciones.listar()
         except Exception as e:
             print(f"Error al cargar ubicaciones: {e}")
             # Datos de ejemplo
@@ -465,12 +438,7 @@ async def crear_movimiento_dialog(page, callback_actualizar=None):
             }
             
             # Guardar en Firebase
-            db.collection("movimientos").add(movimiento)
-            
-            # *** INVALIDAR CACHE PARA FORZAR ACTUALIZACIÓN ***
-            from app.utils.cache_firebase import cache_firebase
-            cache_firebase.invalidar_cache_ubicaciones()
-            cache_firebase.invalidar_cache_movimientos()  # ¡IMPORTANTE! Invalidar movimientos para que aparezcan en la vista
+            await repositorio_movimientos.crear(Movimiento.con_fecha_orden(movimiento), descripcion='Registrar movimiento')
             
             # Registrar en historial
             gestor_historial = GestorHistorial()
@@ -479,7 +447,9 @@ async def crear_movimiento_dialog(page, callback_actualizar=None):
             await gestor_historial.agregar_actividad(
                 tipo="movimiento_producto",
                 descripcion=f"Movió {campo_cantidad.value} unidades de {dropdown_producto.value} desde {origen_partes[0]} a {destino_partes[0]}",
-                usuario=usuario_actual.get('username', 'Usuario') if usuario_actual else 'Sistema'
+                usuario=usuario_actual.get('username', 'Usuario') if usuario_actual else 'Sistema',
+                detalles={"modelo": dropdown_producto.value, "cantidad": int(campo_cantidad.value),
+                          "origen": origen_partes[0], "destino": destino_partes[0]}
             )
             
             page.open(ft.SnackBar(
@@ -536,44 +506,12 @@ async def crear_movimiento_dialog(page, callback_actualizar=None):
     page.open(dialogo_movimiento)
     page.update()
 
-async def obtener_movimientos_firebase():
-    """Obtener historial de movimientos desde Firebase"""
+async def obtener_movimientos_firebase(limite: int = 50):
+    """Obtener los movimientos más recientes desde Firebase (una página, ordenada en el servidor)"""
     try:
-        # Obtener TODOS los movimientos sin filtros problemáticos
-        print("[BUSCAR] Consultando TODOS los movimientos de Firebase...")
-        movimientos_ref = db.collection('movimientos')
-        movimientos = movimientos_ref.stream()
-        
-        movimientos_data = []
-        tipos_encontrados = []
-        
-        for movimiento in movimientos:
-            data = movimiento.to_dict()
-            data['firebase_id'] = movimiento.id
-            
-            # Normalizar el formato de fecha para consistencia
-            if 'fecha' in data and 'fecha_movimiento' not in data:
-                data['fecha_movimiento'] = data['fecha']
-            elif 'fecha_movimiento' in data and 'fecha' not in data:
-                data['fecha'] = data['fecha_movimiento']
-            
-            # Log para debug
-            tipo_mov = data.get('tipo', 'sin_tipo')
-            if tipo_mov not in tipos_encontrados:
-                tipos_encontrados.append(tipo_mov)
-                
-            movimientos_data.append(data)
-        
-        # Ordenar por fecha después de obtener todos los datos
-        try:
-            movimientos_data.sort(key=lambda x: x.get('fecha_movimiento', ''), reverse=True)
-        except Exception as e:
-            print(f"[WARN] No se pudo ordenar movimientos: {e}")
-        
-        print(f"[CHART] MOVIMIENTOS ENCONTRADOS: {len(movimientos_data)} registros")
-        print(f"[LISTA] TIPOS DETECTADOS: {tipos_encontrados}")
-        
-        return movimientos_data
+        pagina = await repositorio_movimientos.pagina(limite=limite)
+        print(f"[CHART] MOVIMIENTOS ENCONTRADOS: {len(pagina.registros)} registros")
+        return [movimiento.copy() for movimiento in pagina.registros]
         
     except Exception as e:
         print(f"[ERROR] Error al obtener movimientos: {e}")
@@ -3,7 +3,8 @@ import asyncio
 from app.utils.temas import GestorTemas
 from app.funciones.sesiones import SesionManager
 from app.utils.historial import GestorHistorial
-from conexiones.firebase import db
+from app.models import Movimiento
+from app.services import repositorio_movimientos, repositorio_productos, repositorio_ubicaciones
 from datetime import datetime
 import uuid
 
@@ -19,14 +20,7 @@ async def crear_movimiento_dialog(page, callback_actualizar=None):
         """Cargar productos desde Firebase"""
         nonlocal productos_disponibles
         try:
-            productos_ref = db.collection('productos')
-            productos = productos_ref.stream()
-            
-            productos_disponibles = []
-            for producto in productos:
-                data = producto.to_dict()
-                data['firebase_id'] = producto.id
-                productos_disponibles.append(data)
+            productos_disponibles = await repositorio_productos.listar()
         except Exception as e:
             print(f"Error al cargar productos: {e}")
             # Datos de ejemplo
@@ -39,14 +33,7 @@ async def crear_movimiento_dialog(page, callback_actualizar=None):
         """Cargar ubicaciones desde Firebase"""
         nonlocal ubicaciones_disponibles
         try:
-            ubicaciones_ref = db.collection('ubicaciones')
-            ubicaciones = ubicaciones_ref.stream()
-            
-            ubicaciones_disponibles = []
-            for ubicacion in ubicaciones:
-                data = ubicacion.to_dict()
-                data['firebase_id'] = ubicacion.id
-                ubicaciones_disponibles.append(data)
+            ubicaciones_disponibles = await repositorio_ubicaciones.listar()
         except Exception as e:
             print(f"Error al cargar ubicaciones: {e}")
             # Datos de ejemplo
@@ -199,7 +186,7 @@ async def crear_movimiento_dialog(page, callback_actualizar=None):
             }
             
             # Guardar en Firebase
-            db.collection("movimientos").add(movimiento)
+            await repositorio_movimientos.crear(Movimiento.con_fecha_orden(movimiento), descripcion='Registrar movimiento')
             
             # Registrar en historial
             gestor_historial = GestorHistorial()
@@ -208,7 +195,9 @@ async def crear_movimiento_dialog(page, callback_actualizar=None):
             await gestor_historial.agregar_actividad(
                 tipo="movimiento_producto",
                 descripcion=f"Movió {campo_cantidad.value} unidades de {dropdown_producto.value} desde {origen_partes[0]} a {destino_partes[0]}",
-                usuario=usuario_actual.get('username', 'Usuario') if usuario_actual else 'Sistema'
+                usuario=usuario_actual.get('username', 'Usuario') if usuario_actual else 'Sistema',
+                detalles={"modelo": dropdown_producto.value, "cantidad": int(campo_cantidad.value),
+                          "origen": origen_partes[0], "destino": destino_partes[0]}
             )
             
             page.open(ft.SnackBar(
@@ -266,18 +255,9 @@ async def crear_movimiento_dialog(page, callback_actualizar=None):
     page.update()
 
 async def obtener_movimientos_firebase():
-    """Obtener historial de movimientos desde Firebase"""
+    """Obtener historial de movimientos (cache ordenado por fecha_movimiento, más recientes primero)"""
     try:
-        movimientos_ref = db.collection('movimientos').order_by('fecha_movimiento', direction='DESCENDING')
-        movimientos = movimientos_ref.stream()
-        
-        movimientos_data = []
-        for movimiento in movimientos:
-            data = movimiento.to_dict()
-            data['firebase_id'] = movimiento.id
-            movimientos_data.append(data)
-        
-        return movimientos_data
+        return [movimiento.copy() for movimiento in await repositorio_movimientos.listar()]
         
     except Exception as e:
         print(f"Error al obtener movimientos: {e}")
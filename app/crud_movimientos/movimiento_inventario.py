@@ -3,7 +3,9 @@ import asyncio
 from app.utils.temas import GestorTemas
 from app.funciones.sesiones import SesionManager
 from app.utils.historial import GestorHistorial
-from conexiones.firebase import db
+from app.models import Movimiento
+from app.services import repositorio_movimientos, repositorio_ubicaciones
+from app.utils.indices_cache import IndiceUbicaciones
 from datetime import datetime
 import uuid
 
@@ -12,30 +14,19 @@ async def crear_movimiento_inventario_dialog(page, callback_actualizar=None):
     tema = GestorTemas.obtener_tema()
     
     # Variables globales para datos
-    productos_disponibles = []
-    ubicaciones_disponibles = []
+    productos_disponibles = ()
+    ubicaciones_disponibles = ()
+    indice_ubicaciones = IndiceUbicaciones()
     
     async def cargar_datos_iniciales():
-        """Cargar productos y ubicaciones desde Firebase"""
-        nonlocal productos_disponibles, ubicaciones_disponibles
+        """Cargar productos y ubicaciones desde el cache (revalidado por versión) con el índice de ubicaciones"""
+        nonlocal productos_disponibles, ubicaciones_disponibles, indice_ubicaciones
         try:
-            # Cargar productos
-            productos_ref = db.collection('productos')
-            productos = productos_ref.stream()
-            productos_disponibles = []
-            for producto in productos:
-                data = producto.to_dict()
-                data['firebase_id'] = producto.id
-                productos_disponibles.append(data)
+            from app.utils.cache_firebase import cache_firebase
             
-            # Cargar ubicaciones
-            ubicaciones_ref = db.collection('ubicaciones')
-            ubicaciones = ubicaciones_ref.stream()
-            ubicaciones_disponibles = []
-            for ubicacion in ubicaciones:
-                data = ubicacion.to_dict()
-                data['firebase_id'] = ubicacion.id
-                ubicaciones_disponibles.append(data)
+            productos_disponibles = await cache_firebase.obtener_productos(mostrar_loading=False)
+            ubicaciones_disponibles = await cache_firebase.obtener_ubicaciones(mostrar_loading=False)
+            indice_ubicaciones = cache_firebase.indice('ubicaciones')
                 
         except Exception as e:
             print(f"Error al cargar datos: {e}")
@@ -175,7 +166,7 @@ async def crear_movimiento_inventario_dialog(page, callback_actualizar=None):
                 ft.dropdown.Option(
                     key=u.get('firebase_id', ''),
                     text=f"{u.get('modelo', 'N/A')} - Alm.{u.get('almacen', '')}/{u.get('estanteria', '')} (Stock: {u.get('cantidad', 0)})"
-                ) for u in ubicaciones_disponibles if u.get('cantidad', 0) > 0
+                ) for u in indice_ubicaciones.con_existencias()
             ]
             
             campo_cantidad.visible = True
@@ -269,22 +260,19 @@ async def crear_movimiento_inventario_dialog(page, callback_actualizar=None):
             ))
             return
         
-        # Buscar si ya existe una ubicación para este producto
-        ubicacion_existente = None
-        for u in ubicaciones_disponibles:
-            if (u.get('modelo') == producto.get('modelo') and 
-                str(u.get('almacen')) == str(almacen) and 
-                u.get('estanteria', '').upper() == estanteria.upper()):
-                ubicacion_existente = u
-                break
+        # Buscar si ya existe una ubicación para este producto en esa estantería
+        ubicacion_existente = next(
+            (u for u in indice_ubicaciones.en_estanteria(almacen, estanteria) if u.get('modelo') == producto.get('modelo')),
+            None
+        )
         
         if ubicacion_existente:
             # Actualizar cantidad existente
             nueva_cantidad = ubicacion_existente.get('cantidad', 0) + cantidad
-            db.collection('ubicaciones').document(ubicacion_existente['firebase_id']).update({
+            await repositorio_ubicaciones.actualizar(ubicacion_existente['firebase_id'], {
                 'cantidad': nueva_cantidad,
                 'fecha_ultima_actualizacion': fecha
-            })
+            }, descripcion='Entrada de inventario')
         else:
             # Crear nueva ubicación
             nueva_ubicacion = {
@@ -296,14 +284,7 @@ async def crear_movimiento_inventario_dialog(page, callback_actualizar=None):
                 'fecha_creacion': fecha,
                 'fecha_ultima_actualizacion': fecha
             }
-            db.collection('ubicaciones').add(nueva_ubicacion)
-        
-        # Actualizar el producto en inventario principal
-        nueva_cantidad_producto = producto.get('cantidad', 0) + cantidad
-        db.collection('productos').document(producto_id).update({
-            'cantidad': nueva_cantidad_producto,
-            'fecha_ultima_actualizacion': fecha
-        })
+            await repositorio_ubicaciones.crear(nueva_ubicacion, descripcion='Entrada de inventario')
         
         # Registrar movimiento
         movimiento = {
@@ -317,13 +298,12 @@ async def crear_movimiento_inventario_dialog(page, callback_actualizar=None):
             'fecha_movimiento': fecha,
             'estado': 'Completado'
         }
-        db.collection('movimientos').add(movimiento)
+        await repositorio_movimientos.crear(Movimiento.con_fecha_orden(movimiento), descripcion='Registrar movimiento de inventario')
         
-        # *** INVALIDAR CACHE PARA FORZAR ACTUALIZACIÓN ***
-        from app.utils.cache_firebase import cache_firebase
-        cache_firebase.invalidar_cache_productos()
-        cache_firebase.invalidar_cache_ubicaciones()
-        cache_firebase.invalidar_cache_movimientos()  # ¡IMPORTANTE! Invalidar movimientos para que aparezcan en la vista
+        # La cantidad del producto se recalcula desde sus ubicaciones (misma clave de modelo que la sincronización)
+        from app.utils.sincronizacion_inventario import marcar_modelos_modificados, sincronizar_pendientes
+        marcar_modelos_modificados(producto.get('modelo'))
+        await sincronizar_pendientes()
         
         page.open(ft.SnackBar(
             content=ft.Text(f"[OK] Entrada registrada: +{cantidad} {producto.get('modelo')}", color=tema.TEXT_COLOR),
@@ -365,19 +345,10 @@ async def crear_movimiento_inventario_dialog(page, callback_actualizar=None):
         
         # Actualizar cantidad en ubicación
         nueva_cantidad = stock_actual - cantidad
-        db.collection('ubicaciones').document(ubicacion_id).update({
+        await repositorio_ubicaciones.actualizar(ubicacion_id, {
             'cantidad': nueva_cantidad,
             'fecha_ultima_actualizacion': fecha
-        })
-        
-        # Buscar y actualizar el producto en inventario principal
-        producto = next((p for p in productos_disponibles if p.get('modelo') == ubicacion.get('modelo')), None)
-        if producto:
-            nueva_cantidad_producto = producto.get('cantidad', 0) - cantidad
-            db.collection('productos').document(producto['firebase_id']).update({
-                'cantidad': nueva_cantidad_producto,
-                'fecha_ultima_actualizacion': fecha
-            })
+        }, descripcion='Salida de inventario')
         
         # Registrar movimiento
         movimiento = {
@@ -391,13 +362,12 @@ async def crear_movimiento_inventario_dialog(page, callback_actualizar=None):
             'fecha_movimiento': fecha,
             'estado': 'Completado'
         }
-        db.collection('movimientos').add(movimiento)
+        await repositorio_movimientos.crear(Movimiento.con_fecha_orden(movimiento), descripcion='Registrar movimiento de inventario')
         
-        # *** INVALIDAR CACHE PARA FORZAR ACTUALIZACIÓN ***
-        from app.utils.cache_firebase import cache_firebase
-        cache_firebase.invalidar_cache_productos()
-        cache_firebase.invalidar_cache_ubicaciones()
-        cache_firebase.invalidar_cache_movimientos()  # ¡IMPORTANTE! Invalidar movimientos para que aparezcan en la vista
+        # La cantidad del producto se recalcula desde sus ubicaciones (misma clave de modelo que la sincronización)
+        from app.utils.sincronizacion_inventario import marcar_modelos_modificados, sincronizar_pendientes
+        marcar_modelos_modificados(ubicacion.get('modelo'))
+        await sincronizar_pendientes()
         
         page.open(ft.SnackBar(
             content=ft.Text(f"[OK] Salida registrada: -{cantidad} {ubicacion.get('modelo')}", color=tema.TEXT_COLOR),
@@ -433,19 +403,10 @@ async def crear_movimiento_inventario_dialog(page, callback_actualizar=None):
         diferencia = cantidad - stock_anterior
         
         # Actualizar cantidad en ubicación
-        db.collection('ubicaciones').document(ubicacion_id).update({
+        await repositorio_ubicaciones.actualizar(ubicacion_id, {
             'cantidad': cantidad,
             'fecha_ultima_actualizacion': fecha
-        })
-        
-        # Buscar y actualizar el producto en inventario principal
-        producto = next((p for p in productos_disponibles if p.get('modelo') == ubicacion.get('modelo')), None)
-        if producto:
-            nueva_cantidad_producto = producto.get('cantidad', 0) + diferencia
-            db.collection('productos').document(producto['firebase_id']).update({
-                'cantidad': nueva_cantidad_producto,
-                'fecha_ultima_actualizacion': fecha
-            })
+        }, descripcion='Ajuste de inventario')
         
         # Registrar movimiento
         movimiento = {
@@ -461,13 +422,12 @@ async def crear_movimiento_inventario_dialog(page, callback_actualizar=None):
             'fecha_movimiento': fecha,
             'estado': 'Completado'
         }
-        db.collection('movimientos').add(movimiento)
+        await repositorio_movimientos.crear(Movimiento.con_fecha_orden(movimiento), descripcion='Registrar movimiento de inventario')
         
-        # *** INVALIDAR CACHE PARA FORZAR ACTUALIZACIÓN ***
-        from app.utils.cache_firebase import cache_firebase
-        cache_firebase.invalidar_cache_productos()
-        cache_firebase.invalidar_cache_ubicaciones()
-        cache_firebase.invalidar_cache_movimientos()  # ¡IMPORTANTE! Invalidar movimientos para que aparezcan en la vista
+        # La cantidad del producto se recalcula desde sus ubicaciones (misma clave de modelo que la sincronización)
+        from app.utils.sincronizacion_inventario import marcar_modelos_modificados, sincronizar_pendientes
+        marcar_modelos_modificados(ubicacion.get('modelo'))
+        await sincronizar_pendientes()
         
         tipo_ajuste = "+" if diferencia > 0 else ""
         page.open(ft.SnackBar(
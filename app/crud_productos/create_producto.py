@@ -1,5 +1,4 @@
 import flet as ft
-from conexiones.firebase import db
 from app.utils.temas import GestorTemas
 from app.utils.historial import GestorHistorial
 from app.funciones.sesiones import SesionManager
@@ -155,7 +154,8 @@ async def vista_crear_producto(page, callback_actualizar_tabla=None):
             await gestor_historial.agregar_actividad(
                 tipo="crear_producto",
                 descripcion=f"Creó producto '{nombre}' (Modelo: {modelo})",
-                usuario=usuario_actual.get('username', 'Usuario') if usuario_actual else 'Sistema'
+                usuario=usuario_actual.get('username', 'Usuario') if usuario_actual else 'Sistema',
+                detalles={"modelo": modelo, "nombre": nombre}
             )
             
             # Actualizar dashboard dinámicamente - TEMPORALMENTE DESHABILITADO
@@ -216,83 +216,30 @@ async def vista_crear_producto(page, callback_actualizar_tabla=None):
     page.update()
 
 async def crear_producto_firebase(modelo,tipo, nombre, precio, cantidad):
-    from app.utils.monitor_firebase import monitor_firebase
-    from app.utils.cache_firebase import cache_firebase
+    from app.models import Producto
+    from app.services import repositorio_productos
     
-    # Verificar si el modelo ya existe
+    # Verificar si el modelo ya existe (sin distinguir mayúsculas ni espacios)
     print(f"[BUSCAR] Verificando si el modelo '{modelo}' ya existe...")
-    
-    # Obtener productos existentes desde cache o Firebase
-    productos_existentes = await cache_firebase.obtener_productos()
-    print(f"[BUSCAR] DEBUG: Obtenidos {len(productos_existentes)} productos para verificar duplicados")
-    
-    # Buscar si el modelo ya existe (case insensitive)
-    modelo_normalizado = modelo.strip().lower()
-    print(f"[BUSCAR] DEBUG: Buscando modelo normalizado: '{modelo_normalizado}'")
-    
-    for i, producto in enumerate(productos_existentes):
-        try:
-            # Verificación robusta para manejar None y tipos incorrectos
-            modelo_producto = producto.get('modelo', '')
-            if modelo_producto is None:
-                modelo_producto = ''
-            elif not isinstance(modelo_producto, str):
-                modelo_producto = str(modelo_producto)
-            
-            modelo_existente = modelo_producto.strip().lower()
-            
-            if modelo_existente == modelo_normalizado:
-                print(f"[ERROR] DEBUG: Modelo duplicado encontrado en posición {i}: '{producto.get('modelo')}'")
-                raise Exception(f"[ERROR] El modelo '{modelo}' ya existe en el inventario. No se permiten modelos duplicados.")
-            
-            # Debug solo para los primeros 3 productos
-            if i < 3:
-                print(f"[BUSCAR] DEBUG: Producto {i}: '{producto.get('modelo')}' -> normalizado: '{modelo_existente}'")
-        except Exception as e:
-            if "ya existe en el inventario" in str(e):
-                raise e  # Re-lanzar si es error de duplicado
-            else:
-                # Error de procesamiento, saltear este producto
-                print(f"[WARN] DEBUG: Error procesando producto {i}: {str(e)} - Producto: {producto}")
-                continue
+    existente = await repositorio_productos.buscar_por_modelo(modelo)
+    if existente is not None:
+        print(f"[ERROR] DEBUG: Modelo duplicado encontrado: '{existente.get('modelo')}'")
+        raise Exception(f"[ERROR] El modelo '{modelo}' ya existe en el inventario. No se permiten modelos duplicados.")
     
     print(f"[OK] Modelo '{modelo}' disponible - procediendo con la creación...")
     
-    print(f"[BUSCAR] DEBUG: Iniciando creación en Firebase con datos:")
-    print(f"   - Modelo: {modelo}")
-    print(f"   - Tipo: {tipo}")
-    print(f"   - Nombre: {nombre}")
-    print(f"   - Precio: {precio}")
-    print(f"   - Cantidad: {cantidad}")
-    
-    # Crear un nuevo producto en la base de datos
+    # Crear un nuevo producto en la base de datos (monitor e invalidación del cache en el repositorio)
     try:
-        timestamp, producto_ref = db.collection("productos").add({
-          "id": modelo,
-          "modelo": modelo,
-          "tipo": tipo,
-          "nombre": nombre,
-          "precio": precio,
-          "cantidad": cantidad
-        })
-        print(f"[OK] DEBUG: Producto creado en Firebase con ID: {producto_ref.id}")
+        producto = await repositorio_productos.crear(
+            Producto(id=modelo, modelo=modelo, tipo=tipo, nombre=nombre, precio=precio, cantidad=cantidad),
+            descripcion=f'Crear producto: {nombre} (modelo: {modelo})'
+        )
+        print(f"[OK] DEBUG: Producto creado en Firebase con ID: {producto.firebase_id}")
     except Exception as e:
         print(f"[ERROR] DEBUG: Error al crear en Firebase: {str(e)}")
         raise e
     
-    # Registrar la escritura en el monitor
-    monitor_firebase.registrar_consulta(
-        tipo='escritura',
-        coleccion='productos',
-        descripcion=f'Crear producto: {nombre} (modelo: {modelo})',
-        cantidad_docs=1
-    )
-    
-    # IMPORTANTE: Invalidar cache para forzar refresh en próxima consulta
-    cache_firebase.invalidar_cache_productos()
-    print("[PROCESO] Cache invalidado después de crear producto")
-    
-    return producto_ref.id
+    return producto.firebase_id
 
 async def obtener_productos_firebase():
     """
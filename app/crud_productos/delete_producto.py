@@ -1,5 +1,5 @@
 import flet as ft
-from conexiones.firebase import db
+from app.services import repositorio_productos
 from app.utils.temas import GestorTemas
 from app.utils.historial import GestorHistorial
 from app.funciones.sesiones import SesionManager
@@ -16,20 +16,11 @@ def on_eliminar_producto_click(page, producto_id, actualizar_tabla):
     async def confirmar_eliminacion(e):
         try:
             # Obtener nombre del producto antes de eliminarlo
-            doc_ref = db.collection("productos").document(producto_id)
-            doc = doc_ref.get()
-            producto_nombre = "producto"
+            producto = await repositorio_productos.obtener(producto_id)
+            producto_nombre = producto.get('nombre', 'producto') if producto else "producto"
             
-            if doc.exists:
-                producto_data = doc.to_dict()
-                producto_nombre = producto_data.get('nombre', 'producto')
-            
-            # Eliminar el producto
-            doc_ref.delete()
-            
-            # Invalidar cache para forzar actualización inmediata
-            from app.utils.cache_firebase import cache_firebase
-            cache_firebase.invalidar_cache_productos()
+            # Eliminar el producto (deja lápida e invalida el cache)
+            await repositorio_productos.eliminar(producto_id, descripcion=f"Eliminar producto '{producto_nombre}'")
             
             # Registrar actividad en el historial
             gestor_historial = GestorHistorial()
@@ -38,7 +29,9 @@ def on_eliminar_producto_click(page, producto_id, actualizar_tabla):
             await gestor_historial.agregar_actividad(
                 tipo="eliminar_producto",
                 descripcion=f"Eliminó producto '{producto_nombre}' (ID: {producto_id})",
-                usuario=usuario_actual.get('username', 'Usuario') if usuario_actual else 'Sistema'
+                usuario=usuario_actual.get('username', 'Usuario') if usuario_actual else 'Sistema',
+                detalles={"modelo": producto.get('modelo', '') if producto else '', "nombre": producto_nombre,
+                          "producto_id": producto_id}
             )
             
             # Actualizar dashboard dinámicamente - TEMPORALMENTE DESHABILITADO  
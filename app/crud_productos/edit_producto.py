@@ -2,7 +2,7 @@ import flet as ft
 from app.utils.temas import GestorTemas
 from app.utils.historial import GestorHistorial
 from app.funciones.sesiones import SesionManager
-from conexiones.firebase import db
+from app.services import repositorio_productos
 import asyncio
 
 #Plan para opcion editar producto:
@@ -20,17 +20,14 @@ async def on_click_editar_producto(page, producto_id, actualizar_tabla):
     
     # Obtener datos actuales del producto
     try:
-        doc_ref = db.collection("productos").document(producto_id)
-        doc = doc_ref.get()
+        producto_data = await repositorio_productos.obtener(producto_id)
         
-        if not doc.exists:
+        if producto_data is None:
             page.open(ft.SnackBar(
                 content=ft.Text("Producto no encontrado", color=tema.TEXT_COLOR),
                 bgcolor=tema.ERROR_COLOR
             ))
             return
-            
-        producto_data = doc.to_dict()
     except Exception as e:
         page.open(ft.SnackBar(
             content=ft.Text(f"Error al cargar producto: {str(e)}", color=tema.TEXT_COLOR),
@@ -108,41 +105,24 @@ async def on_click_editar_producto(page, producto_id, actualizar_tabla):
             if nuevo_modelo.lower() != modelo_original_str.lower():
                 print(f"[BUSCAR] Verificando si el nuevo modelo '{nuevo_modelo}' ya existe...")
                 
-                # Obtener productos existentes desde cache
-                from app.utils.cache_firebase import cache_firebase
-                productos_existentes = await cache_firebase.obtener_productos()
+                # Buscar si el nuevo modelo ya existe (case insensitive, desde cache)
+                existente = await repositorio_productos.buscar_por_modelo(nuevo_modelo)
+                if existente is not None and existente.get('firebase_id') != producto_id:
+                    page.open(ft.SnackBar(
+                        content=ft.Text(f"[ERROR] El modelo '{nuevo_modelo}' ya existe en el inventario. No se permiten modelos duplicados.", color=tema.TEXT_COLOR),
+                        bgcolor=tema.ERROR_COLOR
+                    ))
+                    return
                 
-                # Buscar si el nuevo modelo ya existe (case insensitive)
-                modelo_normalizado = nuevo_modelo.lower()
-                for producto in productos_existentes:
-                    try:
-                        modelo_existente = producto.get('modelo', '')
-                        if modelo_existente and isinstance(modelo_existente, str):
-                            if (modelo_existente.strip().lower() == modelo_normalizado and 
-                                producto.get('firebase_id') != producto_id):
-                                page.open(ft.SnackBar(
-                                    content=ft.Text(f"[ERROR] El modelo '{nuevo_modelo}' ya existe en el inventario. No se permiten modelos duplicados.", color=tema.TEXT_COLOR),
-                                    bgcolor=tema.ERROR_COLOR
-                                ))
-                                return
-                    except Exception as ex:
-                        print(f"Error al procesar producto en edición: {ex}")
-                        continue
-                        
                 print(f"[OK] Nuevo modelo '{nuevo_modelo}' disponible - procediendo con la actualización...")
             
-            # Actualizar en Firebase (sin cantidad)
-            doc_ref = db.collection("productos").document(producto_id)
-            doc_ref.update({
+            # Actualizar en Firebase (sin cantidad); el repositorio invalida el cache
+            await repositorio_productos.actualizar(producto_id, {
                 'modelo': nuevo_modelo,
                 'tipo': campo_tipo.value.strip(),
                 'nombre': campo_nombre.value.strip(),
                 'precio': precio
-            })
-            
-            # Invalidar cache para forzar actualización inmediata
-            from app.utils.cache_firebase import cache_firebase
-            cache_firebase.invalidar_cache_productos()
+            }, descripcion=f"Editar producto '{nuevo_modelo}'")
             
             # Registrar actividad en el historial
             gestor_historial = GestorHistorial()
@@ -151,7 +131,8 @@ async def on_click_editar_producto(page, producto_id, actualizar_tabla):
             await gestor_historial.agregar_actividad(
                 tipo="editar_producto",
                 descripcion=f"Editó producto '{campo_nombre.value.strip()}' (ID: {producto_id})",
-                usuario=usuario_actual.get('username', 'Usuario') if usuario_actual else 'Sistema'
+                usuario=usuario_actual.get('username', 'Usuario') if usuario_actual else 'Sistema',
+                detalles={"modelo": nuevo_modelo, "nombre": campo_nombre.value.strip(), "producto_id": producto_id}
             )
             
             page.open(ft.SnackBar(
@@ -1,5 +1,5 @@
 import flet as ft
-from conexiones.firebase import db
+from app.services.busqueda import MAX_RESULTADOS_DIALOGO
 from app.utils.temas import GestorTemas
 import asyncio
 
@@ -127,35 +127,24 @@ def mostrar_dialogo_busqueda(page, mostrar_productos_filtrados):
 async def buscar_en_firebase(page, busqueda, actualizar_tabla=None, dialogo_busqueda=None):
     tema = GestorTemas.obtener_tema()
     try:
-        # OPTIMIZACIÓN: Buscar primero en cache local antes que en Firebase
-        from app.utils.cache_firebase import cache_firebase
-        from app.utils.monitor_firebase import monitor_firebase
+        # OPTIMIZACIÓN: Índice de texto del cache (0 consultas Firebase, sin recorrer los productos)
+        from app.services import repositorio_productos
         
         print(f"[BUSCAR] BÚSQUEDA INICIADA: '{busqueda}' - usando cache local (0 consultas Firebase)")
-        todos_productos = await cache_firebase.obtener_productos()
         
-        # Filtrar localmente (sin consulta a Firebase)
-        productos_encontrados = []
-        busqueda_lower = busqueda.lower().strip()
-        
-        for producto in todos_productos:
-            # Convertir a string para evitar errores con tipos de datos
-            modelo = str(producto.get('modelo', '')).lower()
-            nombre = str(producto.get('nombre', '')).lower()
-            tipo = str(producto.get('tipo', '')).lower()
-            
-            # Buscar en modelo, nombre y tipo
-            if (busqueda_lower in modelo or 
-                busqueda_lower in nombre or 
-                busqueda_lower in tipo):
-                productos_encontrados.append(producto)
+        # Modelo exacto primero, luego prefijos, coincidencias parciales y aproximadas
+        productos_encontrados = await repositorio_productos.buscar_texto(busqueda, limite=MAX_RESULTADOS_DIALOGO)
+        recortado = len(productos_encontrados) >= MAX_RESULTADOS_DIALOGO
 
         print(f"[DART] BÚSQUEDA COMPLETADA: {len(productos_encontrados)} productos encontrados (filtrado local)")
 
         if productos_encontrados:
             page.close(dialogo_busqueda)  # Cerrar el dialog
+            mensaje = f"Se encontraron {len(productos_encontrados)} productos"
+            if recortado:
+                mensaje = f"Se muestran los primeros {MAX_RESULTADOS_DIALOGO} productos; escriba más del modelo para acotar"
             page.open(ft.SnackBar(
-                content=ft.Text(f"Se encontraron {len(productos_encontrados)} productos", color=tema.TEXT_COLOR),
+                content=ft.Text(mensaje, color=tema.TEXT_COLOR),
                 bgcolor=tema.SUCCESS_COLOR
             ))
             if actualizar_tabla:
@@ -3,7 +3,7 @@ import asyncio
 from app.utils.temas import GestorTemas
 from app.funciones.sesiones import SesionManager
 from app.utils.historial import GestorHistorial
-from conexiones.firebase import db
+from app.services import repositorio_ubicaciones
 from datetime import datetime
 import uuid
 
@@ -90,8 +90,9 @@ async def crear_ubicacion_dialog(page, callback_actualizar=None):
                 "estado": "Activo"
             }
             
-            # Guardar en Firebase
-            db.collection("ubicaciones").add(ubicacion)
+            # Guardar en Firebase. La ubicación nueva aún no tiene modelo ni cantidad:
+            # no hay existencias que recalcular
+            await repositorio_ubicaciones.crear(ubicacion, descripcion='Crear ubicación')
             
             # Registrar actividad
             gestor_historial = GestorHistorial()
@@ -156,18 +157,9 @@ async def crear_ubicacion_dialog(page, callback_actualizar=None):
     page.update()
 
 async def obtener_ubicaciones_firebase():
-    """Obtener todas las ubicaciones desde Firebase"""
+    """Obtener todas las ubicaciones (cache revalidado por versión)"""
     try:
-        ubicaciones_ref = db.collection('ubicaciones')
-        ubicaciones = ubicaciones_ref.stream()
-        
-        ubicaciones_data = []
-        for ubicacion in ubicaciones:
-            data = ubicacion.to_dict()
-            data['firebase_id'] = ubicacion.id
-            ubicaciones_data.append(data)
-        
-        return ubicaciones_data
+        return [ubicacion.copy() for ubicacion in await repositorio_ubicaciones.listar()]
         
     except Exception as e:
         print(f"Error al obtener ubicaciones: {e}")
@@ -201,8 +193,18 @@ async def eliminar_ubicacion_firebase(ubicacion_id, page):
         # Verificar si la ubicación tiene productos asignados
         # En una implementación real, verificaríamos en la colección de productos
         
-        # Eliminar de Firebase
-        db.collection("ubicaciones").document(ubicacion_id).delete()
+        # Modelo que pierde la ubicación, tomado del cache (sin lectura extra a Firebase)
+        modelo = next((u.get('modelo') for u in await repositorio_ubicaciones.listar()
+                       if u.get('firebase_id') == ubicacion_id), None)
+        
+        # Eliminar de Firebase (deja lápida para el cache)
+        await repositorio_ubicaciones.eliminar(ubicacion_id, descripcion='Eliminar ubicación')
+        
+        # Recalcular la cantidad del modelo afectado
+        if modelo:
+            from app.utils.sincronizacion_inventario import marcar_modelos_modificados, sincronizar_pendientes
+            marcar_modelos_modificados(modelo)
+            await sincronizar_pendientes()
         
         # Registrar actividad
         gestor_historial = GestorHistorial()
@@ -5,7 +5,7 @@ Basado en la estructura del Excel: Modelo -> Almacén -> Estantería
 """
 
 import flet as ft
-from conexiones.firebase import db
+from app.services import repositorio_ubicaciones
 from app.utils.temas import GestorTemas
 from app.utils.historial import GestorHistorial
 from app.funciones.sesiones import SesionManager
@@ -168,12 +168,12 @@ async def crear_ubicacion_producto_dialog(page, callback_actualizar=None):
     async def verificar_tipo_existe_en_ubicaciones(tipo_producto):
         """Verificar si el tipo ya existe en la tabla de ubicaciones"""
         try:
-            ubicaciones_existentes = await obtener_ubicaciones_productos_firebase()
-            for ubicacion in ubicaciones_existentes:
-                # Convertir modelo a string antes de hacer lower() para evitar errores con tipos int
-                modelo_ubicacion = str(ubicacion.get('modelo', '')).lower()
-                if modelo_ubicacion == tipo_producto.lower():
-                    return True, ubicacion
+            from app.services import repositorio_ubicaciones
+            
+            # Índice por modelo del cache: no recorre todas las ubicaciones
+            ubicaciones_del_modelo = await repositorio_ubicaciones.listar_por_modelo(tipo_producto)
+            if ubicaciones_del_modelo:
+                return True, ubicaciones_del_modelo[0]
             return False, None
         except Exception as e:
             print(f"Error al verificar ubicaciones: {e}")
@@ -203,14 +203,9 @@ async def crear_ubicacion_producto_dialog(page, callback_actualizar=None):
             ))
             return
         
-        # NUEVA VALIDACIÓN: Verificar que el modelo existe en el inventario
-        modelo_existe_en_inventario = False
-        for producto in productos_disponibles:
-            # Convertir modelo a string antes de hacer lower() para evitar errores con tipos int
-            modelo_producto = str(producto.get('modelo', '')).lower()
-            if modelo_producto == tipo_producto.lower():
-                modelo_existe_en_inventario = True
-                break
+        # NUEVA VALIDACIÓN: Verificar que el modelo existe en el inventario (índice por modelo)
+        from app.services import repositorio_productos
+        modelo_existe_en_inventario = await repositorio_productos.buscar_por_modelo(tipo_producto) is not None
         
         if not modelo_existe_en_inventario:
             page.open(ft.SnackBar(
@@ -266,16 +261,13 @@ async def crear_ubicacion_producto_dialog(page, callback_actualizar=None):
                 "usuario_asignacion": SesionManager.obtener_usuario_actual().get('username', 'Usuario') if SesionManager.obtener_usuario_actual() else 'Sistema'
             }
             
-            # Guardar en Firebase en colección 'ubicaciones'
-            db.collection("ubicaciones").add(ubicacion_producto)
-            
-            # Invalidar cache para refrescar datos
-            from app.utils.cache_firebase import cache_firebase
-            cache_firebase.invalidar_cache_ubicaciones()
+            # Guardar en Firebase en colección 'ubicaciones' (el repositorio invalida el cache)
+            await repositorio_ubicaciones.crear(ubicacion_producto, descripcion='Asignar ubicación a producto')
             
-            # Sincronizar automáticamente las cantidades en el inventario
-            from app.utils.sincronizacion_inventario import sincronizar_modelo
-            await sincronizar_modelo(tipo_producto)
+            # Recalcular la cantidad del modelo en el inventario
+            from app.utils.sincronizacion_inventario import marcar_modelos_modificados, sincronizar_pendientes
+            marcar_modelos_modificados(tipo_producto)
+            await sincronizar_pendientes()
             
             # Registrar actividad
             gestor_historial = GestorHistorial()
@@ -284,7 +276,9 @@ async def crear_ubicacion_producto_dialog(page, callback_actualizar=None):
             await gestor_historial.agregar_actividad(
                 tipo="asignar_ubicacion",
                 descripcion=f"Asignó ubicación: {ubicacion_producto['modelo']} → Almacén {ubicacion_producto['almacen']}, Estantería {ubicacion_producto['estanteria']}",
-                usuario=usuario_actual.get('username', 'Usuario') if usuario_actual else 'Sistema'
+                usuario=usuario_actual.get('username', 'Usuario') if usuario_actual else 'Sistema',
+                detalles={"modelo": ubicacion_producto['modelo'], "almacen": ubicacion_producto['almacen'],
+                          "estanteria": ubicacion_producto['estanteria']}
             )
             
             page.open(ft.SnackBar(
@@ -349,11 +343,8 @@ async def crear_ubicacion_producto_dialog(page, callback_actualizar=None):
 async def obtener_ubicaciones_productos_firebase():
     """Obtener todas las ubicaciones de productos desde Firebase con cache optimizado"""
     try:
-        from app.utils.cache_firebase import cache_firebase
-        
         # Usar cache optimizado
-        ubicaciones = await cache_firebase.obtener_ubicaciones()
-        return ubicaciones
+        return await repositorio_ubicaciones.listar()
         
     except Exception as e:
         print(f"Error al obtener ubicaciones de productos: {e}")
@@ -383,24 +374,17 @@ async def eliminar_ubicacion_producto_firebase(ubicacion_id, page):
     """Eliminar ubicación de producto de Firebase"""
     try:
         # Primero obtener el modelo antes de eliminar
-        doc_ref = db.collection("ubicaciones").document(ubicacion_id)
-        doc = doc_ref.get()
-        modelo_eliminado = None
-        
-        if doc.exists:
-            modelo_eliminado = doc.to_dict().get('modelo')
-        
-        # Eliminar de Firebase
-        doc_ref.delete()
+        ubicacion = await repositorio_ubicaciones.obtener(ubicacion_id)
+        modelo_eliminado = ubicacion.get('modelo') if ubicacion is not None else None
         
-        # Invalidar cache para refrescar datos
-        from app.utils.cache_firebase import cache_firebase
-        cache_firebase.invalidar_cache_ubicaciones()
+        # Eliminar de Firebase (deja lápida para el cache)
+        await repositorio_ubicaciones.eliminar(ubicacion_id, descripcion='Eliminar ubicación de producto')
         
-        # Sincronizar automáticamente las cantidades en el inventario
+        # Recalcular la cantidad del modelo afectado
         if modelo_eliminado:
-            from app.utils.sincronizacion_inventario import sincronizar_modelo
-            await sincronizar_modelo(modelo_eliminado)
+            from app.utils.sincronizacion_inventario import marcar_modelos_modificados, sincronizar_pendientes
+            marcar_modelos_modificados(modelo_eliminado)
+            await sincronizar_pendientes()
         
         # Registrar actividad
         gestor_historial = GestorHistorial()
@@ -1,16 +1,14 @@
 import flet as ft
 import re #librería para expresiones regulares
 import threading #librería para manejar hilos
-from conexiones.firebase import db  # Importar la conexión a Firestore
+from app.services import repositorio_usuarios
 from app.utils.temas import GestorTemas
 from app.utils.historial import GestorHistorial
 from app.funciones.sesiones import SesionManager
 import asyncio
 
-def crear_usuario_firebase(nombre, contrasena, es_admin=False): # Función para crear un usuario en Firebase
+async def crear_usuario_firebase(nombre, contrasena, es_admin=False): # Función para crear un usuario en Firebase
     try: # try para manejar errores
-        referencia_usuarios = db.collection('usuarios') # Crear referencia a la colección de usuarios
-        
         # Crear un nuevo usuario
         nuevo_usuario = {
             'nombre': nombre,
@@ -18,14 +16,14 @@ def crear_usuario_firebase(nombre, contrasena, es_admin=False): # Función para
             'es_admin': es_admin
         }
         
-        # Agregar el usuario a Firebase
-        doc_ref = referencia_usuarios.add(nuevo_usuario)
+        # Agregar el usuario a Firebase (el repositorio invalida el cache de usuarios)
+        registro = await repositorio_usuarios.crear(nuevo_usuario, descripcion=f"Crear usuario '{nombre}'")
         
         # Crear objeto completo del usuario con firebase_id para devolverlo
         usuario_creado = nuevo_usuario.copy()
-        usuario_creado['firebase_id'] = doc_ref[1].id
+        usuario_creado['firebase_id'] = registro['firebase_id']
         
-        print(f"Usuario '{nombre}' creado exitosamente con ID: {doc_ref[1].id}")
+        print(f"Usuario '{nombre}' creado exitosamente con ID: {registro['firebase_id']}")
         return usuario_creado  # Devolver el objeto completo del usuario
         
     except Exception as e:
@@ -34,16 +32,14 @@ def crear_usuario_firebase(nombre, contrasena, es_admin=False): # Función para
 
 async def obtener_usuarios_firebase(): # Función para obtener todos los usuarios de Firebase
     try:
-        referencia_usuarios = db.collection('usuarios')
-        usuarios = referencia_usuarios.stream() #stream para obtener los documentos
+        usuarios = await repositorio_usuarios.listar() # Desde el cache (revalidado por versión)
         
         lista_usuarios = []
         for i, usuario in enumerate(usuarios, start=1): # Enumerar para asignar ID secuencial
-            data = usuario.to_dict() # Convertir el documento a diccionario
+            data = usuario.copy() # Copia modificable del registro
             
             # Validar y asignar valores por defecto para campos faltantes
             data['id'] = i  # Asignar un ID secuencial para la tabla
-            data['firebase_id'] = usuario.id  # Guardar el ID real de Firebase
             data['nombre'] = data.get('nombre', 'Sin nombre')  # Valor por defecto si no existe
             data['contrasena'] = data.get('contrasena', '')  # Valor por defecto si no existe
             data['es_admin'] = data.get('es_admin', False)  # Valor por defecto si no existe
@@ -112,19 +108,13 @@ def mostrar_ventana_crear_usuario(page, callback_actualizar_tabla=None): # Funci
             return
             
         # Crear usuario
-        resultado = crear_usuario_firebase(
+        resultado = await crear_usuario_firebase(
             campo_nombre.value,
             campo_contrasena.value,
             campo_es_admin.value
         )
         
         if resultado and isinstance(resultado, dict):
-            # Invalidar cache para asegurar datos frescos
-            from app.utils.cache_firebase import cache_firebase
-            cache_firebase._cache_usuarios = []
-            cache_firebase._ultimo_update_usuarios = None
-            print("[ELIMINAR] Cache de usuarios invalidado después de crear")
-            
             # Registrar actividad en el historial
             gestor_historial = GestorHistorial()
             usuario_actual = SesionManager.obtener_usuario_actual()
@@ -1,5 +1,5 @@
 import flet as ft
-from conexiones.firebase import db
+from app.services import repositorio_usuarios
 from app.utils.temas import GestorTemas
 from app.utils.historial import GestorHistorial
 from app.funciones.sesiones import SesionManager
@@ -75,12 +75,10 @@ def limpiar_archivos_usuario(id_usuario, nombre_usuario=None):
 async def eliminar_usuario_firebase(id_usuario): #Se manda a llamar en on_eliminar_click
     try:
         # Obtener datos del usuario antes de eliminarlo
-        doc_ref = db.collection('usuarios').document(id_usuario)
-        doc = doc_ref.get()
+        usuario_data = await repositorio_usuarios.obtener(id_usuario)
         usuario_nombre = "usuario"
         
-        if doc.exists:
-            usuario_data = doc.to_dict()
+        if usuario_data is not None:
             usuario_nombre = usuario_data.get('nombre', 'usuario')
         else:
             print(f"[ERROR] Usuario con ID {id_usuario} no encontrado en Firebase")
@@ -91,7 +89,7 @@ async def eliminar_usuario_firebase(id_usuario): #Se manda a llamar en on_elimin
         resultado_limpieza = limpiar_archivos_usuario(id_usuario, usuario_nombre)
         
         # Eliminar el usuario de Firebase
-        doc_ref.delete()
+        await repositorio_usuarios.eliminar(id_usuario, descripcion=f"Eliminar usuario '{usuario_nombre}'")
         print(f"[OK] Usuario '{usuario_nombre}' eliminado de Firebase")
         
         # Registrar actividad en el historial con información de limpieza
@@ -130,12 +128,6 @@ async def on_eliminar_click(e, page, id_usuario, actualizar_tabla): #Se manda a
     if await eliminar_usuario_firebase(id_usuario):
         print("[OK] Usuario eliminado exitosamente.")
         
-        # Invalidar cache para futuras consultas
-        from app.utils.cache_firebase import cache_firebase
-        cache_firebase._cache_usuarios = []
-        cache_firebase._ultimo_update_usuarios = None
-        print("[ELIMINAR] Cache de usuarios invalidado")
-        
         # ACTUALIZACIÓN AUTOMÁTICA: Recargar tabla después de eliminar
         if actualizar_tabla:
             print("[RAPIDO] Ejecutando actualización automática después de eliminar usuario")
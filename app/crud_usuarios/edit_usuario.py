@@ -1,5 +1,5 @@
 import flet as ft
-from conexiones.firebase import db
+from app.services import repositorio_usuarios
 from app.utils.temas import GestorTemas
 from app.utils.historial import GestorHistorial
 from app.funciones.sesiones import SesionManager
@@ -83,7 +83,7 @@ def mostrar_dialogo_editar_usuario(page, usuario_data, actualizar_callback=None)
             # Actualizar en Firebase usando el firebase_id del usuario
             firebase_id = usuario_data.get('firebase_id')
             if firebase_id:
-                db.collection('usuarios').document(firebase_id).update(datos_actualizados)
+                await repositorio_usuarios.actualizar(firebase_id, datos_actualizados, descripcion='Editar usuario')
                 print(f"[OK] Usuario {firebase_id} actualizado en Firebase")
             else:
                 raise Exception("ID de usuario no encontrado")
@@ -92,11 +92,6 @@ def mostrar_dialogo_editar_usuario(page, usuario_data, actualizar_callback=None)
             usuario_data_actualizada = usuario_data.copy()
             usuario_data_actualizada.update(datos_actualizados)
             
-            # Invalidar cache para futuras consultas
-            from app.utils.cache_firebase import cache_firebase
-            cache_firebase._cache_usuarios = []
-            cache_firebase._ultimo_update_usuarios = None
-            print("[ELIMINAR] Cache de usuarios invalidado después de editar")
             
             print("[PROCESO] Preparando actualización silenciosa")
             
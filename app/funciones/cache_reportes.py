@@ -0,0 +1,106 @@
+"""
+Cache de resultados de reportes.
+
+Un reporte se identifica por (tipo, filtros que usa, versión de cada una de
+sus entradas): revisión del cache por colección y versión del historial
+(ver motor_reportes.ENTRADAS_REPORTE y versiones_entradas). Volver a un
+reporte ya visto o exportar el que se está mostrando no recalcula nada, y
+cuando una colección cambia la clave cambia sola: no hay que invalidar a mano.
+
+Los resultados son DataFrames de polars (inmutables, se comparten sin
+copiar). El cache es LRU con tope de entradas y de memoria estimada.
+"""
+
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+import polars as pl
+
+from app.utils.cuota_firebase import atribuida
+from app.funciones.motor_reportes import (ENTRADAS_REPORTE, EntradasReporte, Filtros, cargar_entradas,
+                                          filtros_de, generar_reporte, versiones_entradas)
+
+MAX_ENTRADAS = 32
+MAX_BYTES = 64 * 1024 * 1024
+
+Clave = Tuple[str, Optional[Filtros], Tuple[Tuple[str, Hashable], ...]]
+
+
+class CacheReportes:
+    """Resultados de reportes por (tipo, filtros, versiones de entradas), con desalojo LRU"""
+
+    def __init__(self, max_entradas: int = MAX_ENTRADAS, max_bytes: int = MAX_BYTES,
+                 versiones: Callable[[Iterable[str]], Awaitable[Dict[str, Hashable]]] = versiones_entradas,
+                 cargar: Callable[[Iterable[str]], Awaitable[EntradasReporte]] = cargar_entradas):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._versiones = versiones
+        self._cargar = cargar
+        self._resultados: 'OrderedDict[Clave, Tuple[pl.DataFrame, int]]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    @staticmethod
+    def clave(tipo: str, filtros: Optional[Filtros], versiones: Dict[str, Hashable]) -> Clave:
+        return (tipo, filtros_de(tipo, filtros), tuple(sorted(versiones.items())))
+
+    @atribuida('reportes')
+    async def reporte(self, tipo: str, filtros: Optional[Filtros] = None) -> pl.DataFrame:
+        """Resultado del reporte: del cache si ninguna de sus entradas cambió, si no se calcula"""
+        nombres = ENTRADAS_REPORTE[tipo]
+        clave = self.clave(tipo, filtros, await self._versiones(nombres))
+        resultado = self.obtener(clave)
+        if resultado is not None:
+            return resultado
+        entradas = await self._cargar(nombres)
+        resultado = await asyncio.to_thread(generar_reporte, tipo, entradas, filtros)
+        self.guardar(clave, resultado)
+        return resultado
+
+    def obtener(self, clave: Clave) -> Optional[pl.DataFrame]:
+        with self._lock:
+            guardado = self._resultados.get(clave)
+            if guardado is None:
+                self.fallos += 1
+                return None
+            self._resultados.move_to_end(clave)
+            self.aciertos += 1
+            return guardado[0]
+
+    def guardar(self, clave: Clave, resultado: pl.DataFrame) -> None:
+        """Guarda el resultado; descarta los del mismo reporte con versiones viejas y desaloja por LRU"""
+        tamano = resultado.estimated_size()
+        if tamano > self.max_bytes:
+            return
+        tipo, filtros, versiones = clave
+        with self._lock:
+            for otra in [c for c in self._resultados if c[0] == tipo and c[2] != versiones]:
+                self._quitar(otra)
+            if clave in self._resultados:
+                self._quitar(clave)
+            self._resultados[clave] = (resultado, tamano)
+            self._bytes += tamano
+            while len(self._resultados) > self.max_entradas or self._bytes > self.max_bytes:
+                self._quitar(next(iter(self._resultados)))
+
+    def _quitar(self, clave: Clave) -> None:
+        _, tamano = self._resultados.pop(clave)
+        self._bytes -= tamano
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._resultados.clear()
+            self._bytes = 0
+
+    def estadisticas(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entradas": len(self._resultados), "bytes": self._bytes,
+                    "aciertos": self.aciertos, "fallos": self.fallos}
+
+
+# Instancia global
+cache_reportes = CacheReportes()
@@ -1,47 +1,92 @@
-import polars as pl
 import flet as ft
-from datetime import datetime
-from conexiones.firebase import db
 from app.utils.temas import GestorTemas
 from app.utils.historial import GestorHistorial
 from app.funciones.sesiones import SesionManager
+from app.funciones.importacion_lotes import ImportadorProductos, ImportadorUbicaciones
+from app.funciones.ingesta_excel import leer_productos_excel, leer_ubicaciones_excel
+from app.funciones.diff_importacion import calcular_diff_productos
+from app.ui.aviso_cuota import confirmar_operacion_masiva
+from app.utils.cuota_firebase import cuota_firebase
 import asyncio
 
 def cargar_archivo_excel(ruta_archivo):
     """
     Cargar archivo Excel para inventario - SIN CANTIDAD.
     La cantidad se calcula automáticamente desde ubicaciones.
+    Devuelve un DataFrame normalizado (ver ingesta_excel.py).
     """
-    archivo = pl.read_excel(ruta_archivo)
-    productos = []
-    for row in archivo.iter_rows(named=True):
-        producto = {
-            "modelo": row["Modelo"],
-            "tipo": row["Tipo"],
-            "nombre": row["Nombre"],
-            "precio": row["Precio"],
-            "cantidad": 0  # Cantidad inicial 0 - se calcula desde ubicaciones
-        }
-        productos.append(producto)
-    return productos
+    return leer_productos_excel(ruta_archivo)
 
-async def guardar_productos_en_firebase(productos, page):
+async def calcular_diff_contra_cache(productos):
+    """Compara el DataFrame del archivo con los productos en cache (ver diff_importacion.py)"""
+    from app.services import repositorio_productos
+    productos_cache = await repositorio_productos.tabla()
+    return calcular_diff_productos(productos, productos_cache)
+
+def mostrar_resumen_importacion(page, diff, on_confirmar):
+    """Muestra cuántas filas son nuevas, cambiadas, sin cambios e inválidas antes de escribir"""
+    tema = GestorTemas.obtener_tema()
+    resumen = diff.resumen()
+    # Cada lote lee la existencia de sus documentos antes de escribirlos
+    aviso_cuota = cuota_firebase.aviso_operacion_masiva(
+        'importacion', lecturas=diff.total_escrituras, escrituras=diff.total_escrituras)
+    
+    def confirmar(e):
+        page.close(dialogo_resumen)
+        page.run_task(on_confirmar)
+    
+    dialogo_resumen = ft.AlertDialog(
+        title=ft.Text("Resumen de importación", color=tema.TEXT_COLOR),
+        bgcolor=tema.CARD_COLOR,
+        content=ft.Column(
+            controls=[
+                ft.Text(f"🆕 Nuevos: {resumen['nuevos']}", color=tema.TEXT_COLOR),
+                ft.Text(f"✏️ Con cambios: {resumen['cambiados']}", color=tema.TEXT_COLOR),
+                ft.Text(f"[OK] Sin cambios: {resumen['sin_cambios']}", color=tema.TEXT_SECONDARY),
+                ft.Text(f"[WARN] Inválidos (se omiten): {resumen['invalidos']}", color=tema.TEXT_SECONDARY),
+                ft.Divider(),
+                ft.Text(f"Se escribirán {diff.total_escrituras} productos en Firebase", color=tema.TEXT_COLOR, weight=ft.FontWeight.BOLD),
+            ] + ([ft.Text(f"[WARN] {aviso_cuota}", color=tema.WARNING_COLOR)] if aviso_cuota else []),
+            tight=True,
+            spacing=8,
+        ),
+        actions=[
+            ft.TextButton("Cancelar",
+                          style=ft.ButtonStyle(color=tema.TEXT_SECONDARY),
+                          on_click=lambda e: page.close(dialogo_resumen)),
+            ft.ElevatedButton(
+                "Importar",
+                style=ft.ButtonStyle(
+                    bgcolor=tema.BUTTON_SUCCESS_BG,
+                    color=tema.BUTTON_TEXT,
+                    shape=ft.RoundedRectangleBorder(radius=tema.BORDER_RADIUS)
+                ),
+                disabled=diff.total_escrituras == 0,
+                on_click=confirmar,
+            ),
+        ],
+        modal=True,
+    )
+    page.open(dialogo_resumen)
+    page.update()
+
+async def guardar_productos_en_firebase(diff, page):
+    """Escribe solo los productos nuevos o modificados de un DiffImportacion"""
     tema = GestorTemas.obtener_tema()
     
-    print(f"[ALERT] DEBUG: Iniciando guardar_productos_en_firebase con {len(productos)} productos")
+    print(f"[PROCESO] Importando productos: {diff.resumen()}")
     
     # Mostrar progreso INMEDIATAMENTE
+    barra_progreso = ft.ProgressBar(width=300, value=0, color=tema.PRIMARY_COLOR)
+    texto_progreso = ft.Text(f"Procesando {diff.total_escrituras} productos...", color=tema.TEXT_COLOR)
     mensaje_cargando = ft.AlertDialog(
         title=ft.Text("Importando productos", color=tema.TEXT_COLOR),
         bgcolor=tema.CARD_COLOR,
         content= ft.Container(
-            content=ft.Row(
-                controls=[
-                    ft.ProgressRing(width=16, height=16, stroke_width=2, color=tema.PRIMARY_COLOR),
-                    ft.Text(f"Procesando {len(productos)} productos...", color=tema.TEXT_COLOR)
-                ],
-                alignment=ft.MainAxisAlignment.CENTER,
-                vertical_alignment=ft.CrossAxisAlignment.CENTER,
+            content=ft.Column(
+                controls=[barra_progreso, texto_progreso],
+                horizontal_alignment=ft.CrossAxisAlignment.CENTER,
+                tight=True,
                 spacing=10,
             ),
             padding=ft.Padding(15, 10, 15, 10),
@@ -49,14 +94,11 @@ async def guardar_productos_en_firebase(productos, page):
         modal=True,
     )
     
-    print("[ALERT] DEBUG: AlertDialog creado, intentando abrir...")
     page.open(mensaje_cargando)
-    print("[ALERT] DEBUG: page.open() ejecutado")
     page.update()
-    print("[ALERT] DEBUG: page.update() ejecutado - AlertDialog debería estar visible")
     
-    # Delay mínimo para que el AlertDialog sea visible
-    await asyncio.sleep(1.0)  # 1 segundo mínimo
+    # Ceder el control para que el AlertDialog se dibuje antes de empezar
+    await asyncio.sleep(0.1)
     
     # Mensaje de éxito
     mensaje_exito = ft.AlertDialog(
@@ -68,34 +110,19 @@ async def guardar_productos_en_firebase(productos, page):
         modal=True,
     )
     
+    def actualizar_progreso(procesados, total):
+        """Actualiza la barra tras cada lote confirmado"""
+        barra_progreso.value = procesados / total if total else 1
+        texto_progreso.value = f"{procesados} de {total} productos guardados"
+        page.update()
+    
     try:
-        referencia_productos = db.collection("productos")
-        productos_nuevos_count = 0
-        productos_actualizados_count = 0
-        
-        for producto in productos:
-            try:
-                id_documento = f"{producto['modelo']}"
-                doc_ref = referencia_productos.document(id_documento)
-                doc_snapshot = doc_ref.get()
-                if not all(key in producto for key in ["modelo", "tipo", "nombre", "precio", "cantidad"]):
-                    continue
-                
-                if doc_snapshot.exists:
-                    # Producto ya existe - actualizar
-                    doc_ref.set(producto)
-                    productos_actualizados_count += 1
-                else:
-                    # Producto nuevo - crear
-                    doc_ref.set(producto)
-                    productos_nuevos_count += 1
-                
-                # Pequeño delay para hacer visible el progreso
-                if (productos_nuevos_count + productos_actualizados_count) % 10 == 0:  # Cada 10 productos
-                    await asyncio.sleep(0.1)  # 100ms para mostrar progreso
-
-            except Exception as e:
-                pass
+        # Escritura por lotes con checkpoint (ver importacion_lotes.py)
+        importador = ImportadorProductos()
+        resultado_importacion = await importador.importar_cambios(diff, on_progreso=actualizar_progreso)
+        productos_nuevos_count = resultado_importacion['nuevos']
+        productos_actualizados_count = resultado_importacion['actualizados']
+        productos_sin_cambios_count = resultado_importacion['sin_cambios']
         
         productos_total_count = productos_nuevos_count + productos_actualizados_count
         
@@ -105,21 +132,25 @@ async def guardar_productos_en_firebase(productos, page):
         
         await gestor_historial.agregar_actividad(
             tipo="importar_productos",
-            descripcion=f"Importó {productos_total_count} productos desde archivo Excel - {productos_nuevos_count} nuevos, {productos_actualizados_count} actualizados",
-            usuario=usuario_actual.get('username', 'Usuario') if usuario_actual else 'Sistema'
+            descripcion=f"Importó {productos_total_count} productos desde archivo Excel - {productos_nuevos_count} nuevos, {productos_actualizados_count} actualizados, {productos_sin_cambios_count} sin cambios",
+            usuario=usuario_actual.get('username', 'Usuario') if usuario_actual else 'Sistema',
+            detalles={"cantidad": productos_total_count, "nuevos": productos_nuevos_count,
+                      "actualizados": productos_actualizados_count, "sin_cambios": productos_sin_cambios_count}
         )
         
         # [PROCESO] SINCRONIZACIÓN AUTOMÁTICA después de importar productos
+        # Los productos actualizados conservan su cantidad (merge); solo los nuevos
+        # necesitan tomar la cantidad de sus ubicaciones
         try:
-            from app.utils.sincronizacion_inventario import sincronizar_inventario_completo
-            resultado = await sincronizar_inventario_completo(mostrar_resultados=True)
+            from app.utils.sincronizacion_inventario import sincronizar_modelos
+            resultado = await sincronizar_modelos(diff.nuevos["modelo"].to_list())
             
             # Invalidar cache para refrescar datos
             from app.utils.cache_firebase import cache_firebase
             cache_firebase.invalidar_cache_productos()
             
             # Crear mensaje detallado de importación
-            mensaje_detalle = f"[OK] {productos_nuevos_count} productos nuevos\n✏️ {productos_actualizados_count} productos actualizados"
+            mensaje_detalle = f"[OK] {productos_nuevos_count} productos nuevos\n✏️ {productos_actualizados_count} productos actualizados\n⏭️ {productos_sin_cambios_count} sin cambios"
             
             sync_mensaje = ""
             if resultado['productos_actualizados'] > 0:
@@ -134,35 +165,54 @@ async def guardar_productos_en_firebase(productos, page):
             mensaje_exito.title = ft.Text("Productos importados correctamente", color=tema.TEXT_COLOR)
             mensaje_exito.content = ft.Text(mensaje_detalle, color=tema.TEXT_COLOR)
         
-        print("[ALERT] DEBUG: Cerrando AlertDialog de carga y mostrando éxito...")
-        # Delay mínimo antes de cerrar para asegurar visibilidad
-        await asyncio.sleep(0.5)  # Medio segundo adicional
         page.close(mensaje_cargando)
         page.open(mensaje_exito)
     except Exception as e:
-        print(f"[ALERT] DEBUG: Error en guardar_productos_en_firebase: {e}")
+        # Los lotes ya confirmados quedan en el checkpoint; reintentar reanuda desde ahí
+        print(f"[ERROR] Error en guardar_productos_en_firebase: {e}")
         page.close(mensaje_cargando)
+        page.open(ft.SnackBar(
+            content=ft.Text(f"Importación interrumpida: {e}. Vuelva a importar el archivo para reanudar.", color=tema.TEXT_COLOR),
+            bgcolor=tema.ERROR_COLOR
+        ))
         return False
 
 def on_click_importar_archivo(page, callback_actualizar_tabla=None):
     tema = GestorTemas.obtener_tema()
 
-    productos_importados = []
+    productos_importados = None  # DataFrame normalizado del archivo seleccionado
     
-    async def importar_productos_handler(e, page, ventana, productos_importados):
+    async def importar_productos_handler(e, page, ventana):
         """Handler para importar productos de forma asíncrona"""
-        print("[ALERT] DEBUG: importar_productos_handler iniciado")
+        if productos_importados is None:
+            page.open(ft.SnackBar(
+                content=ft.Text("Por favor selecciona un archivo", color=tema.TEXT_COLOR),
+                bgcolor=tema.ERROR_COLOR
+            ))
+            return
         page.close(ventana)
-        print("[ALERT] DEBUG: Ventana de selección cerrada, llamando guardar_productos_en_firebase")
-        await guardar_productos_en_firebase(productos_importados, page)
         
-        # Actualizar la tabla después de la importación
-        if callback_actualizar_tabla:
-            print("[PROCESO] DEBUG: Actualizando tabla después de importación...")
-            await callback_actualizar_tabla(forzar_refresh=True)
+        diff = await calcular_diff_contra_cache(productos_importados)
+        if diff.total_escrituras == 0:
+            # Reimportar un archivo sin cambios no cuesta escrituras
+            page.open(ft.SnackBar(
+                content=ft.Text(f"Sin cambios: {diff.sin_cambios} productos ya están actualizados ({diff.invalidos} inválidos)", color=tema.TEXT_COLOR),
+                bgcolor=tema.SUCCESS_COLOR
+            ))
+            return
+        
+        async def confirmar_importacion():
+            await guardar_productos_en_firebase(diff, page)
+            
+            # Actualizar la tabla después de la importación
+            if callback_actualizar_tabla:
+                await callback_actualizar_tabla(forzar_refresh=True)
+        
+        mostrar_resumen_importacion(page, diff, confirmar_importacion)
     
     def picked_file(e: ft.FilePickerResultEvent):
         """Manejar selección de archivo - CORREGIDO para ejecutables"""
+        nonlocal productos_importados
         print(f"[DEBUG] picked_file llamado - e.files: {e.files}")
         
         if e.files and len(e.files) > 0:
@@ -186,9 +236,8 @@ def on_click_importar_archivo(page, callback_actualizar_tabla=None):
                 productos = cargar_archivo_excel(ruta)
                 print(f"[DEBUG] Productos cargados: {len(productos)}")
                 
-                # Actualizar lista global y UI
-                productos_importados.clear()
-                productos_importados.extend(productos)
+                # Guardar el DataFrame para la importación y actualizar UI
+                productos_importados = productos
                 selected_file.value = f"{nombre} ({len(productos)} productos)"
                 
                 print(f"[SUCCESS] Archivo cargado exitosamente: {nombre}")
@@ -276,7 +325,7 @@ def on_click_importar_archivo(page, callback_actualizar_tabla=None):
                                         color=tema.BUTTON_TEXT,
                                         shape=ft.RoundedRectangleBorder(radius=tema.BORDER_RADIUS)
                                     ),
-                                    on_click=lambda e: page.run_task(importar_productos_handler, e, page, ventana, productos_importados),
+                                    on_click=lambda e: page.run_task(importar_productos_handler, e, page, ventana),
                                     width=100,
                                     height=40,
                                 ),
@@ -315,90 +364,13 @@ def cargar_archivo_excel_ubicaciones(ruta_archivo):
     """
     Cargar archivo Excel específico para UBICACIONES.
     Formato esperado: Modelo, Almacen, Estanteria, Cantidad, Comentarios (opcional)
+    Devuelve un DataFrame normalizado (ver ingesta_excel.py), o None si no se pudo leer.
     """
     try:
-        # Leer archivo Excel con Polars
-        df = pl.read_excel(ruta_archivo)
-        
-        ubicaciones = []
-        
-        # Iterar sobre las filas
-        for row in df.iter_rows(named=True):
-            # 1. MODELO (requerido) - La información del producto
-            modelo = None
-            modelo_opciones = ["Modelo", "modelo", "Material", "material", "Producto", "producto"]
-            for opcion in modelo_opciones:
-                if row.get(opcion) and str(row.get(opcion)).strip() and str(row.get(opcion)).strip().lower() != 'none':
-                    modelo = str(row.get(opcion)).strip()
-                    break
-            
-            if not modelo:
-                # Si no hay modelo, generar uno automático
-                modelo = f"UBICACION{len(ubicaciones)+1:03d}"
-            
-            # 2. ALMACÉN (requerido)
-            almacen = None
-            almacen_opciones = ["Almacen", "Almacén", "almacen", "almacén", "Deposito", "deposito"]
-            for opcion in almacen_opciones:
-                if row.get(opcion) and str(row.get(opcion)).strip():
-                    almacen = str(row.get(opcion)).strip()
-                    break
-            
-            if not almacen:
-                almacen = "Almacén Principal"  # Valor por defecto
-            
-            # 3. ESTANTERÍA (requerido)
-            estanteria = None
-            estanteria_opciones = ["Estanteria", "Estantería", "estanteria", "estantería", 
-                                 "Ubicacion", "Ubicación", "ubicacion", "ubicación", 
-                                 "Pasillo", "pasillo", "Rack", "rack"]
-            for opcion in estanteria_opciones:
-                if row.get(opcion) and str(row.get(opcion)).strip():
-                    estanteria = str(row.get(opcion)).strip()
-                    break
-            
-            if not estanteria:
-                estanteria = "A1"  # Valor por defecto
-            
-            # 4. CANTIDAD (requerido, default 1)
-            cantidad = 1
-            cantidad_opciones = ["Cantidad", "cantidad", "Qty", "qty", "Stock", "stock"]
-            for opcion in cantidad_opciones:
-                if row.get(opcion):
-                    try:
-                        cantidad = int(float(str(row.get(opcion))))  # Convertir a float primero por si hay decimales
-                        if cantidad <= 0:
-                            cantidad = 1  # Cantidad mínima 1
-                        break
-                    except (ValueError, TypeError):
-                        continue
-            
-            # 5. COMENTARIOS (opcional)
-            comentarios = "Sin observaciones"
-            comentarios_opciones = ["Comentarios", "comentarios", "Observaciones", "observaciones", 
-                                   "Notas", "notas", "Comentario", "comentario"]
-            for opcion in comentarios_opciones:
-                if row.get(opcion) and str(row.get(opcion)).strip():
-                    comentarios = str(row.get(opcion)).strip()
-                    break
-            
-            # Crear registro de ubicación
-            ubicacion = {
-                "modelo": modelo,
-                "almacen": almacen,
-                "estanteria": estanteria,
-                "cantidad": cantidad,
-                "observaciones": comentarios,
-                "fecha_asignacion": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "usuario_asignacion": "Sistema de importación"
-            }
-            
-            ubicaciones.append(ubicacion)
-        
-        return ubicaciones
-        
+        return leer_ubicaciones_excel(ruta_archivo)
     except Exception as e:
-        return []
+        print(f"[ERROR] No se pudo leer el archivo de ubicaciones: {e}")
+        return None
 
 
 async def guardar_ubicaciones_en_firebase(ubicaciones, page):
@@ -408,17 +380,16 @@ async def guardar_ubicaciones_en_firebase(ubicaciones, page):
     print(f"[ALERT] DEBUG: Iniciando guardar_ubicaciones_en_firebase con {len(ubicaciones)} ubicaciones")
     
     # Mostrar progreso INMEDIATAMENTE
+    barra_progreso = ft.ProgressBar(width=300, value=0, color=tema.PRIMARY_COLOR)
+    texto_progreso = ft.Text(f"Procesando {len(ubicaciones)} ubicaciones...", color=tema.TEXT_COLOR)
     mensaje_cargando = ft.AlertDialog(
         title=ft.Text("Importando ubicaciones", color=tema.TEXT_COLOR),
         bgcolor=tema.CARD_COLOR,
         content= ft.Container(
-            content=ft.Row(
-                controls=[
-                    ft.ProgressRing(width=16, height=16, stroke_width=2, color=tema.PRIMARY_COLOR),
-                    ft.Text(f"Procesando {len(ubicaciones)} ubicaciones...", color=tema.TEXT_COLOR)
-                ],
-                alignment=ft.MainAxisAlignment.CENTER,
-                vertical_alignment=ft.CrossAxisAlignment.CENTER,
+            content=ft.Column(
+                controls=[barra_progreso, texto_progreso],
+                horizontal_alignment=ft.CrossAxisAlignment.CENTER,
+                tight=True,
                 spacing=10,
             ),
             padding=ft.Padding(15, 10, 15, 10),
@@ -426,14 +397,11 @@ async def guardar_ubicaciones_en_firebase(ubicaciones, page):
         modal=True,
     )
     
-    print("[ALERT] DEBUG: AlertDialog ubicaciones creado, intentando abrir...")
     page.open(mensaje_cargando)
-    print("[ALERT] DEBUG: page.open() ejecutado para ubicaciones")
     page.update()
-    print("[ALERT] DEBUG: page.update() ejecutado para ubicaciones - AlertDialog debería estar visible")
     
-    # Delay mínimo para que el AlertDialog sea visible
-    await asyncio.sleep(1.0)  # 1 segundo mínimo
+    # Ceder el control para que el AlertDialog se dibuje antes de empezar
+    await asyncio.sleep(0.1)
     
     # Mensaje de éxito
     mensaje_exito = ft.AlertDialog(
@@ -445,26 +413,21 @@ async def guardar_ubicaciones_en_firebase(ubicaciones, page):
         modal=True,
     )
     
+    def actualizar_progreso(procesados, total):
+        """Actualiza la barra tras cada lote confirmado"""
+        barra_progreso.value = procesados / total if total else 1
+        texto_progreso.value = f"{procesados} de {total} ubicaciones procesadas"
+        page.update()
+    
     try:
-        from conexiones.firebase import db
         from app.utils.historial import GestorHistorial
         from app.funciones.sesiones import SesionManager
         
-        guardados = 0
-        errores = 0
-        
-        for ubicacion in ubicaciones:
-            try:
-                # Guardar en colección 'ubicaciones'
-                db.collection('ubicaciones').add(ubicacion)
-                guardados += 1
-                
-                # Pequeño delay para hacer visible el progreso
-                if guardados % 5 == 0:  # Cada 5 ubicaciones
-                    await asyncio.sleep(0.1)  # 100ms para mostrar progreso
-                
-            except Exception as e:
-                errores += 1
+        # Commits por lotes en paralelo con reintentos (ver importacion_lotes.py)
+        importador = ImportadorUbicaciones()
+        resultado_importacion = await importador.importar(ubicaciones, on_progreso=actualizar_progreso)
+        guardados = resultado_importacion['guardados']
+        errores = resultado_importacion['errores']
         
         # Registrar en historial
         gestor_historial = GestorHistorial()
@@ -473,22 +436,23 @@ async def guardar_ubicaciones_en_firebase(ubicaciones, page):
         await gestor_historial.agregar_actividad(
             tipo="importar_ubicaciones",
             descripcion=f"Importó {guardados} ubicaciones desde Excel (Errores: {errores})",
-            usuario=usuario_actual.get('username', 'Usuario') if usuario_actual else 'Sistema'
+            usuario=usuario_actual.get('username', 'Usuario') if usuario_actual else 'Sistema',
+            detalles={"cantidad": guardados, "errores": errores}
         )
         
         # [PROCESO] SINCRONIZACIÓN AUTOMÁTICA después de importar ubicaciones
         if guardados > 0:
+            # Recalcular solo los modelos que aparecen en el archivo; si falla,
+            # quedan marcados para la siguiente sincronización
+            from app.utils.cache_firebase import cache_firebase
+            from app.utils.sincronizacion_inventario import marcar_modelos_modificados, sincronizar_pendientes
+            marcar_modelos_modificados(*resultado_importacion['modelos'])
             try:
-                # Invalidar cache de ubicaciones
-                from app.utils.cache_firebase import cache_firebase
                 cache_firebase.invalidar_cache_ubicaciones()
-                
-                # Ejecutar sincronización completa
-                from app.utils.sincronizacion_inventario import sincronizar_inventario_completo
-                resultado = await sincronizar_inventario_completo(mostrar_resultados=True)
-                
-                # Invalidar cache de productos también
+                resultado = await sincronizar_pendientes()
                 cache_firebase.invalidar_cache_productos()
+                if not resultado['exito']:
+                    raise RuntimeError('; '.join(map(str, resultado['errores'])) or 'sincronización incompleta')
                 
                 # Mensaje combinado de éxito
                 sync_mensaje = ""
@@ -498,18 +462,21 @@ async def guardar_ubicaciones_en_firebase(ubicaciones, page):
                 mensaje_exito.title = ft.Text(f"Ubicaciones importadas y sincronizadas{sync_mensaje}", color=tema.TEXT_COLOR)
                 
             except Exception as sync_error:
-                pass
+                print(f"[ERROR] No se pudieron sincronizar las cantidades tras importar ubicaciones: {sync_error}")
+                mensaje_exito.title = ft.Text(
+                    "Ubicaciones importadas | cantidades de productos pendientes de sincronizar",
+                    color=tema.TEXT_COLOR)
+        
+        if errores:
+            mensaje_exito.content = ft.Text(f"[WARN] {errores} ubicaciones no se pudieron guardar tras varios reintentos", color=tema.TEXT_COLOR)
         
-        print("[ALERT] DEBUG: Cerrando AlertDialog de ubicaciones y mostrando éxito...")
-        # Delay mínimo antes de cerrar para asegurar visibilidad
-        await asyncio.sleep(0.5)  # Medio segundo adicional
         page.close(mensaje_cargando)
         page.open(mensaje_exito)
         
         return True
         
     except Exception as e:
-        print(f"[ALERT] DEBUG: Error en guardar_ubicaciones_en_firebase: {e}")
+        print(f"[ERROR] Error en guardar_ubicaciones_en_firebase: {e}")
         page.close(mensaje_cargando)
         page.open(ft.SnackBar(
             content=ft.Text(f"Error al importar ubicaciones: {e}"),
@@ -550,14 +517,19 @@ async def on_click_importar_archivo_ubicaciones(page, callback_actualizar=None):
             # Cargar y procesar Excel de ubicaciones
             ubicaciones = cargar_archivo_excel_ubicaciones(ruta_archivo)
             
-            if ubicaciones:
+            if ubicaciones is not None and ubicaciones.height > 0:
                 print("[ALERT] DEBUG: Ubicaciones cargadas, cerrando ventana y llamando guardar...")
                 page.close(ventana_ubicaciones)
-                exito = await guardar_ubicaciones_en_firebase(ubicaciones, page)
                 
-                # Actualizar tabla si se proporcionó callback y la importación fue exitosa
-                if exito and callback_actualizar:
-                    await callback_actualizar(forzar_refresh=True)
+                async def guardar():
+                    exito = await guardar_ubicaciones_en_firebase(ubicaciones, page)
+                    
+                    # Actualizar tabla si se proporcionó callback y la importación fue exitosa
+                    if exito and callback_actualizar:
+                        await callback_actualizar(forzar_refresh=True)
+                
+                aviso = cuota_firebase.aviso_operacion_masiva('importacion', escrituras=ubicaciones.height)
+                confirmar_operacion_masiva(page, aviso, guardar, "Importar")
             else:
                 page.open(ft.SnackBar(
                     content=ft.Text("Error al procesar el archivo de ubicaciones", color=tema.TEXT_COLOR),
@@ -0,0 +1,114 @@
+"""
+Comparación de una importación de productos contra el cache.
+
+Cada fila entrante se empareja con el producto en cache por modelo
+normalizado (sin espacios, en minúsculas) y se compara por un hash de su
+contenido. Solo los productos nuevos y los que realmente cambiaron
+generan escrituras: reimportar el mismo archivo no escribe nada.
+"""
+
+from typing import Dict, List, Union
+
+import polars as pl
+
+from app.funciones.ingesta_excel import separar_productos_validos
+
+# Campos que se comparan; la cantidad se calcula desde ubicaciones y no cuenta
+CAMPOS_CONTENIDO = ["modelo", "tipo", "nombre", "precio"]
+
+# Mismos valores por defecto que aplica CacheFirebase al leer productos
+_DEFAULTS_CACHE = {"tipo": "Sin tipo", "nombre": "Sin nombre", "precio": 0.0}
+
+
+def _clave_modelo(columna: str = "modelo") -> pl.Expr:
+    """Modelo normalizado para emparejar filas (igual que la validación de duplicados)"""
+    return pl.col(columna).cast(pl.Utf8).str.strip_chars().str.to_lowercase()
+
+
+def _hash_contenido() -> pl.Expr:
+    """Hash por fila de los campos comparables, con los defaults del cache aplicados"""
+    return pl.struct(
+        pl.col("modelo").cast(pl.Utf8).str.strip_chars(),
+        pl.col("tipo").cast(pl.Utf8).fill_null(_DEFAULTS_CACHE["tipo"]),
+        pl.col("nombre").cast(pl.Utf8).fill_null(_DEFAULTS_CACHE["nombre"]),
+        pl.col("precio").cast(pl.Float64, strict=False).fill_null(_DEFAULTS_CACHE["precio"]),
+    ).hash(seed=0)
+
+
+def _a_float(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def productos_cache_a_frame(productos: List[Dict]) -> pl.DataFrame:
+    """Construye un DataFrame tipado a partir de los dicts del cache"""
+    return pl.DataFrame({
+        "firebase_id": [p.get("firebase_id") for p in productos],
+        "modelo": [None if p.get("modelo") is None else str(p.get("modelo")) for p in productos],
+        "tipo": [None if p.get("tipo") is None else str(p.get("tipo")) for p in productos],
+        "nombre": [None if p.get("nombre") is None else str(p.get("nombre")) for p in productos],
+        "precio": [_a_float(p.get("precio")) for p in productos],
+    }, schema={"firebase_id": pl.Utf8, "modelo": pl.Utf8, "tipo": pl.Utf8,
+               "nombre": pl.Utf8, "precio": pl.Float64})
+
+
+class DiffImportacion:
+    """Resultado de comparar un archivo con el inventario actual"""
+
+    def __init__(self, nuevos: pl.DataFrame, cambiados: pl.DataFrame, sin_cambios: int, invalidos: int):
+        self.nuevos = nuevos            # Esquema de productos, listos para crear
+        self.cambiados = cambiados      # firebase_id + CAMPOS_CONTENIDO
+        self.sin_cambios = sin_cambios
+        self.invalidos = invalidos
+
+    @property
+    def total_escrituras(self) -> int:
+        return self.nuevos.height + self.cambiados.height
+
+    def resumen(self) -> Dict[str, int]:
+        return {
+            "nuevos": self.nuevos.height,
+            "cambiados": self.cambiados.height,
+            "sin_cambios": self.sin_cambios,
+            "invalidos": self.invalidos,
+        }
+
+
+def calcular_diff_productos(entrante: pl.DataFrame,
+                            productos_cache: Union[List[Dict], pl.DataFrame]) -> DiffImportacion:
+    """
+    Compara el DataFrame normalizado de un archivo con los productos en cache.
+
+    Args:
+        entrante: DataFrame de ingesta_excel.normalizar_productos
+        productos_cache: Lista de productos de CacheFirebase, o directamente
+                         su tabla (cache_firebase.tabla('productos'))
+
+    Returns:
+        DiffImportacion con las filas que requieren escritura
+    """
+    validos, invalidos = separar_productos_validos(entrante)
+    validos = (validos
+               .with_columns(_clave_modelo().alias("_clave"), _hash_contenido().alias("_hash"))
+               .unique(subset="_clave", keep="last", maintain_order=True))
+
+    if not isinstance(productos_cache, pl.DataFrame):
+        productos_cache = productos_cache_a_frame(productos_cache)
+    cache = (productos_cache.select("firebase_id", "modelo", "tipo", "nombre", "precio")
+             .filter(pl.col("modelo").is_not_null() & pl.col("firebase_id").is_not_null())
+             .with_columns(_clave_modelo().alias("_clave"), _hash_contenido().alias("_hash_cache"))
+             .unique(subset="_clave", keep="first", maintain_order=True)
+             .select("_clave", "firebase_id", "_hash_cache"))
+
+    unido = validos.join(cache, on="_clave", how="left")
+    existe = pl.col("firebase_id").is_not_null()
+
+    nuevos = unido.filter(~existe).select(entrante.columns)
+    cambiados = unido.filter(existe & (pl.col("_hash") != pl.col("_hash_cache"))).select(
+        ["firebase_id"] + CAMPOS_CONTENIDO
+    )
+    sin_cambios = unido.filter(existe & (pl.col("_hash") == pl.col("_hash_cache"))).height
+
+    return DiffImportacion(nuevos, cambiados, sin_cambios, invalidos.height)
@@ -215,7 +215,7 @@ async def exportar_productos_json(productos, page):
                 "total_productos": len(productos),
                 "version": "1.0"
             },
-            "productos": productos
+            "productos": [dict(producto) for producto in productos]
         }
         
         # Guardar archivo JSON
@@ -702,12 +702,12 @@ async def exportar_ubicaciones_json_archivo(ubicaciones, ruta_destino, timestamp
     datos_exportacion = {
         "fecha_exportacion": datetime.now().isoformat(),
         "total_ubicaciones": len(ubicaciones),
-        "ubicaciones": ubicaciones
+        "ubicaciones": [dict(ubicacion) for ubicacion in ubicaciones]
     }
     
     # Exportar JSON
     with open(ruta_completa, 'w', encoding='utf-8') as f:
-        json.dump(datos_exportacion, f, ensure_ascii=False, indent=2)
+        json.dump(datos_exportacion, f, ensure_ascii=False, indent=2, default=str)
     
     # Registrar actividad
     usuario_actual = SesionManager.obtener_usuario_actual()
@@ -0,0 +1,367 @@
+"""
+Motor de importación masiva a Firebase por lotes.
+
+En lugar de hacer un get() y un set() por fila, agrupa los documentos en
+lotes que caben en un WriteBatch de Firestore (500 operaciones, incluida la
+versión de la colección), consulta la existencia de cada lote con una sola
+llamada get_all() y confirma el lote con un único commit. Cada lote
+confirmado se guarda en un checkpoint local para que una importación
+interrumpida se reanude donde se quedó.
+
+Las ubicaciones usan el mismo esquema de lotes, con varios commits en
+paralelo y reintentos por lote.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Union
+
+import polars as pl
+
+from app.funciones.ingesta_excel import separar_productos_validos
+from app.utils.firestore_async import ejecutar
+from app.utils.monitor_firebase import monitor_firebase
+from app.utils.versiones_colecciones import sellar, subir_version
+
+TAMANO_LOTE = 499  # 500 operaciones por WriteBatch, una queda para la versión de la colección
+CAMPOS_PRODUCTO = ["modelo", "tipo", "nombre", "precio", "cantidad"]
+
+
+class CheckpointImportacion:
+    """
+    Guarda en data/ el avance de una importación masiva.
+    El checkpoint se identifica por una clave calculada a partir del
+    contenido importado, así solo se reanuda si se vuelve a importar
+    exactamente el mismo archivo.
+    """
+
+    def __init__(self, nombre: str, clave: str):
+        self.archivo = Path(f"data/checkpoint_importacion_{nombre}.json")
+        self.clave = clave
+
+    def cargar(self) -> Dict:
+        """Devuelve el avance guardado o un avance vacío si no corresponde"""
+        vacio = {"lotes_confirmados": 0, "nuevos": 0, "actualizados": 0}
+        try:
+            if not self.archivo.exists():
+                return vacio
+            with open(self.archivo, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+            if datos.get("clave") != self.clave:
+                return vacio
+            return datos
+        except Exception as e:
+            print(f"[WARN] Checkpoint ilegible, se ignora: {e}")
+            return vacio
+
+    def guardar(self, lotes_confirmados: int, nuevos: int, actualizados: int, total: int):
+        """Registra un lote confirmado"""
+        try:
+            self.archivo.parent.mkdir(exist_ok=True)
+            datos = {
+                "clave": self.clave,
+                "lotes_confirmados": lotes_confirmados,
+                "nuevos": nuevos,
+                "actualizados": actualizados,
+                "total": total,
+                "fecha": datetime.now().isoformat(),
+            }
+            with open(self.archivo, 'w', encoding='utf-8') as f:
+                json.dump(datos, f, ensure_ascii=False)
+        except Exception as e:
+            print(f"[WARN] No se pudo guardar el checkpoint: {e}")
+
+    def limpiar(self):
+        """Elimina el checkpoint al terminar la importación"""
+        try:
+            if self.archivo.exists():
+                self.archivo.unlink()
+        except Exception as e:
+            print(f"[WARN] No se pudo eliminar el checkpoint: {e}")
+
+
+def calcular_clave_contenido(registros: List[Dict]) -> str:
+    """Hash estable del contenido a importar (independiente del nombre del archivo)"""
+    contenido = json.dumps(registros, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(contenido.encode('utf-8')).hexdigest()
+
+
+def dividir_en_lotes(registros: Union[List, pl.DataFrame], tamano: int = TAMANO_LOTE) -> List[List]:
+    """Divide una lista (o DataFrame) en lotes consecutivos de dicts de tamaño fijo"""
+    if isinstance(registros, pl.DataFrame):
+        return [bloque.to_dicts() for bloque in registros.iter_slices(n_rows=tamano)]
+    return [registros[i:i + tamano] for i in range(0, len(registros), tamano)]
+
+
+def preparar_productos(productos: Union[List[Dict], pl.DataFrame]) -> Dict:
+    """
+    Valida y deduplica los productos antes de escribir.
+    Si un modelo aparece varias veces, gana la última fila (igual que al
+    escribir fila por fila). Las filas sin campos requeridos o sin modelo
+    se cuentan como inválidas.
+    """
+    if isinstance(productos, pl.DataFrame):
+        validos, invalidos = separar_productos_validos(productos)
+        return {"validos": validos.to_dicts(), "invalidos": invalidos.height}
+
+    por_modelo = {}
+    invalidos = 0
+    for producto in productos:
+        if not all(key in producto for key in CAMPOS_PRODUCTO):
+            invalidos += 1
+            continue
+        modelo = producto.get("modelo")
+        if modelo is None or not str(modelo).strip():
+            invalidos += 1
+            continue
+        por_modelo[str(modelo)] = producto
+    return {"validos": list(por_modelo.values()), "invalidos": invalidos}
+
+
+class ImportadorProductos:
+    """
+    Escribe productos en la colección 'productos' usando lotes.
+    Los productos nuevos usan el modelo como ID de documento, igual que en la
+    importación original; los cambios detectados por diff_importacion se
+    aplican con merge sobre el documento existente para no pisar la cantidad.
+    """
+
+    def __init__(self, db=None, tamano_lote: int = TAMANO_LOTE):
+        if db is None:
+            from conexiones.firebase import db
+        self.db = db
+        self.tamano_lote = tamano_lote
+        self.coleccion = "productos"
+
+    def _consultar_existentes(self, referencias) -> set:
+        """Una sola llamada get_all para todo el lote"""
+        existentes = set()
+        for snapshot in self.db.get_all(referencias):
+            if snapshot.exists:
+                existentes.add(snapshot.id)
+        return existentes
+
+    def _confirmar_lote(self, lote: List[Dict], referencias):
+        """Escribe el lote completo con un único commit"""
+        batch = self.db.batch()
+        for operacion, doc_ref in zip(lote, referencias):
+            if operacion["merge"]:
+                batch.set(doc_ref, sellar(dict(operacion["datos"])), merge=True)
+            else:
+                batch.set(doc_ref, sellar(dict(operacion["datos"])))
+        subir_version(batch, self.db, [self.coleccion])
+        batch.commit()
+
+    async def importar(self, productos: Union[List[Dict], pl.DataFrame],
+                       on_progreso: Optional[Callable[[int, int], None]] = None) -> Dict:
+        """
+        Importa los productos por lotes sobrescribiendo cada documento,
+        reanudando desde el checkpoint si existe.
+
+        Args:
+            productos: DataFrame de ingesta_excel o lista de dicts con CAMPOS_PRODUCTO
+            on_progreso: Callback (procesados, total) llamado tras cada lote
+
+        Returns:
+            Dict con nuevos, actualizados, invalidos, lotes y si se reanudó
+        """
+        preparados = preparar_productos(productos)
+        operaciones = [{"id": str(p["modelo"]), "datos": p, "merge": False} for p in preparados["validos"]]
+        resultado = await self._escribir_operaciones(operaciones, on_progreso)
+        resultado["invalidos"] = preparados["invalidos"]
+        return resultado
+
+    async def importar_cambios(self, diff,
+                               on_progreso: Optional[Callable[[int, int], None]] = None) -> Dict:
+        """
+        Escribe solo lo que indica un DiffImportacion: crea los productos
+        nuevos y actualiza (merge) los que cambiaron. Las filas sin cambios
+        no generan escrituras.
+
+        Returns:
+            Dict con nuevos, actualizados, sin_cambios, invalidos, lotes y si se reanudó
+        """
+        # El diff ya sabe qué documentos existen: los cambios son los únicos que existen
+        operaciones = [{"id": str(p["modelo"]), "datos": p, "merge": False, "existe": False}
+                       for p in diff.nuevos.to_dicts()]
+        for cambio in diff.cambiados.to_dicts():
+            firebase_id = cambio.pop("firebase_id")
+            operaciones.append({"id": firebase_id, "datos": cambio, "merge": True, "existe": True})
+
+        resultado = await self._escribir_operaciones(operaciones, on_progreso)
+        resultado["sin_cambios"] = diff.sin_cambios
+        resultado["invalidos"] = diff.invalidos
+        return resultado
+
+    async def _escribir_operaciones(self, operaciones: List[Dict],
+                                    on_progreso: Optional[Callable[[int, int], None]]) -> Dict:
+        """
+        Confirma y registra en el checkpoint cada lote. La existencia solo se
+        consulta (get_all) para las operaciones que no traen la clave "existe".
+        """
+        total = len(operaciones)
+        lotes = dividir_en_lotes(operaciones, self.tamano_lote)
+
+        checkpoint = CheckpointImportacion(self.coleccion, calcular_clave_contenido(operaciones))
+        avance = checkpoint.cargar()
+        lotes_confirmados = avance["lotes_confirmados"]
+        nuevos = avance["nuevos"]
+        actualizados = avance["actualizados"]
+        reanudado = lotes_confirmados > 0
+
+        if reanudado:
+            print(f"[PROCESO] Reanudando importación: {lotes_confirmados}/{len(lotes)} lotes ya confirmados")
+
+        referencia_coleccion = self.db.collection(self.coleccion)
+
+        for indice in range(lotes_confirmados, len(lotes)):
+            lote = lotes[indice]
+            referencias = [referencia_coleccion.document(op["id"]) for op in lote]
+
+            # Las llamadas de red se ejecutan fuera del hilo de la UI
+            if all("existe" in op for op in lote):
+                existentes = {op["id"] for op in lote if op["existe"]}
+            else:
+                inicio = time.perf_counter()
+                existentes = await ejecutar(self._consultar_existentes, referencias)
+                monitor_firebase.registrar_consulta(
+                    tipo='lectura',
+                    coleccion=self.coleccion,
+                    descripcion=f'Importación: existencia lote {indice + 1}/{len(lotes)}',
+                    cantidad_docs=len(referencias),
+                    funcionalidad='importacion',
+                    duracion=time.perf_counter() - inicio
+                )
+
+            inicio = time.perf_counter()
+            await ejecutar(self._confirmar_lote, lote, referencias)
+            monitor_firebase.registrar_consulta(
+                tipo='escritura',
+                coleccion=self.coleccion,
+                descripcion=f'Importación: commit lote {indice + 1}/{len(lotes)}',
+                cantidad_docs=len(lote),
+                funcionalidad='importacion',
+                duracion=time.perf_counter() - inicio
+            )
+
+            nuevos_lote = sum(1 for ref in referencias if ref.id not in existentes)
+            nuevos += nuevos_lote
+            actualizados += len(lote) - nuevos_lote
+            checkpoint.guardar(indice + 1, nuevos, actualizados, total)
+
+            if on_progreso:
+                on_progreso(min((indice + 1) * self.tamano_lote, total), total)
+
+        checkpoint.limpiar()
+
+        return {
+            "nuevos": nuevos,
+            "actualizados": actualizados,
+            "lotes": len(lotes),
+            "reanudado": reanudado,
+        }
+
+
+MAX_COMMITS_PARALELOS = 4  # Lotes de ubicaciones confirmándose a la vez
+MAX_REINTENTOS = 3
+
+
+class ImportadorUbicaciones:
+    """
+    Escribe ubicaciones en la colección 'ubicaciones' por lotes, con varios
+    commits en paralelo (acotados) y reintentos por lote.
+
+    Los IDs de documento se generan en el cliente antes del primer intento,
+    así reintentar un lote que sí llegó a confirmarse no duplica ubicaciones.
+    """
+
+    def __init__(self, db=None, tamano_lote: int = TAMANO_LOTE,
+                 max_paralelos: int = MAX_COMMITS_PARALELOS, max_reintentos: int = MAX_REINTENTOS):
+        if db is None:
+            from conexiones.firebase import db
+        self.db = db
+        self.tamano_lote = tamano_lote
+        self.max_paralelos = max_paralelos
+        self.max_reintentos = max_reintentos
+        self.coleccion = "ubicaciones"
+
+    def _confirmar_lote(self, lote: List[Dict], referencias):
+        batch = self.db.batch()
+        for ubicacion, doc_ref in zip(lote, referencias):
+            batch.set(doc_ref, sellar(dict(ubicacion)))
+        subir_version(batch, self.db, [self.coleccion])
+        batch.commit()
+
+    async def _confirmar_con_reintentos(self, indice: int, lote: List[Dict], referencias,
+                                        semaforo: asyncio.Semaphore) -> bool:
+        """Confirma un lote reintentando con espera exponencial si falla"""
+        async with semaforo:
+            for intento in range(1, self.max_reintentos + 1):
+                try:
+                    inicio = time.perf_counter()
+                    await ejecutar(self._confirmar_lote, lote, referencias)
+                    monitor_firebase.registrar_consulta(
+                        tipo='escritura',
+                        coleccion=self.coleccion,
+                        descripcion=f'Importación ubicaciones: commit lote {indice + 1}',
+                        cantidad_docs=len(lote),
+                        funcionalidad='importacion',
+                        duracion=time.perf_counter() - inicio
+                    )
+                    return True
+                except Exception as e:
+                    print(f"[WARN] Lote {indice + 1} falló (intento {intento}/{self.max_reintentos}): {e}")
+                    if intento < self.max_reintentos:
+                        await asyncio.sleep(0.5 * 2 ** (intento - 1))
+            return False
+
+    async def importar(self, ubicaciones: Union[List[Dict], pl.DataFrame],
+                       on_progreso: Optional[Callable[[int, int], None]] = None) -> Dict:
+        """
+        Importa las ubicaciones por lotes.
+
+        Args:
+            ubicaciones: DataFrame de ingesta_excel o lista de ubicaciones normalizadas
+            on_progreso: Callback (procesados, total) llamado tras cada lote
+
+        Returns:
+            Dict con guardados, errores y el conjunto de modelos afectados
+            (solo de los lotes confirmados)
+        """
+        total = len(ubicaciones)
+        lotes = dividir_en_lotes(ubicaciones, self.tamano_lote)
+        referencia_coleccion = self.db.collection(self.coleccion)
+        referencias_por_lote = [[referencia_coleccion.document() for _ in lote] for lote in lotes]
+
+        semaforo = asyncio.Semaphore(self.max_paralelos)
+        procesados = 0
+        guardados = 0
+        errores = 0
+        modelos_afectados = set()
+
+        async def procesar(indice):
+            nonlocal procesados, guardados, errores
+            lote = lotes[indice]
+            exito = await self._confirmar_con_reintentos(indice, lote, referencias_por_lote[indice], semaforo)
+            procesados += len(lote)
+            if exito:
+                guardados += len(lote)
+                modelos_afectados.update(str(u.get("modelo", "")).strip() for u in lote)
+            else:
+                errores += len(lote)
+            if on_progreso:
+                on_progreso(procesados, total)
+
+        await asyncio.gather(*(procesar(i) for i in range(len(lotes))))
+        modelos_afectados.discard("")
+
+        return {
+            "guardados": guardados,
+            "errores": errores,
+            "lotes": len(lotes),
+            "modelos": modelos_afectados,
+        }
@@ -0,0 +1,137 @@
+"""
+Lectura vectorizada de archivos Excel para importación.
+
+Los encabezados se resuelven una sola vez por archivo (no por fila) y la
+limpieza, conversión de tipos y validación se hacen columna por columna
+con expresiones de Polars. El resultado es un DataFrame, no una lista de
+dicts: la conversión a dicts solo ocurre al escribir cada lote en Firebase.
+"""
+
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import polars as pl
+
+# Encabezados aceptados para cada campo, en orden de prioridad
+COLUMNAS_PRODUCTOS = {
+    "modelo": ["Modelo"],
+    "tipo": ["Tipo"],
+    "nombre": ["Nombre"],
+    "precio": ["Precio"],
+}
+
+COLUMNAS_UBICACIONES = {
+    "modelo": ["Modelo", "modelo", "Material", "material", "Producto", "producto"],
+    "almacen": ["Almacen", "Almacén", "almacen", "almacén", "Deposito", "deposito"],
+    "estanteria": ["Estanteria", "Estantería", "estanteria", "estantería",
+                   "Ubicacion", "Ubicación", "ubicacion", "ubicación",
+                   "Pasillo", "pasillo", "Rack", "rack"],
+    "cantidad": ["Cantidad", "cantidad", "Qty", "qty", "Stock", "stock"],
+    "observaciones": ["Comentarios", "comentarios", "Observaciones", "observaciones",
+                      "Notas", "notas", "Comentario", "comentario"],
+}
+
+
+def resolver_columnas(columnas: List[str], alias: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """
+    Resuelve qué columnas del archivo corresponden a cada campo.
+    Se ejecuta una vez por archivo; devuelve solo los encabezados presentes,
+    respetando el orden de prioridad de `alias`.
+    """
+    presentes = set(columnas)
+    return {campo: [opcion for opcion in opciones if opcion in presentes]
+            for campo, opciones in alias.items()}
+
+
+def _texto_limpio(columna: str, nulos_extra: Tuple[str, ...] = ()) -> pl.Expr:
+    """Columna como texto sin espacios; vacíos (y `nulos_extra`) pasan a null"""
+    texto = pl.col(columna).cast(pl.Utf8).str.strip_chars()
+    es_nulo = texto == ""
+    for valor in nulos_extra:
+        es_nulo = es_nulo | (texto.str.to_lowercase() == valor)
+    return pl.when(es_nulo).then(None).otherwise(texto)
+
+
+def _primer_texto(columnas: List[str], nulos_extra: Tuple[str, ...] = ()) -> pl.Expr:
+    """Primer valor no vacío entre las columnas candidatas"""
+    if not columnas:
+        return pl.lit(None, dtype=pl.Utf8)
+    return pl.coalesce([_texto_limpio(c, nulos_extra) for c in columnas])
+
+
+def _primer_entero(columnas: List[str]) -> pl.Expr:
+    """
+    Primer valor numérico válido entre las columnas candidatas (truncado a
+    entero). Un 0, igual que un vacío, pasa a la siguiente columna, como en
+    la lectura fila por fila.
+    """
+    if not columnas:
+        return pl.lit(None, dtype=pl.Int64)
+    numeros = [_texto_limpio(c).cast(pl.Float64, strict=False) for c in columnas]
+    return pl.coalesce([
+        pl.when(numero == 0).then(None).otherwise(numero).cast(pl.Int64, strict=False)
+        for numero in numeros
+    ])
+
+
+def normalizar_productos(df: pl.DataFrame) -> pl.DataFrame:
+    """
+    Convierte el DataFrame crudo del Excel al esquema de 'productos'.
+    La cantidad siempre empieza en 0: se calcula desde ubicaciones.
+    Las filas sin modelo o con precio no numérico quedan con null en ese campo.
+    """
+    mapeo = resolver_columnas(df.columns, COLUMNAS_PRODUCTOS)
+    faltantes = [COLUMNAS_PRODUCTOS[campo][0] for campo, columnas in mapeo.items() if not columnas]
+    if faltantes:
+        raise ValueError(f"Faltan columnas requeridas: {', '.join(faltantes)}")
+
+    return df.select(
+        _primer_texto(mapeo["modelo"], ("none",)).alias("modelo"),
+        _primer_texto(mapeo["tipo"]).alias("tipo"),
+        _primer_texto(mapeo["nombre"]).alias("nombre"),
+        _texto_limpio(mapeo["precio"][0]).cast(pl.Float64, strict=False).alias("precio"),
+        pl.lit(0, dtype=pl.Int64).alias("cantidad"),
+    )
+
+
+def separar_productos_validos(df: pl.DataFrame) -> Tuple[pl.DataFrame, pl.DataFrame]:
+    """
+    Separa filas válidas e inválidas de un DataFrame de productos.
+    Si un modelo se repite, gana la última fila (igual que al escribir en orden).
+    """
+    es_valido = pl.col("modelo").is_not_null() & pl.col("precio").is_not_null()
+    validos = df.filter(es_valido).unique(subset="modelo", keep="last", maintain_order=True)
+    invalidos = df.filter(~es_valido)
+    return validos, invalidos
+
+
+def normalizar_ubicaciones(df: pl.DataFrame) -> pl.DataFrame:
+    """
+    Convierte el DataFrame crudo del Excel al esquema de 'ubicaciones'.
+    Aplica los mismos valores por defecto que la lectura fila por fila:
+    modelo UBICACIONnnn, 'Almacén Principal', estantería 'A1', cantidad mínima 1.
+    """
+    mapeo = resolver_columnas(df.columns, COLUMNAS_UBICACIONES)
+    ahora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    modelo_auto = pl.format("UBICACION{}", pl.int_range(1, df.height + 1).cast(pl.Utf8).str.zfill(3))
+    cantidad = _primer_entero(mapeo["cantidad"])
+
+    return df.select(
+        pl.coalesce([_primer_texto(mapeo["modelo"], ("none",)), modelo_auto]).alias("modelo"),
+        _primer_texto(mapeo["almacen"]).fill_null("Almacén Principal").alias("almacen"),
+        _primer_texto(mapeo["estanteria"]).fill_null("A1").alias("estanteria"),
+        pl.when(cantidad.is_null() | (cantidad <= 0)).then(1).otherwise(cantidad).alias("cantidad"),
+        _primer_texto(mapeo["observaciones"]).fill_null("Sin observaciones").alias("observaciones"),
+        pl.lit(ahora).alias("fecha_asignacion"),
+        pl.lit("Sistema de importación").alias("usuario_asignacion"),
+    )
+
+
+def leer_productos_excel(ruta_archivo: str) -> pl.DataFrame:
+    """Lee un Excel de productos y lo devuelve normalizado"""
+    return normalizar_productos(pl.read_excel(ruta_archivo))
+
+
+def leer_ubicaciones_excel(ruta_archivo: str) -> pl.DataFrame:
+    """Lee un Excel de ubicaciones y lo devuelve normalizado"""
+    return normalizar_ubicaciones(pl.read_excel(ruta_archivo))
@@ -0,0 +1,495 @@
+"""
+Motor de reportes: cada reporte es un plan perezoso de Polars.
+
+Las entradas (productos, ubicaciones, movimientos e historial) se leen una
+sola vez como DataFrames (ver EntradasReporte y cargar_entradas) y todos los
+reportes parten de ellas: filtros, agrupaciones y joins corren vectorizados.
+generar_reportes() ejecuta varios planes juntos con collect_all, así los
+pasos comunes (p. ej. el historial filtrado) se calculan una sola vez.
+
+El motor no depende de Flet ni de Firebase: ui_reportes solo arma los
+filtros y muestra el DataFrame resultante, y las pruebas y el benchmark
+construyen las entradas a mano.
+"""
+
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Callable, Dict, Hashable, Iterable, NamedTuple, Optional, Tuple
+
+import polars as pl
+
+from app.utils.tablas_cache import TablaMovimientos, TablaProductos, TablaUbicaciones
+
+LIMITE_HISTORIAL = 1000   # Actividades del historial que leen los reportes
+LIMITE_MOVIMIENTOS = 100
+LIMITE_ALTAS_BAJAS = 50
+LIMITE_USUARIOS = 200
+LIMITE_ROTACION = 50
+
+TIPOS_MOVIMIENTO_HISTORIAL = ["movimiento_ubicacion", "mover_ubicacion"]
+TIPOS_BAJA = ["eliminar_producto", "eliminar_productos_multiple"]
+
+# Modelo mencionado en las descripciones del historial que no traen detalles
+_PATRONES_MODELO = (r"\(Modelo: ([^)]+)\)", r"Movió \d+x (\S+) de ")
+
+ESQUEMA_HISTORIAL = {
+    "fecha": pl.Utf8,
+    "tipo": pl.Utf8,
+    "usuario": pl.Utf8,
+    "descripcion": pl.Utf8,
+    "modelo_detalle": pl.Utf8,
+    "cantidad": pl.Int64,
+}
+
+
+class Filtros(NamedTuple):
+    """Período (YYYY-MM-DD, inclusivo) y usuario de los reportes con fechas"""
+    fecha_inicio: Optional[str] = None
+    fecha_fin: Optional[str] = None
+    usuario: Optional[str] = None
+
+    @classmethod
+    def desde_texto(cls, fecha_inicio: str, fecha_fin: str, usuario: str = "todos") -> 'Filtros':
+        """Filtros desde los campos de la vista; fechas inválidas y 'todos' no filtran"""
+        def fecha(valor):
+            try:
+                return datetime.strptime((valor or "").strip(), "%Y-%m-%d").strftime("%Y-%m-%d")
+            except ValueError:
+                return None
+        return cls(fecha(fecha_inicio), fecha(fecha_fin), None if usuario in (None, "", "todos") else usuario)
+
+
+class EntradasReporte(NamedTuple):
+    """DataFrames de los que parten todos los reportes (ver tablas_cache e historial_a_frame)"""
+    productos: pl.DataFrame
+    ubicaciones: pl.DataFrame
+    movimientos: pl.DataFrame
+    historial: pl.DataFrame
+
+
+def _texto(valor) -> Optional[str]:
+    return None if valor is None else str(valor)
+
+
+def _entero(valor) -> Optional[int]:
+    try:
+        return None if valor is None or isinstance(valor, bool) else int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def historial_a_frame(actividades: Iterable[Mapping]) -> pl.DataFrame:
+    """
+    DataFrame del historial en su orden (más reciente primero). El modelo
+    sale de detalles['modelo'] o, en actividades viejas, de la descripción;
+    la cantidad, de detalles['cantidad'] (nula si la actividad no la trae).
+    """
+    filas = [a for a in actividades if isinstance(a, Mapping)]
+    detalles = [a.get("detalles") if isinstance(a.get("detalles"), Mapping) else {} for a in filas]
+    df = pl.DataFrame({
+        "fecha": [_texto(a.get("fecha")) for a in filas],
+        "tipo": [_texto(a.get("tipo")) for a in filas],
+        "usuario": [_texto(a.get("usuario")) for a in filas],
+        "descripcion": [_texto(a.get("descripcion")) for a in filas],
+        "modelo_detalle": [_texto(d.get("modelo")) for d in detalles],
+        "cantidad": [_entero(d.get("cantidad")) for d in detalles],
+    }, schema=ESQUEMA_HISTORIAL)
+    descripcion = pl.col("descripcion")
+    return df.with_columns(
+        pl.coalesce([pl.col("modelo_detalle")] + [descripcion.str.extract(p) for p in _PATRONES_MODELO])
+        .str.strip_chars().alias("modelo")
+    ).drop("modelo_detalle")
+
+
+async def cargar_entradas(nombres: Iterable[str] = EntradasReporte._fields,
+                          limite_historial: int = LIMITE_HISTORIAL) -> EntradasReporte:
+    """
+    Lee del cache cada colección indicada y el historial una sola vez para
+    todos los reportes; las entradas no pedidas quedan vacías.
+    """
+    import asyncio
+    from app.services import repositorio_movimientos, repositorio_productos, repositorio_ubicaciones
+    from app.utils.historial import GestorHistorial
+
+    async def vacia(tabla):
+        return tabla().df
+
+    async def sin_historial():
+        return []
+
+    nombres = set(nombres)
+    productos, ubicaciones, movimientos, historial = await asyncio.gather(
+        repositorio_productos.tabla() if "productos" in nombres else vacia(TablaProductos),
+        repositorio_ubicaciones.tabla() if "ubicaciones" in nombres else vacia(TablaUbicaciones),
+        repositorio_movimientos.tabla() if "movimientos" in nombres else vacia(TablaMovimientos),
+        GestorHistorial().obtener_historial_reciente(limite=limite_historial) if "historial" in nombres
+        else sin_historial(),
+    )
+    return EntradasReporte(productos, ubicaciones, movimientos, historial_a_frame(historial))
+
+
+async def versiones_entradas(nombres: Iterable[str]) -> Dict[str, Hashable]:
+    """
+    Versión actual de cada entrada: revisión del cache por colección (tras
+    revalidarla si hacía falta) y versión del historial. Si no cambió
+    ninguna, el resultado de un reporte sigue valiendo.
+    """
+    from app.services import repositorio_movimientos, repositorio_productos, repositorio_ubicaciones
+    from app.utils.historial import GestorHistorial
+
+    repositorios = {"productos": repositorio_productos, "ubicaciones": repositorio_ubicaciones,
+                    "movimientos": repositorio_movimientos}
+    versiones = {}
+    for nombre in nombres:
+        if nombre == "historial":
+            versiones[nombre] = await GestorHistorial().version()
+        else:
+            await repositorios[nombre].listar()
+            versiones[nombre] = repositorios[nombre].revision()
+    return versiones
+
+
+# ----------------------------------------------------------------------
+# Expresiones comunes
+# ----------------------------------------------------------------------
+
+def _con_valor(columna: str) -> pl.Expr:
+    return pl.col(columna).is_not_null() & (pl.col(columna) != "")
+
+
+def _contiene(columna: str, texto: str) -> pl.Expr:
+    return pl.col(columna).fill_null("").str.contains(texto, literal=True)
+
+
+def _filtrar(plan: pl.LazyFrame, filtros: Optional[Filtros]) -> pl.LazyFrame:
+    """Aplica período y usuario sobre las columnas fecha (ISO) y usuario"""
+    if filtros is None:
+        return plan
+    dia = pl.col("fecha").str.slice(0, 10)
+    if filtros.fecha_inicio:
+        plan = plan.filter(dia >= filtros.fecha_inicio)
+    if filtros.fecha_fin:
+        plan = plan.filter(dia <= filtros.fecha_fin)
+    if filtros.usuario:
+        plan = plan.filter(pl.col("usuario") == filtros.usuario)
+    return plan
+
+
+def _almacen(almacen: str, estanteria: str) -> pl.Expr:
+    return pl.format("Almacén {}/{}", pl.col(almacen), pl.col(estanteria))
+
+
+def _ubicacion_movimiento(columna: str) -> pl.Expr:
+    # Los movimientos entre ubicaciones sin el dict de ubicación se mostraban como 'Almacén N/A/N/A'
+    return (pl.when(pl.col(columna).is_null()).then(pl.lit("Almacén N/A/N/A"))
+            .when(pl.col(columna) == "").then(pl.lit("N/A"))
+            .otherwise(pl.col(columna)))
+
+
+# ----------------------------------------------------------------------
+# Planes
+# ----------------------------------------------------------------------
+
+def plan_movimientos(entradas: EntradasReporte, filtros: Optional[Filtros] = None) -> pl.LazyFrame:
+    """Movimientos de Firebase (más recientes primero) seguidos de los traslados del historial"""
+    tipo = pl.col("tipo")
+    hay_origen = _con_valor("almacen_origen") & _con_valor("estanteria_origen")
+    hay_destino = _con_valor("almacen_destino") & _con_valor("estanteria_destino")
+
+    origen = (pl.when(tipo == "entrada_inventario").then(pl.lit("Entrada Externa"))
+              .when((tipo == "salida_inventario") & hay_origen).then(_almacen("almacen_origen", "estanteria_origen"))
+              .when((tipo == "ajuste_inventario") & hay_destino).then(_almacen("almacen_destino", "estanteria_destino"))
+              .when(tipo == "movimiento_ubicacion").then(_ubicacion_movimiento("ubicacion_origen"))
+              .otherwise(pl.lit("N/A")))
+    destino = (pl.when((tipo == "entrada_inventario") & hay_destino).then(_almacen("almacen_destino", "estanteria_destino"))
+               .when(tipo == "salida_inventario").then(pl.lit("Salida Externa"))
+               .when((tipo == "ajuste_inventario") & hay_destino).then(_almacen("almacen_destino", "estanteria_destino"))
+               .when(tipo == "movimiento_ubicacion").then(_ubicacion_movimiento("ubicacion_destino"))
+               .otherwise(pl.lit("N/A")))
+    motivo = (pl.when(_con_valor("comentarios")).then(pl.col("comentarios"))
+              .when(_con_valor("motivo")).then(pl.col("motivo"))
+              .when(tipo == "entrada_inventario").then(pl.lit("Entrada de inventario"))
+              .when(tipo == "salida_inventario").then(pl.lit("Salida de inventario"))
+              .when(tipo == "ajuste_inventario").then(pl.lit("Ajuste de inventario"))
+              .when(tipo == "movimiento_ubicacion").then(pl.lit("Traslado entre ubicaciones"))
+              .otherwise(pl.lit("Movimiento de inventario")))
+    producto = (pl.when(_con_valor("modelo")).then(pl.col("modelo"))
+                .when(_con_valor("nombre_producto")).then(pl.col("nombre_producto"))
+                .otherwise(pl.lit("N/A")))
+
+    de_firebase = (_filtrar(entradas.movimientos.lazy().with_columns(tipo.fill_null("Transferencia")), filtros)
+                   .sort("fecha", descending=True, nulls_last=True)
+                   .select(
+                       pl.col("fecha").fill_null("N/A"),
+                       pl.col("usuario").fill_null("Sistema"),
+                       producto.alias("producto"),
+                       pl.col("cantidad").fill_null(0).cast(pl.Utf8),
+                       origen.alias("origen"),
+                       destino.alias("destino"),
+                       motivo.alias("motivo"),
+                       pl.col("tipo"),
+                   ))
+    ver = pl.lit("Ver descripción")
+    del_historial = (_filtrar(entradas.historial.lazy(), filtros)
+                     .filter(pl.col("tipo").is_in(TIPOS_MOVIMIENTO_HISTORIAL))
+                     .select(
+                         pl.col("fecha").fill_null("N/A"),
+                         pl.col("usuario").fill_null("Sistema"),
+                         pl.col("descripcion").fill_null("").alias("producto"),
+                         pl.col("cantidad").cast(pl.Utf8).fill_null(ver),
+                         ver.alias("origen"),
+                         ver.alias("destino"),
+                         pl.lit("Movimiento entre ubicaciones").alias("motivo"),
+                         pl.lit("Transferencia").alias("tipo"),
+                     ))
+    return pl.concat([de_firebase, del_historial]).head(LIMITE_MOVIMIENTOS)
+
+
+def plan_ubicaciones(entradas: EntradasReporte, filtros: Optional[Filtros] = None) -> pl.LazyFrame:
+    """Cada ubicación con su estado, ordenadas por almacén y estantería"""
+    almacen = pl.col("almacen").fill_null("Sin almacén")
+    cantidad = pl.col("cantidad").fill_null(0)
+    return (entradas.ubicaciones.lazy()
+            .select(
+                pl.when(almacen.str.contains(r"^\d+$")).then(pl.format("Almacén {}", almacen))
+                .otherwise(almacen).alias("almacen"),
+                pl.col("estanteria").fill_null("Sin estantería"),
+                cantidad.alias("cantidad"),
+                pl.col("modelo").fill_null("Sin modelo"),
+                pl.col("fecha_asignacion").fill_null("N/A"),
+                pl.when(cantidad > 0).then(pl.lit("Ocupado")).otherwise(pl.lit("Disponible")).alias("estado"),
+            )
+            .sort("almacen", "estanteria"))
+
+
+def plan_productos(entradas: EntradasReporte, filtros: Optional[Filtros] = None) -> pl.LazyFrame:
+    """Inventario completo con el usuario que dio de alta cada modelo (según el historial)"""
+    # Si un modelo se creó varias veces queda el alta más antigua del historial leído
+    creadores = (entradas.historial.lazy()
+                 .filter((pl.col("tipo") == "crear_producto") & pl.col("modelo").is_not_null())
+                 .select("modelo", pl.col("usuario").fill_null("Sistema").alias("usuario_alta"))
+                 .unique("modelo", keep="last", maintain_order=True))
+    return (entradas.productos.lazy()
+            .join(creadores, on="modelo", how="left")
+            .select(
+                pl.col("modelo").fill_null("N/A"),
+                pl.col("nombre").fill_null("N/A"),
+                pl.col("categoria").fill_null("Sin categoría"),
+                pl.col("cantidad").fill_null(0).alias("stock_actual"),
+                pl.col("fecha_registro").fill_null("N/A").alias("fecha_ingreso"),
+                pl.col("usuario_alta").fill_null("Importación/Sistema"),
+                pl.col("estado").fill_null("Activo"),
+            )
+            .sort("modelo"))
+
+
+def plan_altas(entradas: EntradasReporte, filtros: Optional[Filtros] = None) -> pl.LazyFrame:
+    """Productos creados según el historial (nombre y modelo tomados de la actividad)"""
+    descripcion = pl.col("descripcion").fill_null("")
+    legible = descripcion.str.contains("'", literal=True) & descripcion.str.contains("(Modelo:", literal=True)
+    return (_filtrar(entradas.historial.lazy(), filtros)
+            .filter(pl.col("tipo") == "crear_producto")
+            .select(
+                pl.col("fecha").fill_null("N/A"),
+                pl.col("usuario").fill_null("Sistema"),
+                pl.when(legible).then(pl.col("modelo").fill_null("N/A"))
+                .otherwise(pl.lit("Ver descripción")).alias("modelo"),
+                pl.when(legible).then(descripcion.str.extract(r"^[^']*'([^']*)"))
+                .otherwise(pl.lit("Ver descripción")).alias("nombre"),
+                pl.lit("Inventario General").alias("categoria"),
+                pl.lit("Ver sistema").alias("cantidad_inicial"),
+                pl.lit(0.0).alias("precio_unitario"),
+                pl.lit(0.0).alias("valor_total"),
+                pl.lit("No especificado").alias("proveedor"),
+                pl.lit("Alta de producto en sistema").alias("motivo"),
+                pl.lit("Por asignar").alias("ubicacion_asignada"),
+            )
+            .head(LIMITE_ALTAS_BAJAS))
+
+
+def plan_bajas(entradas: EntradasReporte, filtros: Optional[Filtros] = None) -> pl.LazyFrame:
+    """Eliminaciones individuales y múltiples según el historial"""
+    descripcion = pl.col("descripcion").fill_null("")
+    multiple = _contiene("tipo", "eliminar_productos_multiple")
+    eliminados = pl.coalesce(pl.col("cantidad"),
+                             descripcion.str.extract(r"Eliminó (\d+) productos").cast(pl.Int64, strict=False))
+    con_cantidad = multiple & eliminados.is_not_null()
+    con_nombre = descripcion.str.contains("'", literal=True)
+    return (_filtrar(entradas.historial.lazy(), filtros)
+            .filter(pl.col("tipo").is_in(TIPOS_BAJA))
+            .select(
+                pl.col("fecha").fill_null("N/A"),
+                pl.col("usuario").fill_null("Sistema"),
+                pl.when(con_cantidad).then(pl.lit("Múltiple"))
+                .when(~multiple & pl.col("modelo").is_not_null()).then(pl.col("modelo"))
+                .when(~multiple & con_nombre).then(pl.lit("Ver sistema"))
+                .otherwise(pl.lit("N/A")).alias("modelo"),
+                pl.when(con_cantidad).then(pl.format("{} productos eliminados", eliminados))
+                .when(~multiple & con_nombre).then(descripcion.str.extract(r"^[^']*'([^']*)"))
+                .otherwise(descripcion).alias("nombre"),
+                pl.lit("Inventario General").alias("categoria"),
+                pl.when(con_cantidad).then(eliminados).otherwise(pl.lit(1)).alias("cantidad_baja"),
+                pl.lit(0.0).alias("valor_perdido"),
+                pl.lit("Eliminación desde sistema").alias("motivo"),
+                pl.lit("Sistema").alias("ubicacion_origen"),
+                pl.lit("Eliminado").alias("estado_final"),
+                descripcion.alias("observaciones"),
+            )
+            .head(LIMITE_ALTAS_BAJAS))
+
+
+def plan_usuarios(entradas: EntradasReporte, filtros: Optional[Filtros] = None) -> pl.LazyFrame:
+    """Actividades del historial clasificadas por acción y módulo"""
+    tipo = pl.col("tipo").fill_null("")
+    accion = (pl.when(_contiene("tipo", "crear")).then(pl.lit("Creación"))
+              .when(_contiene("tipo", "editar")).then(pl.lit("Edición"))
+              .when(_contiene("tipo", "eliminar")).then(pl.lit("Eliminación"))
+              .when(_contiene("tipo", "importar")).then(pl.lit("Importación"))
+              .when(_contiene("tipo", "exportar")).then(pl.lit("Exportación"))
+              .when(_contiene("tipo", "movimiento") | _contiene("tipo", "mover")).then(pl.lit("Movimiento"))
+              .when(_contiene("tipo", "asignar")).then(pl.lit("Asignación"))
+              .otherwise(tipo.str.replace_all("_", " ").str.to_titlecase()))
+    modulo = (pl.when(_contiene("tipo", "producto")).then(pl.lit("Inventario"))
+              .when(_contiene("tipo", "usuario")).then(pl.lit("Usuarios"))
+              .when(_contiene("tipo", "ubicacion")).then(pl.lit("Ubicaciones"))
+              .when(_contiene("tipo", "movimiento")).then(pl.lit("Movimientos"))
+              .otherwise(pl.lit("Sistema")))
+    return (_filtrar(entradas.historial.lazy(), filtros)
+            .head(LIMITE_USUARIOS)
+            .select(
+                pl.col("fecha").fill_null("N/A"),
+                pl.col("usuario").fill_null("Sistema"),
+                accion.alias("accion"),
+                pl.col("descripcion").fill_null("Sin detalles").alias("detalle"),
+                modulo.alias("modulo"),
+                pl.lit("N/A").alias("duracion_sesion"),
+            ))
+
+
+def plan_stock_critico(entradas: EntradasReporte, filtros: Optional[Filtros] = None) -> pl.LazyFrame:
+    """Productos con stock en o por debajo de su mínimo, mayor déficit primero"""
+    actual = pl.col("stock_actual")
+    minimo = pl.col("stock_minimo")
+    return (entradas.productos.lazy()
+            .with_columns(pl.col("cantidad").fill_null(0).alias("stock_actual"),
+                          pl.col("stock_min").fill_null(0).alias("stock_minimo"))
+            .filter(actual <= minimo)
+            .select(
+                pl.col("modelo").fill_null("N/A"),
+                pl.col("nombre").fill_null("N/A"),
+                pl.col("categoria").fill_null("Sin categoría"),
+                actual,
+                minimo,
+                (minimo - actual).alias("deficit"),
+                pl.when(actual == 0).then(pl.lit("CRÍTICA"))
+                .when(actual < minimo * 0.5).then(pl.lit("ALTA"))
+                .otherwise(pl.lit("MEDIA")).alias("prioridad"),
+                pl.when(actual == 0).then(pl.lit("Reposición inmediata requerida"))
+                .when(actual < minimo * 0.5).then(pl.lit("Compra urgente requerida"))
+                .otherwise(pl.lit("Programar reposición")).alias("accion_sugerida"),
+                pl.col("ubicacion").fill_null("Sin ubicación"),
+                pl.col("fecha_registro").fill_null("N/A").alias("ultima_actualizacion"),
+            )
+            .sort(["deficit", "modelo"], descending=[True, False]))
+
+
+def plan_rotacion(entradas: EntradasReporte, filtros: Optional[Filtros] = None) -> pl.LazyFrame:
+    """Actividad por modelo (movimientos de Firebase + historial), más activos primero"""
+    entrada = _contiene("tipo", "entrada")
+    salida = ~entrada & _contiene("tipo", "salida")
+    traslado = ~entrada & ~salida & _contiene("tipo", "movimiento")
+    cantidad = pl.col("cantidad").fill_null(0)
+    cero = pl.lit(0, dtype=pl.Int64)
+
+    de_firebase = (entradas.movimientos.lazy()
+                   .filter(_con_valor("modelo") & (pl.col("modelo") != "N/A"))
+                   .sort("fecha", descending=True, nulls_last=True)
+                   .select(
+                       "modelo",
+                       pl.col("nombre_producto").alias("nombre"),
+                       pl.when(entrada).then(cantidad).otherwise(cero).alias("entradas"),
+                       pl.when(salida).then(cantidad).otherwise(cero).alias("salidas"),
+                       pl.when(traslado).then(1).otherwise(cero).alias("movimientos_ubicacion"),
+                   ))
+
+    tipo = pl.col("tipo").fill_null("").str.to_lowercase()
+    crear = _contiene("tipo", "crear")
+    eliminar = ~crear & _contiene("tipo", "eliminar")
+    mover = ~crear & ~eliminar & _contiene("tipo", "movimiento")
+    del_historial = (entradas.historial.lazy()
+                     .filter((tipo.str.contains("producto", literal=True) | tipo.str.contains("movimiento", literal=True))
+                             & pl.col("modelo").is_not_null())
+                     .select(
+                         "modelo",
+                         pl.lit(None, dtype=pl.Utf8).alias("nombre"),
+                         pl.when(crear).then(1).otherwise(cero).alias("entradas"),
+                         pl.when(eliminar).then(1).otherwise(cero).alias("salidas"),
+                         pl.when(mover).then(1).otherwise(cero).alias("movimientos_ubicacion"),
+                     ))
+
+    total = pl.col("total_movimientos")
+    return (pl.concat([de_firebase, del_historial])
+            .group_by("modelo")
+            .agg(
+                pl.col("nombre").drop_nulls().first().fill_null("Producto"),
+                pl.col("entradas").sum(),
+                pl.col("salidas").sum(),
+                pl.col("movimientos_ubicacion").sum(),
+                pl.len().cast(pl.Int64).alias("total_movimientos"),
+            )
+            .with_columns(
+                pl.when(total >= 10).then(pl.lit("ALTA ROTACIÓN"))
+                .when(total >= 5).then(pl.lit("ROTACIÓN MEDIA"))
+                .otherwise(pl.lit("BAJA ROTACIÓN")).alias("tendencia"),
+                pl.when(total >= 10).then(pl.lit("MUY ACTIVO"))
+                .when(total >= 5).then(pl.lit("ACTIVO"))
+                .otherwise(pl.lit("POCO ACTIVO")).alias("clasificacion"),
+            )
+            .sort(["total_movimientos", "modelo"], descending=[True, False])
+            .head(LIMITE_ROTACION))
+
+
+PLANES: Dict[str, Callable[[EntradasReporte, Optional[Filtros]], pl.LazyFrame]] = {
+    "movimientos": plan_movimientos,
+    "ubicaciones": plan_ubicaciones,
+    "productos": plan_productos,
+    "altas": plan_altas,
+    "bajas": plan_bajas,
+    "usuarios": plan_usuarios,
+    "stock_critico": plan_stock_critico,
+    "rotacion": plan_rotacion,
+}
+
+# Reportes que usan el período y el usuario de los filtros (los demás son el estado actual)
+REPORTES_CON_FILTROS = frozenset({"movimientos", "altas", "bajas", "usuarios"})
+
+# Entradas de las que depende cada reporte (solo esas se cargan y solo sus cambios lo invalidan)
+ENTRADAS_REPORTE: Dict[str, Tuple[str, ...]] = {
+    "movimientos": ("movimientos", "historial"),
+    "ubicaciones": ("ubicaciones",),
+    "productos": ("productos", "historial"),
+    "altas": ("historial",),
+    "bajas": ("historial",),
+    "usuarios": ("historial",),
+    "stock_critico": ("productos",),
+    "rotacion": ("movimientos", "historial"),
+}
+
+
+def filtros_de(tipo: str, filtros: Optional[Filtros]) -> Optional[Filtros]:
+    """Filtros que realmente usa el reporte (None en los de estado actual)"""
+    return filtros if tipo in REPORTES_CON_FILTROS else None
+
+
+def generar_reporte(tipo: str, entradas: EntradasReporte, filtros: Optional[Filtros] = None) -> pl.DataFrame:
+    """Ejecuta el plan de un reporte"""
+    return PLANES[tipo](entradas, filtros_de(tipo, filtros)).collect()
+
+
+def generar_reportes(entradas: EntradasReporte, filtros: Optional[Filtros] = None,
+                     tipos: Optional[Iterable[str]] = None) -> Dict[str, pl.DataFrame]:
+    """Ejecuta varios reportes (todos por defecto) en una sola pasada con collect_all"""
+    tipos = list(PLANES if tipos is None else tipos)
+    planes = [PLANES[tipo](entradas, filtros_de(tipo, filtros)) for tipo in tipos]
+    return dict(zip(tipos, pl.collect_all(planes)))
+
@@ -0,0 +1,7 @@
+from app.models.registro import Registro
+from app.models.producto import Producto, normalizar_modelo
+from app.models.ubicacion import Ubicacion
+from app.models.movimiento import Movimiento
+from app.models.usuario import Usuario
+
+MODELOS = {modelo.COLECCION: modelo for modelo in (Producto, Ubicacion, Movimiento, Usuario)}
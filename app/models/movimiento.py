@@ -0,0 +1,51 @@
+from datetime import datetime
+from typing import Dict, Optional
+
+from app.models.registro import Registro
+
+
+class Movimiento(Registro):
+    """
+    Documento de la colección 'movimientos'.
+    Hay movimientos viejos con 'fecha' y nuevos con 'fecha_movimiento':
+    al leerlos se completan ambos campos con el mismo valor.
+
+    Las fechas se guardan como texto en dos formatos ('2024-05-01 10:20:30' e
+    ISO con 'T') que no ordenan bien entre sí; para consultar por fecha en
+    Firestore (order_by, rangos, cursores) cada movimiento lleva además
+    'fecha_orden' como timestamp (ver con_fecha_orden).
+    """
+
+    __slots__ = ('tipo', 'tipo_movimiento', 'modelo', 'producto_modelo', 'cantidad', 'usuario',
+                 'fecha', 'fecha_movimiento', 'fecha_orden', 'estado', 'motivo', 'comentarios',
+                 'ubicacion_origen', 'ubicacion_destino')
+
+    COLECCION = 'movimientos'
+    CAMPOS = __slots__
+    CAMPO_ORDEN = 'fecha_orden'
+
+    @classmethod
+    def desde_documento(cls, doc_id: str, datos: Dict) -> 'Movimiento':
+        datos = dict(datos)
+        if 'fecha' in datos and 'fecha_movimiento' not in datos:
+            datos['fecha_movimiento'] = datos['fecha']
+        elif 'fecha_movimiento' in datos and 'fecha' not in datos:
+            datos['fecha'] = datos['fecha_movimiento']
+        return super().desde_documento(doc_id, datos)
+
+    @staticmethod
+    def fecha_orden_de(datos: Dict) -> Optional[datetime]:
+        """Fecha del movimiento como datetime (de 'fecha_movimiento' o 'fecha'); None si no se entiende"""
+        valor = datos.get('fecha_movimiento') or datos.get('fecha')
+        if isinstance(valor, datetime):
+            return valor
+        try:
+            return datetime.fromisoformat(str(valor))
+        except ValueError:
+            return None
+
+    @classmethod
+    def con_fecha_orden(cls, datos: Dict) -> Dict:
+        """Agrega 'fecha_orden' a los datos de un movimiento nuevo antes de escribirlo"""
+        datos[cls.CAMPO_ORDEN] = cls.fecha_orden_de(datos) or datetime.now()
+        return datos
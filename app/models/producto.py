@@ -0,0 +1,24 @@
+from app.models.registro import Registro
+
+
+def normalizar_modelo(modelo) -> str:
+    """Clave de comparación de modelos: sin espacios en los extremos y en minúsculas"""
+    if modelo is None:
+        return ''
+    return str(modelo).strip().lower()
+
+
+class Producto(Registro):
+    """Documento de la colección 'productos'"""
+
+    __slots__ = ('id', 'modelo', 'nombre', 'tipo', 'precio', 'cantidad', 'categoria')
+
+    COLECCION = 'productos'
+    CAMPOS = __slots__
+    DEFAULTS = {
+        'nombre': 'Sin nombre',
+        'precio': 0,
+        'modelo': 'Sin modelo',
+        'tipo': 'Sin tipo',
+        'cantidad': 0,
+    }
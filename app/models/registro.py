@@ -0,0 +1,102 @@
+"""
+Base de los registros de Firestore (Producto, Ubicacion, Movimiento, Usuario).
+
+Cada registro guarda sus campos conocidos en __slots__ en lugar de un dict
+por documento (un producto ocupa ~3 veces menos memoria). Los campos que no
+están en CAMPOS (documentos viejos, campos nuevos) se conservan en `_extra`.
+
+Para el resto de la app un registro se lee como un dict de solo lectura:
+registro['modelo'], registro.get('precio', 0), 'fecha' in registro, dict(registro).
+Los registros del cache se comparten entre vistas: para modificar uno se usa
+copy() (devuelve un dict) o reemplazar(**cambios) (devuelve un registro nuevo).
+"""
+
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+_FALTA = object()
+
+
+class Registro(Mapping):
+    """Documento de una colección con campos en slots y acceso tipo dict"""
+
+    __slots__ = ('firebase_id', 'updated_at', '_extra')
+
+    COLECCION = ''
+    CAMPOS: Tuple[str, ...] = ()
+    DEFAULTS: Dict[str, Any] = {}
+    _FIJOS: Tuple[str, ...] = ('firebase_id', 'updated_at')
+    _CONJUNTO_FIJOS = frozenset(_FIJOS)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._FIJOS = ('firebase_id', 'updated_at') + cls.CAMPOS
+        cls._CONJUNTO_FIJOS = frozenset(cls._FIJOS)
+
+    def __init__(self, firebase_id: Optional[str] = None, **datos):
+        self.firebase_id = firebase_id
+        self.updated_at = datos.pop('updated_at', None)
+        for campo in self.CAMPOS:
+            valor = datos.pop(campo, _FALTA)
+            if valor is _FALTA:
+                valor = self.DEFAULTS.get(campo, _FALTA)
+            if valor is not _FALTA:
+                setattr(self, campo, valor)
+        self._extra = datos or None
+
+    @classmethod
+    def desde_documento(cls, doc_id: str, datos: Dict) -> 'Registro':
+        """Registro a partir de un snapshot de Firestore (doc.id, doc.to_dict())"""
+        datos = dict(datos)
+        datos.pop('firebase_id', None)
+        return cls(doc_id, **datos)
+
+    # ------------------------------------------------------------------
+    # Acceso tipo dict
+    # ------------------------------------------------------------------
+
+    def __getitem__(self, clave: str):
+        if clave in self._CONJUNTO_FIJOS:
+            valor = getattr(self, clave, _FALTA)
+            if valor is not _FALTA and (valor is not None or clave != 'updated_at'):
+                return valor
+        elif self._extra and clave in self._extra:
+            return self._extra[clave]
+        raise KeyError(clave)
+
+    def __iter__(self) -> Iterator[str]:
+        for campo in self._FIJOS:
+            valor = getattr(self, campo, _FALTA)
+            if valor is not _FALTA and (valor is not None or campo != 'updated_at'):
+                yield campo
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.a_dict()!r})"
+
+    # ------------------------------------------------------------------
+    # Conversión
+    # ------------------------------------------------------------------
+
+    def a_dict(self) -> Dict:
+        """Todos los campos en un dict nuevo (incluye firebase_id)"""
+        return {clave: self[clave] for clave in self}
+
+    copy = a_dict
+
+    def a_firestore(self) -> Dict:
+        """Datos para escribir en Firestore (sin firebase_id ni updated_at)"""
+        datos = self.a_dict()
+        datos.pop('firebase_id', None)
+        datos.pop('updated_at', None)
+        return datos
+
+    def reemplazar(self, **cambios) -> 'Registro':
+        """Copia del registro con algunos campos cambiados"""
+        datos = self.a_dict()
+        datos.update(cambios)
+        return self.__class__(**datos)
@@ -0,0 +1,19 @@
+from app.models.registro import Registro
+
+
+class Ubicacion(Registro):
+    """Documento de la colección 'ubicaciones' (cantidad de un modelo en un almacén/estantería)"""
+
+    __slots__ = ('id', 'modelo', 'almacen', 'estanteria', 'cantidad', 'observaciones',
+                 'fecha_asignacion', 'fecha_ultima_actualizacion', 'usuario_asignacion')
+
+    COLECCION = 'ubicaciones'
+    CAMPOS = __slots__
+    DEFAULTS = {
+        'modelo': 'Sin modelo',
+        'almacen': 'Sin almacén',
+        'estanteria': 'Sin estantería',
+        'cantidad': 1,
+        'observaciones': 'Sin observaciones',
+        'fecha_asignacion': 'Sin fecha',
+    }
@@ -0,0 +1,10 @@
+from app.models.registro import Registro
+
+
+class Usuario(Registro):
+    """Documento de la colección 'usuarios'"""
+
+    __slots__ = ('nombre', 'contrasena', 'es_admin', 'email')
+
+    COLECCION = 'usuarios'
+    CAMPOS = __slots__
@@ -0,0 +1,6 @@
+from app.services.repositorio import Repositorio
+from app.services.productos import RepositorioProductos, repositorio_productos
+from app.services.ubicaciones import RepositorioUbicaciones, repositorio_ubicaciones
+from app.services.movimientos import PaginaMovimientos, RepositorioMovimientos, repositorio_movimientos
+from app.services.usuarios import RepositorioUsuarios, repositorio_usuarios
+from app.services.busqueda import buscar_en_todo
@@ -0,0 +1,44 @@
+"""
+Búsqueda global (omnibúsqueda) sobre productos, ubicaciones, usuarios y
+movimientos, con los índices de texto del cache.
+"""
+
+from typing import Dict, Iterable, List
+
+from app.models import Registro
+from app.services.movimientos import repositorio_movimientos
+from app.services.productos import repositorio_productos
+from app.services.ubicaciones import repositorio_ubicaciones
+from app.services.usuarios import repositorio_usuarios
+
+REPOSITORIOS_BUSQUEDA = {
+    'productos': repositorio_productos,
+    'ubicaciones': repositorio_ubicaciones,
+    'usuarios': repositorio_usuarios,
+    'movimientos': repositorio_movimientos,
+}
+
+# Resultados de las búsquedas que llenan una tabla (diálogo de productos): con
+# límite el índice deja de puntuar candidatos en cuanto tiene los mejores, y una
+# consulta corta como 'ca' coincide con media colección
+MAX_RESULTADOS_DIALOGO = 500
+
+
+async def buscar_en_todo(texto: str, limite: int = 5,
+                         colecciones: Iterable[str] = tuple(REPOSITORIOS_BUSQUEDA)) -> Dict[str, List[Registro]]:
+    """
+    Mejores coincidencias de cada colección.
+
+    Returns:
+        Dict coleccion -> registros (solo las colecciones con resultados)
+    """
+    resultados = {}
+    for coleccion in colecciones:
+        try:
+            encontrados = await REPOSITORIOS_BUSQUEDA[coleccion].buscar_texto(texto, limite)
+        except Exception as e:
+            print(f"[ERROR] Error buscando en {coleccion}: {e}")
+            continue
+        if encontrados:
+            resultados[coleccion] = encontrados
+    return resultados
@@ -0,0 +1,79 @@
+import time
+from datetime import datetime
+from typing import Any, List, NamedTuple, Optional
+
+from app.models import Movimiento
+from app.services.repositorio import Repositorio
+from app.utils.firestore_async import leer, leer_documento
+
+POR_PAGINA = 50
+
+
+class PaginaMovimientos(NamedTuple):
+    """Una página de movimientos (más recientes primero) y el cursor para pedir la siguiente"""
+    registros: List[Movimiento]
+    cursor: Optional[Any] = None  # Snapshot del último documento; None si no hay más
+
+    @property
+    def hay_mas(self) -> bool:
+        return self.cursor is not None
+
+
+class RepositorioMovimientos(Repositorio):
+    modelo = Movimiento
+
+    def consulta_filtrada(self, desde: Optional[datetime] = None, hasta: Optional[datetime] = None,
+                          tipo: Optional[str] = None):
+        """Consulta de Firestore con el rango [desde, hasta) de 'fecha_orden' y el tipo aplicados en el servidor"""
+        from google.cloud.firestore_v1.base_query import FieldFilter
+        consulta = self._db.collection(self.coleccion)
+        if tipo:
+            consulta = consulta.where(filter=FieldFilter('tipo', '==', tipo))
+        if desde is not None:
+            consulta = consulta.where(filter=FieldFilter(Movimiento.CAMPO_ORDEN, '>=', desde))
+        if hasta is not None:
+            consulta = consulta.where(filter=FieldFilter(Movimiento.CAMPO_ORDEN, '<', hasta))
+        return consulta
+
+    def consulta_paginada(self, limite: int, despues_de=None, desde: Optional[datetime] = None,
+                          hasta: Optional[datetime] = None, tipo: Optional[str] = None):
+        """
+        consulta_filtrada ordenada por 'fecha_orden' descendente, desde el
+        cursor y con límite. Con 'tipo' hace falta el índice compuesto
+        (tipo, fecha_orden desc).
+        """
+        consulta = self.consulta_filtrada(desde, hasta, tipo).order_by(Movimiento.CAMPO_ORDEN, direction='DESCENDING')
+        if despues_de is not None:
+            consulta = consulta.start_after(despues_de)
+        return consulta.limit(limite)
+
+    async def pagina(self, limite: int = POR_PAGINA, despues_de=None, desde: Optional[datetime] = None,
+                     hasta: Optional[datetime] = None, tipo: Optional[str] = None) -> PaginaMovimientos:
+        """
+        Una página de movimientos leída de Firestore sin pasar por el cache:
+        solo se leen `limite` documentos (+1 para saber si hay más). Para la
+        página siguiente se pasa el cursor de la anterior en `despues_de`.
+        """
+        inicio = time.perf_counter()
+        snapshots = await leer(self.consulta_paginada(limite + 1, despues_de, desde, hasta, tipo))
+        hay_mas = len(snapshots) > limite
+        snapshots = snapshots[:limite]
+        self._registrar('lectura', f'Página de movimientos ({len(snapshots)})', len(snapshots), invalidar=False,
+                        inicio=inicio)
+        registros = [self.modelo.desde_documento(s.id, s.to_dict() or {}) for s in snapshots]
+        return PaginaMovimientos(registros, snapshots[-1] if hay_mas else None)
+
+    async def contar(self, desde: Optional[datetime] = None, hasta: Optional[datetime] = None,
+                     tipo: Optional[str] = None) -> int:
+        """Cantidad de movimientos con esos filtros, contada en el servidor (sin leer los documentos)"""
+        consulta = self.consulta_filtrada(desde, hasta, tipo).count()
+        inicio = time.perf_counter()
+        resultado = await leer_documento(consulta)
+        total = int(resultado[0][0].value)
+        # Una agregación cuesta una lectura por cada 1000 entradas del índice
+        self._registrar('lectura', f'Contar movimientos {tipo or ""}'.strip(), max(1, -(-total // 1000)),
+                        invalidar=False, inicio=inicio)
+        return total
+
+
+repositorio_movimientos = RepositorioMovimientos()
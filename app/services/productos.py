@@ -0,0 +1,16 @@
+from typing import Optional
+
+from app.models import Producto
+from app.services.repositorio import Repositorio
+
+
+class RepositorioProductos(Repositorio):
+    modelo = Producto
+
+    async def buscar_por_modelo(self, modelo: str) -> Optional[Producto]:
+        """Producto con ese modelo (sin distinguir mayúsculas ni espacios), por el índice del cache"""
+        await self.listar()
+        return self._cache.indice(self.coleccion).buscar(modelo)
+
+
+repositorio_productos = RepositorioProductos()
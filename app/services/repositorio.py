@@ -0,0 +1,199 @@
+"""
+Repositorio base: único punto de lectura y escritura de una colección para
+las vistas y los módulos CRUD.
+
+La infraestructura que arma sus propios WriteBatch o consultas (cache_firebase,
+versiones_colecciones, importacion_lotes, sincronizacion_inventario,
+historial_nube, cuota_firebase) sigue hablando con Firestore directamente.
+
+Las lecturas de la colección completa salen del cache (CacheFirebase), las
+de un documento suelto van a Firestore, y toda escritura pasa por
+versiones_colecciones (sello updated_at + versión) en el pool de
+firestore_async, se registra en el monitor e invalida el cache.
+"""
+
+import asyncio
+import time
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Type
+
+import polars as pl
+
+from app.models import Registro
+from app.utils.firestore_async import confirmar, ejecutar, leer_documento
+from app.utils.monitor_firebase import monitor_firebase
+from app.utils.versiones_colecciones import (actualizar_documento, agregar_documento, eliminar_documento,
+                                             registrar_eliminacion, subir_version)
+
+# Cada eliminación lleva su lápida (2 operaciones) y el lote sube una vez la versión: 2*249 + 1 = 499
+OPERACIONES_POR_ELIMINACION = 2
+ELIMINACIONES_POR_LOTE = 249
+
+# Presupuesto de cuota_firebase al que se cobra eliminar_varios
+FUNCIONALIDAD_ELIMINACION = 'eliminacion_masiva'
+
+
+class Repositorio:
+    """Lecturas y escrituras de una colección de Firestore con registros de app.models"""
+
+    modelo: Type[Registro] = Registro
+
+    def __init__(self, db=None, cache=None):
+        self._db_inyectada = db
+        self._cache_inyectado = cache
+
+    @property
+    def coleccion(self) -> str:
+        return self.modelo.COLECCION
+
+    @property
+    def _db(self):
+        if self._db_inyectada is None:
+            from conexiones.firebase import db
+            return db
+        return self._db_inyectada
+
+    @property
+    def _cache(self):
+        if self._cache_inyectado is None:
+            from app.utils.cache_firebase import cache_firebase
+            return cache_firebase
+        return self._cache_inyectado
+
+    # ------------------------------------------------------------------
+    # Lecturas
+    # ------------------------------------------------------------------
+
+    async def listar(self, forzar_refresh: bool = False) -> Sequence[Registro]:
+        """Colección completa desde el cache (tupla compartida, no modificar)"""
+        if self.coleccion == 'movimientos':
+            return await self._cache.obtener_movimientos(forzar_refresh=forzar_refresh)
+        obtener = getattr(self._cache, f'obtener_{self.coleccion}')
+        return await obtener(forzar_refresh=forzar_refresh, mostrar_loading=False)
+
+    def listar_inmediato(self) -> Sequence[Registro]:
+        """Lo que haya en el cache en este momento, sin consultar Firebase"""
+        return self._cache.instantanea(self.coleccion).documentos
+
+    def revision(self) -> int:
+        """Revisión de la colección en el cache: cambia cada vez que se publica otra versión"""
+        return self._cache.instantanea(self.coleccion).revision
+
+    async def obtener(self, doc_id: str) -> Optional[Registro]:
+        """Un documento leído de Firestore (1 lectura); None si no existe"""
+        with monitor_firebase.medir('lectura', self.coleccion, f'Leer documento {doc_id}'):
+            snapshot = await leer_documento(self._db.collection(self.coleccion).document(doc_id))
+        if not snapshot.exists:
+            return None
+        return self.modelo.desde_documento(snapshot.id, snapshot.to_dict() or {})
+
+    async def contar(self) -> int:
+        """Cantidad de documentos de la colección, contada en el servidor (sin leer los documentos)"""
+        inicio = time.perf_counter()
+        resultado = await leer_documento(self._db.collection(self.coleccion).count())
+        total = int(resultado[0][0].value)
+        # Una agregación cuesta una lectura por cada 1000 entradas del índice
+        self._registrar('lectura', f'Contar {self.coleccion}', max(1, -(-total // 1000)), invalidar=False,
+                        inicio=inicio)
+        return total
+
+    async def buscar_texto(self, texto: str, limite: Optional[int] = None) -> List[Registro]:
+        """Búsqueda por texto con el índice de trigramas del cache (mejores coincidencias primero)"""
+        await self.listar()
+        # La primera búsqueda tras una carga completa arma el índice: fuera del event loop
+        indice = await asyncio.to_thread(self._cache.indice, self.coleccion, 'texto')
+        return indice.buscar(texto, limite)
+
+    async def tabla(self, forzar_refresh: bool = False) -> pl.DataFrame:
+        """Colección como DataFrame de polars (ver tablas_cache), armado fuera del event loop"""
+        await self.listar(forzar_refresh=forzar_refresh)
+        return await asyncio.to_thread(self._cache.tabla, self.coleccion)
+
+    def sugerencias(self, texto: str, limite: int = 5) -> List[Registro]:
+        """
+        Autocompletado sobre lo que ya está en el cache (sin consultar Firebase).
+        No bloquea la tecla: si el índice aún no existe se arma en segundo plano
+        y mientras tanto no hay sugerencias.
+        """
+        indice = self._cache.indice(self.coleccion, 'texto', esperar=False)
+        return indice.buscar(texto, limite) if indice is not None else []
+
+    # ------------------------------------------------------------------
+    # Escrituras
+    # ------------------------------------------------------------------
+
+    def _datos_escritura(self, datos: Mapping) -> Dict:
+        if isinstance(datos, Registro):
+            return datos.a_firestore()
+        datos = dict(datos)
+        datos.pop('firebase_id', None)
+        return datos
+
+    async def crear(self, datos: Mapping, descripcion: str = "") -> Registro:
+        """Agrega un documento con ID automático y devuelve el registro creado"""
+        datos = self._datos_escritura(datos)
+        inicio = time.perf_counter()
+        referencia = await ejecutar(agregar_documento, self.coleccion, dict(datos), db=self._db_inyectada)
+        self._registrar('escritura', descripcion or 'Crear documento', inicio=inicio)
+        return self.modelo.desde_documento(referencia.id, datos)
+
+    async def actualizar(self, doc_id: str, cambios: Mapping, descripcion: str = "") -> None:
+        """Actualiza solo los campos indicados"""
+        inicio = time.perf_counter()
+        await ejecutar(actualizar_documento, self.coleccion, doc_id, self._datos_escritura(cambios),
+                       db=self._db_inyectada)
+        self._registrar('escritura', descripcion or f'Actualizar {doc_id}', inicio=inicio)
+
+    async def eliminar(self, doc_id: str, descripcion: str = "") -> None:
+        """Elimina el documento dejando lápida para el cache"""
+        inicio = time.perf_counter()
+        await ejecutar(eliminar_documento, self.coleccion, doc_id, db=self._db_inyectada)
+        self._registrar('eliminacion', descripcion or f'Eliminar {doc_id}', inicio=inicio)
+
+    async def eliminar_varios(self, ids: Iterable[str], descripcion: str = "") -> Tuple[List[str], List[str]]:
+        """
+        Elimina varios documentos en WriteBatch de ELIMINACIONES_POR_LOTE.
+        Se cobra a FUNCIONALIDAD_ELIMINACION, con la lápida de cada documento;
+        las vistas avisan antes con aviso_cuota.confirmar_eliminacion_masiva.
+
+        Returns:
+            (ids eliminados, ids cuyo lote falló)
+        """
+        ids = list(ids)
+        eliminados, con_error = [], []
+        for inicio in range(0, len(ids), ELIMINACIONES_POR_LOTE):
+            lote = ids[inicio:inicio + ELIMINACIONES_POR_LOTE]
+            try:
+                batch = self._db.batch()
+                for doc_id in lote:
+                    batch.delete(self._db.collection(self.coleccion).document(doc_id))
+                    registrar_eliminacion(batch, self._db, self.coleccion, doc_id)
+                subir_version(batch, self._db, [self.coleccion])
+                inicio_lote = time.perf_counter()
+                await confirmar(batch)
+                eliminados.extend(lote)
+                self._registrar('eliminacion', descripcion or 'Eliminación en lote',
+                                OPERACIONES_POR_ELIMINACION * len(lote), invalidar=False, inicio=inicio_lote,
+                                funcionalidad=FUNCIONALIDAD_ELIMINACION)
+            except Exception as e:
+                print(f"[ERROR] Error al eliminar lote de {self.coleccion}: {e}")
+                con_error.extend(lote)
+        if eliminados:
+            self._invalidar()
+        return eliminados, con_error
+
+    def _registrar(self, tipo: str, descripcion: str, cantidad: int = 1, invalidar: bool = True,
+                   inicio: Optional[float] = None, funcionalidad: Optional[str] = None) -> None:
+        """Registra la operación en el monitor (con su latencia si se pasa el perf_counter de inicio)"""
+        monitor_firebase.registrar_consulta(
+            tipo=tipo,
+            coleccion=self.coleccion,
+            descripcion=descripcion,
+            cantidad_docs=cantidad,
+            funcionalidad=funcionalidad,
+            duracion=time.perf_counter() - inicio if inicio is not None else None
+        )
+        if invalidar:
+            self._invalidar()
+
+    def _invalidar(self) -> None:
+        getattr(self._cache, f'invalidar_cache_{self.coleccion}')()
@@ -0,0 +1,36 @@
+from typing import Dict, Sequence, Tuple
+
+from app.models import Ubicacion
+from app.services.repositorio import Repositorio
+
+
+class RepositorioUbicaciones(Repositorio):
+    modelo = Ubicacion
+
+    async def listar_por_modelo(self, modelo: str) -> Sequence[Ubicacion]:
+        """Ubicaciones de un modelo, por el índice del cache"""
+        await self.listar()
+        return self._cache.indice(self.coleccion).todos(modelo)
+
+    async def existencias_modelo(self, modelo: str) -> int:
+        """Unidades de un modelo sumando todas sus ubicaciones"""
+        await self.listar()
+        return self._cache.indice(self.coleccion).total_modelo(modelo)
+
+    async def listar_estanteria(self, almacen, estanteria) -> Sequence[Ubicacion]:
+        """Contenido de una estantería"""
+        await self.listar()
+        return self._cache.indice(self.coleccion).en_estanteria(almacen, estanteria)
+
+    async def ocupacion_estanterias(self) -> Dict[Tuple[str, str], int]:
+        """(almacén, estantería) -> unidades guardadas"""
+        await self.listar()
+        return self._cache.indice(self.coleccion).estanterias()
+
+    async def listar_con_existencias(self) -> Sequence[Ubicacion]:
+        """Ubicaciones con cantidad > 0"""
+        await self.listar()
+        return self._cache.indice(self.coleccion).con_existencias()
+
+
+repositorio_ubicaciones = RepositorioUbicaciones()
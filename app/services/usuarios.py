@@ -0,0 +1,27 @@
+import time
+from typing import Optional
+
+from app.models import Usuario
+from app.services.repositorio import Repositorio
+from app.utils.firestore_async import leer
+
+
+class RepositorioUsuarios(Repositorio):
+    modelo = Usuario
+
+    async def autenticar(self, nombre: str, contrasena: str) -> Optional[Usuario]:
+        """Usuario con ese nombre y contraseña (consulta de 1 documento), o None si no coinciden"""
+        from google.cloud.firestore_v1.base_query import FieldFilter
+        consulta = (self._db.collection(self.coleccion)
+                    .where(filter=FieldFilter('nombre', '==', nombre))
+                    .where(filter=FieldFilter('contrasena', '==', contrasena))
+                    .limit(1))
+        inicio = time.perf_counter()
+        snapshots = await leer(consulta)
+        self._registrar('lectura', 'Verificar credenciales', max(1, len(snapshots)), invalidar=False, inicio=inicio)
+        if not snapshots:
+            return None
+        return self.modelo.desde_documento(snapshots[0].id, snapshots[0].to_dict() or {})
+
+
+repositorio_usuarios = RepositorioUsuarios()
@@ -0,0 +1,374 @@
+"""
+Tabla y lista paginadas compartidas por las vistas de listas.
+
+Las vistas reciben colecciones completas (decenas de miles de registros con
+el cache), pero solo se construyen controles de Flet para la página visible:
+armar un DataRow por registro dejaba la interfaz trabada y obligaba a cortar
+los listados ("limitar a 100 por rendimiento").
+
+- Paginador: estado puro (filas, orden, página), sin Flet; se puede probar solo.
+- TablaPaginada: DataTable con orden por columna, selección múltiple (el
+  checkbox del encabezado selecciona todas las filas actuales, no solo la
+  página; con un filtro, solo las filtradas) y barra de páginas.
+- ListaPaginada: lo mismo para listas de tarjetas (vista de categorías).
+
+El diccionario `estado` que pasa la vista conserva página y orden cuando la
+vista reconstruye la tabla (p. ej. después de editar o eliminar).
+"""
+
+from numbers import Number
+from typing import Any, Callable, Dict, FrozenSet, List, MutableSet, Optional, Sequence
+
+import flet as ft
+
+from app.utils.temas import GestorTemas
+
+POR_PAGINA = 50
+
+
+def clave_orden(valor) -> tuple:
+    """Clave comparable para cualquier valor: números, luego texto (sin mayúsculas), vacíos al final"""
+    if valor is None or valor == '':
+        return (2, 0, '')
+    if isinstance(valor, Number) and not isinstance(valor, bool):
+        return (0, valor, '')
+    return (1, 0, str(valor).lower())
+
+
+class Paginador:
+    """Orden y página actual sobre una secuencia de filas"""
+
+    def __init__(self, filas: Sequence, por_pagina: int = POR_PAGINA, estado: Optional[Dict] = None):
+        self.por_pagina = max(1, por_pagina)
+        self.estado = estado if estado is not None else {}
+        self.estado.setdefault('pagina', 0)
+        self.estado.setdefault('orden', None)  # (columna, ascendente)
+        self._originales = list(filas)
+        self._filas = self._originales
+        self._clave: Optional[Callable] = None
+
+    @property
+    def filas(self) -> List:
+        """Todas las filas en el orden actual"""
+        return self._filas
+
+    @property
+    def total(self) -> int:
+        return len(self._filas)
+
+    @property
+    def total_paginas(self) -> int:
+        return max(1, -(-self.total // self.por_pagina))
+
+    @property
+    def pagina(self) -> int:
+        return min(self.estado['pagina'], self.total_paginas - 1)
+
+    def ir_a(self, pagina: int) -> bool:
+        """Cambia de página (acotada al rango válido); False si ya estaba ahí"""
+        pagina = max(0, min(pagina, self.total_paginas - 1))
+        if pagina == self.pagina:
+            return False
+        self.estado['pagina'] = pagina
+        return True
+
+    def ordenar(self, columna, clave: Callable[[Any], Any], ascendente: bool = True) -> None:
+        """Ordena todas las filas por clave(fila) (estable) y vuelve a la primera página"""
+        self._clave = clave
+        self._filas = sorted(self._originales, key=lambda fila: clave_orden(clave(fila)), reverse=not ascendente)
+        self.estado['orden'] = (columna, ascendente)
+        self.estado['pagina'] = 0
+
+    def reemplazar(self, filas: Sequence) -> None:
+        """Nuevas filas conservando el orden y la página (acotada) actuales"""
+        self._originales = list(filas)
+        self._filas = self._originales
+        if self.estado['orden'] is not None and self._clave is not None:
+            columna, ascendente = self.estado['orden']
+            pagina = self.estado['pagina']
+            self.ordenar(columna, self._clave, ascendente)
+            self.estado['pagina'] = pagina
+
+    def visibles(self) -> List:
+        """Filas de la página actual"""
+        inicio = self.pagina * self.por_pagina
+        return self._filas[inicio:inicio + self.por_pagina]
+
+    def rango(self) -> str:
+        """'51–100 de 50,000'"""
+        if not self.total:
+            return "0 de 0"
+        inicio = self.pagina * self.por_pagina
+        return f"{inicio + 1:,}–{min(inicio + self.por_pagina, self.total):,} de {self.total:,}"
+
+
+class _VistaPaginada:
+    """Barra de páginas común a la tabla y a la lista"""
+
+    def __init__(self, filas: Sequence, page=None, por_pagina: int = POR_PAGINA, estado: Optional[Dict] = None):
+        self.page = page
+        self.paginador = Paginador(filas, por_pagina, estado)
+        tema = GestorTemas.obtener_tema()
+        self._texto_rango = ft.Text(size=12, color=tema.TEXT_SECONDARY)
+
+        def boton(icono, destino, ayuda):
+            return ft.IconButton(icono, icon_color=tema.PRIMARY_COLOR, icon_size=20, tooltip=ayuda,
+                                 on_click=lambda e: self.ir_a(destino()))
+
+        self._botones = [
+            boton(ft.Icons.FIRST_PAGE, lambda: 0, "Primera página"),
+            boton(ft.Icons.CHEVRON_LEFT, lambda: self.paginador.pagina - 1, "Página anterior"),
+            boton(ft.Icons.CHEVRON_RIGHT, lambda: self.paginador.pagina + 1, "Página siguiente"),
+            boton(ft.Icons.LAST_PAGE, lambda: self.paginador.total_paginas - 1, "Última página"),
+        ]
+        self.barra = ft.Row(
+            [self._texto_rango, *self._botones],
+            alignment=ft.MainAxisAlignment.END,
+            spacing=2,
+        )
+
+    def ir_a(self, pagina: int) -> None:
+        if self.paginador.ir_a(pagina):
+            self._mostrar()
+            self._actualizar()
+
+    def reemplazar(self, filas: Sequence, primera_pagina: bool = False) -> None:
+        """
+        Muestra otras filas (una colección refrescada o filtrada) sin perder el orden.
+        Conserva la página salvo que se pida volver a la primera (p. ej. al filtrar).
+        """
+        self.paginador.reemplazar(filas)
+        if primera_pagina:
+            self.paginador.ir_a(0)
+        self._mostrar()
+        self._actualizar()
+
+    def _mostrar(self) -> None:
+        """Construye los controles de la página visible y actualiza la barra"""
+        paginador = self.paginador
+        self._texto_rango.value = paginador.rango()
+        primera, ultima = paginador.pagina == 0, paginador.pagina >= paginador.total_paginas - 1
+        for boton, deshabilitado in zip(self._botones, (primera, primera, ultima, ultima)):
+            boton.disabled = deshabilitado
+        self.barra.visible = paginador.total_paginas > 1
+
+    def _actualizar(self) -> None:
+        """Envía al cliente solo este control (no toda la página)"""
+        if montado(self.control):
+            self.control.update()
+
+
+def montado(control: ft.Control) -> bool:
+    """
+    True si el control está en la página (update() solo vale entonces).
+    Un control que la vista ya reemplazó conserva su referencia a la página:
+    se confirma que siga en el índice de controles.
+    """
+    try:
+        page = control.page
+        return page is not None and page.get_control(control.uid) is control
+    except Exception:
+        return False
+
+
+class TablaPaginada(_VistaPaginada):
+    """
+    DataTable que solo materializa la página visible.
+
+    Al reemplazar las filas (refresco tras una edición, filtro, cambio de
+    página u orden) reconcilia por id: las filas cuyo registro no cambió
+    conservan su DataRow, las cambiadas se parchan en el lugar y solo se
+    crean las nuevas. Los registros del cache son inmutables (un cambio
+    publica un objeto nuevo), así que comparar identidad basta casi siempre.
+    Si la lista de filas no cambió se actualiza cada fila parchada por
+    separado; si cambió, la tabla, y Flet solo envía los controles nuevos.
+
+    Args:
+        filas: registros a mostrar (la colección completa)
+        columnas: DataColumn de los datos (el checkbox de selección lo agrega la tabla)
+        celdas: fila -> lista de DataCell, en el orden de `columnas`
+        ordenables: índice de columna -> función fila -> valor para ordenar
+        seleccion: conjunto de ids seleccionados (se modifica en el lugar); None = sin selección
+        id_fila: fila -> id (clave de la reconciliación y de la selección)
+        al_seleccionar: se llama tras cada cambio de selección
+        orden_inicial: (índice de columna, ascendente) si el estado no tiene orden
+        propiedades: resto de argumentos de ft.DataTable (estilo)
+    """
+
+    def __init__(self, filas: Sequence, columnas: List[ft.DataColumn], celdas: Callable[[Any], List[ft.DataCell]],
+                 page=None, por_pagina: int = POR_PAGINA, estado: Optional[Dict] = None,
+                 ordenables: Optional[Dict[int, Callable[[Any], Any]]] = None,
+                 seleccion: Optional[MutableSet] = None,
+                 id_fila: Callable[[Any], Any] = lambda fila: fila.get('firebase_id') or fila.get('id'),
+                 al_seleccionar: Optional[Callable[[], None]] = None,
+                 orden_inicial: Optional[tuple] = None, **propiedades):
+        super().__init__(filas, page, por_pagina, estado)
+        tema = GestorTemas.obtener_tema()
+        self.celdas = celdas
+        self.ordenables = ordenables or {}
+        self.seleccion = seleccion
+        self.id_fila = id_fila
+        self.al_seleccionar = al_seleccionar
+        self._desplazamiento = 0 if seleccion is None else 1
+        self._renderizadas: Dict[Any, tuple] = {}  # clave -> (registro, DataRow)
+        self._parchadas: List[ft.DataRow] = []
+        self._estructura_cambio = True
+        self._ids_actuales: Optional[FrozenSet] = None  # Se arma al primer uso tras cada reemplazar()
+
+        for indice, columna in enumerate(columnas):
+            if indice in self.ordenables:
+                columna.on_sort = lambda e, indice=indice: self.ordenar(indice, e.ascending)
+
+        if seleccion is not None:
+            self.checkbox_todas = ft.Checkbox(tristate=True, fill_color=tema.PRIMARY_COLOR,
+                                              on_change=self._seleccionar_todas)
+            columnas = [ft.DataColumn(ft.Container(content=self.checkbox_todas, width=50,
+                                                   alignment=ft.Alignment(0, 0)),
+                                      heading_row_alignment=ft.CrossAxisAlignment.CENTER), *columnas]
+
+        self.tabla = ft.DataTable(columns=columnas, rows=[], **propiedades)
+
+        orden = self.paginador.estado['orden'] or orden_inicial
+        if orden is not None and orden[0] in self.ordenables:
+            pagina = self.paginador.estado['pagina']
+            self.paginador.ordenar(orden[0], self.ordenables[orden[0]], orden[1])
+            self.paginador.estado['pagina'] = pagina
+        self._mostrar()
+        self.control = ft.Column([self.tabla, self.barra], spacing=5)
+
+    def ordenar(self, columna: int, ascendente: bool) -> None:
+        self.paginador.ordenar(columna, self.ordenables[columna], ascendente)
+        self._mostrar()
+        self._actualizar()
+
+    def reemplazar(self, filas: Sequence, primera_pagina: bool = False) -> None:
+        self._ids_actuales = None
+        super().reemplazar(filas, primera_pagina)
+
+    def _mostrar(self) -> None:
+        super()._mostrar()
+        orden = self.paginador.estado['orden']
+        if orden is not None:
+            self.tabla.sort_column_index = orden[0] + self._desplazamiento
+            self.tabla.sort_ascending = orden[1]
+        self._reconciliar()
+        if self.seleccion is not None:
+            self._sincronizar_checkbox_todas()
+
+    def _reconciliar(self) -> None:
+        """Filas de la página visible reutilizando los DataRow de los registros que no cambiaron"""
+        anteriores = self._renderizadas
+        renderizadas, filas, parchadas = {}, [], []
+        for posicion, registro in enumerate(self.paginador.visibles()):
+            clave = self.id_fila(registro) or ('posicion', posicion)
+            previa = anteriores.get(clave)
+            if previa is None:
+                fila = self._fila(registro)
+            else:
+                registro_previo, fila = previa
+                if registro_previo is not registro and registro_previo != registro:
+                    fila.cells = self._fila(registro).cells
+                    parchadas.append(fila)
+            renderizadas[clave] = (registro, fila)
+            filas.append(fila)
+        self._estructura_cambio = len(filas) != len(self.tabla.rows) or any(
+            nueva is not vieja for nueva, vieja in zip(filas, self.tabla.rows))
+        self.tabla.rows = filas
+        self._renderizadas = renderizadas
+        self._parchadas = parchadas
+
+    def _actualizar(self) -> None:
+        """Envía solo lo que cambió: las filas parchadas, o la tabla si cambió la lista de filas"""
+        if not montado(self.control):
+            return
+        if self._estructura_cambio:
+            self.tabla.update()
+        else:
+            for fila in self._parchadas:
+                fila.update()
+            if self.seleccion is not None:
+                self.checkbox_todas.update()
+        self.barra.update()
+        self._parchadas = []
+        self._estructura_cambio = False
+
+    def _fila(self, fila) -> ft.DataRow:
+        celdas = self.celdas(fila)
+        if self.seleccion is not None:
+            tema = GestorTemas.obtener_tema()
+            id_fila = self.id_fila(fila)
+            celdas = [ft.DataCell(ft.Container(
+                content=ft.Checkbox(value=id_fila in self.seleccion, fill_color=tema.PRIMARY_COLOR,
+                                    on_change=lambda e, id_fila=id_fila: self._seleccionar(id_fila, e.control.value)),
+                width=50,
+                alignment=ft.Alignment(0, 0)  # Centro
+            )), *celdas]
+        return ft.DataRow(cells=celdas)
+
+    # ------------------------------------------------------------------
+    # Selección
+    # ------------------------------------------------------------------
+
+    def _ids(self) -> FrozenSet:
+        """Ids de las filas actuales (ordenar no los cambia; reemplazar sí)"""
+        if self._ids_actuales is None:
+            self._ids_actuales = frozenset(id_fila for id_fila in map(self.id_fila, self.paginador.filas) if id_fila)
+        return self._ids_actuales
+
+    def _seleccionar(self, id_fila, seleccionado: bool) -> None:
+        # El checkbox de la fila ya cambió en el cliente: solo falta el del encabezado
+        if seleccionado:
+            self.seleccion.add(id_fila)
+        else:
+            self.seleccion.discard(id_fila)
+        self._sincronizar_checkbox_todas()
+        self._notificar()
+
+    def _seleccionar_todas(self, e) -> None:
+        # Se decide por la selección actual y no por el valor del checkbox (tristate): si falta alguna, todas.
+        # Solo cuentan las filas actuales: los ids que un filtro ocultó no completan ni se quitan
+        ids = self._ids()
+        seleccionar = not ids.issubset(self.seleccion)
+        if seleccionar:
+            self.seleccion.update(ids)
+        else:
+            self.seleccion.difference_update(ids)
+        for _, fila in self._renderizadas.values():
+            checkbox = fila.cells[0].content.content
+            if checkbox.value != seleccionar:
+                checkbox.value = seleccionar
+                self._parchadas.append(fila)
+        self._sincronizar_checkbox_todas()
+        self._notificar()
+
+    def _sincronizar_checkbox_todas(self) -> None:
+        ids = self._ids()
+        total = len(ids)
+        seleccionadas = len(ids.intersection(self.seleccion))
+        if seleccionadas == 0:
+            self.checkbox_todas.value = False
+        elif seleccionadas >= total:
+            self.checkbox_todas.value = True
+        else:
+            self.checkbox_todas.value = None  # Estado indeterminado
+
+    def _notificar(self) -> None:
+        if self.al_seleccionar:
+            self.al_seleccionar()
+        self._actualizar()
+
+
+class ListaPaginada(_VistaPaginada):
+    """Columna de tarjetas que solo construye las de la página visible"""
+
+    def __init__(self, elementos: Sequence, construir: Callable[[Any], ft.Control], page=None,
+                 por_pagina: int = POR_PAGINA, estado: Optional[Dict] = None, spacing: int = 5):
+        super().__init__(elementos, page, por_pagina, estado)
+        self.construir = construir
+        self.lista = ft.Column(spacing=spacing)
+        self._mostrar()
+        self.control = ft.Column([self.lista, self.barra], spacing=5)
+
+    def _mostrar(self) -> None:
+        super()._mostrar()
+        self.lista.controls = [self.construir(elemento) for elemento in self.paginador.visibles()]
@@ -3,17 +3,20 @@ from app.utils.temas import GestorTemas
 from app.crud_productos.delete_producto import on_eliminar_producto_click
 from app.crud_productos.edit_producto import on_click_editar_producto
 import asyncio
+from app.tablas.tabla_paginada import TablaPaginada, montado
+from app.ui.aviso_cuota import confirmar_eliminacion_masiva
 
 # Variables globales para referencias
 actualizar_tabla_callback = None
-productos_seleccionados = []  # Variable global para mantener estado
+productos_seleccionados = set()  # Variable global para mantener estado
+estado_tabla = {}  # Página y orden de la tabla entre reconstrucciones
+tabla_actual = None  # TablaPaginada a la vista
 
 def toggle_seleccion_todas_productos(seleccionar_todas, productos):
     """Seleccionar o deseleccionar todos los productos"""
-    global productos_seleccionados
     if seleccionar_todas:
-        productos_seleccionados = [producto.get('firebase_id', '') for producto in productos if producto.get('firebase_id')]
-        print(f"[OK] DEBUG: Seleccionados TODOS los productos. IDs: {productos_seleccionados}")
+        productos_seleccionados.update(producto.get('firebase_id') for producto in productos if producto.get('firebase_id'))
+        print(f"[OK] DEBUG: Seleccionados TODOS los productos ({len(productos_seleccionados)})")
     else:
         productos_seleccionados.clear()
         print(f"[ERROR] DEBUG: Deseleccionados TODOS los productos. Lista vacía.")
@@ -54,53 +57,32 @@ def crear_boton_editar(producto_id, page, actualizar_tabla_productos):
         )
     )
 
+def tabla_montada() -> bool:
+    """True si la tabla de productos está a la vista (se puede refrescar en el lugar)"""
+    return tabla_actual is not None and montado(tabla_actual.control)
+
+def actualizar_filas(productos, primera_pagina=False) -> bool:
+    """
+    Refresca la tabla a la vista con `productos` reconciliando fila por fila
+    (solo se envían las filas nuevas o cambiadas). False si no hay tabla
+    montada: entonces hay que construirla con mostrar_tabla_productos.
+    """
+    if not tabla_montada():
+        return False
+    tabla_actual.reemplazar(productos, primera_pagina)
+    return True
+
 def mostrar_tabla_productos(page, productos, actualizar_tabla_productos=None, contenido=None):
     tema = GestorTemas.obtener_tema()
-    global productos_seleccionados  # Usar variable global
+    global tabla_actual  # Tabla a la vista, para refrescarla en el lugar
     
     # Configurar callback global
     if actualizar_tabla_productos:
         set_actualizar_tabla_callback(actualizar_tabla_productos)
     
-    # Estado para el ordenamiento
-    orden_actual = {"columna": 0, "ascendente": True}  # Estado del ordenamiento
-    
-    # Función auxiliar para obtener modelo de forma segura
-    def obtener_modelo_seguro(producto):
-        try:
-            modelo = producto.get('modelo', '')
-            return str(modelo).lower() if modelo is not None else ''
-        except:
-            return ''
-    
-    # Aplicar ordenamiento inicial
-    productos_mostrar = sorted(productos, key=obtener_modelo_seguro)
-    
-    # Función para reordenar y actualizar tabla
-    def aplicar_ordenamiento():
-        nonlocal productos_mostrar
-        if orden_actual["columna"] == 0:  # Columna modelo
-            productos_mostrar = sorted(productos, key=obtener_modelo_seguro, reverse=not orden_actual["ascendente"])
-            print(f"[OK] Aplicando ordenamiento: {'ascendente' if orden_actual['ascendente'] else 'descendente'}")
-            
-            # Para ordenamiento SÍ necesitamos reconstruir la tabla para mostrar el nuevo orden
-            if actualizar_tabla_callback:
-                page.run_task(actualizar_tabla_callback)
-            else:
-                page.update()
-    
-    # Función para manejar ordenamiento
-    def ordenar_productos(e):
-        print(f"🔀 DEBUG: Ordenamiento solicitado - Columna: {e.column_index}, Ascendente: {e.ascending}")
-        if e.column_index == 1:  # Columna modelo (ajustado porque checkbox está en índice 0)
-            orden_actual["columna"] = e.column_index
-            orden_actual["ascendente"] = e.ascending
-            aplicar_ordenamiento()
-    
     # Función para eliminar productos seleccionados
     async def eliminar_productos_seleccionados():
         print(f"[ELIMINAR] DEBUG: Función eliminar_productos_seleccionados llamada")
-        print(f"[ELIMINAR] DEBUG: productos_seleccionados actual: {productos_seleccionados}")
         print(f"[ELIMINAR] DEBUG: Cantidad a eliminar: {len(productos_seleccionados)}")
         
         if not productos_seleccionados:
@@ -114,7 +96,7 @@ def mostrar_tabla_productos(page, productos, actualizar_tabla_productos=None, co
         # Mostrar diálogo de confirmación
         def confirmar_eliminacion(e):
             page.close(dialogo_confirmacion)
-            page.run_task(procesar_eliminacion_multiple)
+            confirmar_eliminacion_masiva(page, len(productos_seleccionados), procesar_eliminacion_multiple)
         
         def cancelar_eliminacion(e):
             page.close(dialogo_confirmacion)
@@ -156,30 +138,18 @@ def mostrar_tabla_productos(page, productos, actualizar_tabla_productos=None, co
         await asyncio.sleep(1.0)  # Tiempo mínimo para visibilidad
         
         try:
-            from conexiones.firebase import db
+            from app.services import repositorio_productos
             from app.utils.historial import GestorHistorial
             from app.funciones.sesiones import SesionManager
             
-            eliminados = 0
-            errores = 0
-            
             print(f"[ELIMINAR] DEBUG: Iniciando eliminación de {len(productos_seleccionados)} productos")
-            print(f"[ELIMINAR] DEBUG: IDs a eliminar: {productos_seleccionados}")
             
-            for producto_id in productos_seleccionados:
-                try:
-                    print(f"[ELIMINAR] DEBUG: Eliminando producto con ID: {producto_id}")
-                    db.collection('productos').document(producto_id).delete()
-                    eliminados += 1
-                    print(f"[OK] DEBUG: Producto {producto_id} eliminado exitosamente")
-                    
-                    # Delay para mostrar progreso
-                    if eliminados % 5 == 0:
-                        await asyncio.sleep(0.1)
-                        
-                except Exception as e:
-                    print(f"[ERROR] DEBUG: Error eliminando producto {producto_id}: {e}")
-                    errores += 1
+            # Eliminar en lotes (un commit por hasta 249 productos)
+            ids_eliminados, ids_con_error = await repositorio_productos.eliminar_varios(
+                productos_seleccionados, descripcion='Eliminación múltiple de productos'
+            )
+            eliminados = len(ids_eliminados)
+            errores = len(ids_con_error)
             
             # Registrar en historial
             gestor_historial = GestorHistorial()
@@ -188,11 +158,13 @@ def mostrar_tabla_productos(page, productos, actualizar_tabla_productos=None, co
             await gestor_historial.agregar_actividad(
                 tipo="eliminar_productos_multiple",
                 descripcion=f"Eliminó {eliminados} productos (Errores: {errores})",
-                usuario=usuario_actual.get('username', 'Usuario') if usuario_actual else 'Sistema'
+                usuario=usuario_actual.get('username', 'Usuario') if usuario_actual else 'Sistema',
+                detalles={"cantidad": eliminados, "errores": errores}
             )
             
             # Limpiar selección
             productos_seleccionados.clear()
+            actualizar_boton_eliminar()
             
             # Mensaje de éxito
             mensaje_exito = ft.AlertDialog(
@@ -219,27 +191,6 @@ def mostrar_tabla_productos(page, productos, actualizar_tabla_productos=None, co
                 bgcolor=tema.ERROR_COLOR
             ))
     
-    # Función para manejar selección de productos (igual que en ubicaciones)
-    def manejar_seleccion_producto(e, producto_id):
-        global productos_seleccionados  # Usar variable global
-        print(f"[BUSCAR] DEBUG: Selección cambiada - Producto: {producto_id}, Estado: {e.control.value}")
-        if e.control.value:  # Checkbox marcado
-            if producto_id not in productos_seleccionados:
-                productos_seleccionados.append(producto_id)
-                print(f"[OK] Producto agregado a selección. ID: {producto_id}, Total: {len(productos_seleccionados)}")
-        else:  # Checkbox desmarcado
-            if producto_id in productos_seleccionados:
-                productos_seleccionados.remove(producto_id)
-                print(f"[ERROR] Producto removido de selección. ID: {producto_id}, Total: {len(productos_seleccionados)}")
-        
-        print(f"[BUSCAR] DEBUG: Estado actual productos_seleccionados: {productos_seleccionados}")
-        
-        # Actualizar visibilidad del botón
-        actualizar_boton_eliminar()
-        
-        # Solo actualizar la página, igual que en ubicaciones
-        page.update()
-    
     # Función para actualizar el botón de eliminación
     def actualizar_boton_eliminar():
         print(f"[PROCESO] Actualizando botón eliminar. Productos seleccionados: {len(productos_seleccionados)}")
@@ -249,121 +200,72 @@ def mostrar_tabla_productos(page, productos, actualizar_tabla_productos=None, co
         else:
             boton_eliminar_multiple.text = "Eliminar Seleccionados"
             boton_eliminar_multiple.visible = False
-        boton_eliminar_multiple.update()
-    
-    def on_checkbox_principal_changed(e):
-        """Manejar cambio del checkbox principal (seleccionar/deseleccionar todas)"""
-        toggle_seleccion_todas_productos(e.control.value, productos)
-        # Actualizar todos los checkboxes individuales
-        for fila in tabla.rows:
-            checkbox_individual = fila.cells[0].content.content
-            checkbox_individual.value = e.control.value
-        
-        # Actualizar visibilidad del botón
-        actualizar_boton_eliminar()
-        page.update()
-
-    def on_checkbox_individual_changed(e, producto_id):
-        """Manejar cambio de checkbox individual"""
-        manejar_seleccion_producto(e, producto_id)
-        
-        # Actualizar estado del checkbox principal
-        total_productos = len([p for p in productos if p.get('firebase_id')])
-        seleccionados = len(productos_seleccionados)
-        
-        if seleccionados == 0:
-            checkbox_principal.value = False
-        elif seleccionados == total_productos:
-            checkbox_principal.value = True
-        else:
-            checkbox_principal.value = None  # Estado indeterminado
-        
-        page.update()
+        if montado(boton_eliminar_multiple):
+            boton_eliminar_multiple.update()
 
-    # Checkbox principal para seleccionar todas
-    checkbox_principal = ft.Checkbox(
-        value=False,
-        on_change=on_checkbox_principal_changed,
-        fill_color=tema.PRIMARY_COLOR
-    )
+    def celdas_producto(producto):
+        return [
+            ft.DataCell(ft.Text(str(producto.get('modelo')), color=tema.TEXT_COLOR)),
+            ft.DataCell(ft.Text(producto.get('tipo'), color=tema.TEXT_COLOR)),
+            ft.DataCell(
+                ft.Container(
+                    content=ft.Text(producto.get('nombre'), color=tema.TEXT_COLOR),
+                    width=300  # Ajusta este valor según lo que necesites
+                )
+            ),
+            ft.DataCell(ft.Text(str(producto.get('precio')), color=tema.TEXT_COLOR)),
+            ft.DataCell(
+                ft.Container(
+                    content=ft.Text(str(producto.get('cantidad')), color=tema.TEXT_COLOR),
+                    alignment=ft.alignment.center,  # Centrar el texto
+                )
+            ),
+            ft.DataCell(
+                ft.Row(
+                    controls=[
+                        crear_boton_editar(producto.get('firebase_id', ''), page, actualizar_tabla_productos),
+                        crear_boton_eliminar(producto.get('firebase_id', ''), page, actualizar_tabla_productos),
+                    ],
+                    spacing=10
+                )
+            )
+        ]
     
-    # Crear una tabla para mostrar los productos
+    # Tabla paginada: solo se construyen las filas de la página visible
     altura_tabla = max(300, (page.window.height or 800) - 350)
     ancho_tabla = max(800, (page.window.width or 1200) - 400)
-    tabla = ft.DataTable(
+    tabla = tabla_actual = TablaPaginada(
+        productos,
+        [
+            ft.DataColumn(ft.Text("Modelo", color=tema.TEXT_COLOR), heading_row_alignment=ft.CrossAxisAlignment.CENTER),
+            ft.DataColumn(ft.Text("Tipo", color=tema.TEXT_COLOR), heading_row_alignment=ft.CrossAxisAlignment.CENTER),
+            ft.DataColumn(ft.Text("Nombre", color=tema.TEXT_COLOR), heading_row_alignment=ft.CrossAxisAlignment.CENTER),
+            ft.DataColumn(ft.Text("Precio", color=tema.TEXT_COLOR), heading_row_alignment=ft.CrossAxisAlignment.CENTER),
+            ft.DataColumn(ft.Text("Cantidad", color=tema.TEXT_COLOR), heading_row_alignment=ft.CrossAxisAlignment.CENTER),
+            ft.DataColumn(ft.Text("Opciones", color=tema.TEXT_COLOR), heading_row_alignment=ft.CrossAxisAlignment.CENTER),
+        ],
+        celdas_producto,
+        page=page,
+        estado=estado_tabla,
+        ordenables={
+            0: lambda p: p.get('modelo'),
+            1: lambda p: p.get('tipo'),
+            2: lambda p: p.get('nombre'),
+            3: lambda p: p.get('precio'),
+            4: lambda p: p.get('cantidad'),
+        },
+        orden_inicial=(0, True),
+        seleccion=productos_seleccionados,
+        id_fila=lambda p: p.get('firebase_id'),
+        al_seleccionar=actualizar_boton_eliminar,
         border=ft.border.all(1, tema.TABLE_BORDER),
-        sort_column_index=1, # Columna por defecto para ordenar (ahora será la 1 porque agregamos checkbox)
         border_radius=tema.BORDER_RADIUS, # Bordes redondeados
-        sort_ascending=True, # Orden ascendente por defecto
         heading_row_color=tema.TABLE_HEADER_BG,  # Color de la fila de encabezado
         heading_row_height=50, # Altura de la fila de encabezado
         data_row_color={ft.ControlState.HOVERED: tema.TABLE_HOVER}, # Color de la fila al pasar el mouse
-        show_checkbox_column=False, # Usar checkbox manual como en ubicaciones
+        show_checkbox_column=False, # La tabla agrega su propio checkbox de selección
         divider_thickness=0, # Grosor del divisor
         column_spacing=50, # Espaciado entre columnas
-        columns=[
-            ft.DataColumn(
-                ft.Container(
-                    content=checkbox_principal,
-                    width=50,
-                    alignment=ft.alignment.center
-                ), 
-                heading_row_alignment=ft.CrossAxisAlignment.CENTER
-            ),  # Columna checkbox con checkbox principal
-            ft.DataColumn(
-                ft.Text("Modelo", color=tema.TEXT_COLOR), 
-                on_sort=lambda e: ordenar_productos(e), 
-                heading_row_alignment=ft.CrossAxisAlignment.CENTER
-            ),
-            ft.DataColumn(ft.Text("Tipo", color=tema.TEXT_COLOR), heading_row_alignment=ft.CrossAxisAlignment.CENTER),
-            ft.DataColumn(ft.Text("Nombre", color=tema.TEXT_COLOR), heading_row_alignment=ft.CrossAxisAlignment.CENTER),
-            ft.DataColumn(ft.Text("Precio", color=tema.TEXT_COLOR), heading_row_alignment=ft.CrossAxisAlignment.CENTER),
-            ft.DataColumn(ft.Text("Cantidad", color=tema.TEXT_COLOR), heading_row_alignment=ft.CrossAxisAlignment.CENTER),
-            ft.DataColumn(ft.Text("Opciones", color=tema.TEXT_COLOR), heading_row_alignment=ft.CrossAxisAlignment.CENTER),
-        ],
-        rows=[
-            ft.DataRow(
-                cells=[
-                    # Checkbox manual (como en ubicaciones)
-                    ft.DataCell(
-                        ft.Container(
-                            content=ft.Checkbox(
-                                value=producto.get('firebase_id', '') in productos_seleccionados,
-                                on_change=lambda e, producto_id=producto.get('firebase_id', ''): on_checkbox_individual_changed(e, producto_id),
-                                fill_color=tema.PRIMARY_COLOR
-                            ),
-                            width=50,
-                            alignment=ft.alignment.center
-                        )
-                    ),
-                    ft.DataCell(ft.Text(str(producto.get('modelo')), color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(producto.get('tipo'), color=tema.TEXT_COLOR)),
-                    ft.DataCell(
-                        ft.Container(
-                            content=ft.Text(producto.get('nombre'), color=tema.TEXT_COLOR),
-                            width=300  # Ajusta este valor según lo que necesites
-                        )
-                    ),
-                    ft.DataCell(ft.Text(str(producto.get('precio')), color=tema.TEXT_COLOR)),
-                    ft.DataCell(
-                        ft.Container(
-                            content=ft.Text(str(producto.get('cantidad')), color=tema.TEXT_COLOR),
-                            alignment=ft.alignment.center,  # Centrar el texto
-                        )
-                    ),
-                    ft.DataCell(
-                        ft.Row(
-                            controls=[
-                                crear_boton_editar(producto.get('firebase_id', ''), page, actualizar_tabla_productos),
-                                crear_boton_eliminar(producto.get('firebase_id', ''), page, actualizar_tabla_productos),
-                            ],
-                            spacing=10
-                        )
-                    )
-                ],
-                selected=False,  # Como en ubicaciones
-            ) for producto in productos_mostrar  # Usar productos_mostrar en lugar de productos
-        ],
         width=ancho_tabla,  # Ancho responsivo
     )
     
@@ -379,13 +281,14 @@ def mostrar_tabla_productos(page, productos, actualizar_tabla_productos=None, co
         on_click=lambda e: page.run_task(eliminar_productos_seleccionados),
         visible=False  # Inicialmente oculto
     )
+    actualizar_boton_eliminar()
     
     scroll_vertical = ft.Column([
         ft.Container(
             content=ft.Row([boton_eliminar_multiple], alignment=ft.MainAxisAlignment.END),
             padding=ft.Padding(0, 0, 0, 10)
         ),
-        tabla
+        tabla.control
     ], scroll=True, height=altura_tabla)  # Altura responsiva
     return ft.Container(
         content=scroll_vertical,
@@ -1,10 +1,13 @@
 import flet as ft
 from app.utils.temas import GestorTemas
 import asyncio
+from app.tablas.tabla_paginada import TablaPaginada, montado
+from app.ui.aviso_cuota import confirmar_eliminacion_masiva
 
 # Variables globales para la selección múltiple
 ubicaciones_seleccionadas = set()
-checkbox_principal = None
+estado_tabla = {}  # Página y orden de la tabla entre reconstrucciones
+tabla_actual = None  # TablaPaginada a la vista
 page_ref = None
 actualizar_tabla_callback = None
 
@@ -34,9 +37,8 @@ def toggle_seleccion_ubicacion(ubicacion_id, seleccionado):
 
 def toggle_seleccion_todas(seleccionar_todas, ubicaciones):
     """Seleccionar o deseleccionar todas las ubicaciones"""
-    global ubicaciones_seleccionadas
     if seleccionar_todas:
-        ubicaciones_seleccionadas = {ubicacion.get('firebase_id') or ubicacion.get('id', '') for ubicacion in ubicaciones if ubicacion.get('firebase_id') or ubicacion.get('id')}
+        ubicaciones_seleccionadas.update(ubicacion.get('firebase_id') or ubicacion.get('id') for ubicacion in ubicaciones if ubicacion.get('firebase_id') or ubicacion.get('id'))
     else:
         ubicaciones_seleccionadas.clear()
     
@@ -58,7 +60,7 @@ def _actualizar_boton_eliminar():
                     btn.content.controls[1].value = f"Eliminar ({len(ubicaciones_seleccionadas)})"
                 else:
                     btn.content.controls[1].value = "Eliminar Selec."
-                page_ref.update()
+                btn.update()
         except Exception as e:
             print(f"Error al actualizar botón eliminar: {e}")
 
@@ -95,7 +97,7 @@ async def eliminar_ubicaciones_seleccionadas(page, actualizar_tabla_ubicaciones)
     # Diálogo de confirmación
     def confirmar_eliminacion(e):
         page.close(dialogo_confirmacion)
-        page.run_task(procesar_eliminacion)
+        confirmar_eliminacion_masiva(page, len(ubicaciones_seleccionadas), procesar_eliminacion)
     
     def cancelar_eliminacion(e):
         page.close(dialogo_confirmacion)
@@ -122,25 +124,30 @@ async def eliminar_ubicaciones_seleccionadas(page, actualizar_tabla_ubicaciones)
         await asyncio.sleep(1.0)  # 1 segundo mínimo
         
         try:
-            from conexiones.firebase import db
+            from app.services import repositorio_ubicaciones
             from app.utils.historial import GestorHistorial
             from app.funciones.sesiones import SesionManager
+            from app.utils.sincronizacion_inventario import sincronizador_inventario
             
-            eliminadas = 0
-            errores = 0
+            # Modelos afectados, tomados del cache (sin lecturas extra a Firebase)
+            modelo_por_id = {
+                u.get('firebase_id'): u.get('modelo')
+                for u in await repositorio_ubicaciones.listar()
+            }
             
-            for ubicacion_id in ubicaciones_seleccionadas:
-                try:
-                    db.collection('ubicaciones').document(ubicacion_id).delete()
-                    eliminadas += 1
-                    
-                    # Pequeño delay para hacer visible el progreso
-                    if eliminadas % 5 == 0:  # Cada 5 ubicaciones
-                        await asyncio.sleep(0.1)  # 100ms para mostrar progreso
-                        
-                except Exception as e:
-                    print(f"Error al eliminar ubicación {ubicacion_id}: {e}")
-                    errores += 1
+            # Eliminar en lotes (un WriteBatch por hasta 249 ubicaciones)
+            ids_eliminados, ids_con_error = await repositorio_ubicaciones.eliminar_varios(
+                ubicaciones_seleccionadas, descripcion='Eliminación masiva de ubicaciones'
+            )
+            eliminadas = len(ids_eliminados)
+            errores = len(ids_con_error)
+            
+            # Recalcular solo los modelos que perdieron ubicaciones
+            if eliminadas:
+                sincronizador_inventario.marcar_modelos_modificados(
+                    modelo_por_id.get(ubicacion_id) for ubicacion_id in ids_eliminados
+                )
+                await sincronizador_inventario.sincronizar_pendientes()
             
             # Registrar en historial
             gestor_historial = GestorHistorial()
@@ -149,11 +156,13 @@ async def eliminar_ubicaciones_seleccionadas(page, actualizar_tabla_ubicaciones)
             await gestor_historial.agregar_actividad(
                 tipo="eliminar_ubicacion",
                 descripcion=f"Eliminó {eliminadas} ubicaciones masivamente (Errores: {errores})",
-                usuario=usuario_actual.get('username', 'Usuario') if usuario_actual else 'Sistema'
+                usuario=usuario_actual.get('username', 'Usuario') if usuario_actual else 'Sistema',
+                detalles={"cantidad": eliminadas, "errores": errores}
             )
             
             # Limpiar selecciones
             ubicaciones_seleccionadas.clear()
+            _actualizar_boton_eliminar()
             
             # Delay mínimo antes de cerrar para asegurar visibilidad
             await asyncio.sleep(0.5)  # Medio segundo adicional
@@ -234,22 +243,19 @@ def crear_boton_editar(ubicacion_id, page, actualizar_tabla_ubicaciones):
     async def editar_ubicacion(e):
         """Editar ubicación - mostrar diálogo de edición"""
         try:
-            from conexiones.firebase import db
+            from app.services import repositorio_ubicaciones
             from datetime import datetime
             
             # Obtener datos actuales de la ubicación
-            doc_ref = db.collection('ubicaciones').document(ubicacion_id)
-            doc = doc_ref.get()
+            ubicacion_data = await repositorio_ubicaciones.obtener(ubicacion_id)
             
-            if not doc.exists:
+            if ubicacion_data is None:
                 page.open(ft.SnackBar(
                     content=ft.Text("[ERROR] Ubicación no encontrada", color=tema.TEXT_COLOR),
                     bgcolor=tema.ERROR_COLOR
                 ))
                 return
             
-            ubicacion_data = doc.to_dict()
-            
             # Solo campo de observaciones (editable)
             campo_observaciones = ft.TextField(
                 label="Observaciones",
@@ -296,10 +302,10 @@ def crear_boton_editar(ubicacion_id, page, actualizar_tabla_ubicaciones):
             async def guardar_cambios(e):
                 try:
                     # Solo actualizar observaciones
-                    doc_ref.update({
+                    await repositorio_ubicaciones.actualizar(ubicacion_id, {
                         'observaciones': campo_observaciones.value.strip(),
                         'fecha_modificacion': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    })
+                    }, descripcion='Editar observaciones de ubicación')
                     
                     page.close(dialogo_editar)
                     page.open(ft.SnackBar(
@@ -415,28 +421,27 @@ def crear_boton_eliminar(ubicacion_id, page, actualizar_tabla_ubicaciones):
     async def eliminar_ubicacion_firebase(ubicacion_id):
         """Eliminar ubicación de Firebase"""
         try:
-            from conexiones.firebase import db
+            from app.services import repositorio_ubicaciones
             from app.utils.historial import GestorHistorial
             from app.funciones.sesiones import SesionManager
             
             # Obtener datos de la ubicación antes de eliminar para el historial
-            doc_ref = db.collection('ubicaciones').document(ubicacion_id)
-            doc = doc_ref.get()
-            if doc.exists:
-                ubicacion_data = doc.to_dict()
+            ubicacion_data = await repositorio_ubicaciones.obtener(ubicacion_id)
+            if ubicacion_data is not None:
                 modelo = ubicacion_data.get('modelo', 'Sin modelo')
                 almacen = ubicacion_data.get('almacen', 'Sin almacén')
                 estanteria = ubicacion_data.get('estanteria', 'Sin estantería')
                 
-                # Eliminar de Firebase
-                doc_ref.delete()
+                # Eliminar de Firebase (deja lápida; el repositorio invalida el cache)
+                await repositorio_ubicaciones.eliminar(ubicacion_id, descripcion='Eliminar ubicación')
                 
                 # Esperar un momento para asegurar que Firebase procese la eliminación
                 await asyncio.sleep(0.2)
                 
-                # Invalidar cache de ubicaciones para forzar refresh
-                from app.utils.cache_firebase import cache_firebase
-                cache_firebase.invalidar_cache_ubicaciones()
+                # Recalcular la cantidad del modelo afectado
+                from app.utils.sincronizacion_inventario import marcar_modelos_modificados, sincronizar_pendientes
+                marcar_modelos_modificados(modelo)
+                await sincronizar_pendientes()
                 
                 # Registrar en historial
                 gestor_historial = GestorHistorial()
@@ -445,7 +450,8 @@ def crear_boton_eliminar(ubicacion_id, page, actualizar_tabla_ubicaciones):
                 await gestor_historial.agregar_actividad(
                     tipo="eliminar_ubicacion",
                     descripcion=f"Eliminó ubicación: {modelo} de {almacen}/{estanteria}",
-                    usuario=usuario_actual.get('username', 'Usuario') if usuario_actual else 'Sistema'
+                    usuario=usuario_actual.get('username', 'Usuario') if usuario_actual else 'Sistema',
+                    detalles={"modelo": modelo, "almacen": almacen, "estanteria": estanteria}
                 )
                 
                 page.open(ft.SnackBar(
@@ -482,9 +488,24 @@ def crear_boton_eliminar(ubicacion_id, page, actualizar_tabla_ubicaciones):
 #     # Esta funcionalidad se movió a la vista de Movimientos
 #     pass
 
+def tabla_montada() -> bool:
+    """True si la tabla de ubicaciones está a la vista (se puede refrescar en el lugar)"""
+    return tabla_actual is not None and montado(tabla_actual.control)
+
+def actualizar_filas(ubicaciones, primera_pagina=False) -> bool:
+    """
+    Refresca la tabla a la vista con `ubicaciones` reconciliando fila por fila
+    (solo se envían las filas nuevas o cambiadas). False si no hay tabla
+    montada: entonces hay que construirla con mostrar_tabla_ubicaciones.
+    """
+    if not tabla_montada():
+        return False
+    tabla_actual.reemplazar([u for u in ubicaciones if u.get('firebase_id') or u.get('id')], primera_pagina)
+    return True
+
 def mostrar_tabla_ubicaciones(page, ubicaciones, actualizar_tabla_ubicaciones=None):
     """Mostrar tabla de ubicaciones con almacén y ubicación específica + Selección múltiple"""
-    global ubicaciones_seleccionadas, checkbox_principal
+    global tabla_actual
     tema = GestorTemas.obtener_tema()
     
     # Configurar referencias globales
@@ -492,37 +513,6 @@ def mostrar_tabla_ubicaciones(page, ubicaciones, actualizar_tabla_ubicaciones=No
     if actualizar_tabla_ubicaciones:
         set_actualizar_tabla_callback(actualizar_tabla_ubicaciones)
     
-    # Estado para el ordenamiento
-    orden_actual = {"columna": 1, "ascendente": True}  # Columna 1 = Modelo/Tipo
-    
-    # Función auxiliar para obtener modelo de forma segura
-    def obtener_modelo_ubicacion_seguro(ubicacion):
-        try:
-            modelo = ubicacion.get('modelo', '')
-            return str(modelo).lower() if modelo is not None else ''
-        except:
-            return ''
-    
-    # Aplicar ordenamiento inicial
-    ubicaciones_mostrar = sorted(ubicaciones, key=obtener_modelo_ubicacion_seguro)
-    
-    # Función para reordenar y actualizar tabla
-    def aplicar_ordenamiento():
-        nonlocal ubicaciones_mostrar
-        if orden_actual["columna"] == 1:  # Columna modelo/tipo
-            ubicaciones_mostrar = sorted(ubicaciones, key=obtener_modelo_ubicacion_seguro, reverse=not orden_actual["ascendente"])
-            print(f"[OK] Aplicando ordenamiento ubicaciones: {'ascendente' if orden_actual['ascendente'] else 'descendente'}")
-            if actualizar_tabla_ubicaciones:
-                actualizar_tabla_ubicaciones()
-    
-    # Función para manejar ordenamiento
-    def ordenar_ubicaciones(e):
-        print(f"🔀 DEBUG UBICACIONES: Ordenamiento solicitado - Columna: {e.column_index}, Ascendente: {e.ascending}")
-        if e.column_index == 1:  # Solo columna modelo/tipo
-            orden_actual["columna"] = e.column_index
-            orden_actual["ascendente"] = e.ascending
-            aplicar_ordenamiento()
-    
     # Dimensiones responsivas mejoradas
     ancho_ventana = page.window.width or 1200
     alto_ventana = page.window.height or 800
@@ -531,7 +521,6 @@ def mostrar_tabla_ubicaciones(page, ubicaciones, actualizar_tabla_ubicaciones=No
     if ancho_ventana < 1000:
         ancho_tabla = ancho_ventana * 0.95
         altura_tabla = alto_ventana * 0.3
-        ancho_checkbox = 50
         ancho_modelo = 90
         ancho_almacen = 60
         ancho_estanteria = 70
@@ -542,7 +531,6 @@ def mostrar_tabla_ubicaciones(page, ubicaciones, actualizar_tabla_ubicaciones=No
     elif ancho_ventana < 1400:
         ancho_tabla = ancho_ventana * 0.92
         altura_tabla = alto_ventana * 0.4
-        ancho_checkbox = 55
         ancho_modelo = 110
         ancho_almacen = 70
         ancho_estanteria = 80
@@ -553,7 +541,6 @@ def mostrar_tabla_ubicaciones(page, ubicaciones, actualizar_tabla_ubicaciones=No
     else:
         ancho_tabla = ancho_ventana * 0.88
         altura_tabla = alto_ventana * 0.52
-        ancho_checkbox = 60
         ancho_modelo = 130
         ancho_almacen = 80
         ancho_estanteria = 90
@@ -579,207 +566,141 @@ def mostrar_tabla_ubicaciones(page, ubicaciones, actualizar_tabla_ubicaciones=No
             height=altura_tabla
         )
 
-    def on_checkbox_principal_changed(e):
-        """Manejar cambio del checkbox principal (seleccionar/deseleccionar todas)"""
-        toggle_seleccion_todas(e.control.value, ubicaciones)
-        # Actualizar todos los checkboxes individuales
-        for fila in tabla.rows:
-            checkbox_individual = fila.cells[0].content.content
-            checkbox_individual.value = e.control.value
-        page.update()
-
-    def on_checkbox_individual_changed(e, ubicacion_id):
-        """Manejar cambio de checkbox individual"""
-        toggle_seleccion_ubicacion(ubicacion_id, e.control.value)
-        
-        # Actualizar estado del checkbox principal
-        total_ubicaciones = len([u for u in ubicaciones if u.get('firebase_id') or u.get('id')])
-        seleccionadas = len(ubicaciones_seleccionadas)
-        
-        if seleccionadas == 0:
-            checkbox_principal.value = False
-        elif seleccionadas == total_ubicaciones:
-            checkbox_principal.value = True
-        else:
-            checkbox_principal.value = None  # Estado indeterminado
-        
-        page.update()
-
-    # Checkbox principal para seleccionar todas
-    checkbox_principal = ft.Checkbox(
-        value=False,
-        on_change=on_checkbox_principal_changed,
-        fill_color=tema.PRIMARY_COLOR
-    )
-
-    tabla = ft.DataTable(
-        sort_column_index=1,  # Columna de modelo/tipo por defecto
-        sort_ascending=True,  # Orden ascendente por defecto
-        columns=[
-            ft.DataColumn(
+    def celdas_ubicacion(ubicacion):
+        return [
+            # Modelo
+            ft.DataCell(
                 ft.Container(
-                    content=checkbox_principal,
-                    width=ancho_checkbox,
-                    alignment=ft.alignment.center
-                ), 
-                heading_row_alignment=ft.CrossAxisAlignment.CENTER
-            ),
-            ft.DataColumn(
-                ft.Text("Modelo", color=tema.TEXT_COLOR, weight=ft.FontWeight.BOLD, size=12), 
-                on_sort=ordenar_ubicaciones,
-                heading_row_alignment=ft.CrossAxisAlignment.CENTER
-            ),
-            ft.DataColumn(
-                ft.Text("Almacén", color=tema.TEXT_COLOR, weight=ft.FontWeight.BOLD, size=12), 
-                heading_row_alignment=ft.CrossAxisAlignment.CENTER
-            ),
-            ft.DataColumn(
-                ft.Text("Estantería", color=tema.TEXT_COLOR, weight=ft.FontWeight.BOLD, size=12), 
-                heading_row_alignment=ft.CrossAxisAlignment.CENTER
-            ),
-            ft.DataColumn(
-                ft.Text("Cantidad", color=tema.TEXT_COLOR, weight=ft.FontWeight.BOLD, size=12), 
-                heading_row_alignment=ft.CrossAxisAlignment.CENTER
-            ),
-            ft.DataColumn(
-                ft.Text("Fecha", color=tema.TEXT_COLOR, weight=ft.FontWeight.BOLD, size=12), 
-                heading_row_alignment=ft.CrossAxisAlignment.CENTER
-            ),
-            ft.DataColumn(
-                ft.Text("Observaciones", color=tema.TEXT_COLOR, weight=ft.FontWeight.BOLD, size=12), 
-                heading_row_alignment=ft.CrossAxisAlignment.CENTER
-            ),
-            ft.DataColumn(
-                ft.Text("Acciones", color=tema.TEXT_COLOR, weight=ft.FontWeight.BOLD, size=12), 
-                heading_row_alignment=ft.CrossAxisAlignment.CENTER
-            ),
-        ],
-        rows=[
-            ft.DataRow(
-                cells=[
-                    # Checkbox de selección
-                    ft.DataCell(
-                        ft.Container(
-                            content=ft.Checkbox(
-                                value=(ubicacion.get('firebase_id') or ubicacion.get('id')) in ubicaciones_seleccionadas,
-                                on_change=lambda e, uid=ubicacion.get('firebase_id') or ubicacion.get('id'): on_checkbox_individual_changed(e, uid),
-                                fill_color=tema.PRIMARY_COLOR
-                            ),
-                            width=ancho_checkbox,
-                            alignment=ft.alignment.center
-                        )
+                    content=ft.Text(
+                        str(ubicacion.get('modelo', 'N/A')), 
+                        color=tema.TEXT_COLOR, 
+                        weight=ft.FontWeight.W_500,
+                        size=11,
+                        overflow=ft.TextOverflow.ELLIPSIS
                     ),
-                    # Modelo
-                    ft.DataCell(
-                        ft.Container(
-                            content=ft.Text(
-                                str(ubicacion.get('modelo', 'N/A')), 
-                                color=tema.TEXT_COLOR, 
-                                weight=ft.FontWeight.W_500,
-                                size=11,
-                                overflow=ft.TextOverflow.ELLIPSIS
-                            ),
-                            width=ancho_modelo,
-                            padding=ft.padding.symmetric(horizontal=5, vertical=4)
-                        )
-                    ),
-                    # Almacén
-                    ft.DataCell(
-                        ft.Container(
-                            content=ft.Row([
-                                ft.Icon(
-                                    ft.Icons.WAREHOUSE,
-                                    color=tema.PRIMARY_COLOR,
-                                    size=14
-                                ),
-                                ft.Text(
-                                    ubicacion.get('almacen', 'N/A'), 
-                                    color=tema.TEXT_COLOR, 
-                                    size=11
-                                )
-                            ], spacing=3),
-                            width=ancho_almacen,
-                            padding=ft.padding.symmetric(horizontal=5, vertical=4)
+                    width=ancho_modelo,
+                    padding=ft.padding.symmetric(horizontal=5, vertical=4)
+                )
+            ),
+            # Almacén
+            ft.DataCell(
+                ft.Container(
+                    content=ft.Row([
+                        ft.Icon(
+                            ft.Icons.WAREHOUSE,
+                            color=tema.PRIMARY_COLOR,
+                            size=14
+                        ),
+                        ft.Text(
+                            ubicacion.get('almacen', 'N/A'), 
+                            color=tema.TEXT_COLOR, 
+                            size=11
                         )
-                    ),
-                    # Estantería
-                    ft.DataCell(
-                        ft.Container(
-                            content=ft.Row([
-                                ft.Icon(ft.Icons.SHELVES, color=tema.SECONDARY_TEXT_COLOR, size=12),
-                                ft.Text(
-                                    ubicacion.get('estanteria', 'N/A'), 
-                                    color=tema.TEXT_COLOR, 
-                                    size=11,
-                                    overflow=ft.TextOverflow.ELLIPSIS
-                                )
-                            ], spacing=3),
-                            width=ancho_estanteria,
-                            padding=ft.padding.symmetric(horizontal=5, vertical=4)
+                    ], spacing=3),
+                    width=ancho_almacen,
+                    padding=ft.padding.symmetric(horizontal=5, vertical=4)
+                )
+            ),
+            # Estantería
+            ft.DataCell(
+                ft.Container(
+                    content=ft.Row([
+                        ft.Icon(ft.Icons.SHELVES, color=tema.SECONDARY_TEXT_COLOR, size=12),
+                        ft.Text(
+                            ubicacion.get('estanteria', 'N/A'), 
+                            color=tema.TEXT_COLOR, 
+                            size=11,
+                            overflow=ft.TextOverflow.ELLIPSIS
                         )
-                    ),
-                    # Cantidad
-                    ft.DataCell(
-                        ft.Container(
-                            content=ft.Row([
-                                ft.Icon(ft.Icons.INVENTORY_2, color=tema.WARNING_COLOR, size=12),
-                                ft.Text(
-                                    str(ubicacion.get('cantidad', '1')), 
-                                    color=tema.TEXT_COLOR, 
-                                    size=11,
-                                    weight=ft.FontWeight.W_500
-                                )
-                            ], spacing=3),
-                            width=ancho_cantidad,
-                            padding=ft.padding.symmetric(horizontal=5, vertical=4)
+                    ], spacing=3),
+                    width=ancho_estanteria,
+                    padding=ft.padding.symmetric(horizontal=5, vertical=4)
+                )
+            ),
+            # Cantidad
+            ft.DataCell(
+                ft.Container(
+                    content=ft.Row([
+                        ft.Icon(ft.Icons.INVENTORY_2, color=tema.WARNING_COLOR, size=12),
+                        ft.Text(
+                            str(ubicacion.get('cantidad', '1')), 
+                            color=tema.TEXT_COLOR, 
+                            size=11,
+                            weight=ft.FontWeight.W_500
                         )
+                    ], spacing=3),
+                    width=ancho_cantidad,
+                    padding=ft.padding.symmetric(horizontal=5, vertical=4)
+                )
+            ),
+            # Fecha de asignación (formato más corto)
+            ft.DataCell(
+                ft.Container(
+                    content=ft.Text(
+                        ubicacion.get('fecha_asignacion', 'N/A')[:10] if ubicacion.get('fecha_asignacion') else 'N/A', 
+                        color=tema.TEXT_COLOR, 
+                        size=10,
+                        overflow=ft.TextOverflow.ELLIPSIS
                     ),
-                    # Fecha de asignación (formato más corto)
-                    ft.DataCell(
-                        ft.Container(
-                            content=ft.Text(
-                                ubicacion.get('fecha_asignacion', 'N/A')[:10] if ubicacion.get('fecha_asignacion') else 'N/A', 
-                                color=tema.TEXT_COLOR, 
-                                size=10,
-                                overflow=ft.TextOverflow.ELLIPSIS
-                            ),
-                            width=ancho_fecha,
-                            padding=ft.padding.symmetric(horizontal=5, vertical=4)
-                        )
+                    width=ancho_fecha,
+                    padding=ft.padding.symmetric(horizontal=5, vertical=4)
+                )
+            ),
+            # Observaciones
+            ft.DataCell(
+                ft.Container(
+                    content=ft.Text(
+                        ubicacion.get('observaciones', 'N/A'), 
+                        color=tema.SECONDARY_TEXT_COLOR, 
+                        size=10,
+                        overflow=ft.TextOverflow.ELLIPSIS
                     ),
-                    # Observaciones
-                    ft.DataCell(
-                        ft.Container(
-                            content=ft.Text(
-                                ubicacion.get('observaciones', 'N/A'), 
-                                color=tema.SECONDARY_TEXT_COLOR, 
-                                size=10,
-                                overflow=ft.TextOverflow.ELLIPSIS
-                            ),
-                            width=ancho_observaciones,
-                            padding=ft.padding.symmetric(horizontal=5, vertical=4)
-                        )
+                    width=ancho_observaciones,
+                    padding=ft.padding.symmetric(horizontal=5, vertical=4)
+                )
+            ),
+            # Acciones
+            ft.DataCell(
+                ft.Container(
+                    content=ft.Row([
+                        crear_boton_editar(ubicacion.get('firebase_id', ''), page, actualizar_tabla_ubicaciones),
+                        crear_boton_eliminar(ubicacion.get('firebase_id', ''), page, actualizar_tabla_ubicaciones),
+                    ],
+                    spacing=8,
+                    tight=True,
+                    alignment=ft.MainAxisAlignment.CENTER
                     ),
-                    # Acciones
-                    ft.DataCell(
-                        ft.Container(
-                            content=ft.Row([
-                                crear_boton_editar(ubicacion.get('firebase_id', ''), page, actualizar_tabla_ubicaciones),
-                                crear_boton_eliminar(ubicacion.get('firebase_id', ''), page, actualizar_tabla_ubicaciones),
-                            ],
-                            spacing=8,
-                            tight=True,
-                            alignment=ft.MainAxisAlignment.CENTER
-                            ),
-                            width=ancho_acciones,
-                            padding=ft.padding.symmetric(horizontal=3, vertical=4),
-                            alignment=ft.alignment.center
-                        )
-                    )
-                ],
-                selected=False
-            ) for ubicacion in ubicaciones_mostrar if ubicacion.get('firebase_id') or ubicacion.get('id')  # Ubicaciones con ID de Firebase o local
-        ],
+                    width=ancho_acciones,
+                    padding=ft.padding.symmetric(horizontal=3, vertical=4),
+                    alignment=ft.alignment.center
+                )
+            )
+        ]
+
+    def columna(titulo):
+        return ft.DataColumn(
+            ft.Text(titulo, color=tema.TEXT_COLOR, weight=ft.FontWeight.BOLD, size=12), 
+            heading_row_alignment=ft.CrossAxisAlignment.CENTER
+        )
+
+    # Tabla paginada: solo se construyen las filas de la página visible
+    tabla = tabla_actual = TablaPaginada(
+        [u for u in ubicaciones if u.get('firebase_id') or u.get('id')],  # Ubicaciones con ID de Firebase o local
+        [columna("Modelo"), columna("Almacén"), columna("Estantería"), columna("Cantidad"),
+         columna("Fecha"), columna("Observaciones"), columna("Acciones")],
+        celdas_ubicacion,
+        page=page,
+        estado=estado_tabla,
+        ordenables={
+            0: lambda u: u.get('modelo'),
+            1: lambda u: u.get('almacen'),
+            2: lambda u: u.get('estanteria'),
+            3: lambda u: u.get('cantidad'),
+            4: lambda u: u.get('fecha_asignacion'),
+        },
+        orden_inicial=(0, True),  # Modelo ascendente por defecto
+        seleccion=ubicaciones_seleccionadas,
+        al_seleccionar=_actualizar_boton_eliminar,
         width=ancho_tabla,
         column_spacing=35,  # Mejor espaciado entre columnas para aprovechar el ancho
         horizontal_lines=ft.BorderSide(width=0.5, color=tema.DIVIDER_COLOR),
@@ -789,7 +710,7 @@ def mostrar_tabla_ubicaciones(page, ubicaciones, actualizar_tabla_ubicaciones=No
         expand=True,  # Expandir al máximo disponible
     )
     
-    scroll_vertical = ft.Column([tabla], scroll=True, height=altura_tabla, 
+    scroll_vertical = ft.Column([tabla.control], scroll=True, height=altura_tabla, 
                                 expand=True, horizontal_alignment=ft.CrossAxisAlignment.CENTER)
     
     return ft.Container(
@@ -2,10 +2,13 @@ import flet as ft
 from app.crud_usuarios.delete_usuarios import mensaje_confirmacion
 from app.utils.temas import GestorTemas
 import asyncio
+from app.tablas.tabla_paginada import TablaPaginada, montado
+from app.ui.aviso_cuota import confirmar_eliminacion_masiva
 
 # Variables globales para la selección múltiple
 usuarios_seleccionados = set()
-checkbox_principal = None
+estado_tabla = {}  # Página y orden de la tabla entre reconstrucciones
+tabla_actual = None  # TablaPaginada a la vista
 page_ref = None
 actualizar_tabla_callback = None
 boton_eliminar_ref = None  # Nueva referencia directa al botón
@@ -42,9 +45,8 @@ def toggle_seleccion_usuario(usuario_id, seleccionado):
 
 def toggle_seleccion_todas(seleccionar_todas, usuarios):
     """Seleccionar o deseleccionar todos los usuarios"""
-    global usuarios_seleccionados
     if seleccionar_todas:
-        usuarios_seleccionados = {usuario.get('firebase_id') or usuario.get('id', '') for usuario in usuarios if usuario.get('firebase_id') or usuario.get('id')}
+        usuarios_seleccionados.update(usuario.get('firebase_id') or usuario.get('id') for usuario in usuarios if usuario.get('firebase_id') or usuario.get('id'))
     else:
         usuarios_seleccionados.clear()
     
@@ -94,7 +96,7 @@ async def eliminar_usuarios_seleccionados(page, callback_actualizar=None):
     # Diálogo de confirmación
     def confirmar_eliminacion(e):
         page.close(dialogo)
-        page.run_task(procesar_eliminacion)
+        confirmar_eliminacion_masiva(page, len(usuarios_seleccionados), procesar_eliminacion)
     
     def cancelar_eliminacion(e):
         page.close(dialogo)
@@ -121,31 +123,17 @@ async def eliminar_usuarios_seleccionados(page, callback_actualizar=None):
         await asyncio.sleep(1.0)
         
         try:
-            from conexiones.firebase import db
-            from app.utils.cache_firebase import cache_firebase
+            from app.services import repositorio_usuarios
             from app.utils.historial import GestorHistorial
             from app.funciones.sesiones import SesionManager
             
-            # Eliminar usuarios de Firebase
-            usuarios_eliminados = len(usuarios_seleccionados)
-            ids_eliminados = list(usuarios_seleccionados.copy())
-            
-            for usuario_id in usuarios_seleccionados:
-                try:
-                    doc_ref = db.collection('usuarios').document(usuario_id)
-                    doc_ref.delete()
-                    print(f"Usuario {usuario_id} eliminado de Firebase")
-                    
-                    # Pequeño delay para progreso visible
-                    if usuarios_eliminados % 5 == 0:
-                        await asyncio.sleep(0.1)
-                except Exception as e:
-                    print(f"Error al eliminar usuario {usuario_id}: {e}")
-            
-            # Invalidar cache para futuras consultas
-            cache_firebase._cache_usuarios = []
-            cache_firebase._ultimo_update_usuarios = None
-            print("[ELIMINAR] Cache invalidado para futuras consultas")
+            # Eliminar usuarios de Firebase en lotes (el repositorio invalida el cache)
+            ids_eliminados, ids_con_error = await repositorio_usuarios.eliminar_varios(
+                usuarios_seleccionados, descripcion='Eliminación masiva de usuarios'
+            )
+            usuarios_eliminados = len(ids_eliminados)
+            for usuario_id in ids_con_error:
+                print(f"Error al eliminar usuario {usuario_id}")
             
             # Registrar en historial
             gestor_historial = GestorHistorial()
@@ -154,11 +142,13 @@ async def eliminar_usuarios_seleccionados(page, callback_actualizar=None):
             await gestor_historial.agregar_actividad(
                 tipo="eliminar_usuarios_masivo",
                 descripcion=f"Eliminó {usuarios_eliminados} usuarios masivamente",
-                usuario=usuario_actual.get('username', 'Usuario') if usuario_actual else 'Sistema'
+                usuario=usuario_actual.get('username', 'Usuario') if usuario_actual else 'Sistema',
+                detalles={"cantidad": usuarios_eliminados}
             )
             
             # Limpiar selección
             usuarios_seleccionados.clear()
+            _actualizar_boton_eliminar()
             
             # Cerrar progreso
             await asyncio.sleep(0.5)
@@ -222,9 +212,24 @@ async def eliminar_usuarios_seleccionados(page, callback_actualizar=None):
     
     page.open(dialogo)
 
+def tabla_montada() -> bool:
+    """True si la tabla de usuarios está a la vista (se puede refrescar en el lugar)"""
+    return tabla_actual is not None and montado(tabla_actual.control)
+
+def actualizar_filas(usuarios, primera_pagina=False) -> bool:
+    """
+    Refresca la tabla a la vista con `usuarios` reconciliando fila por fila
+    (solo se envían las filas nuevas o cambiadas). False si no hay tabla
+    montada: entonces hay que construirla con mostrar_tabla_usuarios.
+    """
+    if not tabla_montada():
+        return False
+    tabla_actual.reemplazar([u for u in usuarios if u.get('firebase_id') or u.get('id')], primera_pagina)
+    return True
+
 def mostrar_tabla_usuarios(page, usuarios, actualizar_tabla=None):
     """Mostrar tabla de usuarios con selección múltiple"""
-    global usuarios_seleccionados, checkbox_principal, tabla
+    global tabla_actual
     tema = GestorTemas.obtener_tema()
     
     # Configurar referencias globales
@@ -237,61 +242,80 @@ def mostrar_tabla_usuarios(page, usuarios, actualizar_tabla=None):
     ancho_tabla = max(800, (page.window.width or 1200) - 400)
     
     # Calcular anchos de columnas responsivos
-    ancho_checkbox = 50
     ancho_id = 100
     ancho_nombre = 200
     ancho_tipo = 150
     ancho_acciones = 120
     
-    # Función para manejar el checkbox principal
-    def on_checkbox_principal_changed(e):
-        seleccionar_todas = e.control.value
-        toggle_seleccion_todas(seleccionar_todas, usuarios)
-        
-        # Actualizar todos los checkboxes individuales en la tabla
-        if 'tabla' in globals() and tabla and tabla.rows:
-            for fila in tabla.rows:
-                checkbox_individual = fila.cells[0].content.content
-                checkbox_individual.value = seleccionar_todas
-        
-        print(f"🔲 Checkbox principal cambiado a: {seleccionar_todas}, seleccionados: {len(usuarios_seleccionados)}")
-        
-        # Solo actualizar la página, NO reconstruir la tabla
-        if page_ref:
-            page_ref.update()
-    
-    # Función para manejar checkboxes individuales
-    def on_checkbox_individual_changed(e, usuario_id):
-        toggle_seleccion_usuario(usuario_id, e.control.value)
-        
-        # Actualizar estado del checkbox principal basado en la selección actual
-        total_usuarios = len([u for u in usuarios if u.get('firebase_id') or u.get('id')])
-        if len(usuarios_seleccionados) == 0:
-            checkbox_principal.value = False
-        elif len(usuarios_seleccionados) == total_usuarios:
-            checkbox_principal.value = True
-        else:
-            checkbox_principal.value = None  # Estado indeterminado
-        
-        # Solo actualizar la página, NO la tabla completa
-        if page_ref:
-            page_ref.update()
-    
-    # Checkbox principal - Definir DESPUÉS de la función
-    checkbox_principal = ft.Checkbox(
-        value=len(usuarios_seleccionados) == len([u for u in usuarios if u.get('firebase_id') or u.get('id')]) and len(usuarios) > 0,
-        on_change=on_checkbox_principal_changed,
-        fill_color=tema.PRIMARY_COLOR
-    )
-    
-    print(f"🔲 Checkbox principal creado con valor inicial: {checkbox_principal.value}")
+    def celdas_usuario(usuario):
+        return [
+            # Nombre
+            ft.DataCell(
+                ft.Container(
+                    content=ft.Text(
+                        usuario.get('nombre', 'Sin nombre'), 
+                        color=tema.TEXT_COLOR,
+                        size=12
+                    ),
+                    width=ancho_nombre,
+                    alignment=ft.alignment.center_left
+                )
+            ),
+            # Tipo de Usuario
+            ft.DataCell(
+                ft.Container(
+                    content=ft.Text(
+                        "Administrador" if usuario.get('es_admin', False) else "Usuario", 
+                        color=tema.TEXT_COLOR,
+                        size=12
+                    ),
+                    width=ancho_tipo,
+                    alignment=ft.alignment.center_left
+                )
+            ),
+            # Acciones
+            ft.DataCell(
+                ft.Container(
+                    content=ft.Row(
+                        controls=[
+                            ft.IconButton(
+                                ft.Icons.EDIT, 
+                                icon_color=tema.PRIMARY_COLOR, 
+                                on_click=lambda e, uid=usuario.get('firebase_id', ''): editar_usuario(uid, page, actualizar_tabla),
+                                tooltip="Editar usuario"
+                            ),
+                            crear_boton_eliminar(page, usuario.get('firebase_id', ''), actualizar_tabla),
+                        ],
+                        spacing=5,
+                        alignment=ft.MainAxisAlignment.CENTER
+                    ),
+                    width=ancho_acciones,
+                    alignment=ft.alignment.center
+                )
+            ),
+        ]
+
+    def columna(titulo):
+        return ft.DataColumn(
+            ft.Text(titulo, color=tema.TEXT_COLOR, weight=ft.FontWeight.BOLD, size=12), 
+            heading_row_alignment=ft.CrossAxisAlignment.CENTER
+        )
     
-    # Crear una tabla para mostrar los usuarios
-    tabla = ft.DataTable(
+    # Tabla paginada: solo se construyen las filas de la página visible
+    tabla = tabla_actual = TablaPaginada(
+        [u for u in usuarios if u.get('firebase_id') or u.get('id')],  # Solo usuarios con ID
+        [columna("Nombre"), columna("Tipo de Usuario"), columna("Acciones")],
+        celdas_usuario,
+        page=page,
+        estado=estado_tabla,
+        ordenables={
+            0: lambda u: u.get('nombre'),
+            1: lambda u: "Administrador" if u.get('es_admin', False) else "Usuario",
+        },
+        seleccion=usuarios_seleccionados,
+        al_seleccionar=_actualizar_boton_eliminar,
         border=ft.border.all(1, tema.TABLE_BORDER),
-        sort_column_index=1,  # Columna nombre (ahora es índice 1, ya que quitamos ID)
         border_radius=tema.BORDER_RADIUS,
-        sort_ascending=True,
         heading_row_color=tema.TABLE_HEADER_BG,
         heading_row_height=50,
         data_row_color={ft.ControlState.HOVERED: tema.TABLE_HOVER},
@@ -300,95 +324,10 @@ def mostrar_tabla_usuarios(page, usuarios, actualizar_tabla=None):
         horizontal_margin=5,  # Margen horizontal reducido
         expand_loose=True,  # Expandir de forma flexible
         expand=True,  # Expandir al máximo disponible
-        columns=[
-            ft.DataColumn(
-                ft.Container(
-                    content=checkbox_principal,
-                    width=ancho_checkbox,
-                    alignment=ft.alignment.center
-                ), 
-                heading_row_alignment=ft.CrossAxisAlignment.CENTER
-            ),
-            ft.DataColumn(
-                ft.Text("Nombre", color=tema.TEXT_COLOR, weight=ft.FontWeight.BOLD, size=12), 
-                heading_row_alignment=ft.CrossAxisAlignment.CENTER
-            ),
-            ft.DataColumn(
-                ft.Text("Tipo de Usuario", color=tema.TEXT_COLOR, weight=ft.FontWeight.BOLD, size=12), 
-                heading_row_alignment=ft.CrossAxisAlignment.CENTER
-            ),
-            ft.DataColumn(
-                ft.Text("Acciones", color=tema.TEXT_COLOR, weight=ft.FontWeight.BOLD, size=12), 
-                heading_row_alignment=ft.CrossAxisAlignment.CENTER
-            ),
-        ],
-        rows=[
-            ft.DataRow(
-                cells=[
-                    # Checkbox de selección
-                    ft.DataCell(
-                        ft.Container(
-                            content=ft.Checkbox(
-                                value=(usuario.get('firebase_id') or usuario.get('id')) in usuarios_seleccionados,
-                                on_change=lambda e, uid=usuario.get('firebase_id') or usuario.get('id'): on_checkbox_individual_changed(e, uid),
-                                fill_color=tema.PRIMARY_COLOR
-                            ),
-                            width=ancho_checkbox,
-                            alignment=ft.alignment.center
-                        )
-                    ),
-                    # Nombre
-                    ft.DataCell(
-                        ft.Container(
-                            content=ft.Text(
-                                usuario.get('nombre', 'Sin nombre'), 
-                                color=tema.TEXT_COLOR,
-                                size=12
-                            ),
-                            width=ancho_nombre,
-                            alignment=ft.alignment.center_left
-                        )
-                    ),
-                    # Tipo de Usuario
-                    ft.DataCell(
-                        ft.Container(
-                            content=ft.Text(
-                                "Administrador" if usuario.get('es_admin', False) else "Usuario", 
-                                color=tema.TEXT_COLOR,
-                                size=12
-                            ),
-                            width=ancho_tipo,
-                            alignment=ft.alignment.center_left
-                        )
-                    ),
-                    # Acciones
-                    ft.DataCell(
-                        ft.Container(
-                            content=ft.Row(
-                                controls=[
-                                    ft.IconButton(
-                                        ft.Icons.EDIT, 
-                                        icon_color=tema.PRIMARY_COLOR, 
-                                        on_click=lambda e, uid=usuario.get('firebase_id', ''): editar_usuario(uid, page, actualizar_tabla),
-                                        tooltip="Editar usuario"
-                                    ),
-                                    crear_boton_eliminar(page, usuario.get('firebase_id', ''), actualizar_tabla),
-                                ],
-                                spacing=5,
-                                alignment=ft.MainAxisAlignment.CENTER
-                            ),
-                            width=ancho_acciones,
-                            alignment=ft.alignment.center
-                        )
-                    ),
-                ],
-                selected=False
-            ) for usuario in usuarios if usuario.get('firebase_id') or usuario.get('id')  # Solo usuarios con ID
-        ],
         width=ancho_tabla,
     )
     
-    scroll_vertical = ft.Column([tabla], scroll=True, height=altura_tabla, 
+    scroll_vertical = ft.Column([tabla.control], scroll=True, height=altura_tabla, 
                                 expand=True, horizontal_alignment=ft.CrossAxisAlignment.CENTER)
     
     return ft.Container(
@@ -416,7 +355,7 @@ def editar_usuario(usuario_id, page, actualizar_tabla_callback):
     try:
         # Primero obtener los datos del usuario desde Firebase
         from app.utils.cache_firebase import cache_firebase
-        usuarios = cache_firebase._cache_usuarios if cache_firebase._cache_usuarios else []
+        usuarios = cache_firebase.instantanea('usuarios').documentos
         
         # Buscar el usuario por firebase_id
         usuario_data = None
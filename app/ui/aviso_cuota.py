@@ -0,0 +1,58 @@
+import flet as ft
+from app.utils.temas import GestorTemas
+
+
+def confirmar_operacion_masiva(page, aviso, on_continuar, accion="Continuar"):
+    """
+    Si hay aviso de cuota (ver cuota_firebase.aviso_operacion_masiva) pregunta
+    antes de ejecutar on_continuar (corrutina); sin aviso la ejecuta directamente.
+    """
+    if not aviso:
+        page.run_task(on_continuar)
+        return
+
+    tema = GestorTemas.obtener_tema()
+
+    def continuar(e):
+        page.close(dialogo)
+        page.run_task(on_continuar)
+
+    dialogo = ft.AlertDialog(
+        title=ft.Text("Cuota de Firebase casi agotada", color=tema.TEXT_COLOR),
+        bgcolor=tema.CARD_COLOR,
+        content=ft.Column(
+            controls=[
+                ft.Text(aviso, color=tema.TEXT_COLOR),
+                ft.Text("Si se agota, Firebase rechazará las operaciones hasta mañana.",
+                        color=tema.TEXT_SECONDARY, size=12),
+            ],
+            tight=True,
+            spacing=8,
+        ),
+        actions=[
+            ft.TextButton("Cancelar",
+                          style=ft.ButtonStyle(color=tema.TEXT_SECONDARY),
+                          on_click=lambda e: page.close(dialogo)),
+            ft.ElevatedButton(
+                accion,
+                style=ft.ButtonStyle(
+                    bgcolor=tema.BUTTON_ERROR_BG,
+                    color=tema.BUTTON_TEXT,
+                    shape=ft.RoundedRectangleBorder(radius=tema.BORDER_RADIUS)
+                ),
+                on_click=continuar,
+            ),
+        ],
+        modal=True,
+    )
+    page.open(dialogo)
+    page.update()
+
+
+def confirmar_eliminacion_masiva(page, cantidad, on_continuar):
+    """confirmar_operacion_masiva para un Repositorio.eliminar_varios de `cantidad` documentos"""
+    from app.services.repositorio import FUNCIONALIDAD_ELIMINACION, OPERACIONES_POR_ELIMINACION
+    from app.utils.cuota_firebase import cuota_firebase
+    aviso = cuota_firebase.aviso_operacion_masiva(FUNCIONALIDAD_ELIMINACION,
+                                                  eliminaciones=OPERACIONES_POR_ELIMINACION * cantidad)
+    confirmar_operacion_masiva(page, aviso, on_continuar, "Eliminar")
@@ -1,6 +1,5 @@
 import flet as ft
 from app.utils.temas import GestorTemas
-from conexiones.firebase import db
 from app.funciones.sesiones import SesionManager
 from app.utils.sesiones_unicas import gestor_sesiones
 from app.ui.barra_carga import progress_ring_pequeno
@@ -182,11 +181,10 @@ def login_view(page: ft.Page, on_login_success): #Función para la vista del log
         
         try:
             # Realizar la consulta a la base de datos para verificar las credenciales del usuario  
-            from google.cloud.firestore_v1.base_query import FieldFilter
-            referencia_usuarios = db.collection('usuarios')
-            query = referencia_usuarios.where(filter=FieldFilter('nombre', '==', usuario)).where(filter=FieldFilter('contrasena', '==', contrasena)).limit(1).get()
+            from app.services import repositorio_usuarios
+            usuario_encontrado = await repositorio_usuarios.autenticar(usuario, contrasena)
             
-            if query:
+            if usuario_encontrado is not None:
                 # Credenciales válidas - verificar sesión única
                 print("🔐 Credenciales válidas, verificando sesión única...")
                 
@@ -224,9 +222,7 @@ def login_view(page: ft.Page, on_login_success): #Función para la vista del log
                     return
                 
                 # Sesión única OK - proceder con login exitoso
-                usuario_doc = query[0]
-                usuario_data = usuario_doc.to_dict()
-                usuario_data['firebase_id'] = usuario_doc.id
+                usuario_data = usuario_encontrado.copy()
                 usuario_data['username'] = usuario_data.get('nombre', usuario)
                 
                 # Establecer la sesión del usuario
@@ -9,7 +9,6 @@ from app.ui_ubicaciones import vista_ubicaciones as vista_ubicaciones_modular
 from app.ui_movimientos import vista_movimientos as vista_movimientos_modular
 from app.ui_reportes import vista_reportes as vista_reportes_modular
 from app.utils.temas import GestorTemas
-from conexiones.firebase import db
 import asyncio
 
 
@@ -1,8 +1,10 @@
 import flet as ft
+from collections.abc import Mapping
 import asyncio
 import json
 from app.utils.temas import GestorTemas
-from conexiones.firebase import db
+from app.services import repositorio_productos
+from app.tablas.tabla_paginada import ListaPaginada
 
 async def vista_categorias(nombre_seccion, contenido, page):
     """Vista completa para gestión de categorías y desglose de productos"""
@@ -96,7 +98,7 @@ async def vista_categorias(nombre_seccion, contenido, page):
             productos_firebase = await obtener_productos_firebase()
             
             for producto in productos_firebase:
-                if isinstance(producto, dict):
+                if isinstance(producto, Mapping):
                     producto_id = producto.get("firebase_id") or producto.get("id") or producto.get("doc_id") or ""
                     if not producto_id:
                         print(f"Advertencia: Producto sin ID: {producto.get('modelo', 'Sin modelo')}")
@@ -114,7 +116,7 @@ async def vista_categorias(nombre_seccion, contenido, page):
             # 3. Actualizar cache para próximas consultas
             try:
                 with open('data/inventario.json', 'w', encoding='utf-8') as f:
-                    json.dump([p for p in productos_firebase], f, ensure_ascii=False, indent=2)
+                    json.dump([dict(p) for p in productos_firebase], f, ensure_ascii=False, indent=2, default=str)
                 print("[SAVE] Cache local actualizado desde Firebase")
             except Exception as e:
                 print(f"[ERROR] Error guardando cache: {e}")
@@ -146,8 +148,8 @@ async def vista_categorias(nombre_seccion, contenido, page):
             print(f"Actualizando producto ID: '{producto_id}' con categoría: '{categoria_completa}'")
             
             # Actualizar directamente en Firebase
-            doc_ref = db.collection("productos").document(producto_id.strip())
-            doc_ref.update({"categoria": categoria_completa})
+            await repositorio_productos.actualizar(producto_id.strip(), {"categoria": categoria_completa},
+                                                  descripcion=f"Cambiar categoría de {producto_id.strip()}")
             
             # Actualizar cache local directamente (más eficiente que invalidar)
             try:
@@ -310,7 +312,7 @@ async def vista_categorias(nombre_seccion, contenido, page):
                     if filtro_categoria.lower() in p["categoria"].lower()
                 ]
         
-        # Mostrar productos (limitar a 50 por rendimiento)
+        # Mostrar productos
         if not productos_filtrados_gestion:
             # Mostrar mensaje cuando no hay productos que coincidan con el filtro
             contenedor.controls.append(
@@ -330,21 +332,14 @@ async def vista_categorias(nombre_seccion, contenido, page):
                 )
             )
         else:
-            for producto in productos_filtrados_gestion[:50]:
-                await crear_card_producto_gestion(producto, contenedor)
-        
-        if len(productos_filtrados_gestion) > 50:
+            # Lista paginada: solo se construyen las tarjetas de la página visible
             contenedor.controls.append(
-                ft.Container(
-                    content=ft.Text(f"... y {len(productos_filtrados_gestion) - 50} productos más", 
-                                   color=tema.SECONDARY_TEXT_COLOR, size=12),
-                    padding=10
-                )
+                ListaPaginada(productos_filtrados_gestion, crear_card_producto_gestion, page=page).control
             )
         
         page.update()
 
-    async def crear_card_producto_gestion(producto, contenedor):
+    def crear_card_producto_gestion(producto):
         """Crear card individual para gestión de producto"""
         
         # Determinar la categoría actual del producto
@@ -482,7 +477,7 @@ async def vista_categorias(nombre_seccion, contenido, page):
             margin=ft.margin.only(bottom=5)
         )
         
-        contenedor.controls.append(card_producto)
+        return card_producto
 
     def cerrar_gestion_categorias():
         """Cerrar la interfaz de gestión de categorías"""
@@ -567,7 +562,7 @@ async def vista_categorias(nombre_seccion, contenido, page):
             productos_encontrados = []
             
             for producto in productos_firebase:
-                if not isinstance(producto, dict):
+                if not isinstance(producto, Mapping):
                     continue
                     
                 modelo = str(producto.get("modelo", "")).upper()
@@ -628,14 +623,14 @@ async def vista_categorias(nombre_seccion, contenido, page):
                     )
                 )
                 
-                # Lista de productos encontrados (diseño mejorado)
-                for producto in productos_encontrados[:50]:  # Limitar a 50 por rendimiento
+                # Lista de productos encontrados (diseño mejorado), paginada: solo se construye la página visible
+                def crear_card_producto(producto):
                     precio = producto.get("precio", 0)
                     cantidad = producto.get("cantidad", 0)
-                    
+                
                     # Determinar color del stock
                     color_stock = tema.SUCCESS_COLOR if cantidad > 10 else tema.WARNING_COLOR if cantidad > 0 else tema.ERROR_COLOR
-                    
+                
                     card_producto = ft.Container(
                         content=ft.Column([
                             ft.Row([
@@ -646,7 +641,7 @@ async def vista_categorias(nombre_seccion, contenido, page):
                                     ft.Text(producto.get("nombre", "Sin nombre"), 
                                            size=14, color=tema.SECONDARY_TEXT_COLOR),
                                 ], expand=True),
-                                
+                            
                                 # Precio
                                 ft.Container(
                                     content=ft.Text(f"${precio:,.2f}", 
@@ -655,7 +650,7 @@ async def vista_categorias(nombre_seccion, contenido, page):
                                     padding=8,
                                     border_radius=5
                                 ),
-                                
+                            
                                 # Stock
                                 ft.Container(
                                     content=ft.Row([
@@ -667,7 +662,7 @@ async def vista_categorias(nombre_seccion, contenido, page):
                                     border_radius=5
                                 )
                             ], spacing=15),
-                            
+                        
                             # Información adicional
                             ft.Row([
                                 ft.Text(f"Categoría: {producto.get('categoria', 'Sin categoría')}", 
@@ -682,7 +677,11 @@ async def vista_categorias(nombre_seccion, contenido, page):
                         border=ft.border.all(1, tema.DIVIDER_COLOR),
                         margin=ft.margin.only(bottom=8)
                     )
-                    contenedor_resultados.controls.append(card_producto)
+                    return card_producto
+                
+                contenedor_resultados.controls.append(
+                    ListaPaginada(productos_encontrados, crear_card_producto, page=page, spacing=0).control
+                )
                 
         except Exception as e:
             print(f"Error al cargar productos de categoría: {e}")
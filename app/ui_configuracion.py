@@ -47,6 +47,76 @@ def vista_configuracion(nombre_seccion, contenido, page):
         on_change=cambiar_tema_handler
     )
     
+    def construir_diagnostico():
+        """Controles del panel de diagnóstico a partir de la instantánea del monitor"""
+        from app.utils.cuota_firebase import cuota_firebase
+        from app.utils.monitor_firebase import ARCHIVO_JSON, ARCHIVO_PROMETHEUS, monitor_firebase
+        resumen = monitor_firebase.instantanea()
+        cuota = resumen['cuota_diaria']
+        
+        controles = [
+            ft.Text(f"Sesión: {resumen['lecturas']} lecturas · {resumen['escrituras']} escrituras · "
+                    f"{resumen['eliminaciones']} eliminaciones ({resumen['consultas_por_minuto']:.1f}/min)",
+                    color=tema.TEXT_COLOR),
+            ft.Container(height=5),
+            ft.Text(f"Cuota del día ({'todas las PCs' if cuota['compartida'] else 'esta PC'})",
+                    color=tema.TEXT_COLOR, weight=ft.FontWeight.BOLD),
+        ]
+        for funcionalidad, presupuesto in cuota['presupuestos'].items():
+            uso = cuota['uso'].get(funcionalidad, {})
+            for operacion, limite in presupuesto.items():
+                usado = uso.get(operacion, 0)
+                fraccion = min(1.0, usado / limite) if limite else 0.0
+                controles.append(ft.Text(f"{funcionalidad} - {operacion}: {usado:,} de {limite:,}",
+                                         color=tema.TEXT_SECONDARY, size=12))
+                controles.append(ft.ProgressBar(
+                    value=fraccion, width=500,
+                    color=tema.WARNING_COLOR if fraccion >= cuota_firebase.umbral else tema.PRIMARY_COLOR))
+        
+        controles += [
+            ft.Container(height=5),
+            ft.Text("Por colección", color=tema.TEXT_COLOR, weight=ft.FontWeight.BOLD),
+        ]
+        for m in resumen['metricas'][:8]:
+            latencia = m['latencia']
+            tiempos = (f" · p50 {latencia['p50_ms']:.0f} ms · p95 {latencia['p95_ms']:.0f} ms"
+                       if latencia['cuenta'] else "")
+            controles.append(ft.Text(f"{m['coleccion']} ({m['tipo']}): {m['operaciones']} llamadas, "
+                                     f"{m['documentos']} docs{tiempos}", color=tema.TEXT_SECONDARY, size=12))
+        if not resumen['metricas']:
+            controles.append(ft.Text("Sin consultas en esta sesión", color=tema.TEXT_SECONDARY, size=12))
+        
+        loop = resumen['latencia_event_loop']
+        controles += [
+            ft.Container(height=5),
+            ft.Text(f"Event loop: p95 {loop['p95_ms']:.1f} ms, máximo {loop['maximo_ms']:.0f} ms "
+                    f"({loop['bloqueos']} bloqueos)", color=tema.TEXT_SECONDARY, size=12),
+            ft.Text(f"[FOLDER] data/{ARCHIVO_JSON} y data/{ARCHIVO_PROMETHEUS} "
+                    f"(última: {monitor_firebase.ultima_instantanea or 'pendiente'})",
+                    color=tema.TEXT_SECONDARY, size=12),
+        ]
+        return controles
+    
+    panel_diagnostico = ft.Column(controls=construir_diagnostico(), spacing=4)
+    
+    def actualizar_diagnostico(guardar=False):
+        from app.utils.monitor_firebase import monitor_firebase
+        if guardar:
+            monitor_firebase.escribir_instantaneas()
+        panel_diagnostico.controls = construir_diagnostico()
+        page.update()
+    
+    def cambiar_consola_firebase(e):
+        """Una línea por consulta en consola (se guarda en la configuración)"""
+        from app.utils.configuracion import GestorConfiguracion
+        from app.utils.monitor_firebase import monitor_firebase
+        monitor_firebase.imprimir = e.control.value
+        GestorConfiguracion.actualizar_configuracion(monitor_firebase_consola=e.control.value)
+    
+    def consola_firebase_activa():
+        from app.utils.monitor_firebase import monitor_firebase
+        return monitor_firebase.imprimir
+    
     contenido.content = ft.Column(
         controls=[
             # Header de la sección
@@ -212,22 +282,44 @@ def vista_configuracion(nombre_seccion, contenido, page):
                             spacing=10
                         ),
                         ft.Container(height=10),
-                        ft.Text("[CHART] Monitoreo en tiempo real del uso de Firebase", 
-                               color=tema.TEXT_SECONDARY),
-                        ft.Text("[BUSCAR] Revisa la consola para ver las consultas en tiempo real", 
-                               color=tema.TEXT_SECONDARY),
+                        panel_diagnostico,
                         ft.Container(height=10),
-                        ft.ElevatedButton(
-                            content=ft.Row([
-                                ft.Icon(ft.Icons.ASSESSMENT, color=tema.ICON_BTN_COLOR),
-                                ft.Text("Ver Reporte Detallado", color=tema.BUTTON_TEXT)
-                            ]),
-                            style=ft.ButtonStyle(
-                                bgcolor=tema.BUTTON_BG,
-                                color=tema.BUTTON_TEXT,
-                                shape=ft.RoundedRectangleBorder(radius=tema.BORDER_RADIUS)
-                            ),
-                            on_click=lambda e: mostrar_reporte_firebase()
+                        ft.Row(
+                            controls=[
+                                ft.Switch(value=consola_firebase_activa(), on_change=cambiar_consola_firebase),
+                                ft.Text("Mostrar cada consulta en la consola", color=tema.TEXT_COLOR),
+                            ],
+                            spacing=10
+                        ),
+                        ft.Container(height=10),
+                        ft.Row(
+                            controls=[
+                                ft.ElevatedButton(
+                                    content=ft.Row([
+                                        ft.Icon(ft.Icons.REFRESH, color=tema.ICON_BTN_COLOR),
+                                        ft.Text("Actualizar", color=tema.BUTTON_TEXT)
+                                    ]),
+                                    style=ft.ButtonStyle(
+                                        bgcolor=tema.BUTTON_BG,
+                                        color=tema.BUTTON_TEXT,
+                                        shape=ft.RoundedRectangleBorder(radius=tema.BORDER_RADIUS)
+                                    ),
+                                    on_click=lambda e: actualizar_diagnostico(guardar=True)
+                                ),
+                                ft.ElevatedButton(
+                                    content=ft.Row([
+                                        ft.Icon(ft.Icons.ASSESSMENT, color=tema.ICON_BTN_COLOR),
+                                        ft.Text("Ver Reporte Detallado", color=tema.BUTTON_TEXT)
+                                    ]),
+                                    style=ft.ButtonStyle(
+                                        bgcolor=tema.BUTTON_BG,
+                                        color=tema.BUTTON_TEXT,
+                                        shape=ft.RoundedRectangleBorder(radius=tema.BORDER_RADIUS)
+                                    ),
+                                    on_click=lambda e: mostrar_reporte_firebase()
+                                ),
+                            ],
+                            spacing=10
                         )
                     ]
                 ),
@@ -1,6 +1,5 @@
 import flet as ft
 from datetime import datetime
-import asyncio
 
 async def vista_inicio(page, nombre_seccion, contenido, fecha_actual):
     # Importaciones dentro de la función para evitar errores de dependencias
@@ -8,7 +7,8 @@ async def vista_inicio(page, nombre_seccion, contenido, fecha_actual):
         from app.utils.temas import GestorTemas
         from app.utils.historial import GestorHistorial
         from app.funciones.sesiones import SesionManager
-        from conexiones.firebase import db
+        from app.utils.cuota_firebase import atribuida, cuota_firebase
+        from app.services import repositorio_productos, repositorio_usuarios
     except ImportError as e:
         print(f"Error al importar dependencias: {e}")
         return ft.Column([
@@ -191,16 +191,13 @@ async def vista_inicio(page, nombre_seccion, contenido, fecha_actual):
     registrar_actualizador(actualizar_estadisticas_dinamicas, page)
     
     # Función para obtener estadísticas del día
+    @atribuida('dashboard')
     async def obtener_estadisticas():
         try:
             stats = await GestorHistorial.obtener_estadisticas_hoy()  # Usar método estático
             
-            # Obtener totales usando count() en lugar de stream() para evitar lecturas masivas
-            productos_ref = db.collection('productos')
-            total_productos = productos_ref.count().get()[0][0].value
-            
-            usuarios_ref = db.collection('usuarios')
-            total_usuarios = usuarios_ref.count().get()[0][0].value
+            total_productos = await contar_coleccion('productos')
+            total_usuarios = await contar_coleccion('usuarios')
             
             return {
                 'total_productos': total_productos,
@@ -222,31 +219,31 @@ async def vista_inicio(page, nombre_seccion, contenido, fecha_actual):
                 'importados_hoy': 0,
             }
     
+    async def contar_coleccion(coleccion):
+        """Total de documentos: con count() (1 lectura), o del cache si la cuota está casi agotada"""
+        from app.utils.cache_firebase import cache_firebase
+        en_cache = cache_firebase.instantanea(coleccion).documentos
+        if en_cache and cuota_firebase.solo_cache():
+            return len(en_cache)
+        repositorio = repositorio_productos if coleccion == 'productos' else repositorio_usuarios
+        return await repositorio.contar()
+    
     # Función para obtener productos con menor stock
     async def obtener_productos_bajo_stock():
         try:
-            # Obtener una muestra de productos y ordenar localmente
-            productos_ref = db.collection('productos')
-            productos = productos_ref.limit(50).stream()  # Solo 50 productos para reducir lecturas
-            
-            productos_data = []
-            for producto in productos:
-                data = producto.to_dict()
-                stock = int(data.get('stock', 0))
-                # Solo incluir productos con stock bajo (menos de 20)
-                if stock < 20:
-                    productos_data.append({
-                        'nombre': data.get('nombre', 'Sin nombre'),
-                        'stock': stock
-                    })
-            
-            # Ordenar por stock ascendente y tomar los 5 menores
-            productos_data.sort(key=lambda x: x['stock'])
-            resultado = productos_data[:5]
-            
-            print(f"[PACKAGE] Productos bajo stock encontrados: {len(resultado)}")
-            return resultado
-            return productos_data[:5]
+            # Filtro y orden vectorizados sobre la tabla del inventario en cache (el
+            # repositorio lo carga desde disco + cambios si todavía no está)
+            import polars as pl
+            productos = await repositorio_productos.tabla()
+            bajo_stock = (productos.lazy()
+                          .select(pl.col('nombre').fill_null('Sin nombre'),
+                                  pl.col('cantidad').fill_null(0).alias('stock'))
+                          .filter(pl.col('stock') < 20)
+                          .sort('stock')
+                          .head(5)
+                          .collect())
+            print(f"[PACKAGE] Productos bajo stock encontrados: {bajo_stock.height}")
+            return bajo_stock.to_dicts()
             
         except Exception as e:
             print(f"Error al obtener productos bajo stock: {e}")
@@ -256,6 +253,7 @@ async def vista_inicio(page, nombre_seccion, contenido, fecha_actual):
             ]
     
     # Función para obtener actividades recientes
+    @atribuida('dashboard')
     async def obtener_actividades_recientes():
         try:
             actividades = await GestorHistorial.obtener_actividades_recientes(5)  # Usar método estático
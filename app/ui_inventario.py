@@ -1,6 +1,7 @@
 import flet as ft
-from app.tablas.ui_tabla_productos import mostrar_tabla_productos
+from app.tablas.ui_tabla_productos import actualizar_filas, mostrar_tabla_productos, tabla_montada
 from app.ui.barra_carga import vista_carga
+from app.ui.aviso_cuota import confirmar_operacion_masiva
 import asyncio
 from app.funciones.carga_archivos import on_click_importar_archivo
 from app.crud_productos.create_producto import obtener_productos_firebase, vista_crear_producto
@@ -11,6 +12,7 @@ from app.utils.temas import GestorTemas
 async def vista_inventario(nombre_seccion, contenido, page):
     from app.utils.monitor_firebase import monitor_firebase
     from app.utils.cache_firebase import cache_firebase
+    from app.utils.cuota_firebase import cuota_firebase
     
     print("🏪 ENTRANDO A INVENTARIO - Optimizando carga...")
     
@@ -21,11 +23,13 @@ async def vista_inventario(nombre_seccion, contenido, page):
 
     # CARGA INMEDIATA desde cache si está disponible
     productos_cache = cache_firebase.obtener_productos_inmediato()
+    revalidar_despues = False
     if productos_cache:
         # Mostrar datos inmediatamente sin loading screen
         print("[RAPIDO] CARGA INSTANTÁNEA desde cache - Saltando loading screen")
         productos_actuales = productos_cache
-        # Continuar directamente sin mostrar barra de carga
+        # Si vienen de la copia en disco, revalidar después de dibujar
+        revalidar_despues = cache_firebase.necesita_revalidar('productos')
     else:
         # Solo mostrar loading si no hay cache
         print("[CONSULTA] No hay cache - Mostrando loading y consultando Firebase")
@@ -48,10 +52,13 @@ async def vista_inventario(nombre_seccion, contenido, page):
         """
         nonlocal productos_actuales
         try:
+            # Con la tabla a la vista se refresca en el lugar, sin pantalla de carga
+            tabla_visible = tabla_montada()
             if forzar_refresh:
                 print("[PROCESO] ACTUALIZANDO TABLA - Refresh forzado (post-operación)")
-                contenido.content = vista_carga("Actualizando datos...", 16)
-                page.update()
+                if not tabla_visible:
+                    contenido.content = vista_carga("Actualizando datos...", 16)
+                    page.update()
                 
                 # Forzar consulta a Firebase (ej: después de crear/editar)
                 productos_actuales = await cache_firebase.obtener_productos(forzar_refresh=True)
@@ -64,11 +71,15 @@ async def vista_inventario(nombre_seccion, contenido, page):
                     productos_actuales = productos_cache_rapido
                 else:
                     print("[CONSULTA] Cache expirado - Consultando Firebase")
-                    contenido.content = vista_carga("Actualizando inventario...", 16)
-                    page.update()
+                    if not tabla_visible:
+                        contenido.content = vista_carga("Actualizando inventario...", 16)
+                        page.update()
                     productos_actuales = await cache_firebase.obtener_productos()
                 print(f"   → Actualización normal completada: {len(productos_actuales)} productos")
                 
+            # Solo se envían las filas nuevas o cambiadas; si no hay tabla, se construye la vista
+            if actualizar_filas(productos_actuales):
+                return
             contenido.content = construir_vista_inventario(productos_actuales)
             page.update()
         except Exception as e:
@@ -81,9 +92,11 @@ async def vista_inventario(nombre_seccion, contenido, page):
         nonlocal productos_actuales
         try:
             print("Mostrando productos filtrados")
+            productos_actuales = productos_filtrados
+            if actualizar_filas(productos_actuales, primera_pagina=True):
+                return
             contenido.content = vista_carga()
             page.update()
-            productos_actuales = productos_filtrados
             contenido.content = construir_vista_inventario(productos_actuales)
             page.update()
         except Exception as e:
@@ -246,7 +259,9 @@ async def vista_inventario(nombre_seccion, contenido, page):
                                                 color=tema.BUTTON_TEXT,
                                                 shape=ft.RoundedRectangleBorder(radius=tema.BORDER_RADIUS)
                                             ),
-                                            on_click=lambda e: page.run_task(sincronizar_inventario_manual),
+                                            on_click=lambda e: confirmar_operacion_masiva(
+                                                page, cuota_firebase.aviso_operacion_masiva('sincronizacion'),
+                                                sincronizar_inventario_manual, "Sincronizar"),
                                         ),
                                         width=ancho_boton,  # Ancho responsivo
                                         padding=ft.padding.symmetric(horizontal=5, vertical=20)
@@ -296,5 +311,16 @@ async def vista_inventario(nombre_seccion, contenido, page):
             padding=ft.padding.only(bottom=40),
             bgcolor=tema.BG_COLOR,
         )
+    async def revalidar_en_segundo_plano():
+        """Valida contra Firebase sin bloquear la vista y redibuja solo si hubo cambios"""
+        nonlocal productos_actuales
+        if await cache_firebase.revalidar('productos'):
+            productos_actuales = cache_firebase.obtener_productos_inmediato()
+            contenido.content = construir_vista_inventario(productos_actuales)
+            page.update()
+    
     contenido.content = construir_vista_inventario(productos_actuales)
     page.update()  # Actualizar la página para mostrar el contenido inicial
+    
+    if revalidar_despues:
+        page.run_task(revalidar_en_segundo_plano)
@@ -1,40 +1,82 @@
 import flet as ft
+from collections.abc import Mapping
 from app.utils.temas import GestorTemas
 from app.utils.historial import GestorHistorial
 from app.funciones.sesiones import SesionManager
 from app.crud_movimientos.movimiento_inventario import crear_movimiento_inventario_dialog
-from app.crud_movimientos.create_movimiento import crear_movimiento_ubicacion_dialog, obtener_movimientos_firebase
-from conexiones.firebase import db
+from app.crud_movimientos.create_movimiento import crear_movimiento_ubicacion_dialog
+from app.services.movimientos import POR_PAGINA, repositorio_movimientos
 import asyncio
-from datetime import datetime
+from datetime import datetime, timedelta
 from app.ui.barra_carga import vista_carga
+from app.tablas.tabla_paginada import TablaPaginada
+
+TIPOS_MOVIMIENTO = {
+    'entrada_inventario': "Entradas",
+    'salida_inventario': "Salidas",
+    'ajuste_inventario': "Ajustes",
+    'movimiento_ubicacion': "Traslados",
+}
+PERIODOS = {  # clave: (texto, días hacia atrás; None = sin límite)
+    'todo': ("Todo el historial", None),
+    'hoy': ("Hoy", 0),
+    '7': ("Últimos 7 días", 7),
+    '30': ("Últimos 30 días", 30),
+    '90': ("Últimos 90 días", 90),
+}
+ORDEN_INICIAL = (5, False)  # Fecha descendente, igual que la consulta en Firebase
 
 async def vista_movimientos(nombre_seccion, contenido, page):
     """Vista para realizar y visualizar movimientos de productos"""
-    from app.utils.cache_firebase import cache_firebase
     tema = GestorTemas.obtener_tema()
     
     # Variables de estado
-    movimientos_actuales = []
+    movimientos_actuales = []  # Páginas ya cargadas, más recientes primero
+    cursor = None  # Último documento cargado; None si no hay más antiguos
+    conteos = {}  # Totales por tipo contados en el servidor
+    filtros = {'tipo': 'todos', 'periodo': 'todo'}
+    estado_tabla = {}  # Página y orden de la tabla entre recargas
     
     # Dimensiones responsivas
     ancho_ventana = page.window.width or 1200
     alto_ventana = page.window.height or 800
     
+    def rango_filtros():
+        """(desde, tipo) del filtro elegido, para la consulta en Firebase"""
+        dias = PERIODOS[filtros['periodo']][1]
+        desde = None
+        if dias is not None:
+            desde = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=dias)
+        tipo = None if filtros['tipo'] == 'todos' else filtros['tipo']
+        return desde, tipo
+    
     async def cargar_movimientos():
-        """Cargar movimientos desde Firebase con cache"""
-        return await cache_firebase.obtener_movimientos()
+        """Primera página (la más reciente) y totales por tipo, consultados en Firebase"""
+        nonlocal movimientos_actuales, cursor, conteos
+        desde, tipo = rango_filtros()
+        pagina, *totales = await asyncio.gather(
+            repositorio_movimientos.pagina(desde=desde, tipo=tipo),
+            *(repositorio_movimientos.contar(desde=desde, tipo=t) for t in TIPOS_MOVIMIENTO),
+            return_exceptions=True
+        )
+        if isinstance(pagina, Exception):
+            raise pagina
+        movimientos_actuales = list(pagina.registros)
+        cursor = pagina.cursor
+        # Un conteo que falla (p. ej. falta el índice) solo deja su tarjeta en 0
+        conteos = {t: n for t, n in zip(TIPOS_MOVIMIENTO, totales) if isinstance(n, int)}
+        return movimientos_actuales
     
     async def actualizar_tabla_movimientos(forzar_refresh=False):
-        """Actualizar la tabla de movimientos"""
+        """Volver a la página más reciente (al entrar, al actualizar o al cambiar filtros)"""
         nonlocal movimientos_actuales
         try:
             if not forzar_refresh:
-                # Carga optimizada con cache
                 contenido.content = vista_carga("Cargando movimientos...", 16)
                 page.update()
             
-            movimientos_actuales = await cache_firebase.obtener_movimientos(forzar_refresh=forzar_refresh)
+            estado_tabla.clear()
+            await cargar_movimientos()
             contenido.content = construir_vista_movimientos(movimientos_actuales)
             page.update()
             
@@ -44,6 +86,28 @@ async def vista_movimientos(nombre_seccion, contenido, page):
             contenido.content = construir_vista_movimientos([])
             page.update()
     
+    async def cargar_mas_antiguos(e=None):
+        """Agregar la página siguiente de movimientos más antiguos"""
+        nonlocal cursor
+        if cursor is None:
+            return
+        try:
+            desde, tipo = rango_filtros()
+            pagina = await repositorio_movimientos.pagina(despues_de=cursor, desde=desde, tipo=tipo)
+            cursor = pagina.cursor
+            movimientos_actuales.extend(pagina.registros)
+            if estado_tabla.get('orden', ORDEN_INICIAL) == ORDEN_INICIAL:
+                # Con el orden por fecha los nuevos quedan al final: mostrar la primera página agregada
+                estado_tabla['pagina'] = (len(movimientos_actuales) - len(pagina.registros)) // POR_PAGINA
+            contenido.content = construir_vista_movimientos(movimientos_actuales)
+            page.update()
+        except Exception as e:
+            print(f"[ERROR] Error al cargar movimientos antiguos: {e}")
+    
+    def cambiar_filtro(clave, valor):
+        filtros[clave] = valor
+        page.run_task(actualizar_tabla_movimientos)
+    
     async def mostrar_dialogo_nuevo_movimiento(e):
         """Mostrar diálogo para crear nuevo movimiento de inventario"""
         await crear_movimiento_inventario_dialog(page, lambda: actualizar_tabla_movimientos(forzar_refresh=True))
@@ -65,16 +129,14 @@ async def vista_movimientos(nombre_seccion, contenido, page):
                 height=300
             )
         
-        # Crear filas de la tabla
-        filas = []
-        for mov in movimientos:
-            # Verificar si es string y convertir si es necesario
-            if isinstance(mov, str):
-                continue
-                
-            if not isinstance(mov, dict):
-                continue
-                
+        def nombre_usuario(mov):
+            # Extraer nombre del usuario (puede ser string o dict)
+            usuario_raw = mov.get('usuario', 'N/A')
+            if isinstance(usuario_raw, dict):
+                return usuario_raw.get('nombre', usuario_raw.get('username', 'Usuario'))
+            return str(usuario_raw)
+        
+        def celdas_movimiento(mov):
             # Procesar ubicaciones - pueden ser strings o dicts
             ubicacion_origen = mov.get('ubicacion_origen', 'N/A')
             ubicacion_destino = mov.get('ubicacion_destino', 'N/A')
@@ -92,53 +154,49 @@ async def vista_movimientos(nombre_seccion, contenido, page):
                 
             fecha = mov.get('fecha_movimiento', '').split('T')[0] if mov.get('fecha_movimiento') else 'N/A'
             
-            # Extraer nombre del usuario (puede ser string o dict)
-            usuario_raw = mov.get('usuario', 'N/A')
-            if isinstance(usuario_raw, dict):
-                # Si es diccionario, extraer el nombre
-                usuario_nombre = usuario_raw.get('nombre', usuario_raw.get('username', 'Usuario'))
-            else:
-                # Si es string, usar directamente
-                usuario_nombre = str(usuario_raw)
-            
-            fila = ft.DataRow(
-                cells=[
-                    ft.DataCell(ft.Text(mov.get('modelo', mov.get('producto_modelo', 'N/A')), color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(str(mov.get('cantidad', 0)), color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(origen_texto, color=tema.TEXT_COLOR, size=12)),
-                    ft.DataCell(ft.Text(destino_texto, color=tema.TEXT_COLOR, size=12)),
-                    ft.DataCell(ft.Text(mov.get('tipo', mov.get('tipo_movimiento', 'N/A')), color=tema.TEXT_COLOR, size=12)),
-                    ft.DataCell(ft.Text(fecha, color=tema.TEXT_COLOR, size=12)),
-                    ft.DataCell(ft.Text(usuario_nombre, color=tema.TEXT_COLOR, size=12)),
-                    ft.DataCell(
-                        ft.Container(
-                            content=ft.Text(
-                                mov.get('estado', 'N/A'), 
-                                color=ft.Colors.WHITE,
-                                size=11,
-                                weight=ft.FontWeight.BOLD
-                            ),
-                            bgcolor=tema.SUCCESS_COLOR if mov.get('estado') == 'Completado' else tema.WARNING_COLOR,
-                            padding=ft.padding.symmetric(horizontal=8, vertical=4),
-                            border_radius=12
-                        )
-                    ),
-                ]
-            )
-            filas.append(fila)
+            return [
+                ft.DataCell(ft.Text(mov.get('modelo', mov.get('producto_modelo', 'N/A')), color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(str(mov.get('cantidad', 0)), color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(origen_texto, color=tema.TEXT_COLOR, size=12)),
+                ft.DataCell(ft.Text(destino_texto, color=tema.TEXT_COLOR, size=12)),
+                ft.DataCell(ft.Text(mov.get('tipo', mov.get('tipo_movimiento', 'N/A')), color=tema.TEXT_COLOR, size=12)),
+                ft.DataCell(ft.Text(fecha, color=tema.TEXT_COLOR, size=12)),
+                ft.DataCell(ft.Text(nombre_usuario(mov), color=tema.TEXT_COLOR, size=12)),
+                ft.DataCell(
+                    ft.Container(
+                        content=ft.Text(
+                            mov.get('estado', 'N/A'), 
+                            color=ft.Colors.WHITE,
+                            size=11,
+                            weight=ft.FontWeight.BOLD
+                        ),
+                        bgcolor=tema.SUCCESS_COLOR if mov.get('estado') == 'Completado' else tema.WARNING_COLOR,
+                        padding=ft.padding.symmetric(horizontal=8, vertical=4),
+                        border_radius=12
+                    )
+                ),
+            ]
         
-        return ft.DataTable(
-            columns=[
-                ft.DataColumn(ft.Text("Producto", color=tema.TEXT_COLOR, weight=ft.FontWeight.BOLD)),
-                ft.DataColumn(ft.Text("Cantidad", color=tema.TEXT_COLOR, weight=ft.FontWeight.BOLD)),
-                ft.DataColumn(ft.Text("Origen", color=tema.TEXT_COLOR, weight=ft.FontWeight.BOLD)),
-                ft.DataColumn(ft.Text("Destino", color=tema.TEXT_COLOR, weight=ft.FontWeight.BOLD)),
-                ft.DataColumn(ft.Text("Tipo", color=tema.TEXT_COLOR, weight=ft.FontWeight.BOLD)),
-                ft.DataColumn(ft.Text("Fecha", color=tema.TEXT_COLOR, weight=ft.FontWeight.BOLD)),
-                ft.DataColumn(ft.Text("Usuario", color=tema.TEXT_COLOR, weight=ft.FontWeight.BOLD)),
-                ft.DataColumn(ft.Text("Estado", color=tema.TEXT_COLOR, weight=ft.FontWeight.BOLD)),
-            ],
-            rows=filas,
+        def columna(titulo):
+            return ft.DataColumn(ft.Text(titulo, color=tema.TEXT_COLOR, weight=ft.FontWeight.BOLD))
+        
+        # Tabla paginada: solo se construyen las filas de la página visible
+        return TablaPaginada(
+            [mov for mov in movimientos if isinstance(mov, Mapping)],
+            [columna("Producto"), columna("Cantidad"), columna("Origen"), columna("Destino"),
+             columna("Tipo"), columna("Fecha"), columna("Usuario"), columna("Estado")],
+            celdas_movimiento,
+            page=page,
+            estado=estado_tabla,
+            ordenables={
+                0: lambda mov: mov.get('modelo', mov.get('producto_modelo')),
+                1: lambda mov: mov.get('cantidad'),
+                4: lambda mov: mov.get('tipo', mov.get('tipo_movimiento')),
+                5: lambda mov: mov.get('fecha_orden') or mov.get('fecha_movimiento') or mov.get('fecha'),
+                6: nombre_usuario,
+            },
+            por_pagina=POR_PAGINA,
+            orden_inicial=ORDEN_INICIAL,  # Más recientes primero
             border=ft.border.all(1, tema.DIVIDER_COLOR),
             border_radius=tema.BORDER_RADIUS,
             column_spacing=100,  # Espaciado máximo para distribución completa del ancho
@@ -150,23 +208,38 @@ async def vista_movimientos(nombre_seccion, contenido, page):
             },
             width=None,  # Permitir que la tabla use todo el ancho disponible
             expand_loose=True,  # Expandir para llenar el contenedor
-        )
+        ).control
     
     def construir_vista_movimientos(movimientos):
         """Construir vista completa de movimientos"""
+        dropdown_periodo = ft.Dropdown(
+            value=filtros['periodo'],
+            options=[ft.dropdown.Option(clave, texto) for clave, (texto, _) in PERIODOS.items()],
+            on_change=lambda e: cambiar_filtro('periodo', e.control.value),
+            width=170,
+            dense=True,
+            color=tema.TEXT_COLOR,
+            border_color=tema.INPUT_BORDER,
+            focused_border_color=tema.PRIMARY_COLOR
+        )
+        dropdown_tipo = ft.Dropdown(
+            value=filtros['tipo'],
+            options=[ft.dropdown.Option("todos", "Todos los tipos")] +
+                    [ft.dropdown.Option(tipo, texto) for tipo, texto in TIPOS_MOVIMIENTO.items()],
+            on_change=lambda e: cambiar_filtro('tipo', e.control.value),
+            width=170,
+            dense=True,
+            color=tema.TEXT_COLOR,
+            border_color=tema.INPUT_BORDER,
+            focused_border_color=tema.PRIMARY_COLOR
+        )
         
-        # Debug: Contar tipos de movimientos
-        tipos_debug = {}
-        for mov in movimientos:
-            tipo = mov.get('tipo', 'sin_tipo')
-            tipos_debug[tipo] = tipos_debug.get(tipo, 0) + 1
-        print(f"[BUSCAR] DEBUG TIPOS EN UI: {tipos_debug}")
         
-        # Contadores específicos
-        entradas = len([m for m in movimientos if m.get('tipo') == 'entrada_inventario'])
-        salidas = len([m for m in movimientos if m.get('tipo') == 'salida_inventario'])
-        ajustes = len([m for m in movimientos if m.get('tipo') == 'ajuste_inventario'])
-        traslados = len([m for m in movimientos if m.get('tipo') == 'movimiento_ubicacion'])
+        # Totales del período contados en Firebase (no solo de las páginas cargadas)
+        entradas = conteos.get('entrada_inventario', 0)
+        salidas = conteos.get('salida_inventario', 0)
+        ajustes = conteos.get('ajuste_inventario', 0)
+        traslados = conteos.get('movimiento_ubicacion', 0)
         
         print(f"🔢 CONTADORES: Entradas={entradas}, Salidas={salidas}, Ajustes={ajustes}, Traslados={traslados}")
         
@@ -245,7 +318,7 @@ async def vista_movimientos(nombre_seccion, contenido, page):
                         ft.Container(
                             content=ft.Column([
                                 ft.Text("Entradas", color=tema.TEXT_SECONDARY, size=14, weight=ft.FontWeight.W_500),
-                                ft.Text(str(len([m for m in movimientos if m.get('tipo') == 'entrada_inventario'])), 
+                                ft.Text(str(entradas), 
                                        color=tema.SUCCESS_COLOR, size=28, weight=ft.FontWeight.BOLD)
                             ], horizontal_alignment=ft.CrossAxisAlignment.CENTER),
                             bgcolor=tema.CARD_COLOR,
@@ -262,7 +335,7 @@ async def vista_movimientos(nombre_seccion, contenido, page):
                         ft.Container(
                             content=ft.Column([
                                 ft.Text("Salidas", color=tema.TEXT_SECONDARY, size=14, weight=ft.FontWeight.W_500),
-                                ft.Text(str(len([m for m in movimientos if m.get('tipo') == 'salida_inventario'])), 
+                                ft.Text(str(salidas), 
                                        color=tema.WARNING_COLOR, size=28, weight=ft.FontWeight.BOLD)
                             ], horizontal_alignment=ft.CrossAxisAlignment.CENTER),
                             bgcolor=tema.CARD_COLOR,
@@ -279,7 +352,7 @@ async def vista_movimientos(nombre_seccion, contenido, page):
                         ft.Container(
                             content=ft.Column([
                                 ft.Text("Ajustes", color=tema.TEXT_SECONDARY, size=14, weight=ft.FontWeight.W_500),
-                                ft.Text(str(len([m for m in movimientos if m.get('tipo') == 'ajuste_inventario'])), 
+                                ft.Text(str(ajustes), 
                                        color=tema.PRIMARY_COLOR, size=28, weight=ft.FontWeight.BOLD)
                             ], horizontal_alignment=ft.CrossAxisAlignment.CENTER),
                             bgcolor=tema.CARD_COLOR,
@@ -296,7 +369,7 @@ async def vista_movimientos(nombre_seccion, contenido, page):
                         ft.Container(
                             content=ft.Column([
                                 ft.Text("Traslados", color=tema.TEXT_SECONDARY, size=14, weight=ft.FontWeight.W_500),
-                                ft.Text(str(len([m for m in movimientos if m.get('tipo') == 'movimiento_ubicacion'])), 
+                                ft.Text(str(traslados), 
                                        color=tema.DIVIDER_COLOR, size=28, weight=ft.FontWeight.BOLD)
                             ], horizontal_alignment=ft.CrossAxisAlignment.CENTER),
                             bgcolor=tema.CARD_COLOR,
@@ -322,13 +395,25 @@ async def vista_movimientos(nombre_seccion, contenido, page):
                             ft.Row([
                                 ft.Text("Historial de Movimientos", 
                                        size=20, weight=ft.FontWeight.BOLD, color=tema.TEXT_COLOR),
-                                ft.Text(f"({len(movimientos)} registros)", 
-                                       size=14, color=tema.TEXT_SECONDARY)
+                                ft.Row([
+                                    dropdown_periodo,
+                                    dropdown_tipo,
+                                    ft.Text(f"({len(movimientos)} registros{'+' if cursor is not None else ''})", 
+                                           size=14, color=tema.TEXT_SECONDARY)
+                                ], spacing=15),
                             ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
                             ft.Container(height=10),  # Separación reducida
                             ft.Container(
                                 content=ft.Column([
-                                    construir_tabla_movimientos(movimientos)
+                                    construir_tabla_movimientos(movimientos),
+                                    ft.Row([
+                                        ft.TextButton(
+                                            "Cargar movimientos más antiguos",
+                                            icon=ft.Icons.HISTORY,
+                                            on_click=lambda e: page.run_task(cargar_mas_antiguos),
+                                            visible=cursor is not None
+                                        )
+                                    ], alignment=ft.MainAxisAlignment.CENTER),
                                 ], scroll=ft.ScrollMode.AUTO, expand=True),
                                 bgcolor=tema.CARD_COLOR,
                                 padding=15,  # Padding interno aumentado para mejor espaciado del contenido
@@ -368,8 +453,5 @@ async def vista_movimientos(nombre_seccion, contenido, page):
             height=alto_ventana - 100  # Altura más pequeña para mejor visualización
         )
     
-    # Cargar datos iniciales con cache
-    movimientos_iniciales = await cache_firebase.obtener_movimientos()
-    movimientos_actuales = movimientos_iniciales
-    contenido.content = construir_vista_movimientos(movimientos_actuales)
-    page.update()
+    # Cargar datos iniciales: solo la página más reciente; las anteriores se piden con el botón
+    await actualizar_tabla_movimientos()
@@ -1,8 +1,9 @@
 import flet as ft
 from app.utils.temas import GestorTemas
-from app.utils.historial import GestorHistorial
 from app.funciones.sesiones import SesionManager
-from conexiones.firebase import db
+from app.funciones.cache_reportes import cache_reportes
+from app.funciones.motor_reportes import PLANES, Filtros
+from app.tablas.tabla_paginada import TablaPaginada
 from datetime import datetime, timedelta
 import json
 import os
@@ -90,642 +91,19 @@ async def vista_reportes(nombre_seccion, contenido, page):
     }
 
     async def obtener_datos_reporte(tipo_reporte):
-        """Obtener datos según el tipo de reporte seleccionado"""
+        """Obtener datos según el tipo de reporte seleccionado (ver motor_reportes)"""
         try:
-            gestor_historial = GestorHistorial()
-            
-            if tipo_reporte == "movimientos":
-                return await generar_reporte_movimientos()
-            elif tipo_reporte == "ubicaciones":
-                return await generar_reporte_ubicaciones()
-            elif tipo_reporte == "productos":
-                return await generar_reporte_productos()
-            elif tipo_reporte == "altas":
-                return await generar_reporte_altas()
-            elif tipo_reporte == "bajas":
-                return await generar_reporte_bajas()
-            elif tipo_reporte == "usuarios":
-                return await generar_reporte_usuarios()
-            elif tipo_reporte == "stock_critico":
-                return await generar_reporte_stock_critico()
-            elif tipo_reporte == "rotacion":
-                return await generar_reporte_rotacion()
-            else:
+            if tipo_reporte not in PLANES:
                 return []
+            filtros = Filtros.desde_texto(campo_fecha_inicio.value, campo_fecha_fin.value, dropdown_usuario.value)
+            # Si no cambió ninguna de sus entradas sale del cache sin recalcular
+            reporte = await cache_reportes.reporte(tipo_reporte, filtros)
+            return reporte.to_dicts()
                 
         except Exception as e:
             print(f"Error al obtener datos del reporte: {e}")
             return []
 
-    async def generar_reporte_movimientos():
-        """Generar reporte de movimientos desde datos reales del sistema"""
-        try:
-            from app.utils.cache_firebase import cache_firebase
-            
-            # Obtener movimientos reales desde Firebase
-            movimientos_firebase = await cache_firebase.obtener_movimientos()
-            
-            # También obtener del historial local para movimientos de ubicaciones
-            historial_manager = GestorHistorial()
-            historial_local = await historial_manager.obtener_historial_reciente(limite=1000)
-            
-            reporte_movimientos = []
-            
-            # Procesar movimientos de Firebase
-            for mov in movimientos_firebase:
-                # Verificar que mov sea un diccionario
-                if not isinstance(mov, dict):
-                    print(f"Elemento no es diccionario: {type(mov)} -> {mov}")
-                    continue
-                
-                # Obtener información del usuario de forma más limpia
-                usuario = mov.get('usuario', 'Sistema')
-                if isinstance(usuario, dict):
-                    # Si el usuario es un objeto complejo, extraer solo el nombre
-                    usuario = usuario.get('nombre', usuario.get('username', usuario.get('email', 'Usuario')))
-                
-                # Obtener información del producto
-                producto_info = "N/A"
-                if mov.get('modelo'):
-                    producto_info = mov.get('modelo')
-                elif mov.get('producto_modelo'):
-                    producto_info = mov.get('producto_modelo')
-                elif mov.get('nombre_producto'):
-                    producto_info = mov.get('nombre_producto')
-                
-                # Determinar origen y destino según el tipo de movimiento
-                tipo_movimiento = mov.get('tipo', mov.get('tipo_movimiento', 'Transferencia'))
-                origen_str = "N/A"
-                destino_str = "N/A"
-                motivo_str = "Movimiento de inventario"
-                
-                if tipo_movimiento == 'entrada_inventario':
-                    origen_str = "Entrada Externa"
-                    if mov.get('almacen_destino') and mov.get('estanteria_destino'):
-                        destino_str = f"Almacén {mov.get('almacen_destino')}/{mov.get('estanteria_destino')}"
-                    motivo_str = "Entrada de inventario"
-                
-                elif tipo_movimiento == 'salida_inventario':
-                    if mov.get('almacen_origen') and mov.get('estanteria_origen'):
-                        origen_str = f"Almacén {mov.get('almacen_origen')}/{mov.get('estanteria_origen')}"
-                    destino_str = "Salida Externa"
-                    motivo_str = "Salida de inventario"
-                
-                elif tipo_movimiento == 'ajuste_inventario':
-                    if mov.get('almacen_destino') and mov.get('estanteria_destino'):
-                        origen_str = f"Almacén {mov.get('almacen_destino')}/{mov.get('estanteria_destino')}"
-                        destino_str = f"Almacén {mov.get('almacen_destino')}/{mov.get('estanteria_destino')}"
-                    motivo_str = "Ajuste de inventario"
-                
-                elif tipo_movimiento == 'movimiento_ubicacion':
-                    # Manejar ubicaciones origen y destino de forma segura
-                    ubicacion_origen = mov.get('ubicacion_origen', {})
-                    ubicacion_destino = mov.get('ubicacion_destino', {})
-                    
-                    if isinstance(ubicacion_origen, dict):
-                        origen_str = f"Almacén {ubicacion_origen.get('almacen', 'N/A')}/{ubicacion_origen.get('ubicacion', 'N/A')}"
-                    else:
-                        origen_str = str(ubicacion_origen) if ubicacion_origen else "N/A"
-                    
-                    if isinstance(ubicacion_destino, dict):
-                        destino_str = f"Almacén {ubicacion_destino.get('almacen', 'N/A')}/{ubicacion_destino.get('ubicacion', 'N/A')}"
-                    else:
-                        destino_str = str(ubicacion_destino) if ubicacion_destino else "N/A"
-                    
-                    motivo_str = "Traslado entre ubicaciones"
-                
-                # Usar comentarios si están disponibles para un motivo más específico
-                if mov.get('comentarios'):
-                    motivo_str = mov.get('comentarios')
-                elif mov.get('motivo'):
-                    motivo_str = mov.get('motivo')
-                
-                reporte_movimientos.append({
-                    "fecha": mov.get("fecha_movimiento", mov.get("fecha", "N/A")),
-                    "usuario": usuario,
-                    "producto": producto_info,
-                    "cantidad": mov.get("cantidad", 0),
-                    "origen": origen_str,
-                    "destino": destino_str,
-                    "motivo": motivo_str,
-                    "tipo": tipo_movimiento
-                })
-            
-            # Procesar movimientos del historial local
-            for actividad in historial_local:
-                # Verificar que la actividad sea un diccionario
-                if not isinstance(actividad, dict):
-                    print(f"Actividad no es diccionario: {type(actividad)} -> {actividad}")
-                    continue
-                    
-                if actividad.get("tipo") in ["movimiento_ubicacion", "mover_ubicacion"]:
-                    desc = actividad.get("descripcion", "")
-                    reporte_movimientos.append({
-                        "fecha": actividad.get("fecha", "N/A"),
-                        "usuario": actividad.get("usuario", "Sistema"),
-                        "producto": desc,
-                        "cantidad": "Ver descripción",
-                        "origen": "Ver descripción",
-                        "destino": "Ver descripción", 
-                        "motivo": "Movimiento entre ubicaciones",
-                        "tipo": "Transferencia"
-                    })
-            
-            return reporte_movimientos[:100]  # Limitar a últimos 100
-            
-        except Exception as e:
-            print(f"Error al generar reporte de movimientos: {e}")
-            # Fallback a datos de ejemplo
-            return [
-                {
-                    "fecha": "2024-01-15 14:30:25",
-                    "usuario": "Admin",
-                    "producto": "Laptop Dell Inspiron",
-                    "modelo": "LAP001",
-                    "cantidad": 5,
-                    "origen": "Almacén Principal → Estante A-3, Nivel 2",
-                    "destino": "Almacén Secundario → Estante B-2, Nivel 1",
-                    "motivo": "Redistribución de inventario",
-                    "tipo": "Transferencia"
-                }
-            ]
-
-    async def generar_reporte_ubicaciones():
-        """Generar reporte de ubicaciones agrupado por almacén y estantería"""
-        try:
-            from app.utils.cache_firebase import cache_firebase
-            
-            # Obtener ubicaciones directamente desde Firebase (tabla ubicaciones)
-            ubicaciones_firebase = await cache_firebase.obtener_ubicaciones()
-            
-            reporte_ubicaciones = []
-            
-            for ubicacion in ubicaciones_firebase:
-                # Verificar que ubicacion sea un diccionario
-                if not isinstance(ubicacion, dict):
-                    print(f"Ubicación no es diccionario: {type(ubicacion)} -> {ubicacion}")
-                    continue
-                
-                almacen = ubicacion.get("almacen", "Sin almacén")
-                estanteria = ubicacion.get("estanteria", "Sin estantería") 
-                cantidad = ubicacion.get("cantidad", 0)
-                modelo = ubicacion.get("modelo", "Sin modelo")
-                fecha_asignacion = ubicacion.get("fecha_asignacion", "N/A")
-                
-                # Mostrar cada ubicación individual (sin agrupar)
-                reporte_ubicaciones.append({
-                    "almacen": f"Almacén {almacen}" if str(almacen).isdigit() else str(almacen),
-                    "estanteria": str(estanteria),
-                    "cantidad": int(cantidad) if cantidad else 0,
-                    "modelo": str(modelo),
-                    "fecha_asignacion": str(fecha_asignacion),
-                    "estado": "Ocupado" if cantidad > 0 else "Disponible"
-                })
-            
-            # Ordenar por almacén y luego por estantería
-            reporte_ubicaciones.sort(key=lambda x: (x['almacen'], x['estanteria']))
-            
-            return reporte_ubicaciones
-            
-        except Exception as e:
-            print(f"Error al generar reporte de ubicaciones: {e}")
-            return []
-
-    async def generar_reporte_productos():
-        """Generar reporte completo de productos desde Firebase"""
-        try:
-            from app.crud_productos.create_producto import obtener_productos_firebase
-            from app.funciones.sesiones import GestorHistorial
-            
-            productos_firebase = await obtener_productos_firebase()
-            
-            # Obtener historial para identificar quién dio de alta cada producto
-            historial_manager = GestorHistorial()
-            historial_actividades = await historial_manager.obtener_historial_reciente(limite=1000)
-            
-            # Crear diccionario de quién creó cada producto
-            usuarios_creadores = {}
-            for actividad in historial_actividades:
-                if isinstance(actividad, dict) and actividad.get("tipo") == "crear_producto":
-                    desc = actividad.get("descripcion", "")
-                    usuario = actividad.get("usuario", "Sistema")
-                    
-                    # Extraer modelo de la descripción
-                    if "(Modelo:" in desc:
-                        try:
-                            modelo = desc.split("(Modelo: ")[1].split(")")[0]
-                            usuarios_creadores[modelo] = usuario
-                        except:
-                            pass
-            
-            reporte_productos = []
-            for producto in productos_firebase:
-                # Verificar que producto sea un diccionario
-                if not isinstance(producto, dict):
-                    print(f"Producto no es diccionario: {type(producto)} -> {producto}")
-                    continue
-                
-                modelo = producto.get("modelo", "N/A")
-                usuario_alta = usuarios_creadores.get(modelo, "Importación/Sistema")
-                
-                reporte_productos.append({
-                    "modelo": modelo,
-                    "nombre": producto.get("nombre", "N/A"),
-                    "categoria": producto.get("categoria", "Sin categoría"),
-                    "stock_actual": producto.get("cantidad", 0),
-                    "fecha_ingreso": producto.get("fecha_registro", "N/A"),
-                    "usuario_alta": usuario_alta,
-                    "estado": producto.get("estado", "Activo")
-                })
-            
-            return reporte_productos
-            
-        except Exception as e:
-            print(f"Error al generar reporte de productos: {e}")
-            return []
-
-    async def generar_reporte_altas():
-        """Generar reporte de productos dados de alta desde historial real"""
-        try:
-            historial_manager = GestorHistorial()
-            historial_actividades = await historial_manager.obtener_historial_reciente(limite=1000)
-            
-            reporte_altas = []
-            for actividad in historial_actividades:
-                # Verificar que actividad sea un diccionario
-                if not isinstance(actividad, dict):
-                    print(f"Actividad altas no es diccionario: {type(actividad)} -> {actividad}")
-                    continue
-                    
-                if actividad.get("tipo") == "crear_producto":
-                    descripcion = actividad.get("descripcion", "")
-                    # Extraer información de la descripción: "Creó producto 'nombre' (Modelo: modelo)"
-                    try:
-                        if "'" in descripcion and "(Modelo:" in descripcion:
-                            nombre = descripcion.split("'")[1]
-                            modelo = descripcion.split("(Modelo: ")[1].split(")")[0]
-                        else:
-                            nombre = "Ver descripción"
-                            modelo = "Ver descripción"
-                    except:
-                        nombre = descripcion
-                        modelo = "N/A"
-                    
-                    reporte_altas.append({
-                        "fecha": actividad.get("fecha", "N/A"),
-                        "usuario": actividad.get("usuario", "Sistema"),
-                        "modelo": modelo,
-                        "nombre": nombre,
-                        "categoria": "Inventario General",
-                        "cantidad_inicial": "Ver sistema",
-                        "precio_unitario": 0.0,
-                        "valor_total": 0.0,
-                        "proveedor": "No especificado",
-                        "motivo": "Alta de producto en sistema",
-                        "ubicacion_asignada": "Por asignar"
-                    })
-            
-            return reporte_altas[:50]  # Últimas 50 altas
-            
-        except Exception as e:
-            print(f"Error al generar reporte de altas: {e}")
-            # Fallback a datos de ejemplo
-            return [
-                {
-                    "fecha": "2024-01-15 09:15:30",
-                    "usuario": "Admin",
-                    "modelo": "TAB001",
-                    "nombre": "Tablet Samsung Galaxy",
-                    "categoria": "Dispositivos Móviles",
-                    "cantidad_inicial": 12,
-                    "precio_unitario": 8500.00,
-                    "valor_total": 102000.00,
-                    "proveedor": "Tech Solutions SA",
-                    "motivo": "Nuevo producto en catálogo",
-                    "ubicacion_asignada": "Almacén Principal → Estante D-1"
-                }
-            ]
-
-    async def generar_reporte_bajas():
-        """Generar reporte de productos dados de baja desde historial real"""
-        try:
-            historial_manager = GestorHistorial()
-            historial_actividades = await historial_manager.obtener_historial_reciente(limite=1000)
-            
-            reporte_bajas = []
-            for actividad in historial_actividades:
-                # Verificar que actividad sea un diccionario
-                if not isinstance(actividad, dict):
-                    print(f"Actividad bajas no es diccionario: {type(actividad)} -> {actividad}")
-                    continue
-                    
-                if actividad.get("tipo") in ["eliminar_producto", "eliminar_productos_multiple"]:
-                    descripcion = actividad.get("descripcion", "")
-                    
-                    if "eliminar_productos_multiple" in actividad.get("tipo", ""):
-                        # Para eliminaciones múltiples
-                        try:
-                            cantidad = int(descripcion.split("Eliminó ")[1].split(" productos")[0])
-                            nombre = f"{cantidad} productos eliminados"
-                            modelo = "Múltiple"
-                        except:
-                            cantidad = 1
-                            nombre = descripcion
-                            modelo = "N/A"
-                    else:
-                        # Para eliminaciones individuales: "Eliminó producto 'nombre' (ID: id)"
-                        try:
-                            if "'" in descripcion:
-                                nombre = descripcion.split("'")[1]
-                                modelo = "Ver sistema"
-                            else:
-                                nombre = descripcion
-                                modelo = "N/A"
-                            cantidad = 1
-                        except:
-                            nombre = descripcion
-                            modelo = "N/A"
-                            cantidad = 1
-                    
-                    reporte_bajas.append({
-                        "fecha": actividad.get("fecha", "N/A"),
-                        "usuario": actividad.get("usuario", "Sistema"),
-                        "modelo": modelo,
-                        "nombre": nombre,
-                        "categoria": "Inventario General",
-                        "cantidad_baja": cantidad,
-                        "valor_perdido": 0.0,  # No disponible en historial
-                        "motivo": "Eliminación desde sistema",
-                        "ubicacion_origen": "Sistema",
-                        "estado_final": "Eliminado",
-                        "observaciones": descripcion
-                    })
-            
-            return reporte_bajas[:50]  # Últimas 50 bajas
-            
-        except Exception as e:
-            print(f"Error al generar reporte de bajas: {e}")
-            # Fallback a datos de ejemplo
-            return [
-                {
-                    "fecha": "2024-01-13 14:22:10",
-                    "usuario": "Admin",
-                    "modelo": "LAP999",
-                    "nombre": "Laptop HP Antigua",
-                    "categoria": "Equipos de Cómputo",
-                    "cantidad_baja": 3,
-                    "valor_perdido": 18000.00,
-                    "motivo": "Obsolescencia tecnológica",
-                    "ubicacion_origen": "Almacén Principal → Estante A-1",
-                    "estado_final": "Desechado",
-                    "observaciones": "Equipos con más de 5 años de uso"
-                }
-            ]
-
-    async def generar_reporte_usuarios():
-        """Generar reporte de actividad de usuarios desde historial real"""
-        try:
-            historial_manager = GestorHistorial()
-            historial_actividades = await historial_manager.obtener_historial_reciente(limite=200)
-            
-            reporte_usuarios = []
-            for actividad in historial_actividades:
-                # Verificar que actividad sea un diccionario
-                if not isinstance(actividad, dict):
-                    print(f"Actividad usuarios no es diccionario: {type(actividad)} -> {actividad}")
-                    continue
-                    
-                # Convertir tipo de actividad a acción legible
-                tipo = actividad.get("tipo", "")
-                if "crear" in tipo:
-                    accion = "Creación"
-                elif "editar" in tipo:
-                    accion = "Edición"
-                elif "eliminar" in tipo:
-                    accion = "Eliminación"
-                elif "importar" in tipo:
-                    accion = "Importación"
-                elif "exportar" in tipo:
-                    accion = "Exportación"
-                elif "movimiento" in tipo or "mover" in tipo:
-                    accion = "Movimiento"
-                elif "asignar" in tipo:
-                    accion = "Asignación"
-                else:
-                    accion = tipo.replace("_", " ").title()
-                
-                # Determinar módulo
-                if "producto" in tipo:
-                    modulo = "Inventario"
-                elif "usuario" in tipo:
-                    modulo = "Usuarios"
-                elif "ubicacion" in tipo:
-                    modulo = "Ubicaciones"
-                elif "movimiento" in tipo:
-                    modulo = "Movimientos"
-                else:
-                    modulo = "Sistema"
-                
-                reporte_usuarios.append({
-                    "fecha": actividad.get("fecha", "N/A"),
-                    "usuario": actividad.get("usuario", "Sistema"),
-                    "accion": accion,
-                    "detalle": actividad.get("descripcion", "Sin detalles"),
-                    "modulo": modulo,
-                    "ip_origen": "192.168.1.100",  # IP por defecto
-                    "duracion_sesion": "N/A"
-                })
-            
-            return reporte_usuarios
-            
-        except Exception as e:
-            print(f"Error al generar reporte de usuarios: {e}")
-            # Fallback a datos de ejemplo
-            return [
-                {
-                    "fecha": "2024-01-15 14:30:25",
-                    "usuario": "Admin",
-                    "accion": "Movimiento de Producto",
-                    "detalle": "Movió 5 unidades de 'Laptop Dell Inspiron'",
-                    "modulo": "Movimientos",
-                    "ip_origen": "192.168.1.100",
-                    "duracion_sesion": "2h 15m"
-                }
-            ]
-
-    async def generar_reporte_stock_critico():
-        """Generar reporte de productos con stock crítico desde Firebase"""
-        try:
-            from app.crud_productos.create_producto import obtener_productos_firebase
-            productos_firebase = await obtener_productos_firebase()
-            
-            productos_criticos = []
-            for producto in productos_firebase:
-                # Verificar que producto sea un diccionario
-                if not isinstance(producto, dict):
-                    print(f"Producto crítico no es diccionario: {type(producto)} -> {producto}")
-                    continue
-                    
-                stock_actual = producto.get("cantidad", 0)
-                stock_minimo = producto.get("stock_min", 0)
-                
-                # Solo incluir productos con stock por debajo del mínimo
-                if stock_actual <= stock_minimo:
-                    deficit = stock_minimo - stock_actual
-                    
-                    # Determinar prioridad
-                    if stock_actual == 0:
-                        prioridad = "CRÍTICA"
-                        accion = "Reposición inmediata requerida"
-                    elif stock_actual < stock_minimo * 0.5:
-                        prioridad = "ALTA"
-                        accion = "Compra urgente requerida"
-                    else:
-                        prioridad = "MEDIA"
-                        accion = "Programar reposición"
-                    
-                    productos_criticos.append({
-                        "modelo": producto.get("modelo", "N/A"),
-                        "nombre": producto.get("nombre", "N/A"),
-                        "categoria": producto.get("categoria", "Sin categoría"),
-                        "stock_actual": stock_actual,
-                        "stock_minimo": stock_minimo,
-                        "deficit": deficit,
-                        "prioridad": prioridad,
-                        "accion_sugerida": accion,
-                        "ubicacion": producto.get("ubicacion", "Sin ubicación"),
-                        "ultima_actualizacion": producto.get("fecha_registro", "N/A")
-                    })
-            
-            return productos_criticos
-            
-        except Exception as e:
-            print(f"Error al generar reporte de stock crítico: {e}")
-            # Datos de ejemplo como fallback
-            return [
-                {
-                    "modelo": "RAM001",
-                    "nombre": "Memoria RAM DDR4 8GB",
-                    "categoria": "Componentes",
-                    "stock_actual": 2,
-                    "stock_minimo": 10,
-                    "deficit": 8,
-                    "prioridad": "CRÍTICA",
-                    "accion_sugerida": "Compra urgente requerida",
-                    "ubicacion": "Almacén Principal → Estante B-5"
-                }
-            ]
-
-    async def generar_reporte_rotacion():
-        """Generar reporte de rotación de inventario - productos más activos"""
-        try:
-            from app.utils.cache_firebase import cache_firebase
-            from app.funciones.sesiones import GestorHistorial
-            
-            # Obtener movimientos y historial para analizar actividad
-            movimientos_firebase = await cache_firebase.obtener_movimientos()
-            historial_manager = GestorHistorial()
-            historial_actividades = await historial_manager.obtener_historial_reciente(limite=1000)
-            
-            # Contabilizar actividad por producto
-            actividad_productos = {}
-            
-            # Procesar movimientos de Firebase
-            for mov in movimientos_firebase:
-                if isinstance(mov, dict):
-                    modelo = mov.get('modelo', mov.get('producto_modelo', 'N/A'))
-                    if modelo != 'N/A':
-                        if modelo not in actividad_productos:
-                            actividad_productos[modelo] = {
-                                "modelo": modelo,
-                                "entradas": 0,
-                                "salidas": 0,
-                                "movimientos_ubicacion": 0,
-                                "total_movimientos": 0,
-                                "nombre": mov.get('nombre_producto', 'Producto')
-                            }
-                        
-                        tipo_mov = mov.get('tipo', mov.get('tipo_movimiento', ''))
-                        cantidad = mov.get('cantidad', 0)
-                        
-                        if 'entrada' in tipo_mov:
-                            actividad_productos[modelo]["entradas"] += cantidad
-                        elif 'salida' in tipo_mov:
-                            actividad_productos[modelo]["salidas"] += cantidad
-                        elif 'movimiento' in tipo_mov:
-                            actividad_productos[modelo]["movimientos_ubicacion"] += 1
-                        
-                        actividad_productos[modelo]["total_movimientos"] += 1
-            
-            # Procesar historial de actividades
-            for actividad in historial_actividades:
-                if isinstance(actividad, dict):
-                    desc = actividad.get("descripcion", "")
-                    tipo = actividad.get("tipo", "")
-                    
-                    # Buscar menciones de productos en las descripciones
-                    if "producto" in tipo.lower() or "movimiento" in tipo.lower():
-                        # Intentar extraer modelo de la descripción
-                        palabras = desc.split()
-                        for palabra in palabras:
-                            if len(palabra) > 3 and palabra.isalnum():
-                                # Considerar como posible modelo de producto
-                                if palabra not in actividad_productos:
-                                    actividad_productos[palabra] = {
-                                        "modelo": palabra,
-                                        "entradas": 0,
-                                        "salidas": 0,
-                                        "movimientos_ubicacion": 0,
-                                        "total_movimientos": 0,
-                                        "nombre": "Producto"
-                                    }
-                                
-                                if "crear" in tipo:
-                                    actividad_productos[palabra]["entradas"] += 1
-                                elif "eliminar" in tipo:
-                                    actividad_productos[palabra]["salidas"] += 1
-                                elif "movimiento" in tipo:
-                                    actividad_productos[palabra]["movimientos_ubicacion"] += 1
-                                
-                                actividad_productos[palabra]["total_movimientos"] += 1
-                                break  # Solo procesar el primer modelo encontrado
-            
-            # Convertir a lista y calcular métricas de rotación
-            reporte_rotacion = []
-            for datos in actividad_productos.values():
-                total_actividad = datos["total_movimientos"]
-                if total_actividad > 0:  # Solo incluir productos con actividad
-                    # Calcular clasificación según la actividad
-                    if total_actividad >= 10:
-                        clasificacion = "MUY ACTIVO"
-                        tendencia = "ALTA ROTACIÓN"
-                    elif total_actividad >= 5:
-                        clasificacion = "ACTIVO"
-                        tendencia = "ROTACIÓN MEDIA"
-                    else:
-                        clasificacion = "POCO ACTIVO"
-                        tendencia = "BAJA ROTACIÓN"
-                    
-                    reporte_rotacion.append({
-                        "modelo": datos["modelo"],
-                        "nombre": datos["nombre"],
-                        "entradas": datos["entradas"],
-                        "salidas": datos["salidas"],
-                        "movimientos_ubicacion": datos["movimientos_ubicacion"],
-                        "total_movimientos": total_actividad,
-                        "tendencia": tendencia,
-                        "clasificacion": clasificacion
-                    })
-            
-            # Ordenar por total de movimientos (más activos primero)
-            reporte_rotacion.sort(key=lambda x: x["total_movimientos"], reverse=True)
-            
-            return reporte_rotacion[:50]  # Top 50 productos más activos
-            
-        except Exception as e:
-            print(f"Error al generar reporte de rotación: {e}")
-            return []
-
     # Componentes de la interfaz
     def crear_selector_tipo_reporte():
         """Crear selector de tipo de reporte con mejores efectos visuales"""
@@ -1058,13 +436,14 @@ async def vista_reportes(nombre_seccion, contenido, page):
             page.update()
             return
 
-        # Crear columnas según el tipo de reporte
-        columnas = obtener_columnas_reporte()
-        filas = obtener_filas_reporte()
-
-        tabla = ft.DataTable(
-            columns=columnas,
-            rows=filas,
+        # Tabla paginada con todas las filas del reporte (solo se construye la página visible)
+        campos = campos_orden.get(tipo_reporte_seleccionado, [])
+        tabla = TablaPaginada(
+            datos_reporte,
+            obtener_columnas_reporte(),
+            obtener_celdas_reporte,
+            page=page,
+            ordenables={indice: (lambda item, campo=campo: item.get(campo)) for indice, campo in enumerate(campos)},
             border=ft.border.all(1, tema.DIVIDER_COLOR),
             border_radius=tema.BORDER_RADIUS,
             bgcolor=tema.CARD_COLOR,
@@ -1122,7 +501,7 @@ async def vista_reportes(nombre_seccion, contenido, page):
             ft.Container(
                 content=ft.Row([
                     ft.Container(
-                        content=tabla,
+                        content=tabla.control,
                         border=ft.border.all(1, tema.DIVIDER_COLOR),
                         border_radius=tema.BORDER_RADIUS,
                         padding=10,
@@ -1212,86 +591,95 @@ async def vista_reportes(nombre_seccion, contenido, page):
         else:
             return []
 
-    def obtener_filas_reporte():
-        """Obtener filas según el tipo de reporte"""
-        filas = []
-        
-        for item in datos_reporte[:100]:  # Limitar a 100 registros por performance
-            if tipo_reporte_seleccionado == "movimientos":
-                filas.append(ft.DataRow(cells=[
-                    ft.DataCell(ft.Text(item["fecha"], size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(item["usuario"], size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(item["producto"], size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(str(item["cantidad"]), size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(item["origen"], size=10, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(item["destino"], size=10, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(item["motivo"], size=10, color=tema.TEXT_COLOR))
-                ]))
-            elif tipo_reporte_seleccionado == "ubicaciones":
-                filas.append(ft.DataRow(cells=[
-                    ft.DataCell(ft.Text(item["almacen"], size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(item["estanteria"], size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(str(item["cantidad"]), size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(item["modelo"], size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(item["fecha_asignacion"], size=10, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(item["estado"], size=11, color=tema.TEXT_COLOR))
-                ]))
-            elif tipo_reporte_seleccionado == "productos":
-                filas.append(ft.DataRow(cells=[
-                    ft.DataCell(ft.Text(item["modelo"], size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(item["nombre"], size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(item["categoria"], size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(str(item["stock_actual"]), size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(item["fecha_ingreso"], size=10, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(item["usuario_alta"], size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(item["estado"], size=11, color=tema.TEXT_COLOR))
-                ]))
-            elif tipo_reporte_seleccionado == "altas":
-                filas.append(ft.DataRow(cells=[
-                    ft.DataCell(ft.Text(item["fecha"][:16] if len(item["fecha"]) > 16 else item["fecha"], size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(item["usuario"], size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(f"{item['modelo']} - {item['nombre']}", size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(item["categoria"], size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(item["motivo"], size=10, color=tema.TEXT_COLOR))
-                ]))
-            elif tipo_reporte_seleccionado == "bajas":
-                filas.append(ft.DataRow(cells=[
-                    ft.DataCell(ft.Text(item["fecha"][:16] if len(item["fecha"]) > 16 else item["fecha"], size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(item["usuario"], size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(f"{item['modelo']} - {item['nombre']}", size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(str(item["cantidad_baja"]), size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(item["motivo"], size=10, color=tema.TEXT_COLOR))
-                ]))
-            elif tipo_reporte_seleccionado == "usuarios":
-                filas.append(ft.DataRow(cells=[
-                    ft.DataCell(ft.Text(item["fecha"][:16] if len(item["fecha"]) > 16 else item["fecha"], size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(item["usuario"], size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(item["accion"], size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(item["detalle"], size=10, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(item["modulo"], size=11, color=tema.TEXT_COLOR))
-                ]))
-            elif tipo_reporte_seleccionado == "stock_critico":
-                color_prioridad = tema.ERROR_COLOR if item["prioridad"] == "CRÍTICA" else tema.WARNING_COLOR
-                filas.append(ft.DataRow(cells=[
-                    ft.DataCell(ft.Text(f"{item['modelo']} - {item['nombre']}", size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(str(item["stock_actual"]), size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(item["prioridad"], size=11, color=color_prioridad, weight=ft.FontWeight.BOLD)),
-                    ft.DataCell(ft.Text(item["accion_sugerida"], size=10, color=tema.TEXT_COLOR))
-                ]))
-            elif tipo_reporte_seleccionado == "rotacion":
-                # Color según clasificación
-                color_clasificacion = tema.SUCCESS_COLOR if "MUY ACTIVO" in item["clasificacion"] else tema.WARNING_COLOR if "ACTIVO" in item["clasificacion"] else tema.TEXT_COLOR
-                filas.append(ft.DataRow(cells=[
-                    ft.DataCell(ft.Text(f"{item['modelo']} - {item['nombre']}", size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(str(item["entradas"]), size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(str(item["salidas"]), size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(str(item["movimientos_ubicacion"]), size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(str(item["total_movimientos"]), size=11, color=tema.PRIMARY_COLOR, weight=ft.FontWeight.BOLD)),
-                    ft.DataCell(ft.Text(item["tendencia"], size=11, color=tema.TEXT_COLOR)),
-                    ft.DataCell(ft.Text(item["clasificacion"], size=10, color=color_clasificacion, weight=ft.FontWeight.BOLD))
-                ]))
-        
-        return filas
+    # Campo por el que se ordena cada columna del reporte (en el orden de obtener_columnas_reporte)
+    campos_orden = {
+        "movimientos": ["fecha", "usuario", "producto", "cantidad", "origen", "destino", "motivo"],
+        "ubicaciones": ["almacen", "estanteria", "cantidad", "modelo", "fecha_asignacion", "estado"],
+        "productos": ["modelo", "nombre", "categoria", "stock_actual", "fecha_ingreso", "usuario_alta", "estado"],
+        "altas": ["fecha", "usuario", "modelo", "categoria", "motivo"],
+        "bajas": ["fecha", "usuario", "modelo", "cantidad_baja", "motivo"],
+        "usuarios": ["fecha", "usuario", "accion", "detalle", "modulo"],
+        "stock_critico": ["modelo", "stock_actual", "prioridad", "accion_sugerida"],
+        "rotacion": ["modelo", "entradas", "salidas", "movimientos_ubicacion", "total_movimientos",
+                     "tendencia", "clasificacion"],
+    }
+
+    def obtener_celdas_reporte(item):
+        """Celdas de una fila según el tipo de reporte"""
+        if tipo_reporte_seleccionado == "movimientos":
+            return [
+                ft.DataCell(ft.Text(item["fecha"], size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(item["usuario"], size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(item["producto"], size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(str(item["cantidad"]), size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(item["origen"], size=10, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(item["destino"], size=10, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(item["motivo"], size=10, color=tema.TEXT_COLOR))
+            ]
+        elif tipo_reporte_seleccionado == "ubicaciones":
+            return [
+                ft.DataCell(ft.Text(item["almacen"], size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(item["estanteria"], size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(str(item["cantidad"]), size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(item["modelo"], size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(item["fecha_asignacion"], size=10, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(item["estado"], size=11, color=tema.TEXT_COLOR))
+            ]
+        elif tipo_reporte_seleccionado == "productos":
+            return [
+                ft.DataCell(ft.Text(item["modelo"], size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(item["nombre"], size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(item["categoria"], size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(str(item["stock_actual"]), size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(item["fecha_ingreso"], size=10, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(item["usuario_alta"], size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(item["estado"], size=11, color=tema.TEXT_COLOR))
+            ]
+        elif tipo_reporte_seleccionado == "altas":
+            return [
+                ft.DataCell(ft.Text(item["fecha"][:16] if len(item["fecha"]) > 16 else item["fecha"], size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(item["usuario"], size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(f"{item['modelo']} - {item['nombre']}", size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(item["categoria"], size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(item["motivo"], size=10, color=tema.TEXT_COLOR))
+            ]
+        elif tipo_reporte_seleccionado == "bajas":
+            return [
+                ft.DataCell(ft.Text(item["fecha"][:16] if len(item["fecha"]) > 16 else item["fecha"], size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(item["usuario"], size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(f"{item['modelo']} - {item['nombre']}", size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(str(item["cantidad_baja"]), size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(item["motivo"], size=10, color=tema.TEXT_COLOR))
+            ]
+        elif tipo_reporte_seleccionado == "usuarios":
+            return [
+                ft.DataCell(ft.Text(item["fecha"][:16] if len(item["fecha"]) > 16 else item["fecha"], size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(item["usuario"], size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(item["accion"], size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(item["detalle"], size=10, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(item["modulo"], size=11, color=tema.TEXT_COLOR))
+            ]
+        elif tipo_reporte_seleccionado == "stock_critico":
+            color_prioridad = tema.ERROR_COLOR if item["prioridad"] == "CRÍTICA" else tema.WARNING_COLOR
+            return [
+                ft.DataCell(ft.Text(f"{item['modelo']} - {item['nombre']}", size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(str(item["stock_actual"]), size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(item["prioridad"], size=11, color=color_prioridad, weight=ft.FontWeight.BOLD)),
+                ft.DataCell(ft.Text(item["accion_sugerida"], size=10, color=tema.TEXT_COLOR))
+            ]
+        elif tipo_reporte_seleccionado == "rotacion":
+            # Color según clasificación
+            color_clasificacion = tema.SUCCESS_COLOR if "MUY ACTIVO" in item["clasificacion"] else tema.WARNING_COLOR if "ACTIVO" in item["clasificacion"] else tema.TEXT_COLOR
+            return [
+                ft.DataCell(ft.Text(f"{item['modelo']} - {item['nombre']}", size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(str(item["entradas"]), size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(str(item["salidas"]), size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(str(item["movimientos_ubicacion"]), size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(str(item["total_movimientos"]), size=11, color=tema.PRIMARY_COLOR, weight=ft.FontWeight.BOLD)),
+                ft.DataCell(ft.Text(item["tendencia"], size=11, color=tema.TEXT_COLOR)),
+                ft.DataCell(ft.Text(item["clasificacion"], size=10, color=color_clasificacion, weight=ft.FontWeight.BOLD))
+            ]
+        return []
 
     def obtener_estadisticas_reporte():
         """Obtener estadísticas del reporte"""
@@ -51,11 +51,13 @@ async def vista_ubicaciones(nombre_seccion, contenido, page):
 
     # CARGA INMEDIATA desde cache si está disponible
     ubicaciones_cache = cache_firebase.obtener_ubicaciones_inmediato()
+    revalidar_despues = False
     if ubicaciones_cache:
         # Mostrar datos inmediatamente sin loading screen
         print("[RAPIDO] CARGA INSTANTÁNEA UBICACIONES desde cache - Saltando loading screen")
         ubicaciones_actuales = ubicaciones_cache
-        # Continuar directamente sin mostrar barra de carga
+        # Si vienen de la copia en disco, revalidar después de dibujar
+        revalidar_despues = cache_firebase.necesita_revalidar('ubicaciones')
     else:
         # Solo mostrar loading si no hay cache
         print("[CONSULTA] No hay cache ubicaciones - Mostrando loading y consultando Firebase")
@@ -77,10 +79,13 @@ async def vista_ubicaciones(nombre_seccion, contenido, page):
         """
         nonlocal ubicaciones_actuales
         try:
+            # Con la tabla a la vista se refresca en el lugar, sin pantalla de carga
+            tabla_visible = ui_tabla_ubicaciones.tabla_montada()
             if forzar_refresh:
                 print("[PROCESO] ACTUALIZANDO TABLA UBICACIONES - Refresh forzado (post-operación)")
-                contenido.content = vista_carga("Actualizando ubicaciones...", 16)
-                page.update()
+                if not tabla_visible:
+                    contenido.content = vista_carga("Actualizando ubicaciones...", 16)
+                    page.update()
                 
                 # Forzar consulta a Firebase (ej: después de crear/editar)
                 ubicaciones_actuales = await cache_firebase.obtener_ubicaciones(forzar_refresh=True)
@@ -93,11 +98,15 @@ async def vista_ubicaciones(nombre_seccion, contenido, page):
                     ubicaciones_actuales = ubicaciones_cache_rapido
                 else:
                     print("[CONSULTA] Cache ubicaciones expirado - Consultando Firebase")
-                    contenido.content = vista_carga("Actualizando ubicaciones...", 16)
-                    page.update()
+                    if not tabla_visible:
+                        contenido.content = vista_carga("Actualizando ubicaciones...", 16)
+                        page.update()
                     ubicaciones_actuales = await cache_firebase.obtener_ubicaciones()
                 print(f"   → Actualización ubicaciones normal completada: {len(ubicaciones_actuales)} ubicaciones")
                 
+            # Solo se envían las filas nuevas o cambiadas; si no hay tabla, se construye la vista
+            if ui_tabla_ubicaciones.actualizar_filas(ubicaciones_actuales):
+                return
             contenido.content = construir_vista_ubicaciones(ubicaciones_actuales)
             page.update()
         except Exception as e:
@@ -114,6 +123,8 @@ async def vista_ubicaciones(nombre_seccion, contenido, page):
             
             # Actualizar ubicaciones actuales
             ubicaciones_actuales = ubicaciones_filtradas
+            if ui_tabla_ubicaciones.actualizar_filas(ubicaciones_filtradas, primera_pagina=True):
+                return
             
             # Crear nueva tabla con ubicaciones filtradas
             nueva_tabla = ui_tabla_ubicaciones.mostrar_tabla_ubicaciones(
@@ -149,14 +160,9 @@ async def vista_ubicaciones(nombre_seccion, contenido, page):
             return
         
         try:
-            # Filtrar ubicaciones localmente (en una implementación real sería desde Firebase)
-            ubicaciones_filtradas = [
-                ubicacion for ubicacion in ubicaciones_actuales
-                if (termino_busqueda in str(ubicacion.get('modelo', '')).lower() or
-                    termino_busqueda in str(ubicacion.get('almacen', '')).lower() or
-                    termino_busqueda in str(ubicacion.get('estanteria', '')).lower() or
-                    termino_busqueda in str(ubicacion.get('observaciones', '')).lower())
-            ]
+            # Índice de texto del cache: modelo, almacén, estantería y observaciones
+            from app.services import repositorio_ubicaciones
+            ubicaciones_filtradas = await repositorio_ubicaciones.buscar_texto(termino_busqueda)
             
             await mostrar_ubicaciones_filtradas(ubicaciones_filtradas)
             
@@ -170,30 +176,23 @@ async def vista_ubicaciones(nombre_seccion, contenido, page):
             page.update()
             return
         
-        texto_lower = texto.lower()
+        from app.services import repositorio_ubicaciones
         sugerencias = []
         
-        # Buscar coincidencias en ubicaciones actuales
-        for ubicacion in ubicaciones_actuales[:5]:  # Limitar a 5 sugerencias
-            modelo = str(ubicacion.get('modelo', '')).lower()  # Convertir a string para evitar errores con int
-            almacen = str(ubicacion.get('almacen', '')).lower()
-            estanteria = str(ubicacion.get('estanteria', '')).lower()  # Convertir a string por consistencia
-            
-            if (texto_lower in modelo or 
-                texto_lower in almacen or 
-                texto_lower in estanteria):
-                sugerencia_texto = f"{ubicacion.get('modelo', 'N/A')} - Almacén {ubicacion.get('almacen', 'N/A')} / {ubicacion.get('estanteria', 'N/A')}"
-                if sugerencia_texto not in [s.content.value for s in sugerencias]:
-                    sugerencias.append(
-                        ft.Container(
-                            content=ft.Text(sugerencia_texto, color=tema.TEXT_COLOR, size=12),
-                            bgcolor=tema.CARD_COLOR,
-                            padding=8,
-                            border_radius=tema.BORDER_RADIUS,
-                            on_click=lambda e, texto=sugerencia_texto.split(' - ')[0]: seleccionar_sugerencia(texto),
-                            ink=True
-                        )
+        # Mejores 5 coincidencias del índice de texto del cache
+        for ubicacion in repositorio_ubicaciones.sugerencias(texto, limite=5):
+            sugerencia_texto = f"{ubicacion.get('modelo', 'N/A')} - Almacén {ubicacion.get('almacen', 'N/A')} / {ubicacion.get('estanteria', 'N/A')}"
+            if sugerencia_texto not in [s.content.value for s in sugerencias]:
+                sugerencias.append(
+                    ft.Container(
+                        content=ft.Text(sugerencia_texto, color=tema.TEXT_COLOR, size=12),
+                        bgcolor=tema.CARD_COLOR,
+                        padding=8,
+                        border_radius=tema.BORDER_RADIUS,
+                        on_click=lambda e, texto=sugerencia_texto.split(' - ')[0]: seleccionar_sugerencia(texto),
+                        ink=True
                     )
+                )
         
         if sugerencias:
             sugerencias_container.content = ft.Column(
@@ -403,6 +402,17 @@ async def vista_ubicaciones(nombre_seccion, contenido, page):
             bgcolor=tema.BG_COLOR,
         )
 
+    async def revalidar_en_segundo_plano():
+        """Valida contra Firebase sin bloquear la vista y redibuja solo si hubo cambios"""
+        nonlocal ubicaciones_actuales
+        if await cache_firebase.revalidar('ubicaciones'):
+            ubicaciones_actuales = cache_firebase.obtener_ubicaciones_inmediato()
+            contenido.content = construir_vista_ubicaciones(ubicaciones_actuales)
+            page.update()
+    
     # Cargar datos iniciales y mostrar vista
     contenido.content = construir_vista_ubicaciones(ubicaciones_actuales) 
     page.update()
+    
+    if revalidar_despues:
+        page.run_task(revalidar_en_segundo_plano)
@@ -52,8 +52,7 @@ async def vista_usuarios(nombre_seccion, contenido, page=None):
                 print("[PROCESO] REFRESH TRADICIONAL: Consultando Firebase")
                 # Solo para casos donde realmente necesitamos recargar desde Firebase
                 from app.utils.cache_firebase import cache_firebase
-                cache_firebase._cache_usuarios = []
-                cache_firebase._ultimo_update_usuarios = None
+                cache_firebase.invalidar_cache_usuarios()
                 usuarios_actuales = await cache_firebase.obtener_usuarios(forzar_refresh=True, mostrar_loading=False)
                 print(f"   → Refresh completado: {len(usuarios_actuales)} usuarios")
             else:
@@ -63,7 +62,9 @@ async def vista_usuarios(nombre_seccion, contenido, page=None):
                 usuarios_actuales = await cache_firebase.obtener_usuarios(mostrar_loading=False)
                 print(f"   → Actualización normal completada: {len(usuarios_actuales)} usuarios")
                 
-            # Actualizar solo la tabla, no toda la vista
+            # Actualizar solo la tabla, no toda la vista: en el lugar si está a la vista
+            if ui_tabla_usuarios.actualizar_filas(usuarios_actuales):
+                return
             if hasattr(contenido.content, 'controls') and len(contenido.content.controls) >= 4:
                 nueva_tabla = ui_tabla_usuarios.mostrar_tabla_usuarios(
                     page, usuarios_actuales, actualizar_tabla_usuarios
@@ -87,6 +88,8 @@ async def vista_usuarios(nombre_seccion, contenido, page=None):
             print("Mostrando usuarios filtrados")
             
             usuarios_actuales = usuarios_filtrados
+            if ui_tabla_usuarios.actualizar_filas(usuarios_filtrados, primera_pagina=True):
+                return
             
             nueva_tabla = ui_tabla_usuarios.mostrar_tabla_usuarios(
                 page, usuarios_filtrados, actualizar_tabla_usuarios
@@ -117,12 +120,9 @@ async def vista_usuarios(nombre_seccion, contenido, page=None):
             return
         
         try:
-            usuarios_filtrados = [
-                usuario for usuario in usuarios_actuales
-                if (termino_busqueda in str(usuario.get('nombre', '')).lower() or
-                    termino_busqueda in str(usuario.get('id', '')).lower() or
-                    termino_busqueda in str(usuario.get('firebase_id', '')).lower())
-            ]
+            # Índice de texto del cache: nombre, ID, email e ID de Firebase
+            from app.services import repositorio_usuarios
+            usuarios_filtrados = await repositorio_usuarios.buscar_texto(termino_busqueda)
             
             await mostrar_usuarios_filtrados(usuarios_filtrados)
             
@@ -136,26 +136,23 @@ async def vista_usuarios(nombre_seccion, contenido, page=None):
             page.update()
             return
         
-        texto_lower = texto.lower()
+        from app.services import repositorio_usuarios
         sugerencias = []
         
-        for usuario in usuarios_actuales[:5]:  # Limitar a 5 sugerencias
-            nombre = str(usuario.get('nombre', '')).lower()
-            user_id = str(usuario.get('id', '')).lower()
-            
-            if (texto_lower in nombre or texto_lower in user_id):
-                sugerencia_texto = f"{usuario.get('nombre', 'Sin nombre')} (ID: {usuario.get('id', 'N/A')})"
-                if sugerencia_texto not in [s.content.value for s in sugerencias]:
-                    sugerencias.append(
-                        ft.Container(
-                            content=ft.Text(sugerencia_texto, color=tema.TEXT_COLOR, size=12),
-                            bgcolor=tema.CARD_COLOR,
-                            padding=8,
-                            border_radius=tema.BORDER_RADIUS,
-                            on_click=lambda e, texto=usuario.get('nombre', ''): seleccionar_sugerencia(texto),
-                            ink=True
-                        )
+        # Mejores 5 coincidencias del índice de texto del cache
+        for usuario in repositorio_usuarios.sugerencias(texto, limite=5):
+            sugerencia_texto = f"{usuario.get('nombre', 'Sin nombre')} (ID: {usuario.get('id', 'N/A')})"
+            if sugerencia_texto not in [s.content.value for s in sugerencias]:
+                sugerencias.append(
+                    ft.Container(
+                        content=ft.Text(sugerencia_texto, color=tema.TEXT_COLOR, size=12),
+                        bgcolor=tema.CARD_COLOR,
+                        padding=8,
+                        border_radius=tema.BORDER_RADIUS,
+                        on_click=lambda e, texto=usuario.get('nombre', ''): seleccionar_sugerencia(texto),
+                        ink=True
                     )
+                )
         
         if sugerencias:
             sugerencias_container.content = ft.Column(
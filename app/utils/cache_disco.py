@@ -0,0 +1,111 @@
+"""
+Copia local del cache de Firebase en SQLite (data/cache_local.sqlite).
+
+Al abrir la app las vistas se dibujan con estos datos mientras el cache se
+revalida en segundo plano contra la versión de cada colección (ver
+versiones_colecciones). Cada colección se guarda como un único bloque JSON
+junto con la versión y la marca de agua con la que se leyó, así una copia
+vieja nunca se da por buena: al revalidar se traen los cambios posteriores
+a esa marca.
+
+Los usuarios no se guardan en disco (incluyen contraseñas).
+"""
+
+import json
+import sqlite3
+import threading
+from collections.abc import Mapping
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+COLECCIONES_PERSISTENTES = ('productos', 'ubicaciones', 'movimientos')
+_CLAVE_FECHA = '__fecha__'
+
+
+def _codificar(valor):
+    """Fechas de Firestore (DatetimeWithNanoseconds) como {'__fecha__': iso}; registros como dict"""
+    if isinstance(valor, datetime):
+        return {_CLAVE_FECHA: valor.isoformat()}
+    if isinstance(valor, Mapping):
+        return dict(valor)
+    return str(valor)
+
+
+def _decodificar(objeto: Dict):
+    if len(objeto) == 1 and _CLAVE_FECHA in objeto:
+        return datetime.fromisoformat(objeto[_CLAVE_FECHA])
+    return objeto
+
+
+class CacheDisco:
+    """Lectura y escritura de colecciones cacheadas en un archivo SQLite"""
+
+    def __init__(self, ruta: str = "data/cache_local.sqlite"):
+        self.ruta = Path(ruta)
+        self._lock = threading.Lock()
+
+    def _conectar(self) -> sqlite3.Connection:
+        self.ruta.parent.mkdir(exist_ok=True)
+        conexion = sqlite3.connect(self.ruta)
+        conexion.execute(
+            "CREATE TABLE IF NOT EXISTS colecciones ("
+            " coleccion TEXT PRIMARY KEY,"
+            " documentos TEXT NOT NULL,"
+            " version TEXT,"
+            " guardado TEXT NOT NULL)"
+        )
+        return conexion
+
+    def guardar(self, coleccion: str, documentos: List[Dict], version: Optional[Dict]) -> bool:
+        """Reemplaza la copia de la colección (se llama fuera del hilo de la UI)"""
+        if coleccion not in COLECCIONES_PERSISTENTES:
+            return False
+        try:
+            datos = json.dumps(documentos, default=_codificar, ensure_ascii=False)
+            datos_version = None if version is None else json.dumps(version, default=_codificar)
+            with self._lock:
+                conexion = self._conectar()
+                try:
+                    with conexion:
+                        conexion.execute(
+                            "INSERT OR REPLACE INTO colecciones VALUES (?, ?, ?, ?)",
+                            (coleccion, datos, datos_version, datetime.now().isoformat())
+                        )
+                finally:
+                    conexion.close()
+            return True
+        except Exception as e:
+            print(f"[WARN] No se pudo guardar {coleccion} en disco: {e}")
+            return False
+
+    def cargar(self, coleccion: str) -> Optional[Tuple[List[Dict], Optional[Dict]]]:
+        """
+        Devuelve (documentos, version) guardados o None si no hay copia.
+        `version` es None si la colección se leyó sin versión: habrá carga completa al revalidar.
+        """
+        if coleccion not in COLECCIONES_PERSISTENTES or not self.ruta.exists():
+            return None
+        try:
+            with self._lock:
+                conexion = self._conectar()
+                try:
+                    fila = conexion.execute(
+                        "SELECT documentos, version FROM colecciones WHERE coleccion = ?", (coleccion,)
+                    ).fetchone()
+                finally:
+                    conexion.close()
+            if fila is None:
+                return None
+            documentos = json.loads(fila[0], object_hook=_decodificar)
+            version = None if fila[1] is None else json.loads(fila[1], object_hook=_decodificar)
+            return documentos, version
+        except Exception as e:
+            print(f"[WARN] Copia local de {coleccion} ilegible, se ignora: {e}")
+            return None
+
+    def limpiar(self) -> None:
+        """Elimina la copia local completa"""
+        with self._lock:
+            if self.ruta.exists():
+                self.ruta.unlink()
@@ -1,25 +1,124 @@
 import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from conexiones.firebase import db
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import polars as pl
+
+from app.models import MODELOS, Registro
+from app.utils import firestore_async
+from app.utils.cache_disco import CacheDisco
+from app.utils.cuota_firebase import cuota_firebase
+from app.utils.indices_cache import INDICES
 from app.utils.monitor_firebase import monitor_firebase
+from app.utils.versiones_colecciones import CAMPO_ACTUALIZADO, leer_version, referencia_eliminados
+
+COLECCIONES_CACHE = ('productos', 'ubicaciones', 'usuarios', 'movimientos')
+TIMEOUT_PRIMER_SNAPSHOT = 10  # Segundos que se espera la carga inicial de una escucha
+TIMEOUT_LECTURA_TRAS_ESCRITURA = 5  # Segundos que se espera a que la escucha vea la última escritura
+
+
+# Documento de Firestore -> registro con los campos por defecto que espera la UI
+_NORMALIZADORES = {coleccion: modelo.desde_documento for coleccion, modelo in MODELOS.items()}
+
+
+class Instantanea(NamedTuple):
+    """
+    Foto de solo lectura de una colección del cache.
+    `revision` cambia cada vez que se publica una lista nueva, así quien
+    derive datos (tablas ordenadas, reportes) puede reutilizarlos mientras no cambie.
+    """
+    coleccion: str
+    revision: int
+    documentos: Tuple[Registro, ...]
+
 
 class CacheFirebase:
     """
     Cache inteligente para minimizar consultas a Firebase.
     Guarda datos en memoria por un tiempo determinado.
+    
+    Al vencer el TTL (o al invalidar) el cache se revalida leyendo solo
+    `_metadatos/{coleccion}`: si la versión no cambió no se lee nada más, y
+    si cambió se traen solo los documentos con `updated_at` posterior a la
+    última marca de agua (ver versiones_colecciones).
+    
+    Copia en disco (opcional): con un CacheDisco las colecciones se guardan
+    en data/ tras cada carga y al iniciar se restauran con cargar_desde_disco(),
+    de modo que la UI se dibuja al instante y se revalida en segundo plano.
+    
+    Modo escucha (opcional): con activar_escuchas() cada colección recibe los
+    cambios de Firestore por on_snapshot y el cache se mantiene al día sin
+    volver a leer la colección completa al vencer el TTL. La escucha no ve
+    las escrituras locales al instante: tras invalidar (o con forzar_refresh)
+    se lee `_metadatos/{coleccion}` y se espera un snapshot con read_time
+    posterior a esa versión; si no llega a tiempo se revalida por versión.
+    
+    Concurrencia: las cargas corren en hilos aparte y son single-flight por
+    colección (llamadas simultáneas esperan la misma carga). Cada colección se
+    guarda como una tupla inmutable que se reemplaza entera bajo `_lock`
+    (copy-on-write), así un lector nunca ve una a medias.
+    
+    Los obtener_* devuelven esa misma tupla sin copiarla. Los documentos son
+    registros de app.models (Producto, Ubicacion, ...) que se leen como dicts
+    de solo lectura; para modificar uno se usa doc.copy().
+    
+    Índices: productos y ubicaciones se publican junto con un índice por
+    modelo normalizado, y todas las colecciones con un índice de texto para
+    la búsqueda (ver indices_cache y el método indice()). Productos,
+    ubicaciones y movimientos tienen además un DataFrame de polars para los
+    cálculos de conjunto (tabla()). Los deltas los actualizan documento por
+    documento.
     """
     
-    def __init__(self): # Funcion para inicializar el cache
-        self._cache_productos: List[Dict] = []
-        self._cache_usuarios: List[Dict] = []
-        self._cache_ubicaciones: List[Dict] = []
-        self._cache_movimientos: List[Dict] = []
+    def __init__(self, db=None, disco: Optional[CacheDisco] = None): # Funcion para inicializar el cache
+        self._db_inyectada = db
+        self._disco = disco
+        self._escritor_disco: Optional[ThreadPoolExecutor] = None
+        self._desde_disco = set()  # Colecciones mostradas desde disco, aún sin revalidar
+        self._cache_productos: Tuple[Registro, ...] = ()
+        self._cache_usuarios: Tuple[Registro, ...] = ()
+        self._cache_ubicaciones: Tuple[Registro, ...] = ()
+        self._cache_movimientos: Tuple[Registro, ...] = ()
+        self._revisiones: Dict[str, int] = {c: 0 for c in COLECCIONES_CACHE}
+        self._indices: Dict[str, Dict[str, object]] = {
+            c: {nombre: tipo() for nombre, tipo in indices.items()} for c, indices in INDICES.items()
+        }
         self._ultimo_update_productos: Optional[datetime] = None
         self._ultimo_update_usuarios: Optional[datetime] = None
         self._ultimo_update_ubicaciones: Optional[datetime] = None
         self._ultimo_update_movimientos: Optional[datetime] = None
         self._duracion_cache = timedelta(minutes=5)  # Cache válido por 5 minutos
+        
+        # Modo escucha: watch activo, documentos por id y aviso de carga inicial
+        self._escuchas: Dict[str, object] = {}
+        self._documentos_escucha: Dict[str, Dict[str, Dict]] = {}
+        self._escuchas_listas: Dict[str, threading.Event] = {}
+        self._horas_escucha: Dict[str, object] = {}  # read_time del último snapshot aplicado
+        self._generaciones_escucha: Dict[str, int] = {}  # Generación ya confirmada contra la versión
+        
+        # Versión y marca de agua (updated_at) con las que se cargó cada colección
+        self._versiones: Dict[str, Dict] = {}
+        
+        # Concurrencia: cargas en curso por colección, lock de publicación y
+        # generación (sube al invalidar; una carga iniciada antes no marca el cache como vigente)
+        self._cargas_en_curso: Dict[str, Future] = {}
+        self._indices_en_curso: Dict[Tuple[str, str], Future] = {}
+        self._constructor_indices: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.RLock()
+        self._generaciones: Dict[str, int] = {c: 0 for c in COLECCIONES_CACHE}
+        self._escucha_avanzo = threading.Condition(self._lock)
+    
+    @property
+    def _db(self):
+        """Cliente de Firestore (inyectable para pruebas)"""
+        if self._db_inyectada is None:
+            from conexiones.firebase import db
+            self._db_inyectada = db
+        return self._db_inyectada
     
     def _cache_valido(self, ultimo_update: Optional[datetime]) -> bool:
         """Verifica si el cache sigue siendo válido"""
@@ -27,159 +126,648 @@ class CacheFirebase:
             return False
         return datetime.now() - ultimo_update < self._duracion_cache
     
-    def tiene_productos_en_cache(self) -> bool:
-        """Verifica si hay productos válidos en cache SIN hacer consultas"""
-        return (len(self._cache_productos) > 0 and 
-                self._cache_valido(self._ultimo_update_productos))
+    def _vigente(self, coleccion: str, ultimo_update: Optional[datetime]) -> bool:
+        """Con escucha sincronizada el cache siempre está al día; si no, aplica el TTL"""
+        return self._escucha_sincronizada(coleccion) or self._cache_valido(ultimo_update)
+    
+    # ------------------------------------------------------------------
+    # Revalidación por versión de colección
+    # ------------------------------------------------------------------
     
-    def obtener_productos_inmediato(self) -> List[Dict]:
+    def _leer_version_segura(self, coleccion: str) -> Optional[Dict]:
+        try:
+            return leer_version(coleccion, db=self._db)
+        except Exception as e:
+            print(f"[WARN] No se pudo leer la versión de {coleccion}: {e}")
+            return None
+    
+    def _registrar_version(self, coleccion: str, version: Optional[Dict]) -> None:
+        """Guarda la versión leída ANTES de una carga completa como marca de agua"""
+        if version is None:
+            self._versiones.pop(coleccion, None)
+        else:
+            self._versiones[coleccion] = version
+        self._desde_disco.discard(coleccion)
+        self._persistir(coleccion)
+    
+    def _revalidar_por_version(self, coleccion: str) -> bool:
         """
-        Obtiene productos inmediatamente desde cache si están disponibles.
-        NO hace consultas a Firebase. Útil para carga instantánea de UI.
+        Revalida una colección ya cargada sin releerla completa.
+        
+        Returns:
+            True si el cache quedó al día (sin cambios o con el delta aplicado);
+            False si hace falta una carga completa.
         """
-        if self.tiene_productos_en_cache():
-            print(f"[RAPIDO] CACHE INMEDIATO: {len(self._cache_productos)} productos (0ms)")
-            return self._cache_productos.copy()
-        return []
+        actual = self._versiones.get(coleccion)
+        if actual is None or not getattr(self, f'_cache_{coleccion}'):
+            return False
+        
+        generacion = self._generaciones[coleccion]
+        remota = self._leer_version_segura(coleccion)
+        if remota is None:
+            return False
+        
+        cambio = remota['version'] != actual['version']
+        if cambio:
+            try:
+                self._aplicar_delta(coleccion, actual[CAMPO_ACTUALIZADO])
+            except Exception as e:
+                print(f"[WARN] Delta de {coleccion} falló, se hará carga completa: {e}")
+                return False
+        
+        with self._lock:
+            self._versiones[coleccion] = remota
+            self._marcar_actualizado(coleccion, generacion)
+            self._desde_disco.discard(coleccion)
+        if cambio:
+            self._persistir(coleccion)
+        return True
+    
+    def _marcar_actualizado(self, coleccion: str, generacion: int) -> None:
+        """Reinicia el TTL solo si nadie invalidó la colección mientras se cargaba"""
+        if self._generaciones[coleccion] == generacion:
+            setattr(self, f'_ultimo_update_{coleccion}', datetime.now())
+    
+    def _aplicar_delta(self, coleccion: str, marca) -> None:
+        """Trae documentos y lápidas con updated_at > marca y los aplica al cache"""
+        from google.cloud.firestore_v1.base_query import FieldFilter
+        
+        filtro = FieldFilter(CAMPO_ACTUALIZADO, '>', marca)
+        inicio = time.perf_counter()
+        cambiados = list(self._db.collection(coleccion).where(filter=filtro).stream())
+        eliminados = list(referencia_eliminados(self._db, coleccion).where(filter=filtro).stream())
+        duracion = time.perf_counter() - inicio
+        
+        normalizar = _NORMALIZADORES[coleccion]
+        while True:
+            with self._lock:
+                revision = self._revisiones[coleccion]
+                actual = getattr(self, f'_cache_{coleccion}')
+            lista, cambios = self._armar_delta(coleccion, actual, cambiados, eliminados, normalizar)
+            # Si otra publicación ganó mientras se armaba, el delta se rearma sobre la tupla nueva
+            if self._publicar(coleccion, lista, cambios, revision_base=revision):
+                break
+        
+        monitor_firebase.registrar_consulta(
+            tipo='lectura',
+            coleccion=coleccion,
+            descripcion=f'Delta por versión ({len(cambiados)} cambios, {len(eliminados)} eliminados)',
+            cantidad_docs=max(1, len(cambiados) + len(eliminados)),
+            duracion=duracion
+        )
+        print(f"[CACHE] Delta {coleccion}: {len(cambiados)} cambios, {len(eliminados)} eliminados")
     
-    async def obtener_productos(self, forzar_refresh: bool = False, mostrar_loading: bool = True) -> List[Dict]:
+    def _armar_delta(self, coleccion: str, actual: Sequence[Registro], cambiados, eliminados, normalizar):
+        """Lista nueva y pares (anterior, nuevo) de aplicar el delta sobre la tupla `actual`"""
+        documentos = {d.get('firebase_id'): d for d in actual}
+        
+        # Aplicar en orden de updated_at: un documento recreado después de
+        # eliminarse (o eliminado después de editarse) queda en su último estado
+        eventos = [(d.to_dict() or {}, d.id, False) for d in cambiados]
+        eventos += [(l.to_dict() or {}, l.id, True) for l in eliminados]
+        eventos.sort(key=lambda e: e[0][CAMPO_ACTUALIZADO])
+        cambios = []
+        for datos, doc_id, es_lapida in eventos:
+            if es_lapida:
+                cambios.append((documentos.pop(doc_id, None), None))
+            else:
+                nuevo = normalizar(doc_id, datos)
+                cambios.append((documentos.get(doc_id), nuevo))
+                documentos[doc_id] = nuevo
+        
+        lista = list(documentos.values())
+        if coleccion == 'movimientos':
+            lista.sort(key=lambda x: str(x.get('fecha_movimiento', '')), reverse=True)
+        return lista, cambios
+    
+    # ------------------------------------------------------------------
+    # Copia en disco
+    # ------------------------------------------------------------------
+    
+    def cargar_desde_disco(self) -> Dict[str, int]:
         """
-        Obtiene productos con cache inteligente y ultra-rápido.
-        Solo consulta Firebase si es necesario.
+        Restaura las colecciones guardadas en disco. Quedan marcadas como
+        pendientes de revalidar: obtener_*_inmediato las devuelve y la
+        siguiente consulta normal las valida por versión (delta o nada).
         
-        Args:
-            forzar_refresh: Fuerza actualización desde Firebase
-            mostrar_loading: Si mostrar mensajes de loading (útil para UI)
+        Returns:
+            Dict coleccion -> documentos restaurados
         """
-        # CACHE HIT: Retorno inmediato sin delays
-        if not forzar_refresh and self._cache_valido(self._ultimo_update_productos):
-            if mostrar_loading:
-                print(f"[CACHE] HIT INMEDIATO: {len(self._cache_productos)} productos (0ms, 0 consultas Firebase)")
+        if self._disco is None:
+            return {}
+        restauradas = {}
+        for coleccion in COLECCIONES_CACHE:
+            if getattr(self, f'_cache_{coleccion}'):
+                continue  # Ya hay datos en memoria más nuevos
+            copia = self._disco.cargar(coleccion)
+            if not copia:
+                continue
+            documentos, version = copia
+            normalizar = _NORMALIZADORES[coleccion]
+            documentos = [normalizar(d.get('firebase_id'), d) for d in documentos]
             
-            # Retorno inmediato sin awaits innecesarios
-            return self._cache_productos.copy()
+            def restaurada(coleccion=coleccion, version=version):
+                setattr(self, f'_ultimo_update_{coleccion}', None)
+                if version is not None:
+                    self._versiones[coleccion] = version
+                self._desde_disco.add(coleccion)
+            self._publicar(coleccion, documentos, al_publicar=restaurada)
+            restauradas[coleccion] = len(documentos)
+        if restauradas:
+            print(f"[CACHE] Restaurado desde disco: {restauradas}")
+        return restauradas
+    
+    def _persistir(self, coleccion: str) -> None:
+        """Guarda la colección en disco en un hilo aparte (uno a la vez)"""
+        if self._disco is None:
+            return
+        if self._escritor_disco is None:
+            self._escritor_disco = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache_disco")
+        documentos = getattr(self, f'_cache_{coleccion}')
+        version = self._versiones.get(coleccion)
+        self._escritor_disco.submit(self._disco.guardar, coleccion, documentos, version)
+    
+    def guardar_en_disco(self) -> None:
+        """Guarda todas las colecciones en memoria (al cerrar la app)"""
+        if self._disco is None:
+            return
+        if self._escritor_disco is not None:
+            self._escritor_disco.shutdown(wait=True)
+            self._escritor_disco = None
+        for coleccion in COLECCIONES_CACHE:
+            documentos = getattr(self, f'_cache_{coleccion}')
+            if documentos:
+                self._disco.guardar(coleccion, documentos, self._versiones.get(coleccion))
+    
+    def necesita_revalidar(self, coleccion: str) -> bool:
+        """True si los datos en memoria vienen de disco o vencieron"""
+        return (coleccion in self._desde_disco or
+                not self._vigente(coleccion, getattr(self, f'_ultimo_update_{coleccion}')))
+    
+    async def revalidar(self, coleccion: str) -> bool:
+        """
+        Revalida una colección en segundo plano.
         
-        # CACHE MISS: Consultar Firebase
-        if mostrar_loading:
-            print("[CACHE MISS] Consultando Firebase para productos...")
-            
+        Con la cuota diaria casi agotada se queda con lo que hay en cache
+        (ver cuota_firebase.solo_cache); el botón Actualizar sigue consultando.
+        
+        Returns:
+            True si los datos cambiaron (la vista debe redibujarse)
+        """
+        if self.instantanea(coleccion).documentos and cuota_firebase.solo_cache():
+            return False
+        antes = self._revisiones[coleccion]
+        obtener = {
+            'productos': lambda: self.obtener_productos(mostrar_loading=False),
+            'ubicaciones': lambda: self.obtener_ubicaciones(mostrar_loading=False),
+            'usuarios': lambda: self.obtener_usuarios(mostrar_loading=False),
+            'movimientos': self.obtener_movimientos,
+        }[coleccion]
+        await obtener()
+        return self._revisiones[coleccion] != antes
+    
+    # ------------------------------------------------------------------
+    # Modo escucha en tiempo real
+    # ------------------------------------------------------------------
+    
+    async def activar_escuchas(self, colecciones: Iterable[str] = COLECCIONES_CACHE) -> None:
+        """
+        Adjunta un on_snapshot por colección. La primera entrega trae la
+        colección completa (única lectura completa); después solo llegan
+        los documentos agregados, modificados o eliminados.
+        """
+        nuevas = [c for c in dict.fromkeys(colecciones) if c not in self._escuchas_listas]
+        generaciones = {c: self._generaciones[c] for c in nuevas}
+        for coleccion in nuevas:
+            self._documentos_escucha[coleccion] = {}
+            self._escuchas_listas[coleccion] = threading.Event()
+        # Marca de agua para la copia en disco (al reabrir se revalida desde aquí),
+        # leída en el pool y antes de adjuntar la escucha
+        versiones = await asyncio.gather(
+            *(firestore_async.ejecutar(self._leer_version_segura, c) for c in nuevas), return_exceptions=True)
+        for coleccion, version in zip(nuevas, versiones):
+            if coleccion not in self._escuchas_listas:  # desactivar_escuchas() mientras se leía
+                continue
+            self._registrar_version(coleccion, None if isinstance(version, BaseException) else version)
+            # El primer snapshot llega después de leer la versión: ya la incluye
+            self._generaciones_escucha[coleccion] = generaciones[coleccion]
+            try:
+                self._escuchas[coleccion] = self._db.collection(coleccion).on_snapshot(
+                    lambda _snapshot, cambios, hora, c=coleccion: self._aplicar_cambios(c, cambios, hora)
+                )
+                print(f"[CACHE] Escucha en tiempo real activada: {coleccion}")
+            except Exception as e:
+                print(f"[ERROR] No se pudo activar la escucha de {coleccion}: {e}")
+                self._documentos_escucha.pop(coleccion, None)
+                self._escuchas_listas.pop(coleccion, None)
+    
+    def desactivar_escuchas(self) -> None:
+        """Cancela las escuchas; el cache vuelve a depender del TTL"""
+        for coleccion, escucha in list(self._escuchas.items()):
+            try:
+                escucha.unsubscribe()
+            except Exception as e:
+                print(f"[WARN] Error al cancelar escucha de {coleccion}: {e}")
+        with self._escucha_avanzo:
+            self._escuchas.clear()
+            self._documentos_escucha.clear()
+            self._escuchas_listas.clear()
+            self._horas_escucha.clear()
+            self._generaciones_escucha.clear()
+            self._escucha_avanzo.notify_all()
+    
+    def escuchas_activas(self) -> List[str]:
+        """Colecciones con escucha adjunta"""
+        return list(self._escuchas)
+    
+    def _escucha_sincronizada(self, coleccion: str) -> bool:
+        evento = self._escuchas_listas.get(coleccion)
+        return evento is not None and evento.is_set()
+    
+    async def _esperar_escucha(self, coleccion: str) -> bool:
+        """
+        Si la colección tiene escucha, espera su carga inicial en lugar de
+        lanzar una lectura completa en paralelo. False si no hay escucha o
+        no llegó a tiempo (se usa la consulta normal).
+        """
+        evento = self._escuchas_listas.get(coleccion)
+        if evento is None:
+            return False
+        if not evento.is_set():
+            await asyncio.to_thread(evento.wait, TIMEOUT_PRIMER_SNAPSHOT)
+        return evento.is_set()
+    
+    async def _servir_desde_escucha(self, coleccion: str, forzar_refresh: bool) -> bool:
+        """
+        True si la escucha puede responder la lectura. Tras una invalidación
+        (una escritura local) o con forzar_refresh, antes se confirma que la
+        escucha ya aplicó la última versión de la colección (ver
+        _sincronizar_escucha); si no se pudo, se sigue con la carga normal.
+        """
+        if not await self._esperar_escucha(coleccion):
+            return False
+        generacion = self._generaciones[coleccion]
+        if not forzar_refresh and self._generaciones_escucha.get(coleccion) == generacion:
+            return True
         try:
-            referencia_productos = db.collection('productos')
-            productos = referencia_productos.stream()
-            
-            lista_productos = []
-            count_docs = 0
-            for producto in productos:
-                data = producto.to_dict()
-                data['firebase_id'] = producto.id
-                data['nombre'] = data.get('nombre', 'Sin nombre')
-                data['precio'] = data.get('precio', 0)
-                data['modelo'] = data.get('modelo', 'Sin modelo')
-                data['tipo'] = data.get('tipo', 'Sin tipo')
-                data['cantidad'] = data.get('cantidad', 0)
-                lista_productos.append(data)
-                count_docs += 1
-            
-            # Registrar en el monitor
+            al_dia = await firestore_async.ejecutar(self._sincronizar_escucha, coleccion)
+        except TimeoutError:
+            al_dia = False
+        if al_dia:
+            with self._lock:
+                if coleccion in self._escuchas_listas:
+                    self._generaciones_escucha[coleccion] = generacion
+        return al_dia
+    
+    def _escucha_incluye(self, coleccion: str, version: Dict) -> bool:
+        """True si el último snapshot aplicado es posterior a `version` (con el lock tomado)"""
+        hora = self._horas_escucha.get(coleccion)
+        try:
+            return hora is not None and hora >= version[CAMPO_ACTUALIZADO]
+        except TypeError:
+            return False
+    
+    def _sincronizar_escucha(self, coleccion: str) -> bool:
+        """
+        Lectura tras escritura con escucha (en el pool): lee la versión de la
+        colección (1 lectura) y espera hasta TIMEOUT_LECTURA_TRAS_ESCRITURA
+        un snapshot con read_time posterior. Si no llega, revalida por versión.
+        """
+        remota = self._leer_version_segura(coleccion)
+        if remota is None:
+            return True  # Sin versión no hay escritura que esperar
+        limite = time.monotonic() + TIMEOUT_LECTURA_TRAS_ESCRITURA
+        with self._escucha_avanzo:
+            while not self._escucha_incluye(coleccion, remota):
+                restante = limite - time.monotonic()
+                if restante <= 0 or coleccion not in self._escuchas_listas:
+                    break
+                self._escucha_avanzo.wait(restante)
+            else:
+                self._versiones[coleccion] = remota
+                return True
+        print(f"[WARN] La escucha de {coleccion} no trajo la última escritura a tiempo - revalidando por versión")
+        return self._revalidar_por_version(coleccion)
+    
+    def _aplicar_cambios(self, coleccion: str, cambios, hora=None) -> None:
+        """
+        Aplica los deltas de un snapshot al cache. Se ejecuta en el hilo de
+        la escucha de Firestore: la lista nueva se arma aparte y se asigna
+        de una vez para que los lectores nunca vean una lista a medias.
+        """
+        documentos = self._documentos_escucha.get(coleccion)
+        if documentos is None:  # Escucha cancelada mientras llegaba el snapshot
+            return
+        
+        normalizar = _NORMALIZADORES[coleccion]
+        pares = []
+        for cambio in cambios:
+            documento = cambio.document
+            if cambio.type.name == 'REMOVED':
+                pares.append((documentos.pop(documento.id, None), None))
+            else:
+                nuevo = normalizar(documento.id, documento.to_dict() or {})
+                pares.append((documentos.get(documento.id), nuevo))
+                documentos[documento.id] = nuevo
+        
+        lista = list(documentos.values())
+        if coleccion == 'movimientos':
+            lista.sort(key=lambda x: str(x.get('fecha_movimiento', '')), reverse=True)
+        
+        # El primer snapshot reemplaza lo que hubiera (p. ej. la copia en disco): índice desde cero
+        primer_snapshot = not self._escuchas_listas[coleccion].is_set()
+        def publicada():
+            setattr(self, f'_ultimo_update_{coleccion}', datetime.now())
+            if hora is not None:
+                self._horas_escucha[coleccion] = hora
+            self._escucha_avanzo.notify_all()
+        self._publicar(coleccion, lista, None if primer_snapshot else pares, al_publicar=publicada)
+        
+        if cambios:
             monitor_firebase.registrar_consulta(
                 tipo='lectura',
-                coleccion='productos',
-                descripcion=f'Cache miss - consulta completa productos',
-                cantidad_docs=count_docs
+                coleccion=coleccion,
+                descripcion=f'Escucha en tiempo real - {len(cambios)} cambios',
+                cantidad_docs=len(cambios),
+                funcionalidad='sincronizacion'
             )
+        self._escuchas_listas[coleccion].set()
+    
+    # ------------------------------------------------------------------
+    # Instantáneas
+    # ------------------------------------------------------------------
+    
+    def _publicar(self, coleccion: str, documentos: Iterable[Dict],
+                  cambios: Optional[Sequence[Tuple[Optional[Registro], Optional[Registro]]]] = None,
+                  revision_base: Optional[int] = None,
+                  al_publicar: Optional[Callable[[], None]] = None) -> bool:
+        """
+        Reemplaza la tupla de la colección, actualiza su índice y sube su revisión.
+        
+        Los índices se arman fuera del lock (una reconstrucción o las copias
+        en capas de un delta); bajo el lock solo se instalan, así las lecturas
+        del cache no esperan a que se indexe.
+        
+        Args:
+            cambios: pares (anterior, nuevo) aplicados sobre la tupla publicada;
+                     con ellos el índice se actualiza solo en esos documentos,
+                     sin ellos se reconstruye desde la lista completa
+            revision_base: revisión sobre la que se armó `documentos`; si ya
+                           se publicó otra, no se instala nada
+            al_publicar: se llama bajo el lock junto con la instalación
+                         (TTL, versión, etc. de la misma publicación)
+        
+        Returns:
+            False si `revision_base` quedó vieja (el llamador rearma y reintenta)
+        """
+        documentos = tuple(documentos)
+        tipos = INDICES.get(coleccion, {})
+        # Los índices que se reconstruyen se arman una vez; los de bajo demanda quedan para indice()
+        reconstruidos = {nombre: tipo(documentos) for nombre, tipo in tipos.items()
+                         if cambios is None and not tipo.BAJO_DEMANDA}
+        while True:
+            with self._lock:
+                revision = self._revisiones[coleccion]
+                if revision_base is not None and revision != revision_base:
+                    return False
+                anteriores = dict(self._indices.get(coleccion, {})) if cambios is not None else {}
             
-            # Actualizar cache
-            self._cache_productos = lista_productos
-            self._ultimo_update_productos = datetime.now()
-            
-            if mostrar_loading:
-                print(f"[OK] Cache actualizado con {len(lista_productos)} productos")
-            return lista_productos.copy()
+            nuevos = dict(reconstruidos)
+            for nombre, tipo in tipos.items():
+                if nombre in nuevos:
+                    continue
+                anterior = anteriores.get(nombre)
+                if anterior is None:
+                    nuevos[nombre] = None if tipo.BAJO_DEMANDA else tipo(documentos)
+                    continue
+                indice = anterior.copiar()
+                for viejo, nuevo in cambios:
+                    indice.aplicar(viejo, nuevo)
+                nuevos[nombre] = indice
             
-        except Exception as e:
-            print(f"[ERROR] Error al obtener productos: {str(e)}")
-            # Si hay error, devolver cache anterior si existe
-            if self._cache_productos:
-                print("[RECUPERACION] Devolviendo datos del cache anterior por error")
-                return self._cache_productos.copy()
-            return []
+            with self._lock:
+                if cambios is not None and self._revisiones[coleccion] != revision:
+                    if revision_base is not None:
+                        return False
+                    continue  # Otra publicación cambió los índices: aplicar los cambios sobre los nuevos
+                setattr(self, f'_cache_{coleccion}', documentos)
+                if tipos:
+                    self._indices[coleccion] = nuevos
+                self._revisiones[coleccion] += 1
+                if al_publicar is not None:
+                    al_publicar()
+                return True
+    
+    def instantanea(self, coleccion: str) -> Instantanea:
+        """Tupla actual de la colección con su revisión (sin consultar Firebase ni copiar)"""
+        with self._lock:
+            return Instantanea(coleccion, self._revisiones[coleccion], getattr(self, f'_cache_{coleccion}'))
     
-    async def obtener_usuarios(self, forzar_refresh: bool = False, mostrar_loading: bool = True) -> List[Dict]:
+    def indice(self, coleccion: str, nombre: str = 'modelo', esperar: bool = True):
         """
-        Obtiene usuarios con cache inteligente optimizado.
+        Índice publicado junto con la tupla actual (ver indices_cache), p. ej.
+        cache_firebase.indice('productos').buscar(modelo) sin recorrer la colección
+        o cache_firebase.indice('ubicaciones', 'texto').buscar('a1', limite=5).
+        Los de bajo demanda se construyen la primera vez que se piden (fuera del lock);
+        con esperar=False la construcción queda en segundo plano y se devuelve None.
         """
-        # CACHE HIT: Retorno inmediato
-        if not forzar_refresh and self._cache_valido(self._ultimo_update_usuarios):
-            if mostrar_loading:
-                print(f"[RAPIDO] CACHE HIT INMEDIATO: {len(self._cache_usuarios)} usuarios (0ms, 0 consultas Firebase)")
-            return self._cache_usuarios.copy()
+        with self._lock:
+            indice = self._indices[coleccion][nombre]
+            if indice is not None:
+                return indice
+            if not esperar:
+                clave = (coleccion, nombre)
+                en_curso = self._indices_en_curso.get(clave)
+                if en_curso is None or en_curso.done():
+                    if self._constructor_indices is None:
+                        self._constructor_indices = ThreadPoolExecutor(max_workers=1, thread_name_prefix="indices")
+                    self._indices_en_curso[clave] = self._constructor_indices.submit(self.indice, coleccion, nombre)
+                return None
+            revision = self._revisiones[coleccion]
+            documentos = getattr(self, f'_cache_{coleccion}')
+        indice = INDICES[coleccion][nombre](documentos)
+        with self._lock:
+            # Si se publicó otra lista mientras tanto, este índice sirve solo a quien lo pidió
+            if self._revisiones[coleccion] == revision and self._indices[coleccion].get(nombre) is None:
+                self._indices[coleccion][nombre] = indice
+        return indice
+    
+    def tabla(self, coleccion: str) -> pl.DataFrame:
+        """
+        DataFrame de polars de la colección (ver tablas_cache) para filtros,
+        agrupaciones y joins vectorizados. La primera llamada tras una carga
+        completa lo arma: desde el event loop, llamarla con asyncio.to_thread.
+        """
+        return self.indice(coleccion, 'tabla').df
+    
+    # ------------------------------------------------------------------
+    # Carga de colecciones
+    # ------------------------------------------------------------------
+    
+    async def _una_sola_carga(self, coleccion: str, cargar: Callable[[], Sequence[Registro]]) -> Sequence[Registro]:
+        """
+        Single-flight por colección: si ya hay una carga en curso, esta llamada
+        espera esa misma en lugar de lanzar otra lectura (p. ej. varios clics
+        seguidos en Actualizar, o la vista y el sincronizador a la vez).
+        La carga corre en el pool de Firestore, así la comparten también los llamadores
+        de otros event loops (asyncio.run en hilos); cancelar a un lector no la cancela.
+        Corre con el contexto de quien la lanzó: su costo va a esa funcionalidad.
+        Si no termina en firestore_async.TIMEOUT_FIRESTORE segundos, se olvida (la
+        próxima llamada lanza otra) y se devuelve lo que haya en cache o en disco.
+        """
+        with self._lock:
+            en_curso = self._cargas_en_curso.get(coleccion)
+            if en_curso is not None and not en_curso.done():
+                print(f"[CACHE] Carga de {coleccion} en curso - esperando la misma consulta")
+            else:
+                en_curso = firestore_async.ejecutor().submit(contextvars.copy_context().run, cargar)
+                self._cargas_en_curso[coleccion] = en_curso
+                en_curso.add_done_callback(lambda futuro: self._fin_carga(coleccion, futuro))
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(en_curso)),
+                                          firestore_async.TIMEOUT_FIRESTORE)
+        except asyncio.TimeoutError:
+            self._fin_carga(coleccion, en_curso)
+            respaldo = getattr(self, f'_cache_{coleccion}')
+            print(f"[WARN] La carga de {coleccion} no respondió en {firestore_async.TIMEOUT_FIRESTORE}s - "
+                  f"usando la copia en cache ({len(respaldo)} registros)")
+            return respaldo
+    
+    def _fin_carga(self, coleccion: str, futuro: Future) -> None:
+        with self._lock:
+            if self._cargas_en_curso.get(coleccion) is futuro:
+                del self._cargas_en_curso[coleccion]
+    
+    def _cargar_coleccion(self, coleccion: str, mostrar_loading: bool = True) -> Sequence[Registro]:
+        """
+        Revalida por versión o, si no alcanza, lee la colección completa.
+        Se ejecuta en un hilo aparte (ver _una_sola_carga).
+        """
+        # TTL vencido o refresh: validar con la versión antes de releer todo
+        if self._revalidar_por_version(coleccion):
+            return getattr(self, f'_cache_{coleccion}')
         
         # CACHE MISS: Consultar Firebase
         if mostrar_loading:
-            print("[CONSULTA] CACHE MISS: Consultando usuarios en Firebase...")
+            print(f"[CACHE MISS] Consultando Firebase para {coleccion}...")
         
+        generacion = self._generaciones[coleccion]
         try:
-            referencia_usuarios = db.collection('usuarios')
-            usuarios = referencia_usuarios.stream()
-            
-            lista_usuarios = []
-            count_docs = 0
-            for usuario in usuarios:
-                data = usuario.to_dict()
-                data['firebase_id'] = usuario.id
-                lista_usuarios.append(data)
-                count_docs += 1
+            version = self._leer_version_segura(coleccion)
+            normalizar = _NORMALIZADORES[coleccion]
+            inicio = time.perf_counter()
+            lista = [normalizar(doc.id, doc.to_dict() or {})
+                     for doc in self._db.collection(coleccion).stream()]
+            duracion = time.perf_counter() - inicio
+            if coleccion == 'movimientos':
+                lista.sort(key=lambda x: str(x.get('fecha_movimiento', '')), reverse=True)
             
             # Registrar en el monitor
             monitor_firebase.registrar_consulta(
                 tipo='lectura',
-                coleccion='usuarios',
-                descripcion=f'Obtener todos los usuarios (cache miss)',
-                cantidad_docs=count_docs
+                coleccion=coleccion,
+                descripcion=f'Cache miss - consulta completa {coleccion}',
+                cantidad_docs=len(lista),
+                duracion=duracion
             )
             
-            # Actualizar cache
-            self._cache_usuarios = lista_usuarios
-            self._ultimo_update_usuarios = datetime.now()
+            # Publicar la lista nueva de una vez
+            def publicada():
+                self._marcar_actualizado(coleccion, generacion)
+                self._registrar_version(coleccion, version)
+            self._publicar(coleccion, lista, al_publicar=publicada)
             
             if mostrar_loading:
-                print(f"[OK] Cache de usuarios actualizado con {len(lista_usuarios)} usuarios")
-            else:
-                print(f"[PROCESO] Cache usuarios actualizado silenciosamente: {len(lista_usuarios)} usuarios")
-            return lista_usuarios.copy()
+                print(f"[OK] Cache de {coleccion} actualizado con {len(lista)} documentos")
+            return getattr(self, f'_cache_{coleccion}')
             
         except Exception as e:
-            print(f"[ERROR] Error al obtener usuarios: {str(e)}")
-            if self._cache_usuarios:
-                return self._cache_usuarios.copy()
-            return []
+            print(f"[ERROR] Error al obtener {coleccion}: {str(e)}")
+            # Si hay error, devolver cache anterior si existe
+            anterior = getattr(self, f'_cache_{coleccion}')
+            if anterior:
+                print("[RECUPERACION] Devolviendo datos del cache anterior por error")
+            return anterior
+    
+    def _invalidar(self, coleccion: str) -> None:
+        with self._lock:
+            self._generaciones[coleccion] += 1
+            setattr(self, f'_ultimo_update_{coleccion}', None)
+    
+    def tiene_productos_en_cache(self) -> bool:
+        """Verifica si hay productos válidos en cache SIN hacer consultas"""
+        return (len(self._cache_productos) > 0 and 
+                self._vigente('productos', self._ultimo_update_productos))
+    
+    def obtener_productos_inmediato(self) -> Sequence[Registro]:
+        """
+        Obtiene productos inmediatamente desde cache si están disponibles.
+        NO hace consultas a Firebase. Útil para carga instantánea de UI.
+        """
+        if self.tiene_productos_en_cache() or ('productos' in self._desde_disco and self._cache_productos):
+            print(f"[RAPIDO] CACHE INMEDIATO: {len(self._cache_productos)} productos (0ms)")
+            return self._cache_productos
+        return ()
+    
+    async def obtener_productos(self, forzar_refresh: bool = False, mostrar_loading: bool = True) -> Sequence[Registro]:
+        """
+        Obtiene productos con cache inteligente y ultra-rápido.
+        Solo consulta Firebase si es necesario.
+        
+        Args:
+            forzar_refresh: Fuerza actualización desde Firebase
+            mostrar_loading: Si mostrar mensajes de loading (útil para UI)
+        """
+        # CACHE HIT: Retorno inmediato sin delays (con escucha siempre está al día)
+        if await self._servir_desde_escucha('productos', forzar_refresh) or (
+                not forzar_refresh and self._cache_valido(self._ultimo_update_productos)):
+            if mostrar_loading:
+                print(f"[CACHE] HIT INMEDIATO: {len(self._cache_productos)} productos (0ms, 0 consultas Firebase)")
+            return self._cache_productos
+        
+        productos = await self._una_sola_carga('productos', lambda: self._cargar_coleccion('productos', mostrar_loading))
+        return productos
+    
+    async def obtener_usuarios(self, forzar_refresh: bool = False, mostrar_loading: bool = True) -> Sequence[Registro]:
+        """
+        Obtiene usuarios con cache inteligente optimizado.
+        """
+        # CACHE HIT: Retorno inmediato
+        if await self._servir_desde_escucha('usuarios', forzar_refresh) or (
+                not forzar_refresh and self._cache_valido(self._ultimo_update_usuarios)):
+            if mostrar_loading:
+                print(f"[RAPIDO] CACHE HIT INMEDIATO: {len(self._cache_usuarios)} usuarios (0ms, 0 consultas Firebase)")
+            return self._cache_usuarios
+        
+        usuarios = await self._una_sola_carga('usuarios', lambda: self._cargar_coleccion('usuarios', mostrar_loading))
+        return usuarios
     
     def invalidar_cache_productos(self):
         """Fuerza la actualización del cache de productos en la próxima consulta"""
-        self._ultimo_update_productos = None
+        self._invalidar('productos')
         print("[PROCESO] Cache de productos invalidado")
     
     def invalidar_cache_usuarios(self):
         """Fuerza la actualización del cache de usuarios en la próxima consulta"""
-        self._ultimo_update_usuarios = None
+        self._invalidar('usuarios')
         print("[PROCESO] Cache de usuarios invalidado")
     
     def tiene_ubicaciones_en_cache(self) -> bool:
         """Verifica si hay ubicaciones válidas en cache SIN hacer consultas"""
         return (len(self._cache_ubicaciones) > 0 and 
-                self._cache_valido(self._ultimo_update_ubicaciones))
+                self._vigente('ubicaciones', self._ultimo_update_ubicaciones))
     
-    def obtener_ubicaciones_inmediato(self) -> List[Dict]:
+    def obtener_ubicaciones_inmediato(self) -> Sequence[Registro]:
         """
         Obtiene ubicaciones inmediatamente desde cache si están disponibles.
         NO hace consultas a Firebase. Útil para carga instantánea de UI.
         """
-        if self.tiene_ubicaciones_en_cache():
+        if self.tiene_ubicaciones_en_cache() or ('ubicaciones' in self._desde_disco and self._cache_ubicaciones):
             print(f"[RAPIDO] CACHE INMEDIATO UBICACIONES: {len(self._cache_ubicaciones)} ubicaciones (0ms)")
-            return self._cache_ubicaciones.copy()
-        return []
+            return self._cache_ubicaciones
+        return ()
     
-    async def obtener_ubicaciones(self, forzar_refresh: bool = False, mostrar_loading: bool = True) -> List[Dict]:
+    async def obtener_ubicaciones(self, forzar_refresh: bool = False, mostrar_loading: bool = True) -> Sequence[Registro]:
         """
         Obtiene ubicaciones con cache inteligente y ultra-rápido.
         Solo consulta Firebase si es necesario.
@@ -188,105 +776,57 @@ class CacheFirebase:
             forzar_refresh: Fuerza actualización desde Firebase
             mostrar_loading: Si mostrar mensajes de loading (útil para UI)
         """
-        # CACHE HIT: Retorno inmediato sin delays
-        if not forzar_refresh and self._cache_valido(self._ultimo_update_ubicaciones):
+        # CACHE HIT: Retorno inmediato sin delays (con escucha siempre está al día)
+        if await self._servir_desde_escucha('ubicaciones', forzar_refresh) or (
+                not forzar_refresh and self._cache_valido(self._ultimo_update_ubicaciones)):
             if mostrar_loading:
                 print(f"[RAPIDO] CACHE HIT UBICACIONES INMEDIATO: {len(self._cache_ubicaciones)} ubicaciones (0ms, 0 consultas Firebase)")
-            
-            # Retorno inmediato sin awaits innecesarios
-            return self._cache_ubicaciones.copy()
+            return self._cache_ubicaciones
         
-        # CACHE MISS: Consultar Firebase
-        if mostrar_loading:
-            print("[CONSULTA] CACHE MISS UBICACIONES: Consultando Firebase para ubicaciones...")
-            
-        try:
-            referencia_ubicaciones = db.collection('ubicaciones')
-            ubicaciones = referencia_ubicaciones.stream()
-            
-            lista_ubicaciones = []
-            count_docs = 0
-            for ubicacion in ubicaciones:
-                data = ubicacion.to_dict()
-                data['firebase_id'] = ubicacion.id
-                # Asegurar campos requeridos
-                data['modelo'] = data.get('modelo', 'Sin modelo')
-                data['almacen'] = data.get('almacen', 'Sin almacén')
-                data['estanteria'] = data.get('estanteria', 'Sin estantería')
-                data['cantidad'] = data.get('cantidad', 1)
-                data['observaciones'] = data.get('observaciones', 'Sin observaciones')
-                data['fecha_asignacion'] = data.get('fecha_asignacion', 'Sin fecha')
-                lista_ubicaciones.append(data)
-                count_docs += 1
-            
-            # Registrar en el monitor
-            monitor_firebase.registrar_consulta(
-                tipo='lectura',
-                coleccion='ubicaciones',
-                descripcion=f'Cache miss - consulta completa ubicaciones',
-                cantidad_docs=count_docs
-            )
-            
-            # Actualizar cache
-            self._cache_ubicaciones = lista_ubicaciones
-            self._ultimo_update_ubicaciones = datetime.now()
-            
-            if mostrar_loading:
-                print(f"[OK] Cache ubicaciones actualizado con {len(lista_ubicaciones)} ubicaciones")
-            return lista_ubicaciones.copy()
-            
-        except Exception as e:
-            print(f"[ERROR] Error al obtener ubicaciones: {str(e)}")
-            # Si hay error, devolver cache anterior si existe
-            if self._cache_ubicaciones:
-                print("[PROCESO] Devolviendo datos del cache anterior por error")
-                return self._cache_ubicaciones.copy()
-            return []
+        ubicaciones = await self._una_sola_carga('ubicaciones', lambda: self._cargar_coleccion('ubicaciones', mostrar_loading))
+        return ubicaciones
     
     def invalidar_cache_ubicaciones(self):
         """Invalida el cache de ubicaciones para forzar actualización"""
-        self._ultimo_update_ubicaciones = None
+        self._invalidar('ubicaciones')
         print("[PROCESO] Cache de ubicaciones invalidado")
     
     def invalidar_cache_movimientos(self):
         """Invalida el cache de movimientos para forzar actualización"""
-        self._ultimo_update_movimientos = None
+        self._invalidar('movimientos')
         print("[PROCESO] Cache de movimientos invalidado")
     
-    async def obtener_movimientos(self, forzar_refresh: bool = False) -> List[Dict]:
-        """Obtiene movimientos con cache inteligente"""
-        if not forzar_refresh and self._cache_valido(self._ultimo_update_movimientos):
+    def obtener_movimientos_inmediato(self) -> Sequence[Registro]:
+        """
+        Obtiene movimientos desde cache (o la copia en disco) sin consultar Firebase.
+        """
+        if self._cache_movimientos and ('movimientos' in self._desde_disco or
+                                        self._vigente('movimientos', self._ultimo_update_movimientos)):
+            return self._cache_movimientos
+        return ()
+    
+    async def obtener_movimientos(self, forzar_refresh: bool = False) -> Sequence[Registro]:
+        """Obtiene movimientos con cache inteligente (más recientes primero)"""
+        if await self._servir_desde_escucha('movimientos', forzar_refresh) or (
+                not forzar_refresh and self._cache_valido(self._ultimo_update_movimientos)):
             print(f"[RAPIDO] CACHE MOVIMIENTOS: {len(self._cache_movimientos)} registros")
-            return self._cache_movimientos.copy()
+            return self._cache_movimientos
         
         print(f"[CONSULTA] Consultando movimientos desde Firebase... (forzar_refresh={forzar_refresh})")
-        from app.crud_movimientos.create_movimiento import obtener_movimientos_firebase
-        
-        try:
-            self._cache_movimientos = await obtener_movimientos_firebase()
-            self._ultimo_update_movimientos = datetime.now()
-            print(f"[OK] MOVIMIENTOS ACTUALIZADOS: {len(self._cache_movimientos)} registros")
-            
-            # Log detallado de los movimientos para debug
-            if len(self._cache_movimientos) > 0:
-                print(f"   [LISTA] Últimos movimientos: {[m.get('tipo', 'N/A') for m in self._cache_movimientos[:3]]}")
-            
-            return self._cache_movimientos.copy()
-        except Exception as e:
-            print(f"[ERROR] Error al obtener movimientos: {e}")
-            return []
+        movimientos = await self._una_sola_carga('movimientos', lambda: self._cargar_coleccion('movimientos'))
+        return movimientos
     
     def limpiar_cache(self):
         """Limpia todo el cache"""
-        self._cache_productos.clear()
-        self._cache_usuarios.clear()
-        self._cache_ubicaciones.clear()
-        self._cache_movimientos.clear()
-        self._ultimo_update_productos = None
-        self._ultimo_update_usuarios = None
-        self._ultimo_update_ubicaciones = None
-        self._ultimo_update_movimientos = None
+        self.desactivar_escuchas()
+        with self._lock:
+            for coleccion in COLECCIONES_CACHE:
+                self._publicar(coleccion, ())
+                self._generaciones[coleccion] += 1
+                setattr(self, f'_ultimo_update_{coleccion}', None)
+            self._versiones.clear()
+            self._desde_disco.clear()
         print("[LIMPIEZA] Cache completo limpiado")
 
-# Instancia global del cache
-cache_firebase = CacheFirebase()
+# Instancia global del cache (con copia en data/cache_local.sqlite)
+cache_firebase = CacheFirebase(disco=CacheDisco())
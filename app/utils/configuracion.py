@@ -14,6 +14,9 @@ class GestorConfiguracion:
         "idioma": "es",
         "notificaciones": True,
         "auto_backup": False,
+        "cache_tiempo_real": False,  # Escuchas on_snapshot en lugar de recargas por TTL
+        "presupuestos_firebase": {},  # {funcionalidad: {operacion: límite diario}} sobre los de cuota_firebase
+        "monitor_firebase_consola": False,  # Una línea en consola por cada consulta a Firebase
         "ultima_actualizacion": None
     }
     
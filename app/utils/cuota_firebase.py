@@ -0,0 +1,436 @@
+"""
+Presupuesto diario de Firebase y costo por funcionalidad.
+
+El plan de Firestore tiene un límite diario (LIMITES_DIARIOS) que comparten
+todas las PCs del negocio, pero MonitorFirebase solo contaba la sesión
+actual. Aquí cada operación que registra el monitor se atribuye a una
+funcionalidad (importacion, sincronizacion, dashboard, reportes,
+eliminacion_masiva o general) y
+se acumula por día:
+
+  - En data/cuota_firebase.sqlite, tabla `uso` (UPSERT por día,
+    funcionalidad y operación): la comparten todas las instancias que usan
+    la misma carpeta data/. Los incrementos se juntan en memoria y se
+    vuelcan en el pool de firestore_async cada INTERVALO_VOLCADO segundos,
+    al consultar el uso y al cerrar; cada volcado relee el día para la
+    estimación en memoria que usa solo_cache().
+  - En Firestore, `_cuota/{dia}` guarda el total del día de cada cliente
+    (proceso): {'clientes': {id: {funcionalidad: {operacion: n}}}}. Cada
+    cliente sobrescribe solo su entrada (set con merge y valores absolutos:
+    reintentar no duplica) y al leer el documento se suman todas. Se
+    sincroniza cada INTERVALO_GLOBAL segundos una vez llamado iniciar()
+    (1 escritura y 1 lectura).
+
+El uso estimado de cada funcionalidad es el mayor entre lo local y lo global
+más lo que este cliente consumió desde la última sincronización. El día es
+el de la cuota de Firestore, que se reinicia a medianoche del Pacífico.
+
+La funcionalidad se toma del contexto: `with atribuir('reportes'): ...`
+marca todo lo que se registre dentro (también en los hilos lanzados con
+firestore_async.ejecutar, que copian el contexto). Sin atribución va a
+'general'.
+
+Los presupuestos por funcionalidad (PRESUPUESTOS_DEFECTO) se ajustan en la
+configuración ("presupuestos_firebase"). Al pasar UMBRAL_AVISO del
+presupuesto de una funcionalidad o del límite diario:
+  - solo_cache() indica que las revalidaciones en segundo plano deben
+    servir lo que haya en cache sin consultar Firebase;
+  - aviso_operacion_masiva() devuelve el aviso a mostrar antes de una
+    importación, sincronización o eliminación en lote.
+"""
+
+import functools
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+LIMITES_DIARIOS = {'lecturas': 50_000, 'escrituras': 20_000, 'eliminaciones': 20_000}
+
+FUNCIONALIDADES = ('importacion', 'sincronizacion', 'dashboard', 'reportes', 'eliminacion_masiva', 'general')
+
+# Suman el límite diario; lo que no se indica no tiene presupuesto propio
+PRESUPUESTOS_DEFECTO = {
+    'importacion': {'lecturas': 5_000, 'escrituras': 10_000, 'eliminaciones': 5_000},
+    'sincronizacion': {'lecturas': 20_000, 'escrituras': 4_000},
+    'dashboard': {'lecturas': 5_000},
+    'reportes': {'lecturas': 10_000},
+    'eliminacion_masiva': {'eliminaciones': 10_000},
+    'general': {'lecturas': 10_000, 'escrituras': 6_000, 'eliminaciones': 5_000},
+}
+
+OPERACIONES = {'lectura': 'lecturas', 'escritura': 'escrituras', 'eliminacion': 'eliminaciones'}
+
+UMBRAL_AVISO = 0.9
+INTERVALO_VOLCADO = 5.0  # segundos
+INTERVALO_GLOBAL = 300.0  # segundos
+COLECCION_CUOTA = '_cuota'
+
+_ESQUEMA = (
+    "CREATE TABLE IF NOT EXISTS uso ("
+    " dia TEXT NOT NULL,"
+    " funcionalidad TEXT NOT NULL,"
+    " operacion TEXT NOT NULL,"
+    " cantidad INTEGER NOT NULL,"
+    " PRIMARY KEY (dia, funcionalidad, operacion))",
+)
+
+Clave = Tuple[str, str]  # (funcionalidad, operacion)
+
+_funcionalidad: ContextVar[str] = ContextVar('funcionalidad_firebase', default='general')
+
+
+@contextmanager
+def atribuir(funcionalidad: str):
+    """Atribuye a `funcionalidad` las operaciones registradas dentro del bloque"""
+    token = _funcionalidad.set(funcionalidad)
+    try:
+        yield
+    finally:
+        _funcionalidad.reset(token)
+
+
+def atribuida(funcionalidad: str):
+    """Decorador de corrutinas: lo que registren va a `funcionalidad`"""
+    def decorador(corrutina):
+        @functools.wraps(corrutina)
+        async def envoltura(*args, **kwargs):
+            with atribuir(funcionalidad):
+                return await corrutina(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def funcionalidad_actual() -> str:
+    return _funcionalidad.get()
+
+
+try:
+    ZONA_CUOTA = ZoneInfo("America/Los_Angeles")
+except ZoneInfoNotFoundError:  # Windows sin el paquete tzdata
+    print("[WARN] Sin datos de zonas horarias (tzdata): el día de la cuota se calcula en UTC-8")
+    ZONA_CUOTA = timezone(timedelta(hours=-8))
+
+
+def _hoy() -> str:
+    """Día de la cuota de Firestore (se reinicia a medianoche en America/Los_Angeles)"""
+    return datetime.now(ZONA_CUOTA).strftime("%Y-%m-%d")
+
+
+def _anidar(planos: Mapping[Clave, int]) -> Dict[str, Dict[str, int]]:
+    anidado: Dict[str, Dict[str, int]] = {}
+    for (funcionalidad, operacion), cantidad in planos.items():
+        anidado.setdefault(funcionalidad, {})[operacion] = cantidad
+    return anidado
+
+
+def combinar_presupuestos(ajustes: Optional[Mapping]) -> Dict[str, Dict[str, int]]:
+    """Presupuestos por defecto con los ajustes de la configuración encima"""
+    presupuestos = {f: dict(p) for f, p in PRESUPUESTOS_DEFECTO.items()}
+    for funcionalidad, limites in (ajustes or {}).items():
+        if isinstance(limites, Mapping):
+            presupuestos.setdefault(funcionalidad, {}).update(
+                {op: int(n) for op, n in limites.items() if op in LIMITES_DIARIOS})
+    return presupuestos
+
+
+class CuotaFirebase:
+    """Uso diario de Firebase por funcionalidad, compartido entre procesos y PCs"""
+
+    def __init__(self, ruta: str = "data/cuota_firebase.sqlite", db=None,
+                 presupuestos: Optional[Mapping] = None, umbral: float = UMBRAL_AVISO,
+                 intervalo_volcado: float = INTERVALO_VOLCADO, intervalo_global: float = INTERVALO_GLOBAL,
+                 reloj=time.monotonic):
+        self.ruta = Path(ruta)
+        self._db_inyectada = db
+        self._presupuestos = combinar_presupuestos(presupuestos) if presupuestos is not None else None
+        self.umbral = umbral
+        self.intervalo_volcado = intervalo_volcado
+        self.intervalo_global = intervalo_global
+        self._reloj = reloj
+        self.cliente = uuid.uuid4().hex[:12]
+
+        self._lock = threading.RLock()
+        self._conexion: Optional[sqlite3.Connection] = None
+        self._pendiente: Dict[Tuple[str, str, str], int] = {}
+        self._ultimo_volcado = reloj()
+        self._volcando = False
+        # Uso del día en SQLite según el último volcado (de todas las instancias)
+        self._local: Dict[Clave, int] = {}
+        self._local_dia: Optional[str] = None
+
+        # Lo de este cliente en el día y lo último leído de `_cuota/{dia}`
+        self._dia = _hoy()
+        self._propio: Dict[Clave, int] = {}
+        self._propio_sincronizado: Dict[Clave, int] = {}
+        self._global: Optional[Dict[Clave, int]] = None
+        self._global_activo = False
+        self._ultima_sincronizacion: Optional[float] = None
+        self._sincronizando = False
+        self._solo_cache_avisado = False
+
+    @property
+    def _db(self):
+        if self._db_inyectada is None:
+            from conexiones.firebase import db
+            return db
+        return self._db_inyectada
+
+    def presupuestos(self) -> Dict[str, Dict[str, int]]:
+        """Presupuesto diario por funcionalidad (defecto + configuración, leída una vez)"""
+        if self._presupuestos is None:
+            from app.utils.configuracion import GestorConfiguracion
+            ajustes = GestorConfiguracion.obtener_configuracion_completa().get("presupuestos_firebase")
+            self._presupuestos = combinar_presupuestos(ajustes)
+        return self._presupuestos
+
+    # ------------------------------------------------------------------
+    # Registro
+    # ------------------------------------------------------------------
+
+    def registrar(self, funcionalidad: str, tipo: str, cantidad: int = 1) -> None:
+        """Suma `cantidad` operaciones de `tipo` ('lectura', 'escritura', 'eliminacion')"""
+        operacion = OPERACIONES.get(tipo)
+        if operacion is None or cantidad <= 0:
+            return
+        dia = _hoy()
+        with self._lock:
+            self._cambiar_de_dia(dia)
+            clave = (dia, funcionalidad, operacion)
+            self._pendiente[clave] = self._pendiente.get(clave, 0) + cantidad
+            self._propio[(funcionalidad, operacion)] = self._propio.get((funcionalidad, operacion), 0) + cantidad
+            ahora = self._reloj()
+            volcar = not self._volcando and ahora - self._ultimo_volcado >= self.intervalo_volcado
+            if volcar:
+                self._volcando = True
+            sincronizar = (self._global_activo and not self._sincronizando and
+                           (self._ultima_sincronizacion is None or
+                            ahora - self._ultima_sincronizacion >= self.intervalo_global))
+            if sincronizar:
+                self._sincronizando = True
+        if volcar or sincronizar:
+            # SQLite y Firestore fuera del hilo que registra (suele ser el event loop)
+            from app.utils.firestore_async import ejecutor
+            if volcar:
+                ejecutor().submit(self._volcar_programado)
+            if sincronizar:
+                ejecutor().submit(self._sincronizar_seguro)
+
+    def _volcar_programado(self) -> None:
+        try:
+            self.volcar()
+        finally:
+            with self._lock:
+                self._volcando = False
+
+    def _cambiar_de_dia(self, dia: str) -> None:
+        """Al pasar la medianoche lo propio y lo global empiezan de cero (con el lock tomado)"""
+        if dia != self._dia:
+            self._dia = dia
+            self._propio = {}
+            self._propio_sincronizado = {}
+            self._global = None
+
+    def _conectar(self) -> sqlite3.Connection:
+        """Conexión compartida (se abre al primer uso); llamar con el lock tomado"""
+        if self._conexion is None:
+            self.ruta.parent.mkdir(exist_ok=True)
+            conexion = sqlite3.connect(self.ruta, check_same_thread=False, timeout=2.0)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            with conexion:
+                for sentencia in _ESQUEMA:
+                    conexion.execute(sentencia)
+            self._conexion = conexion
+        return self._conexion
+
+    def volcar(self) -> None:
+        """Escribe en SQLite los incrementos pendientes (una transacción) y relee el día"""
+        with self._lock:
+            self._ultimo_volcado = self._reloj()
+            if not self._pendiente:
+                return
+            lote, self._pendiente = self._pendiente, {}
+            try:
+                conexion = self._conectar()
+                with conexion:
+                    conexion.executemany(
+                        "INSERT INTO uso VALUES (?, ?, ?, ?)"
+                        " ON CONFLICT (dia, funcionalidad, operacion) DO UPDATE SET cantidad = cantidad + excluded.cantidad",
+                        [(*clave, cantidad) for clave, cantidad in lote.items()]
+                    )
+                self._leer_local(self._dia)
+            except sqlite3.Error as e:
+                print(f"[WARN] No se pudo guardar el uso de Firebase, se reintentará: {e}")
+                for clave, cantidad in lote.items():
+                    self._pendiente[clave] = self._pendiente.get(clave, 0) + cantidad
+
+    def _leer_local(self, dia: str) -> Dict[Clave, int]:
+        """Uso del día guardado en SQLite; el de hoy queda para la estimación (con el lock tomado)"""
+        filas = self._conectar().execute(
+            "SELECT funcionalidad, operacion, cantidad FROM uso WHERE dia = ?", (dia,)
+        ).fetchall()
+        uso = {(f, o): n for f, o, n in filas}
+        if dia == self._dia:
+            self._local, self._local_dia = dict(uso), dia
+        return uso
+
+    # ------------------------------------------------------------------
+    # Uso compartido entre PCs
+    # ------------------------------------------------------------------
+
+    def iniciar(self) -> None:
+        """Activa la sincronización con `_cuota/{dia}` (la primera en el próximo registro)"""
+        self._global_activo = True
+
+    def _sincronizar_seguro(self) -> None:
+        try:
+            self.sincronizar_global()
+        except Exception as e:
+            print(f"[WARN] No se pudo sincronizar la cuota de Firebase: {e}")
+        finally:
+            with self._lock:
+                self._sincronizando = False
+                self._ultima_sincronizacion = self._reloj()
+
+    def sincronizar_global(self) -> Dict[str, Dict[str, int]]:
+        """Publica el total propio del día y lee la suma de todos los clientes"""
+        with self._lock:
+            dia = _hoy()
+            self._cambiar_de_dia(dia)
+            propio = dict(self._propio)
+        referencia = self._db.collection(COLECCION_CUOTA).document(dia)
+        referencia.set({'dia': dia, 'clientes': {self.cliente: _anidar(propio)}}, merge=True)
+        clientes = (referencia.get().to_dict() or {}).get('clientes') or {}
+
+        total: Dict[Clave, int] = {}
+        for uso in clientes.values():
+            for funcionalidad, operaciones in (uso or {}).items():
+                for operacion, cantidad in (operaciones or {}).items():
+                    total[(funcionalidad, operacion)] = total.get((funcionalidad, operacion), 0) + int(cantidad)
+        with self._lock:
+            if self._dia == dia:
+                self._global = total
+                self._propio_sincronizado = propio
+
+        from app.utils.monitor_firebase import monitor_firebase
+        monitor_firebase.registrar_consulta(tipo='escritura', coleccion=COLECCION_CUOTA,
+                                            descripcion='Cuota diaria compartida', funcionalidad='general')
+        monitor_firebase.registrar_consulta(tipo='lectura', coleccion=COLECCION_CUOTA,
+                                            descripcion='Cuota diaria compartida', funcionalidad='general')
+        return _anidar(total)
+
+    # ------------------------------------------------------------------
+    # Consulta y presupuestos
+    # ------------------------------------------------------------------
+
+    def uso_del_dia(self, dia: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        """{funcionalidad: {operacion: cantidad}} estimado del día (hoy por defecto), leído de SQLite"""
+        dia = dia or _hoy()
+        self.volcar()
+        with self._lock:
+            try:
+                uso = self._leer_local(dia)
+            except sqlite3.Error as e:
+                print(f"[WARN] No se pudo leer el uso de Firebase: {e}")
+                uso = {}
+            return _anidar(self._sumar_memoria(uso, dia))
+
+    def uso_estimado(self) -> Dict[str, Dict[str, int]]:
+        """Como uso_del_dia() de hoy pero sin tocar SQLite: lo del último volcado más lo pendiente"""
+        dia = _hoy()
+        with self._lock:
+            self._cambiar_de_dia(dia)
+            uso = dict(self._local) if self._local_dia == dia else {}
+            return _anidar(self._sumar_memoria(uso, dia))
+
+    def _sumar_memoria(self, uso: Dict[Clave, int], dia: str) -> Dict[Clave, int]:
+        """Suma a `uso` lo pendiente de volcar y el total global (con el lock tomado)"""
+        for clave, cantidad in self._pendiente.items():
+            if clave[0] == dia:
+                uso[clave[1:]] = uso.get(clave[1:], 0) + cantidad
+        if self._global is not None and self._dia == dia:
+            for clave, total in self._global.items():
+                desde_sincronizar = self._propio.get(clave, 0) - self._propio_sincronizado.get(clave, 0)
+                uso[clave] = max(uso.get(clave, 0), total + desde_sincronizar)
+        return uso
+
+    def _excedidos(self, funcionalidad: str, operaciones=tuple(LIMITES_DIARIOS),
+                   adicionales: Optional[Mapping[str, int]] = None,
+                   uso: Optional[Dict[str, Dict[str, int]]] = None) -> List[str]:
+        """Presupuestos que superan el umbral (contando `adicionales` por venir)"""
+        uso = self.uso_del_dia() if uso is None else uso
+        adicionales = adicionales or {}
+        avisos = []
+        presupuesto = self.presupuestos().get(funcionalidad, {})
+        for operacion in operaciones:
+            usado = uso.get(funcionalidad, {}).get(operacion, 0) + adicionales.get(operacion, 0)
+            limite = presupuesto.get(operacion)
+            if limite and usado >= limite * self.umbral:
+                avisos.append(f"{funcionalidad}: {usado:,} de {limite:,} {operacion} del presupuesto diario")
+        for operacion in operaciones:
+            usado = sum(u.get(operacion, 0) for u in uso.values()) + adicionales.get(operacion, 0)
+            limite = LIMITES_DIARIOS[operacion]
+            if usado >= limite * self.umbral:
+                avisos.append(f"Total del día: {usado:,} de {limite:,} {operacion}")
+        return avisos
+
+    def solo_cache(self, funcionalidad: Optional[str] = None) -> bool:
+        """
+        True si las lecturas de la funcionalidad (la del contexto por defecto)
+        o las del día están cerca del límite: las revalidaciones en segundo
+        plano deben quedarse con el cache. Se consulta desde el event loop:
+        usa la estimación en memoria (uso_estimado), sin leer SQLite.
+        """
+        excedidos = self._excedidos(funcionalidad or funcionalidad_actual(), operaciones=('lecturas',),
+                                    uso=self.uso_estimado())
+        if excedidos and not self._solo_cache_avisado:
+            print(f"[WARN] Cuota de Firebase casi agotada, revalidaciones solo desde cache: {'; '.join(excedidos)}")
+        self._solo_cache_avisado = bool(excedidos)
+        return bool(excedidos)
+
+    def aviso_operacion_masiva(self, funcionalidad: str, lecturas: int = 0, escrituras: int = 0,
+                               eliminaciones: int = 0) -> Optional[str]:
+        """
+        Aviso para mostrar antes de una operación masiva si, con lo que se
+        estima que va a consumir, supera el umbral de su presupuesto o del
+        límite diario. None si no hace falta avisar.
+        """
+        adicionales = {'lecturas': lecturas, 'escrituras': escrituras, 'eliminaciones': eliminaciones}
+        excedidos = self._excedidos(funcionalidad, adicionales=adicionales)
+        if not excedidos:
+            return None
+        return "La cuota diaria de Firebase está casi agotada:\n" + "\n".join(f"• {e}" for e in excedidos)
+
+    def resumen(self) -> Dict:
+        """Uso del día, presupuestos y límites (para el reporte del monitor)"""
+        return {
+            'dia': _hoy(),
+            'uso': self.uso_del_dia(),
+            'presupuestos': self.presupuestos(),
+            'limites': dict(LIMITES_DIARIOS),
+            'compartida': self._global is not None,
+        }
+
+    def cerrar(self) -> None:
+        """Publica el total propio, vuelca lo pendiente y cierra el archivo (al cerrar la app)"""
+        with self._lock:
+            publicar = self._global_activo and not self._sincronizando
+            self._global_activo = False
+            self._sincronizando = self._sincronizando or publicar
+        if publicar:
+            self._sincronizar_seguro()
+        self.volcar()
+        with self._lock:
+            if self._conexion is not None:
+                self._conexion.close()
+                self._conexion = None
+
+
+# Instancia global
+cuota_firebase = CuotaFirebase()
@@ -0,0 +1,91 @@
+"""
+Acceso a Firestore sin bloquear el event loop de Flet.
+
+El SDK de firebase_admin es síncrono: cada stream()/get()/commit() llamado
+dentro de un `async def` congela la interfaz hasta que responde la red.
+Las funciones de este módulo corren esas llamadas en un pool de hilos
+acotado (MAX_HILOS_FIRESTORE) con un tiempo límite, y las lecturas largas
+se cortan en cuanto quien espera se cancela o se agota el tiempo.
+
+Uso:
+    docs = await leer(db.collection('productos'))
+    snapshot = await leer_documento(db.collection('productos').document(id))
+    await ejecutar(agregar_documento, 'movimientos', movimiento)
+"""
+
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+MAX_HILOS_FIRESTORE = 8
+TIMEOUT_FIRESTORE = 30  # Segundos
+
+_ejecutor: Optional[ThreadPoolExecutor] = None
+_lock_ejecutor = threading.Lock()
+
+
+class LecturaCancelada(Exception):
+    """La lectura se abandonó (timeout o cancelación) antes de terminar"""
+
+
+def ejecutor() -> ThreadPoolExecutor:
+    """Pool compartido por todas las llamadas a Firestore (se crea al primer uso)"""
+    global _ejecutor
+    with _lock_ejecutor:
+        if _ejecutor is None:
+            _ejecutor = ThreadPoolExecutor(max_workers=MAX_HILOS_FIRESTORE, thread_name_prefix="firestore")
+        return _ejecutor
+
+
+async def ejecutar(funcion: Callable, *args, timeout: Optional[float] = TIMEOUT_FIRESTORE, **kwargs):
+    """
+    Ejecuta una llamada síncrona del SDK en el pool y la espera sin bloquear el loop.
+    Corre con una copia del contexto (p. ej. la funcionalidad a la que se
+    atribuye la consulta, ver cuota_firebase.atribuir).
+
+    Raises:
+        TimeoutError: si no respondió en `timeout` segundos (la UI queda libre;
+                      el hilo termina por su cuenta cuando el SDK responde o falla)
+    """
+    loop = asyncio.get_running_loop()
+    contexto = contextvars.copy_context()
+    futuro = loop.run_in_executor(ejecutor(), lambda: contexto.run(funcion, *args, **kwargs))
+    try:
+        return await asyncio.wait_for(futuro, timeout)
+    except asyncio.TimeoutError:
+        nombre = getattr(funcion, '__qualname__', repr(funcion))
+        print(f"[WARN] Firestore no respondió en {timeout}s ({nombre})")
+        raise TimeoutError(f"Firestore no respondió en {timeout}s") from None
+
+
+async def leer(consulta, timeout: Optional[float] = TIMEOUT_FIRESTORE) -> List:
+    """
+    Equivalente a list(consulta.stream()) fuera del loop.
+    Si se cancela o vence el tiempo, el hilo deja de consumir el stream.
+    """
+    cancelada = threading.Event()
+
+    def _leer():
+        documentos = []
+        for doc in consulta.stream():
+            if cancelada.is_set():
+                raise LecturaCancelada()
+            documentos.append(doc)
+        return documentos
+
+    try:
+        return await ejecutar(_leer, timeout=timeout)
+    finally:
+        cancelada.set()
+
+
+async def leer_documento(referencia, timeout: Optional[float] = TIMEOUT_FIRESTORE):
+    """Equivalente a referencia.get() (también sirve para consultas y agregaciones)"""
+    return await ejecutar(referencia.get, timeout=timeout)
+
+
+async def confirmar(batch, timeout: Optional[float] = TIMEOUT_FIRESTORE):
+    """Equivalente a batch.commit()"""
+    return await ejecutar(batch.commit, timeout=timeout)
@@ -1,9 +1,9 @@
 import flet as ft
-from conexiones.firebase import db
+from app.utils.firestore_async import ejecutar
+from app.utils.historial_local import historial_local
+from app.utils.historial_nube import historial_nube
 from datetime import datetime
 import asyncio
-import json
-from pathlib import Path
 
 # [ALERT] MODO ECONÓMICO: Deshabilitar escrituras a Firebase temporalmente
 MODO_ECONOMICO = True  # Cambiar a False cuando se recupere la cuota de Firebase
@@ -11,10 +11,13 @@ MODO_ECONOMICO = True  # Cambiar a False cuando se recupere la cuota de Firebase
 class GestorHistorial:
     """Gestor para el historial de actividades del sistema"""
     
+    # Actividades registradas por este proceso (ver version())
+    _agregadas = 0
+    
     def __init__(self):
         self.coleccion = "historial"
-        # Archivo local para el historial en modo económico
-        self.historial_local = Path("data/historial_local.json")
+        # Registro local (SQLite, solo se agrega) para el historial en modo económico
+        self.historial_local = historial_local
     
     async def agregar_actividad(self, tipo: str, descripcion: str, usuario: str, detalles: dict = None):
         """
@@ -41,48 +44,42 @@ class GestorHistorial:
                 self._guardar_historial_local(actividad)
                 print(f"[SAVE] [MODO ECONÓMICO] Actividad guardada localmente: {descripcion}")
             else:
-                # Guardar en Firebase (cuando no estemos en modo económico)
-                db.collection(self.coleccion).add(actividad)
-                print(f"[OK] Actividad registrada en Firebase: {descripcion}")
+                # Firebase: se encola y se escribe por lotes en documentos por hora (ver historial_nube)
+                historial_nube.agregar(actividad)
+            GestorHistorial._agregadas += 1
             
         except Exception as e:
             print(f"[ERROR] Error al registrar actividad: {e}")
     
     def _guardar_historial_local(self, actividad):
-        """Guardar actividad en archivo local JSON"""
+        """Agregar la actividad al registro local (sin leer ni reescribir lo anterior)"""
         try:
-            # Crear directorio si no existe
-            self.historial_local.parent.mkdir(exist_ok=True)
-            
-            # Leer historial existente
-            historial_existente = []
-            if self.historial_local.exists():
-                with open(self.historial_local, 'r', encoding='utf-8') as f:
-                    historial_existente = json.load(f)
-            
-            # Agregar nueva actividad al inicio
-            historial_existente.insert(0, actividad)
-            
-            # Mantener solo los últimos 100 registros para no llenar el disco
-            if len(historial_existente) > 100:
-                historial_existente = historial_existente[:100]
-            
-            # Guardar de vuelta
-            with open(self.historial_local, 'w', encoding='utf-8') as f:
-                json.dump(historial_existente, f, ensure_ascii=False, indent=2, default=str)
-                
+            self.historial_local.agregar(actividad)
         except Exception as e:
             print(f"Error al guardar historial local: {e}")
     
-    def _leer_historial_local(self, limite: int = 50):
-        """Leer historial desde archivo local"""
+    async def version(self) -> tuple:
+        """
+        Cambia cada vez que se agrega una actividad: sirve de clave para no
+        recalcular lo que se derivó del historial (p. ej. los reportes).
+        En modo económico incluye la última actividad del registro local; si
+        no, la versión del historial en Firestore (1 lectura), que también
+        cambia cuando escriben otras PCs.
+        """
         try:
-            if not self.historial_local.exists():
-                return []
-            
-            with open(self.historial_local, 'r', encoding='utf-8') as f:
-                historial = json.load(f)
-                return historial[:limite]
+            if MODO_ECONOMICO:
+                ultima = self.historial_local.ultimo_id()
+            else:
+                ultima = await ejecutar(historial_nube.version)
+        except Exception as e:
+            print(f"[WARN] No se pudo leer la versión del historial: {e}")
+            ultima = None
+        return (GestorHistorial._agregadas, ultima)
+    
+    def _leer_historial_local(self, limite: int = 50, tipo: str = None, usuario: str = None):
+        """Leer las actividades más recientes del registro local"""
+        try:
+            return self.historial_local.recientes(limite, tipo=tipo, usuario=usuario)
         except Exception as e:
             print(f"Error al leer historial local: {e}")
             return []
@@ -102,20 +99,7 @@ class GestorHistorial:
             return self._leer_historial_local(limite)
         
         try:
-            # Obtener documentos ordenados por fecha descendente desde Firebase
-            docs = (db.collection(self.coleccion)
-                   .order_by("timestamp", direction="DESCENDING")
-                   .limit(limite)
-                   .get())
-            
-            actividades = []
-            for doc in docs:
-                data = doc.to_dict()
-                data["id"] = doc.id
-                actividades.append(data)
-            
-            return actividades
-            
+            return await ejecutar(historial_nube.recientes, limite)
         except Exception as e:
             print(f"[ERROR] Error al obtener historial: {e}")
             return []
@@ -131,23 +115,11 @@ class GestorHistorial:
         Returns:
             list: Lista de actividades del usuario
         """
+        if MODO_ECONOMICO:
+            return self._leer_historial_local(limite, usuario=usuario)
+        
         try:
-            from google.cloud.firestore_v1.base_query import FieldFilter
-            # Obtener documentos ordenados por fecha descendente
-            docs = (db.collection(self.coleccion)
-                   .where(filter=FieldFilter("usuario", "==", usuario))
-                   .order_by("timestamp", direction="DESCENDING")
-                   .limit(limite)
-                   .get())
-            
-            actividades = []
-            for doc in docs:
-                data = doc.to_dict()
-                data["id"] = doc.id
-                actividades.append(data)
-            
-            return actividades
-            
+            return await ejecutar(historial_nube.recientes, limite, usuario=usuario)
         except Exception as e:
             print(f"[ERROR] Error al obtener historial por usuario: {e}")
             return []
@@ -163,22 +135,11 @@ class GestorHistorial:
         Returns:
             list: Lista de actividades del tipo especificado
         """
+        if MODO_ECONOMICO:
+            return self._leer_historial_local(limite, tipo=tipo)
+        
         try:
-            from google.cloud.firestore_v1.base_query import FieldFilter
-            docs = (db.collection(self.coleccion)
-                   .where(filter=FieldFilter("tipo", "==", tipo))
-                   .order_by("timestamp", direction="DESCENDING")
-                   .limit(limite)
-                   .get())
-            
-            actividades = []
-            for doc in docs:
-                data = doc.to_dict()
-                data["id"] = doc.id
-                actividades.append(data)
-            
-            return actividades
-            
+            return await ejecutar(historial_nube.recientes, limite, tipo=tipo)
         except Exception as e:
             print(f"[ERROR] Error al obtener historial por tipo: {e}")
             return []
@@ -268,47 +229,15 @@ class GestorHistorial:
     async def obtener_estadisticas_hoy():
         """Obtener estadísticas del día actual"""
         if MODO_ECONOMICO:
-            # Obtener estadísticas desde archivo local
+            # Contadores por día del registro local: no recorre las actividades
             try:
-                gestor = GestorHistorial()
-                actividades = gestor._leer_historial_local(100)  # Leer más registros para estadísticas
-                
-                fecha_hoy = datetime.now().strftime("%Y-%m-%d")
-                estadisticas = {}
-                
-                # Comentar debug para limpiar terminal
-                # print(f"[CHART] [DEBUG] Fecha hoy: {fecha_hoy}")
-                # print(f"[CHART] [DEBUG] Total actividades leídas: {len(actividades)}")
-                
-                for actividad in actividades:
-                    # Verificar si es del día actual (usando startswith para fechas ISO)
-                    fecha_actividad = actividad.get('fecha', '')
-                    tipo_actividad = actividad.get('tipo', 'otro')
-                    # print(f"[CHART] [DEBUG] Actividad: fecha={fecha_actividad}, tipo={tipo_actividad}")
-                    
-                    if fecha_actividad.startswith(fecha_hoy):
-                        estadisticas[tipo_actividad] = estadisticas.get(tipo_actividad, 0) + 1
-                        # print(f"[OK] [DEBUG] Contada: {tipo_actividad} = {estadisticas[tipo_actividad]}")
-                
-                # print(f"[CHART] [DEBUG] Estadísticas finales: {estadisticas}")
-                return estadisticas
+                return GestorHistorial().historial_local.conteo_del_dia()
             except Exception as error:
                 print(f"Error al obtener estadísticas locales: {error}")
                 return {}
         
         try:
-            from google.cloud.firestore_v1.base_query import FieldFilter
-            fecha_hoy = datetime.now().strftime("%Y-%m-%d")
-            docs = db.collection('historial').where(filter=FieldFilter('fecha', '>=', fecha_hoy)).get()
-            
-            estadisticas = {}
-            for doc in docs:
-                data = doc.to_dict()
-                tipo = data.get('tipo', 'otro')
-                estadisticas[tipo] = estadisticas.get(tipo, 0) + 1
-            
-            return estadisticas
-            
+            return await ejecutar(historial_nube.conteo_del_dia)
         except Exception as error:
             print(f"Error al obtener estadísticas: {error}")
             return {}
@@ -424,13 +353,13 @@ class RegistroActividades:
     
     # Funciones estáticas adicionales para compatibilidad
     def obtener_productos_stock_bajo(limite=5):
-        """Obtener productos con stock bajo desde Firebase"""
+        """Productos con stock bajo según el inventario en cache (sin consultar Firebase)"""
         try:
-            productos = db.collection('productos').order_by('cantidad').limit(limite).get()
+            from app.services import repositorio_productos
+            productos = sorted(repositorio_productos.listar_inmediato(), key=lambda p: p.get('cantidad') or 0)
             productos_stock_bajo = []
             
-            for producto in productos:
-                data = producto.to_dict()
+            for data in productos[:limite]:
                 productos_stock_bajo.append({
                     'nombre': data.get('nombre', 'Sin nombre'),
                     'cantidad': data.get('cantidad', 0),
@@ -0,0 +1,167 @@
+"""
+Registro local de actividades (modo económico) en SQLite: data/historial_local.sqlite.
+
+Antes el historial local era un JSON que se leía y reescribía completo en
+cada actividad y se recortaba a las últimas 100 (los reportes perdían todo
+lo anterior). Ahora cada actividad es una fila que solo se agrega:
+
+  - `actividades` guarda fecha, día, tipo, usuario, descripción y los
+    `detalles` estructurados (JSON). El día es el segmento: hay índices por
+    (dia, tipo), fecha, (tipo, fecha) y (usuario, fecha), así que leer las
+    más recientes (con o sin filtro) recorre solo las filas devueltas.
+  - `conteo_diario` lleva cuántas actividades de cada tipo hubo por día; se
+    actualiza en la misma transacción que el INSERT, por lo que las
+    estadísticas del día no dependen del tamaño del registro.
+
+El JSON viejo (data/historial_local.json) se importa una vez, cuando el
+registro está vacío.
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional
+
+_ESQUEMA = (
+    "CREATE TABLE IF NOT EXISTS actividades ("
+    " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+    " fecha TEXT NOT NULL,"
+    " dia TEXT NOT NULL,"
+    " tipo TEXT NOT NULL,"
+    " usuario TEXT,"
+    " descripcion TEXT,"
+    " detalles TEXT)",
+    "CREATE INDEX IF NOT EXISTS idx_actividades_dia ON actividades (dia, tipo)",
+    "CREATE INDEX IF NOT EXISTS idx_actividades_fecha ON actividades (fecha)",
+    "CREATE INDEX IF NOT EXISTS idx_actividades_tipo ON actividades (tipo, fecha)",
+    "CREATE INDEX IF NOT EXISTS idx_actividades_usuario ON actividades (usuario, fecha)",
+    "CREATE TABLE IF NOT EXISTS conteo_diario ("
+    " dia TEXT NOT NULL,"
+    " tipo TEXT NOT NULL,"
+    " cantidad INTEGER NOT NULL,"
+    " PRIMARY KEY (dia, tipo))",
+)
+
+_COLUMNAS = "id, fecha, tipo, usuario, descripcion, detalles"
+
+
+def _fila_a_actividad(fila) -> Dict:
+    id_, fecha, tipo, usuario, descripcion, detalles = fila
+    try:
+        detalles = json.loads(detalles) if detalles else {}
+    except ValueError:
+        detalles = {}
+    # Mismas claves que el historial de Firebase ('timestamp' para quien ordene por él)
+    return {"id": id_, "tipo": tipo, "descripcion": descripcion, "usuario": usuario,
+            "fecha": fecha, "timestamp": fecha, "detalles": detalles}
+
+
+class HistorialLocal:
+    """Actividades en un archivo SQLite: solo se agregan, se leen por índice"""
+
+    def __init__(self, ruta: str = "data/historial_local.sqlite",
+                 json_anterior: Optional[str] = "data/historial_local.json"):
+        self.ruta = Path(ruta)
+        self.json_anterior = Path(json_anterior) if json_anterior else None
+        self._lock = threading.Lock()
+        self._conexion: Optional[sqlite3.Connection] = None
+
+    def _conectar(self) -> sqlite3.Connection:
+        """Conexión compartida (se abre al primer uso); llamar con el lock tomado"""
+        if self._conexion is None:
+            self.ruta.parent.mkdir(exist_ok=True)
+            conexion = sqlite3.connect(self.ruta, check_same_thread=False)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            with conexion:
+                for sentencia in _ESQUEMA:
+                    conexion.execute(sentencia)
+            self._conexion = conexion
+            self._importar_json_anterior()
+        return self._conexion
+
+    def _importar_json_anterior(self) -> None:
+        if self.json_anterior is None or not self.json_anterior.exists():
+            return
+        if self._conexion.execute("SELECT 1 FROM actividades LIMIT 1").fetchone():
+            return
+        try:
+            with open(self.json_anterior, 'r', encoding='utf-8') as f:
+                anteriores = json.load(f)
+        except Exception as e:
+            print(f"[WARN] No se pudo importar {self.json_anterior}: {e}")
+            return
+        # El JSON está más reciente primero: se agregan en orden cronológico
+        actividades = [a for a in reversed(anteriores) if isinstance(a, Mapping)]
+        with self._conexion:
+            for actividad in actividades:
+                self._insertar(actividad)
+        print(f"[OK] Historial local: {len(actividades)} actividades importadas de {self.json_anterior}")
+
+    def _insertar(self, actividad: Mapping) -> int:
+        fecha = str(actividad.get("fecha") or actividad.get("timestamp") or datetime.now().isoformat())
+        dia = fecha[:10]
+        tipo = str(actividad.get("tipo") or "otro")
+        detalles = actividad.get("detalles")
+        cursor = self._conexion.execute(
+            "INSERT INTO actividades (fecha, dia, tipo, usuario, descripcion, detalles) VALUES (?, ?, ?, ?, ?, ?)",
+            (fecha, dia, tipo, actividad.get("usuario"), actividad.get("descripcion"),
+             json.dumps(detalles, ensure_ascii=False, default=str) if detalles else None)
+        )
+        self._conexion.execute(
+            "INSERT INTO conteo_diario VALUES (?, ?, 1)"
+            " ON CONFLICT (dia, tipo) DO UPDATE SET cantidad = cantidad + 1",
+            (dia, tipo)
+        )
+        return cursor.lastrowid
+
+    def agregar(self, actividad: Mapping) -> int:
+        """Agrega la actividad (un INSERT y un contador) y devuelve su id"""
+        with self._lock:
+            conexion = self._conectar()
+            with conexion:
+                return self._insertar(actividad)
+
+    def recientes(self, limite: int = 50, tipo: Optional[str] = None, usuario: Optional[str] = None) -> List[Dict]:
+        """Las `limite` actividades más recientes (opcionalmente de un tipo o usuario)"""
+        condiciones, parametros = [], []
+        if tipo is not None:
+            condiciones.append("tipo = ?")
+            parametros.append(tipo)
+        if usuario is not None:
+            condiciones.append("usuario = ?")
+            parametros.append(usuario)
+        where = f" WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        with self._lock:
+            filas = self._conectar().execute(
+                f"SELECT {_COLUMNAS} FROM actividades{where} ORDER BY fecha DESC, id DESC LIMIT ?",
+                (*parametros, limite)
+            ).fetchall()
+        return [_fila_a_actividad(fila) for fila in filas]
+
+    def conteo_del_dia(self, dia: Optional[str] = None) -> Dict[str, int]:
+        """{tipo: cantidad} de un día (YYYY-MM-DD, hoy por defecto)"""
+        dia = dia or datetime.now().strftime("%Y-%m-%d")
+        with self._lock:
+            filas = self._conectar().execute(
+                "SELECT tipo, cantidad FROM conteo_diario WHERE dia = ?", (dia,)
+            ).fetchall()
+        return dict(filas)
+
+    def ultimo_id(self) -> int:
+        """Id de la última actividad (0 si no hay): cambia con cada agregado"""
+        with self._lock:
+            fila = self._conectar().execute("SELECT MAX(id) FROM actividades").fetchone()
+        return fila[0] or 0
+
+    def cerrar(self) -> None:
+        with self._lock:
+            if self._conexion is not None:
+                self._conexion.close()
+                self._conexion = None
+
+
+# Instancia global
+historial_local = HistorialLocal()
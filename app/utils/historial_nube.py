@@ -0,0 +1,218 @@
+"""
+Historial en Firestore con escritura diferida y agrupada por hora.
+
+Antes cada actividad era un documento de 'historial' (una escritura por
+acción y una lectura por actividad al mostrar el dashboard). Ahora las
+actividades se juntan en memoria y se escriben de a varias en documentos de
+'historial_horas', uno por hora ('2024-03-01T10'):
+
+    {'hora': '2024-03-01T10', 'dia': '2024-03-01', 'actividades': [...]}
+
+Cada vaciado es un solo batch con un set(merge) por hora tocada (ArrayUnion
+de las actividades, cada una con su id) y la subida de la versión de
+'historial_horas' en _metadatos (ver versiones_colecciones), que version()
+lee para saber si otra PC escribió. Reintentar un batch que el servidor ya
+había confirmado no duplica nada, por eso los conteos del día se calculan
+de las actividades al leer y no con Increment. Se vacía cada
+INTERVALO_VACIADO segundos, al juntar MAX_PENDIENTES actividades y al
+cerrar la app (cerrar()). Leer las recientes cuesta un documento por hora
+con actividad, y las estadísticas del día como mucho 24 documentos.
+
+Un documento admite ~1 MiB: alcanza para unas 3000 actividades por hora.
+"""
+
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Mapping, Optional
+
+from app.utils.monitor_firebase import monitor_firebase
+from app.utils.versiones_colecciones import leer_version, subir_version
+
+COLECCION_HORAS = 'historial_horas'
+INTERVALO_VACIADO = 30.0  # segundos
+MAX_PENDIENTES = 200
+HORAS_POR_LECTURA = 6
+MAX_HORAS_LECTURA = 24 * 7  # Las recientes se buscan como mucho una semana atrás
+
+
+def _hora(actividad: Mapping) -> str:
+    return str(actividad.get("fecha") or datetime.now().isoformat())[:13]
+
+
+class HistorialNube:
+    """Buffer de actividades que se escribe en Firestore por lotes, agrupado por hora"""
+
+    def __init__(self, db=None, intervalo: float = INTERVALO_VACIADO, max_pendientes: int = MAX_PENDIENTES):
+        self._db_inyectada = db
+        self.intervalo = intervalo
+        self.max_pendientes = max_pendientes
+        self._pendientes: List[Dict] = []
+        self._lock = threading.Lock()
+        self._lock_vaciado = threading.Lock()  # Un vaciado a la vez
+        self._temporizador: Optional[threading.Timer] = None
+
+    @property
+    def _db(self):
+        if self._db_inyectada is None:
+            from conexiones.firebase import db
+            return db
+        return self._db_inyectada
+
+    # ------------------------------------------------------------------
+    # Escritura diferida
+    # ------------------------------------------------------------------
+
+    def agregar(self, actividad: Mapping) -> None:
+        """Encola la actividad (no toca Firestore); se escribe en el próximo vaciado"""
+        actividad = dict(actividad)
+        actividad.setdefault("id", uuid.uuid4().hex)  # Distingue actividades iguales dentro del ArrayUnion
+        with self._lock:
+            self._pendientes.append(actividad)
+            lleno = len(self._pendientes) >= self.max_pendientes
+            if not lleno:
+                self._programar()
+        if lleno:
+            from app.utils.firestore_async import ejecutor
+            ejecutor().submit(self.vaciar)
+
+    def _programar(self) -> None:
+        """Arma el temporizador del próximo vaciado si no hay uno (con el lock tomado)"""
+        if self._temporizador is None and self.intervalo is not None:
+            self._temporizador = threading.Timer(self.intervalo, self.vaciar)
+            self._temporizador.daemon = True
+            self._temporizador.start()
+
+    def pendientes(self) -> int:
+        with self._lock:
+            return len(self._pendientes)
+
+    def vaciar(self) -> int:
+        """
+        Escribe las actividades pendientes (un batch, un documento por hora).
+        Si falla se vuelven a encolar para el próximo intento. Devuelve
+        cuántas actividades se escribieron.
+        """
+        from google.cloud import firestore
+        with self._lock_vaciado:
+            with self._lock:
+                lote, self._pendientes = self._pendientes, []
+                if self._temporizador is not None:
+                    self._temporizador.cancel()
+                    self._temporizador = None
+            if not lote:
+                return 0
+
+            por_hora: Dict[str, List[Dict]] = {}
+            for actividad in lote:
+                por_hora.setdefault(_hora(actividad), []).append(actividad)
+            try:
+                db = self._db
+                batch = db.batch()
+                for hora, actividades in por_hora.items():
+                    batch.set(db.collection(COLECCION_HORAS).document(hora), {
+                        "hora": hora,
+                        "dia": hora[:10],
+                        "actividades": firestore.ArrayUnion(actividades),
+                    }, merge=True)
+                subir_version(batch, db, [COLECCION_HORAS])
+                inicio = time.perf_counter()
+                batch.commit()
+                duracion = time.perf_counter() - inicio
+            except Exception as e:
+                print(f"[WARN] No se pudo escribir el historial ({len(lote)} actividades), se reintentará: {e}")
+                with self._lock:
+                    self._pendientes[:0] = lote
+                    self._programar()
+                return 0
+
+        monitor_firebase.registrar_consulta(
+            tipo='escritura',
+            coleccion=COLECCION_HORAS,
+            descripcion=f'Historial: {len(lote)} actividades',
+            cantidad_docs=len(por_hora) + 1,
+            duracion=duracion
+        )
+        return len(lote)
+
+    def cerrar(self) -> None:
+        """Vacía lo pendiente (al cerrar la app)"""
+        try:
+            escritas = self.vaciar()
+            if escritas:
+                print(f"[OK] Historial: {escritas} actividades pendientes guardadas en Firebase")
+        except Exception as e:
+            print(f"[ERROR] Error al guardar el historial pendiente: {e}")
+
+    # ------------------------------------------------------------------
+    # Lecturas (síncronas: llamar con firestore_async.ejecutar)
+    # ------------------------------------------------------------------
+
+    def recientes(self, limite: int = 50, tipo: Optional[str] = None, usuario: Optional[str] = None) -> List[Dict]:
+        """Las `limite` actividades más recientes (incluye las aún no escritas), más nuevas primero"""
+        def coincide(actividad):
+            return ((tipo is None or actividad.get("tipo") == tipo) and
+                    (usuario is None or actividad.get("usuario") == usuario))
+
+        with self._lock:
+            resultado = [a for a in reversed(self._pendientes) if coincide(a)][:limite]
+        # Las pendientes pueden escribirse mientras se lee: no repetirlas
+        vistas = {a["id"] for a in resultado}
+
+        consulta = self._db.collection(COLECCION_HORAS).order_by("hora", direction="DESCENDING")
+        ultimo, leidas = None, 0
+        inicio = time.perf_counter()
+        while len(resultado) < limite and leidas < MAX_HORAS_LECTURA:
+            pagina = consulta.start_after(ultimo) if ultimo is not None else consulta
+            horas = list(pagina.limit(HORAS_POR_LECTURA).stream())
+            leidas += len(horas)
+            for hora in horas:
+                for actividad in reversed((hora.to_dict() or {}).get("actividades", [])):
+                    if coincide(actividad) and actividad.get("id") not in vistas:
+                        resultado.append(actividad)
+            if len(horas) < HORAS_POR_LECTURA:
+                break
+            ultimo = horas[-1]
+
+        if leidas:
+            monitor_firebase.registrar_consulta(
+                tipo='lectura', coleccion=COLECCION_HORAS,
+                descripcion='Historial reciente', cantidad_docs=leidas,
+                duracion=time.perf_counter() - inicio
+            )
+        return resultado[:limite]
+
+    def version(self) -> Optional[int]:
+        """Versión del historial en Firestore (sube con el vaciado de cualquier PC); 1 lectura"""
+        actual = leer_version(COLECCION_HORAS, db=self._db)
+        return actual['version'] if actual else None
+
+    def conteo_del_dia(self, dia: Optional[str] = None) -> Dict[str, int]:
+        """{tipo: cantidad} de un día (YYYY-MM-DD, hoy por defecto), contando las actividades de cada hora"""
+        from google.cloud.firestore_v1.base_query import FieldFilter
+        dia = dia or datetime.now().strftime("%Y-%m-%d")
+        with monitor_firebase.medir('lectura', COLECCION_HORAS, f'Estadísticas del {dia}') as consulta:
+            horas = list(self._db.collection(COLECCION_HORAS).where(filter=FieldFilter("dia", "==", dia)).stream())
+            consulta['cantidad_docs'] = max(1, len(horas))
+        conteo: Dict[str, int] = {}
+        vistas = set()
+
+        def contar(actividad):
+            tipo = str(actividad.get("tipo") or "otro")
+            conteo[tipo] = conteo.get(tipo, 0) + 1
+
+        for hora in horas:
+            for actividad in (hora.to_dict() or {}).get("actividades", []):
+                vistas.add(actividad.get("id"))
+                contar(actividad)
+        with self._lock:
+            # Una pendiente reencolada tras un commit sin respuesta puede estar ya escrita
+            for actividad in self._pendientes:
+                if str(actividad.get("fecha", ""))[:10] == dia and actividad["id"] not in vistas:
+                    contar(actividad)
+        return conteo
+
+
+# Instancia global
+historial_nube = HistorialNube()
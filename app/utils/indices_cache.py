@@ -0,0 +1,731 @@
+"""
+Índices en memoria sobre las colecciones del cache.
+
+CacheFirebase mantiene un índice por colección junto a su tupla de
+registros: se reconstruye cuando se publica la colección completa y se
+actualiza documento por documento con los deltas (revalidación por versión
+y escuchas), así buscar un modelo no recorre la colección. Cada grupo
+lleva además la suma de `cantidad` al día: existencias por modelo y
+ocupación por estantería salen sin sumar la lista.
+
+Los índices siguen el mismo copy-on-write que las tuplas: el cache arma uno
+nuevo con copiar() + aplicar() y lo publica junto con la lista, nunca
+modifica el que ya está publicado. Para que un delta de un documento no
+copie la colección entera, los mapas grandes se copian en capas (_Capas:
+la base se comparte y la copia lleva solo sus cambios) y la lista ordenada
+de la búsqueda también (_ListaOrdenada); cada MAX_CAMBIOS cambios se
+consolidan en una base nueva.
+
+Los índices con BAJO_DEMANDA = True (búsqueda de texto) no se construyen al
+publicar la colección completa sino la primera vez que alguien los pide.
+"""
+
+import heapq
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Set, Tuple
+
+from app.models import Registro, normalizar_modelo
+from app.utils.tablas_cache import TablaMovimientos, TablaProductos, TablaUbicaciones
+
+
+def cantidad_de(documento: Registro) -> int:
+    """Cantidad del documento como entero (0 si falta o no es numérica), igual que la columna de la tabla"""
+    valor = documento.get('cantidad', 0) or 0
+    try:
+        return int(valor)
+    except (ValueError, TypeError):
+        try:
+            return int(float(valor))
+        except (ValueError, TypeError, OverflowError):
+            return 0
+
+
+def clave_estanteria(almacen, estanteria) -> Tuple[str, str]:
+    """Clave de una estantería: almacén como texto y estantería en mayúsculas"""
+    almacen = '' if almacen is None else str(almacen).strip()
+    estanteria = '' if estanteria is None else str(estanteria).strip().upper()
+    return almacen, estanteria
+
+
+# Cambios acumulados en una copia a partir de los cuales copiar() consolida una base nueva
+MAX_CAMBIOS = 2048
+
+_FALTA = object()
+_BORRADO = object()
+
+
+class _Capas:
+    """
+    Mapa copy-on-write: una base compartida que nunca se modifica y los
+    cambios propios de esta copia (_BORRADO marca una clave quitada).
+    Las lecturas miran primero los cambios y después la base.
+    """
+
+    __slots__ = ('_base', '_cambios', '_largo')
+
+    def __init__(self, base: Dict, cambios: Optional[Dict] = None, largo: Optional[int] = None):
+        self._base = base
+        self._cambios = {} if cambios is None else cambios
+        self._largo = len(base) if largo is None else largo
+
+    @classmethod
+    def de(cls, mapa) -> '_Capas':
+        """Copia de un dict o de otro _Capas que comparte la base (solo copia los cambios)"""
+        if not isinstance(mapa, _Capas):
+            return cls(mapa)
+        if len(mapa._cambios) >= MAX_CAMBIOS:
+            return cls(mapa.consolidado())
+        return cls(mapa._base, dict(mapa._cambios), mapa._largo)
+
+    def consolidado(self) -> Dict:
+        """Dict nuevo con la base y los cambios aplicados"""
+        base = dict(self._base)
+        for clave, valor in self._cambios.items():
+            if valor is _BORRADO:
+                base.pop(clave, None)
+            else:
+                base[clave] = valor
+        return base
+
+    def get(self, clave, defecto=None):
+        valor = self._cambios.get(clave, _FALTA)
+        if valor is _FALTA:
+            return self._base.get(clave, defecto)
+        return defecto if valor is _BORRADO else valor
+
+    def __getitem__(self, clave):
+        valor = self.get(clave, _FALTA)
+        if valor is _FALTA:
+            raise KeyError(clave)
+        return valor
+
+    def __contains__(self, clave) -> bool:
+        return self.get(clave, _FALTA) is not _FALTA
+
+    def __setitem__(self, clave, valor) -> None:
+        if clave not in self:
+            self._largo += 1
+        self._cambios[clave] = valor
+
+    def pop(self, clave, defecto=_FALTA):
+        valor = self.get(clave, _FALTA)
+        if valor is _FALTA:
+            if defecto is _FALTA:
+                raise KeyError(clave)
+            return defecto
+        if clave in self._base:
+            self._cambios[clave] = _BORRADO
+        else:
+            del self._cambios[clave]
+        self._largo -= 1
+        return valor
+
+    def items(self) -> Iterator[Tuple]:
+        cambios = self._cambios
+        for clave, valor in self._base.items():
+            if clave not in cambios:
+                yield clave, valor
+        for clave, valor in cambios.items():
+            if valor is not _BORRADO:
+                yield clave, valor
+
+    def keys(self) -> Iterator:
+        return (clave for clave, _ in self.items())
+
+    def values(self) -> Iterator:
+        return (valor for _, valor in self.items())
+
+    __iter__ = keys
+
+    def __len__(self) -> int:
+        return self._largo
+
+
+class _ListaOrdenada:
+    """
+    Lista ordenada sin repetidos con el mismo copy-on-write que _Capas: la
+    base se comparte y cada copia lleva sus agregados (ordenados) y quitados.
+    """
+
+    __slots__ = ('_base', '_agregados', '_quitados')
+
+    def __init__(self, base: List, agregados: Optional[List] = None, quitados: Optional[Set] = None):
+        self._base = base
+        self._agregados = [] if agregados is None else agregados
+        self._quitados = set() if quitados is None else quitados
+
+    def copiar(self) -> '_ListaOrdenada':
+        if len(self._agregados) + len(self._quitados) >= MAX_CAMBIOS:
+            return _ListaOrdenada(list(self.desde(None)))
+        return _ListaOrdenada(self._base, list(self._agregados), set(self._quitados))
+
+    def agregar(self, elemento) -> None:
+        if elemento in self._quitados:
+            self._quitados.discard(elemento)  # Sigue en la base
+        else:
+            insort(self._agregados, elemento)
+
+    def quitar(self, elemento) -> None:
+        posicion = bisect_left(self._agregados, elemento)
+        if posicion < len(self._agregados) and self._agregados[posicion] == elemento:
+            del self._agregados[posicion]
+            return
+        posicion = bisect_left(self._base, elemento)
+        if posicion < len(self._base) and self._base[posicion] == elemento:
+            self._quitados.add(elemento)
+
+    def desde(self, inicio) -> Iterator:
+        """Elementos >= inicio en orden (todos con inicio None)"""
+        if inicio is None:
+            base, agregados = iter(self._base), iter(self._agregados)
+        else:
+            base = (self._base[i] for i in range(bisect_left(self._base, inicio), len(self._base)))
+            agregados = iter(self._agregados[bisect_left(self._agregados, inicio):])
+        quitados = self._quitados
+        for elemento in heapq.merge(base, agregados) if self._agregados else base:
+            if not quitados or elemento not in quitados:
+                yield elemento
+
+    def __len__(self) -> int:
+        return len(self._base) + len(self._agregados) - len(self._quitados)
+
+
+class _Grupos:
+    """Clave -> registros con esa clave, con el total de cantidad de cada grupo"""
+
+    __slots__ = ('registros', 'totales')
+
+    def __init__(self):
+        self.registros: Dict[Hashable, Tuple[Registro, ...]] = {}
+        self.totales: Dict[Hashable, int] = {}
+
+    def copiar(self) -> '_Grupos':
+        nuevo = _Grupos()
+        nuevo.registros = _Capas.de(self.registros)
+        nuevo.totales = _Capas.de(self.totales)
+        return nuevo
+
+    def agregar(self, clave: Hashable, documento: Registro) -> None:
+        self.registros[clave] = self.registros.get(clave, ()) + (documento,)
+        self.totales[clave] = self.totales.get(clave, 0) + cantidad_de(documento)
+
+    def quitar(self, clave: Hashable, documento: Registro) -> None:
+        firebase_id = documento.get('firebase_id')
+        actuales = self.registros.get(clave, ())
+        restantes = tuple(d for d in actuales if d.get('firebase_id') != firebase_id)
+        if not restantes:
+            self.registros.pop(clave, None)
+            self.totales.pop(clave, None)
+            return
+        self.registros[clave] = restantes
+        # Se resta la cantidad del registro que estaba indexado, no la del que llega
+        quitados = sum(cantidad_de(d) for d in actuales if d.get('firebase_id') == firebase_id)
+        self.totales[clave] -= quitados
+
+
+class IndiceModelo:
+    """Modelo normalizado (sin mayúsculas ni espacios) -> registros con ese modelo y su cantidad total"""
+
+    __slots__ = ('_por_modelo',)
+
+    BAJO_DEMANDA = False
+
+    def __init__(self, documentos: Iterable[Registro] = ()):
+        self._por_modelo = _Grupos()
+        for documento in documentos:
+            self._agregar(documento)
+
+    def copiar(self) -> 'IndiceModelo':
+        nuevo = self.__class__()
+        nuevo._por_modelo = self._por_modelo.copiar()
+        return nuevo
+
+    def aplicar(self, anterior: Optional[Registro], nuevo: Optional[Registro]) -> None:
+        """Refleja que el documento `anterior` pasó a ser `nuevo` (None = no existe)"""
+        if anterior is not None:
+            self._quitar(anterior)
+        if nuevo is not None:
+            self._agregar(nuevo)
+
+    def _agregar(self, documento: Registro) -> None:
+        self._por_modelo.agregar(normalizar_modelo(documento.get('modelo')), documento)
+
+    def _quitar(self, documento: Registro) -> None:
+        self._por_modelo.quitar(normalizar_modelo(documento.get('modelo')), documento)
+
+    def buscar(self, modelo) -> Optional[Registro]:
+        """Primer registro con ese modelo, o None"""
+        registros = self._por_modelo.registros.get(normalizar_modelo(modelo))
+        return registros[0] if registros else None
+
+    def todos(self, modelo) -> Tuple[Registro, ...]:
+        """Todos los registros con ese modelo"""
+        return self._por_modelo.registros.get(normalizar_modelo(modelo), ())
+
+    def total_modelo(self, modelo) -> int:
+        """Suma de `cantidad` de los registros con ese modelo"""
+        return self._por_modelo.totales.get(normalizar_modelo(modelo), 0)
+
+    def __contains__(self, modelo) -> bool:
+        return normalizar_modelo(modelo) in self._por_modelo.registros
+
+    def __len__(self) -> int:
+        return len(self._por_modelo.registros)
+
+
+class IndiceUbicaciones(IndiceModelo):
+    """
+    Además del modelo, indexa las ubicaciones por (almacén, estantería) con su
+    ocupación total, y lleva aparte las que tienen existencias (cantidad > 0).
+    """
+
+    __slots__ = ('_por_estanteria', '_con_existencias')
+
+    def __init__(self, documentos: Iterable[Registro] = ()):
+        self._por_estanteria = _Grupos()
+        self._con_existencias: Dict[str, Registro] = {}
+        super().__init__(documentos)
+
+    def copiar(self) -> 'IndiceUbicaciones':
+        nuevo = super().copiar()
+        nuevo._por_estanteria = self._por_estanteria.copiar()
+        nuevo._con_existencias = _Capas.de(self._con_existencias)
+        return nuevo
+
+    def _agregar(self, documento: Registro) -> None:
+        super()._agregar(documento)
+        self._por_estanteria.agregar(self._clave_estanteria(documento), documento)
+        if cantidad_de(documento) > 0:
+            self._con_existencias[documento.get('firebase_id')] = documento
+
+    def _quitar(self, documento: Registro) -> None:
+        super()._quitar(documento)
+        self._por_estanteria.quitar(self._clave_estanteria(documento), documento)
+        self._con_existencias.pop(documento.get('firebase_id'), None)
+
+    @staticmethod
+    def _clave_estanteria(documento: Registro) -> Tuple[str, str]:
+        return clave_estanteria(documento.get('almacen'), documento.get('estanteria'))
+
+    def en_estanteria(self, almacen, estanteria) -> Tuple[Registro, ...]:
+        """Ubicaciones de una estantería de un almacén"""
+        return self._por_estanteria.registros.get(clave_estanteria(almacen, estanteria), ())
+
+    def total_estanteria(self, almacen, estanteria) -> int:
+        """Unidades guardadas en una estantería"""
+        return self._por_estanteria.totales.get(clave_estanteria(almacen, estanteria), 0)
+
+    def estanterias(self) -> Dict[Tuple[str, str], int]:
+        """(almacén, estantería) -> unidades, de todas las estanterías ocupadas"""
+        return dict(self._por_estanteria.totales)
+
+    def con_existencias(self) -> Tuple[Registro, ...]:
+        """Ubicaciones con cantidad > 0 (origen posible de una salida o traslado)"""
+        return tuple(self._con_existencias.values())
+
+
+# ----------------------------------------------------------------------
+# Búsqueda de texto
+# ----------------------------------------------------------------------
+
+LARGO_MINIMO_CORRECCION = 4  # Palabras más cortas no se corrigen (demasiadas variantes válidas)
+LETRAS_CORRECCION = 'abcdefghijklmnopqrstuvwxyz0123456789-'
+
+# Con límite, candidatos a puntuar como máximo en consultas muy amplias ('a', 'ca')
+MAX_PUNTUADOS = 5000
+
+# Nivel de coincidencia, de mejor a peor
+EXACTO, PREFIJO, PREFIJO_PALABRA, CONTIENE, APROXIMADO = range(5)
+
+# Lo que separa palabras: todo lo que no es letra ni dígito
+_SEPARADOR = re.compile(r'[\W_]')
+_SEPARADORES = re.compile(r'[\W_]+')
+
+
+def normalizar_texto(valor) -> str:
+    """Minúsculas, sin espacios en los extremos y sin acentos ('Almacén' -> 'almacen')"""
+    if valor is None:
+        return ''
+    texto = str(valor).strip().lower()
+    if texto.isascii():
+        return texto
+    texto = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def trigramas(texto: str) -> Set[str]:
+    """Trigramas del texto con un espacio de borde (así 'a1' también tiene trigramas)"""
+    relleno = f" {texto} "
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+def variantes_edicion(palabra: str) -> Set[str]:
+    """Palabras a una edición de distancia: borrar, trasponer, cambiar o insertar un carácter"""
+    partes = [(palabra[:i], palabra[i:]) for i in range(len(palabra) + 1)]
+    borradas = {a + b[1:] for a, b in partes if b}
+    traspuestas = {a + b[1] + b[0] + b[2:] for a, b in partes if len(b) > 1}
+    cambiadas = {a + c + b[1:] for a, b in partes if b for c in LETRAS_CORRECCION}
+    insertadas = {a + c + b for a, b in partes for c in LETRAS_CORRECCION}
+    return borradas | traspuestas | cambiadas | insertadas
+
+
+def nivel_coincidencia(consulta: str, textos: Tuple[str, ...]) -> Optional[int]:
+    """EXACTO/PREFIJO sobre el campo principal, luego PREFIJO_PALABRA/CONTIENE en cualquiera; None si no aparece"""
+    principal = textos[0]
+    if principal == consulta:
+        return EXACTO
+    if principal.startswith(consulta):
+        return PREFIJO
+    nivel = None
+    for texto in textos:
+        posicion = texto.find(consulta)
+        while posicion >= 0:
+            if posicion == 0 or _SEPARADOR.match(texto, posicion - 1):
+                return PREFIJO_PALABRA
+            nivel = CONTIENE
+            posicion = texto.find(consulta, posicion + 1)
+    return nivel
+
+
+class IndiceTexto:
+    """
+    Índice de trigramas sobre los CAMPOS de una colección (el primero es el
+    principal: modelo o nombre), la lista ordenada de valores principales y
+    el vocabulario (palabra -> registros que la usan).
+
+    - Modelo exacto y prefijo del modelo salen de la lista ordenada (bisect).
+    - El resto de coincidencias sale de intersectar las listas de trigramas
+      (consultas de 3+ caracteres) o de las claves que contienen la consulta
+      (1-2 caracteres); nunca se recorren todos los registros.
+    - Cada candidato se verifica sobre sus "bordes": los campos unidos con
+      los separadores cambiados por espacios, así "prefijo de palabra" es
+      buscar ' ' + consulta (la consulta con separadores usa nivel_coincidencia).
+    - Con límite se corta en cuanto hay suficientes coincidencias buenas y
+      se puntúan a lo sumo MAX_PUNTUADOS candidatos; sin límite los
+      candidatos salen de operaciones de conjuntos (en C).
+    - Si faltan resultados, cada palabra desconocida de la consulta se
+      corrige a la más usada del vocabulario a una edición de distancia
+      ('tornilo' -> 'tornillo') y se agregan esos resultados como aproximados.
+    """
+
+    __slots__ = ('_documentos', '_textos', '_bordes', '_postings', '_propias', '_principales', '_vocabulario',
+                 '_orden')
+
+    CAMPOS: Tuple[str, ...] = ()
+    BAJO_DEMANDA = True
+
+    def __init__(self, documentos: Iterable[Registro] = ()):
+        self._documentos: Dict[str, Registro] = {}
+        self._textos: Dict[str, Tuple[str, ...]] = {}
+        self._bordes: Dict[str, str] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self._propias: Optional[Set[str]] = None  # None: todas las listas son de este índice
+        self._vocabulario: Dict[str, int] = {}
+        self._orden: Optional[List[str]] = None  # Ids por valor principal, se arma en la primera búsqueda amplia
+
+        # Construcción completa sin pasar por _agregar (es el camino caliente de una carga)
+        unicos = {d.get('firebase_id'): d for d in documentos if d.get('firebase_id') is not None}
+        postings = self._postings
+        vocabulario = self._vocabulario
+        principales = []
+        for doc_id, documento in unicos.items():
+            textos = self._textos_de(documento)
+            self._documentos[doc_id] = documento
+            self._textos[doc_id] = textos
+            self._bordes[doc_id] = self._bordes_de(textos)
+            principales.append((textos[0], doc_id))
+            for palabra in self._palabras_de(textos):
+                vocabulario[palabra] = vocabulario.get(palabra, 0) + 1
+            for trigrama in self._trigramas_de(textos):
+                lista = postings.get(trigrama)
+                if lista is None:
+                    postings[trigrama] = {doc_id}
+                else:
+                    lista.add(doc_id)
+        principales.sort()
+        self._principales = _ListaOrdenada(principales)
+
+    def copiar(self) -> 'IndiceTexto':
+        """Copia en capas: comparte los mapas y las listas de trigramas, copia solo lo que modifique"""
+        nuevo = self.__class__()
+        nuevo._documentos = _Capas.de(self._documentos)
+        nuevo._textos = _Capas.de(self._textos)
+        nuevo._bordes = _Capas.de(self._bordes)
+        nuevo._postings = _Capas.de(self._postings)
+        nuevo._propias = set()
+        nuevo._principales = self._principales.copiar()
+        nuevo._vocabulario = _Capas.de(self._vocabulario)
+        return nuevo
+
+    def aplicar(self, anterior: Optional[Registro], nuevo: Optional[Registro]) -> None:
+        """Refleja que el documento `anterior` pasó a ser `nuevo` (None = no existe)"""
+        if anterior is not None and (nuevo is None or nuevo.get('firebase_id') != anterior.get('firebase_id')):
+            self._quitar(anterior)
+        if nuevo is not None:
+            self._agregar(nuevo)
+        self._orden = None
+
+    def _textos_de(self, documento: Registro) -> Tuple[str, ...]:
+        return tuple(normalizar_texto(documento.get(campo)) for campo in self.CAMPOS)
+
+    @staticmethod
+    def _bordes_de(textos: Tuple[str, ...]) -> str:
+        return ' ' + _SEPARADORES.sub(' ', ' '.join(textos))
+
+    @staticmethod
+    def _trigramas_de(textos: Tuple[str, ...]) -> Set[str]:
+        # Cada campo con sus bordes; los trigramas que cruzan de un campo al otro no se guardan
+        return {trigrama for trigrama in trigramas(' \0 '.join(textos)) if '\0' not in trigrama}
+
+    @staticmethod
+    def _palabras_de(textos: Tuple[str, ...]) -> Set[str]:
+        return set(' '.join(textos).split())
+
+    def _lista(self, trigrama: str) -> Set[str]:
+        """Lista de ids del trigrama, copiada si todavía es compartida con el índice publicado"""
+        lista = self._postings.get(trigrama)
+        if lista is None:
+            lista = self._postings[trigrama] = set()
+            if self._propias is not None:
+                self._propias.add(trigrama)
+        elif self._propias is not None and trigrama not in self._propias:
+            lista = self._postings[trigrama] = set(lista)
+            self._propias.add(trigrama)
+        return lista
+
+    def _sacar_de_lista(self, trigrama: str, doc_id: str) -> None:
+        lista = self._lista(trigrama)
+        lista.discard(doc_id)
+        if not lista:
+            self._postings.pop(trigrama, None)
+
+    def _contar_palabras(self, palabras: Iterable[str], delta: int) -> None:
+        for palabra in palabras:
+            restantes = self._vocabulario.get(palabra, 0) + delta
+            if restantes > 0:
+                self._vocabulario[palabra] = restantes
+            else:
+                self._vocabulario.pop(palabra, None)
+
+    def _agregar(self, documento: Registro) -> None:
+        """Agrega el documento o, si ya estaba, toca solo los trigramas y palabras que cambiaron"""
+        doc_id = documento.get('firebase_id')
+        if doc_id is None:
+            return
+        textos = self._textos_de(documento)
+        anteriores = self._textos.get(doc_id)
+        self._documentos[doc_id] = documento
+        if textos == anteriores:
+            return
+        self._textos[doc_id] = textos
+        self._bordes[doc_id] = self._bordes_de(textos)
+
+        palabras, trigramas_nuevos = self._palabras_de(textos), self._trigramas_de(textos)
+        if anteriores is None:
+            palabras_viejas, trigramas_viejos = set(), set()
+            self._principales.agregar((textos[0], doc_id))
+        else:
+            palabras_viejas, trigramas_viejos = self._palabras_de(anteriores), self._trigramas_de(anteriores)
+            if anteriores[0] != textos[0]:
+                self._principales.quitar((anteriores[0], doc_id))
+                self._principales.agregar((textos[0], doc_id))
+
+        self._contar_palabras(palabras_viejas - palabras, -1)
+        self._contar_palabras(palabras - palabras_viejas, 1)
+        for trigrama in trigramas_viejos - trigramas_nuevos:
+            self._sacar_de_lista(trigrama, doc_id)
+        for trigrama in trigramas_nuevos - trigramas_viejos:
+            self._lista(trigrama).add(doc_id)
+
+    def _quitar(self, documento: Registro) -> None:
+        doc_id = documento.get('firebase_id')
+        textos = self._textos.pop(doc_id, None)
+        self._documentos.pop(doc_id, None)
+        self._bordes.pop(doc_id, None)
+        if textos is None:
+            return
+        self._principales.quitar((textos[0], doc_id))
+        self._contar_palabras(self._palabras_de(textos), -1)
+        for trigrama in self._trigramas_de(textos):
+            self._sacar_de_lista(trigrama, doc_id)
+
+    def _listas_de(self, consulta: str) -> Optional[List[Set[str]]]:
+        """Listas de trigramas de la consulta (de menor a mayor); None si alguna está vacía"""
+        listas = []
+        for i in range(len(consulta) - 2):
+            lista = self._postings.get(consulta[i:i + 3])
+            if not lista:
+                return None
+            listas.append(lista)
+        return sorted(listas, key=len)
+
+    def _candidatos(self, consulta: str) -> Iterator[str]:
+        """Ids cuyos textos pueden contener la consulta (se generan a medida que se piden)"""
+        if len(consulta) < 3:
+            vistos = set()
+            for trigrama, lista in self._postings.items():
+                if consulta in trigrama:
+                    for doc_id in lista:
+                        if doc_id not in vistos:
+                            vistos.add(doc_id)
+                            yield doc_id
+            return
+        listas = self._listas_de(consulta)
+        if listas is None:
+            return
+        primera, resto = listas[0], listas[1:]
+        for doc_id in primera:
+            if all(doc_id in lista for lista in resto):
+                yield doc_id
+
+    def _todos_los_candidatos(self, consulta: str) -> Set[str]:
+        """Los mismos ids que _candidatos, de una vez con uniones e intersecciones de conjuntos"""
+        if len(consulta) < 3:
+            return set().union(*(lista for trigrama, lista in self._postings.items() if consulta in trigrama))
+        listas = self._listas_de(consulta)
+        if listas is None:
+            return set()
+        return listas[0].intersection(*listas[1:])
+
+    def _coincidencias(self, consulta: str, limite: Optional[int]) -> Dict[str, int]:
+        """id -> nivel de los registros que contienen la consulta"""
+        encontrados: Dict[str, int] = {}
+
+        # Exacto y prefijo del campo principal: rango de la lista ordenada
+        for principal, doc_id in self._principales.desde((consulta,)):
+            if not principal.startswith(consulta):
+                break
+            encontrados[doc_id] = EXACTO if principal == consulta else PREFIJO
+            if limite is not None and len(encontrados) >= limite:
+                return encontrados
+
+        # Prefijo de palabra y "contiene", verificando cada candidato de los trigramas
+        textos_de, bordes_de = self._textos, self._bordes
+        sin_separadores = _SEPARADOR.search(consulta) is None
+        inicio_palabra = ' ' + consulta
+        if limite is None:
+            candidatos = self._todos_los_candidatos(consulta).difference(encontrados)
+            if sin_separadores:
+                # Todos los resultados: una sola pasada sin llamadas por candidato
+                encontrados.update({doc_id: PREFIJO_PALABRA if inicio_palabra in bordes else CONTIENE
+                                    for doc_id in candidatos if consulta in (bordes := bordes_de[doc_id])})
+                return encontrados
+        else:
+            candidatos = self._candidatos(consulta)
+        buenos = len(encontrados)
+        puntuados = 0
+        for doc_id in candidatos:
+            if limite is not None:
+                if doc_id in encontrados:
+                    continue
+                puntuados += 1
+                if puntuados > MAX_PUNTUADOS and len(encontrados) >= limite:
+                    break
+            if sin_separadores:
+                bordes = bordes_de[doc_id]
+                if inicio_palabra in bordes:
+                    nivel = PREFIJO_PALABRA
+                elif consulta in bordes:
+                    nivel = CONTIENE
+                else:
+                    continue
+            else:
+                nivel = nivel_coincidencia(consulta, textos_de[doc_id])
+                if nivel is None:
+                    continue
+            encontrados[doc_id] = nivel
+            if nivel <= PREFIJO_PALABRA:
+                buenos += 1
+                if limite is not None and buenos >= limite:
+                    break
+        return encontrados
+
+    def _ordenar(self, encontrados: Dict[str, int]) -> List[str]:
+        """Ids por nivel y, dentro de cada nivel, por valor principal"""
+        if len(encontrados) * 8 < len(self):
+            textos_de = self._textos
+            return sorted(encontrados, key=lambda doc_id: (encontrados[doc_id], textos_de[doc_id][0]))
+        # Muchos resultados: filtrar el orden ya armado y ordenar (estable) solo por nivel
+        if self._orden is None:
+            self._orden = [doc_id for _, doc_id in self._principales.desde(None)]
+        seleccion = [doc_id for doc_id in self._orden if doc_id in encontrados]
+        seleccion.sort(key=encontrados.__getitem__)
+        return seleccion
+
+    def corregir(self, consulta: str) -> Optional[str]:
+        """Consulta con cada palabra desconocida cambiada por la más usada a una edición; None si no hay"""
+        corregidas = []
+        for palabra in consulta.split():
+            if palabra in self._vocabulario or len(palabra) < LARGO_MINIMO_CORRECCION:
+                corregidas.append(palabra)
+                continue
+            opciones = [v for v in variantes_edicion(palabra) if v in self._vocabulario]
+            if not opciones:
+                return None
+            corregidas.append(max(opciones, key=lambda v: (self._vocabulario[v], v)))
+        corregida = ' '.join(corregidas)
+        return corregida if corregida != consulta else None
+
+    def buscar(self, texto, limite: Optional[int] = None, difuso: bool = True) -> List[Registro]:
+        """
+        Registros que coinciden con el texto: modelo exacto, prefijo del modelo,
+        prefijo de una palabra, contiene y aproximados, en ese orden (y por
+        valor principal dentro de cada nivel).
+
+        Args:
+            limite: cantidad máxima de resultados (None = todos)
+            difuso: agregar aproximados si faltan resultados (con límite) o no hubo ninguno
+        """
+        consulta = normalizar_texto(texto)
+        if not consulta:
+            return []
+        encontrados = self._coincidencias(consulta, limite)
+
+        faltan = not encontrados if limite is None else len(encontrados) < limite
+        corregida = self.corregir(consulta) if difuso and faltan else None
+        if corregida:
+            restantes = None if limite is None else limite - len(encontrados)
+            for doc_id, nivel in self._coincidencias(corregida, restantes).items():
+                # Aproximados: después de todos, ordenados por su nivel con la consulta corregida
+                encontrados.setdefault(doc_id, APROXIMADO * 10 + nivel)
+
+        orden = self._ordenar(encontrados)
+        if limite is not None:
+            orden = orden[:limite]
+        documentos = self._documentos
+        return [documentos[doc_id] for doc_id in orden]
+
+    def __len__(self) -> int:
+        return len(self._textos)
+
+
+class TextoProductos(IndiceTexto):
+    __slots__ = ()
+    CAMPOS = ('modelo', 'nombre', 'tipo', 'categoria')
+
+
+class TextoUbicaciones(IndiceTexto):
+    __slots__ = ()
+    CAMPOS = ('modelo', 'almacen', 'estanteria', 'observaciones')
+
+
+class TextoUsuarios(IndiceTexto):
+    __slots__ = ()
+    CAMPOS = ('nombre', 'id', 'email', 'firebase_id')
+
+
+class TextoMovimientos(IndiceTexto):
+    __slots__ = ()
+    CAMPOS = ('modelo', 'tipo', 'usuario', 'motivo', 'comentarios', 'ubicacion_origen', 'ubicacion_destino')
+
+
+# Colección -> índices que mantiene el cache ('modelo' es el que devuelve indice(coleccion);
+# 'tabla' es el DataFrame de tablas_cache, que sigue el mismo contrato)
+INDICES = {
+    'productos': {'modelo': IndiceModelo, 'texto': TextoProductos, 'tabla': TablaProductos},
+    'ubicaciones': {'modelo': IndiceUbicaciones, 'texto': TextoUbicaciones, 'tabla': TablaUbicaciones},
+    'usuarios': {'texto': TextoUsuarios},
+    'movimientos': {'texto': TextoMovimientos, 'tabla': TablaMovimientos},
+}
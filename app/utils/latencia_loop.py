@@ -0,0 +1,69 @@
+"""
+Medición del retraso (lag) del event loop de Flet.
+
+Una tarea duerme INTERVALO segundos una y otra vez; lo que tarda de más en
+despertar es tiempo en que el loop estuvo ocupado y la interfaz no respondía
+(p. ej. una llamada síncrona a Firestore dentro de un `async def`).
+"""
+
+import asyncio
+from collections import deque
+from typing import Dict, Optional
+
+INTERVALO_MEDICION = 0.1  # Segundos entre muestras
+UMBRAL_BLOQUEO = 0.25  # Retraso a partir del cual se avisa en consola
+
+
+class MonitorLatenciaLoop:
+    """Guarda las últimas muestras de retraso y resume promedio, p95 y máximo"""
+
+    def __init__(self, intervalo: float = INTERVALO_MEDICION, umbral_bloqueo: float = UMBRAL_BLOQUEO,
+                 muestras: int = 600):
+        self.intervalo = intervalo
+        self.umbral_bloqueo = umbral_bloqueo
+        self._muestras = deque(maxlen=muestras)
+        self._maximo = 0.0
+        self._bloqueos = 0
+        self._tarea: Optional[asyncio.Task] = None
+
+    def registrar(self, retraso: float) -> None:
+        retraso = max(0.0, retraso)
+        self._muestras.append(retraso)
+        self._maximo = max(self._maximo, retraso)
+        if retraso >= self.umbral_bloqueo:
+            self._bloqueos += 1
+            print(f"[WARN] Event loop bloqueado {retraso * 1000:.0f} ms")
+
+    async def medir(self) -> None:
+        """Bucle de medición; correr con page.run_task(monitor_latencia_loop.medir)"""
+        loop = asyncio.get_running_loop()
+        self._tarea = asyncio.current_task()
+        try:
+            while True:
+                inicio = loop.time()
+                await asyncio.sleep(self.intervalo)
+                self.registrar(loop.time() - inicio - self.intervalo)
+        except asyncio.CancelledError:
+            pass
+
+    def detener(self) -> None:
+        if self._tarea is not None and not self._tarea.done():
+            self._tarea.get_loop().call_soon_threadsafe(self._tarea.cancel)
+        self._tarea = None
+
+    def resumen(self) -> Dict:
+        """Retraso en milisegundos de las últimas muestras (y máximo de toda la sesión)"""
+        muestras = sorted(self._muestras)
+        if not muestras:
+            return {'muestras': 0, 'promedio_ms': 0.0, 'p95_ms': 0.0, 'maximo_ms': 0.0, 'bloqueos': 0}
+        return {
+            'muestras': len(muestras),
+            'promedio_ms': sum(muestras) / len(muestras) * 1000,
+            'p95_ms': muestras[min(len(muestras) - 1, int(len(muestras) * 0.95))] * 1000,
+            'maximo_ms': self._maximo * 1000,
+            'bloqueos': self._bloqueos,
+        }
+
+
+# Instancia global del monitor
+monitor_latencia_loop = MonitorLatenciaLoop()
@@ -1,85 +1,371 @@
-from datetime import datetime
-from typing import Dict, List
+"""
+Métricas de las consultas a Firebase.
+
+Antes cada consulta se guardaba en una lista que crecía toda la sesión y se
+imprimía un resumen de varias líneas en consola. Ahora el monitor guarda:
+
+  - las últimas MAX_CONSULTAS_RECIENTES consultas en un buffer circular;
+  - por (colección, tipo) un contador de operaciones y de documentos, y un
+    histograma de latencia (LIMITES_LATENCIA, en segundos) cuando quien
+    registra pasa la `duracion` (o usa `medir`);
+  - los totales de la sesión, y el uso diario por funcionalidad en
+    cuota_firebase.
+
+`escribir_instantaneas()` deja el estado en data/metricas_firebase.json y en
+formato de texto de Prometheus (data/metricas_firebase.prom);
+`iniciar_instantaneas()` lo repite cada INTERVALO_INSTANTANEAS segundos en un
+hilo aparte. El panel de diagnóstico de Configuración lee `instantanea()`.
+
+La consola queda en silencio salvo que se active `imprimir` (configuración
+"monitor_firebase_consola"): entonces es una línea por consulta.
+"""
+
 import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.utils.cuota_firebase import LIMITES_DIARIOS, cuota_firebase, funcionalidad_actual
+
+MAX_CONSULTAS_RECIENTES = 200
+LIMITES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+INTERVALO_INSTANTANEAS = 60.0  # segundos
+ARCHIVO_JSON = "metricas_firebase.json"
+ARCHIVO_PROMETHEUS = "metricas_firebase.prom"
+PREFIJO_PROMETHEUS = "totalstock"
+
+_CONTADORES = {'lectura': 'lecturas', 'escritura': 'escrituras', 'eliminacion': 'eliminaciones'}
+
+
+class HistogramaLatencia:
+    """Cubetas acumulables (como las de Prometheus) con suma, cuenta y máximo"""
+
+    __slots__ = ('cubetas', 'suma', 'cuenta', 'maximo')
+
+    def __init__(self):
+        self.cubetas = [0] * (len(LIMITES_LATENCIA) + 1)  # La última es +Inf
+        self.suma = 0.0
+        self.cuenta = 0
+        self.maximo = 0.0
+
+    def observar(self, segundos: float) -> None:
+        segundos = max(0.0, segundos)
+        self.cubetas[bisect_left(LIMITES_LATENCIA, segundos)] += 1
+        self.suma += segundos
+        self.cuenta += 1
+        self.maximo = max(self.maximo, segundos)
+
+    def percentil(self, p: float) -> float:
+        """Límite superior de la cubeta que contiene el percentil p (0-1); el máximo si cae en +Inf"""
+        if not self.cuenta:
+            return 0.0
+        objetivo = p * self.cuenta
+        acumulado = 0
+        for limite, cantidad in zip(LIMITES_LATENCIA, self.cubetas):
+            acumulado += cantidad
+            if acumulado >= objetivo:
+                return min(limite, self.maximo)
+        return self.maximo
+
+    def resumen(self) -> Dict:
+        return {
+            'cuenta': self.cuenta,
+            'suma_s': self.suma,
+            'promedio_ms': self.suma / self.cuenta * 1000 if self.cuenta else 0.0,
+            'p50_ms': self.percentil(0.5) * 1000,
+            'p95_ms': self.percentil(0.95) * 1000,
+            'maximo_ms': self.maximo * 1000,
+            'cubetas': list(self.cubetas),
+        }
+
+
+class MetricasOperacion:
+    """Contadores e histograma de una (colección, tipo)"""
+
+    __slots__ = ('operaciones', 'documentos', 'latencia')
+
+    def __init__(self):
+        self.operaciones = 0
+        self.documentos = 0
+        self.latencia = HistogramaLatencia()
+
+
+def _etiqueta(valor: str) -> str:
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _escribir_atomico(ruta: Path, texto: str) -> None:
+    """Escribe a un temporal y lo renombra: quien lea nunca ve un archivo a medias"""
+    temporal = ruta.with_name(ruta.name + ".tmp")
+    with open(temporal, 'w', encoding='utf-8') as f:
+        f.write(texto)
+    os.replace(temporal, ruta)
+
 
 class MonitorFirebase:
     """
     Monitor para rastrear todas las consultas a Firebase y analizar el consumo.
+    Cada consulta se suma también al uso diario por funcionalidad (ver cuota_firebase.py).
     """
-    
-    def __init__(self):
-        self._consultas_sesion: List[Dict] = []
+
+    def __init__(self, cuota=None, max_recientes: int = MAX_CONSULTAS_RECIENTES, imprimir: Optional[bool] = None):
+        self._cuota = cuota if cuota is not None else cuota_firebase
+        self._max_recientes = max_recientes
+        self._imprimir = imprimir
+        self._lock = threading.Lock()
+        self._consultas_sesion: deque = deque(maxlen=max_recientes)
+        self._metricas: Dict[Tuple[str, str], MetricasOperacion] = {}
         self._contadores = {
             'lecturas': 0,
             'escrituras': 0,
             'eliminaciones': 0
         }
         self._inicio_sesion = datetime.now()
-    
-    def registrar_consulta(self, tipo: str, coleccion: str, descripcion: str = "", cantidad_docs: int = 1):
+        self._hilo_instantaneas: Optional[threading.Thread] = None
+        self._detener_instantaneas = threading.Event()
+        self._ultima_instantanea: Optional[str] = None
+
+    @property
+    def imprimir(self) -> bool:
+        """Una línea en consola por consulta (apagado salvo que la configuración lo pida)"""
+        if self._imprimir is None:
+            from app.utils.configuracion import GestorConfiguracion
+            self._imprimir = bool(GestorConfiguracion.obtener_configuracion_completa().get("monitor_firebase_consola"))
+        return self._imprimir
+
+    @imprimir.setter
+    def imprimir(self, valor: bool) -> None:
+        self._imprimir = bool(valor)
+
+    def registrar_consulta(self, tipo: str, coleccion: str, descripcion: str = "", cantidad_docs: int = 1,
+                           funcionalidad: Optional[str] = None, duracion: Optional[float] = None):
         """
         Registra una consulta a Firebase
-        
+
         Args:
             tipo: 'lectura', 'escritura', 'eliminacion'
             coleccion: Nombre de la colección (ej: 'productos', 'usuarios')
             descripcion: Descripción de la operación
             cantidad_docs: Número de documentos afectados
+            funcionalidad: A quién se le cobra ('importacion', 'sincronizacion', 'dashboard',
+                           'reportes'); por defecto la del contexto (ver cuota_firebase.atribuir)
+            duracion: Segundos que tardó la llamada a Firestore (para el histograma de latencia)
         """
         timestamp = datetime.now()
+        funcionalidad = funcionalidad or funcionalidad_actual()
         consulta = {
             'timestamp': timestamp.strftime("%H:%M:%S"),
             'tipo': tipo,
             'coleccion': coleccion,
             'descripcion': descripcion,
             'cantidad_docs': cantidad_docs,
+            'funcionalidad': funcionalidad,
+            'duracion_ms': duracion * 1000 if duracion is not None else None,
             'tiempo_sesion': (timestamp - self._inicio_sesion).total_seconds()
         }
-        
-        self._consultas_sesion.append(consulta)
-        
-        # Actualizar contadores
-        if tipo == 'lectura':
-            self._contadores['lecturas'] += cantidad_docs
-        elif tipo == 'escritura':
-            self._contadores['escrituras'] += cantidad_docs
-        elif tipo == 'eliminacion':
-            self._contadores['eliminaciones'] += cantidad_docs
-        
-        # Print inmediato para debugging
-        emoji = {'lectura': '📖', 'escritura': '✏️', 'eliminacion': '[ELIMINAR]'}.get(tipo, '❓')
-        print(f"{emoji} FIREBASE: {tipo.upper()} - {coleccion} ({cantidad_docs} docs) - {descripcion}")
-        self._mostrar_resumen_rapido()
-    
-    def _mostrar_resumen_rapido(self):
-        """Muestra un resumen rápido después de cada consulta"""
-        total = sum(self._contadores.values())
-        print(f"   [CHART] Total sesión: {total} consultas ({self._contadores['lecturas']}L, {self._contadores['escrituras']}E, {self._contadores['eliminaciones']}D)")
-        print(f"   ⏱️ Tiempo: {(datetime.now() - self._inicio_sesion).total_seconds():.1f}s")
-        print("   " + "="*50)
-    
+
+        with self._lock:
+            self._consultas_sesion.append(consulta)
+            metricas = self._metricas.get((coleccion, tipo))
+            if metricas is None:
+                metricas = self._metricas[(coleccion, tipo)] = MetricasOperacion()
+            metricas.operaciones += 1
+            metricas.documentos += cantidad_docs
+            if duracion is not None:
+                metricas.latencia.observar(duracion)
+            if tipo in _CONTADORES:
+                self._contadores[_CONTADORES[tipo]] += cantidad_docs
+        self._cuota.registrar(funcionalidad, tipo, cantidad_docs)
+
+        if self.imprimir:
+            latencia = f" {duracion * 1000:.0f} ms" if duracion is not None else ""
+            print(f"[FIREBASE] {tipo} {coleccion} ({cantidad_docs} docs{latencia}) [{funcionalidad}] {descripcion}")
+
+    @contextmanager
+    def medir(self, tipo: str, coleccion: str, descripcion: str = "", funcionalidad: Optional[str] = None):
+        """
+        Mide el bloque y lo registra al salir (si no lanzó excepción). El
+        bloque recibe un dict donde puede ajustar 'cantidad_docs' y 'descripcion':
+
+            with monitor_firebase.medir('lectura', 'productos') as consulta:
+                docs = list(ref.stream())
+                consulta['cantidad_docs'] = len(docs)
+        """
+        consulta = {'cantidad_docs': 1, 'descripcion': descripcion}
+        inicio = time.perf_counter()
+        yield consulta
+        self.registrar_consulta(tipo, coleccion, consulta['descripcion'], consulta['cantidad_docs'],
+                                funcionalidad=funcionalidad, duracion=time.perf_counter() - inicio)
+
+    # ------------------------------------------------------------------
+    # Resúmenes
+    # ------------------------------------------------------------------
+
+    def metricas(self) -> List[Dict]:
+        """Contadores y latencia por (colección, tipo), de más a menos documentos"""
+        with self._lock:
+            filas = [{'coleccion': coleccion, 'tipo': tipo, 'operaciones': m.operaciones,
+                      'documentos': m.documentos, 'latencia': m.latencia.resumen()}
+                     for (coleccion, tipo), m in self._metricas.items()]
+        return sorted(filas, key=lambda f: f['documentos'], reverse=True)
+
+    def consultas_recientes(self, limite: Optional[int] = None) -> List[Dict]:
+        """Las últimas consultas (del buffer circular), más nuevas al final"""
+        with self._lock:
+            recientes = list(self._consultas_sesion)
+        return recientes[-limite:] if limite else recientes
+
     def obtener_resumen_completo(self):
         """Obtiene un resumen completo de la sesión"""
         tiempo_total = (datetime.now() - self._inicio_sesion).total_seconds()
-        total_consultas = sum(self._contadores.values())
-        
+        with self._lock:
+            contadores = dict(self._contadores)
+        total_consultas = sum(contadores.values())
+
         return {
             'tiempo_sesion_segundos': tiempo_total,
             'tiempo_sesion_minutos': tiempo_total / 60,
             'total_consultas': total_consultas,
-            'lecturas': self._contadores['lecturas'],
-            'escrituras': self._contadores['escrituras'],
-            'eliminaciones': self._contadores['eliminaciones'],
+            'lecturas': contadores['lecturas'],
+            'escrituras': contadores['escrituras'],
+            'eliminaciones': contadores['eliminaciones'],
             'consultas_por_minuto': (total_consultas / (tiempo_total / 60)) if tiempo_total > 0 else 0,
-            'porcentaje_limite_diario_lecturas': (self._contadores['lecturas'] / 50000) * 100,
-            'porcentaje_limite_diario_escrituras': (self._contadores['escrituras'] / 20000) * 100,
-            'historial_consultas': self._consultas_sesion
+            'porcentaje_limite_diario_lecturas': (contadores['lecturas'] / LIMITES_DIARIOS['lecturas']) * 100,
+            'porcentaje_limite_diario_escrituras': (contadores['escrituras'] / LIMITES_DIARIOS['escrituras']) * 100,
+            'latencia_event_loop': self._resumen_latencia(),
+            'cuota_diaria': self._cuota.resumen(),
+            'metricas': self.metricas(),
+            'historial_consultas': self.consultas_recientes()
         }
-    
+
+    def _resumen_latencia(self) -> Dict:
+        from app.utils.latencia_loop import monitor_latencia_loop
+        return monitor_latencia_loop.resumen()
+
+    def instantanea(self) -> Dict:
+        """Resumen serializable a JSON con la hora en que se tomó"""
+        resumen = self.obtener_resumen_completo()
+        resumen['generado'] = datetime.now().isoformat(timespec='seconds')
+        resumen['inicio_sesion'] = self._inicio_sesion.isoformat(timespec='seconds')
+        return resumen
+
+    def texto_prometheus(self, resumen: Optional[Dict] = None) -> str:
+        """Las métricas en el formato de texto de Prometheus"""
+        resumen = resumen or self.instantanea()
+        p = PREFIJO_PROMETHEUS
+        lineas = [
+            f"# HELP {p}_firestore_operaciones_total Llamadas a Firestore registradas en la sesión",
+            f"# TYPE {p}_firestore_operaciones_total counter",
+        ]
+        etiquetas = {(m['coleccion'], m['tipo']): f'coleccion="{_etiqueta(m["coleccion"])}",tipo="{_etiqueta(m["tipo"])}"'
+                     for m in resumen['metricas']}
+        for m in resumen['metricas']:
+            lineas.append(f"{p}_firestore_operaciones_total{{{etiquetas[m['coleccion'], m['tipo']]}}} {m['operaciones']}")
+        lineas += [
+            f"# HELP {p}_firestore_documentos_total Documentos leídos, escritos o eliminados en la sesión",
+            f"# TYPE {p}_firestore_documentos_total counter",
+        ]
+        for m in resumen['metricas']:
+            lineas.append(f"{p}_firestore_documentos_total{{{etiquetas[m['coleccion'], m['tipo']]}}} {m['documentos']}")
+        lineas += [
+            f"# HELP {p}_firestore_latencia_segundos Duración de las llamadas a Firestore",
+            f"# TYPE {p}_firestore_latencia_segundos histogram",
+        ]
+        for m in resumen['metricas']:
+            latencia = m['latencia']
+            if not latencia['cuenta']:
+                continue
+            base = etiquetas[m['coleccion'], m['tipo']]
+            acumulado = 0
+            for limite, cantidad in zip(LIMITES_LATENCIA + ('+Inf',), latencia['cubetas']):
+                acumulado += cantidad
+                lineas.append(f'{p}_firestore_latencia_segundos_bucket{{{base},le="{limite}"}} {acumulado}')
+            lineas.append(f"{p}_firestore_latencia_segundos_sum{{{base}}} {latencia['suma_s']:.6f}")
+            lineas.append(f"{p}_firestore_latencia_segundos_count{{{base}}} {latencia['cuenta']}")
+
+        cuota = resumen['cuota_diaria']
+        lineas += [
+            f"# HELP {p}_firebase_uso_diario Operaciones del día por funcionalidad (cuota compartida)",
+            f"# TYPE {p}_firebase_uso_diario gauge",
+        ]
+        for funcionalidad, uso in sorted(cuota['uso'].items()):
+            for operacion, cantidad in sorted(uso.items()):
+                lineas.append(f'{p}_firebase_uso_diario{{funcionalidad="{_etiqueta(funcionalidad)}",'
+                              f'operacion="{operacion}"}} {cantidad}')
+        lineas += [
+            f"# HELP {p}_firebase_presupuesto_diario Presupuesto diario por funcionalidad",
+            f"# TYPE {p}_firebase_presupuesto_diario gauge",
+        ]
+        for funcionalidad, presupuesto in sorted(cuota['presupuestos'].items()):
+            for operacion, limite in sorted(presupuesto.items()):
+                lineas.append(f'{p}_firebase_presupuesto_diario{{funcionalidad="{_etiqueta(funcionalidad)}",'
+                              f'operacion="{operacion}"}} {limite}')
+
+        loop = resumen['latencia_event_loop']
+        lineas += [
+            f"# HELP {p}_event_loop_retraso_p95_segundos Retraso p95 del event loop de Flet",
+            f"# TYPE {p}_event_loop_retraso_p95_segundos gauge",
+            f"{p}_event_loop_retraso_p95_segundos {loop['p95_ms'] / 1000:.6f}",
+            f"# HELP {p}_event_loop_bloqueos_total Veces que el event loop superó el umbral de bloqueo",
+            f"# TYPE {p}_event_loop_bloqueos_total counter",
+            f"{p}_event_loop_bloqueos_total {loop['bloqueos']}",
+        ]
+        return "\n".join(lineas) + "\n"
+
+    # ------------------------------------------------------------------
+    # Instantáneas en data/
+    # ------------------------------------------------------------------
+
+    def escribir_instantaneas(self, directorio: str = "data") -> Optional[str]:
+        """Escribe el JSON y el texto de Prometheus; devuelve la hora de la instantánea"""
+        try:
+            carpeta = Path(directorio)
+            carpeta.mkdir(exist_ok=True)
+            resumen = self.instantanea()
+            _escribir_atomico(carpeta / ARCHIVO_JSON, json.dumps(resumen, ensure_ascii=False, indent=2, default=str))
+            _escribir_atomico(carpeta / ARCHIVO_PROMETHEUS, self.texto_prometheus(resumen))
+            self._ultima_instantanea = resumen['generado']
+            return self._ultima_instantanea
+        except Exception as e:
+            print(f"[WARN] No se pudieron escribir las métricas de Firebase: {e}")
+            return None
+
+    @property
+    def ultima_instantanea(self) -> Optional[str]:
+        return self._ultima_instantanea
+
+    def iniciar_instantaneas(self, intervalo: float = INTERVALO_INSTANTANEAS, directorio: str = "data") -> None:
+        """Escribe las instantáneas cada `intervalo` segundos en un hilo aparte"""
+        if self._hilo_instantaneas is not None:
+            return
+        self._detener_instantaneas.clear()
+
+        def bucle():
+            while not self._detener_instantaneas.wait(intervalo):
+                self.escribir_instantaneas(directorio)
+
+        self._hilo_instantaneas = threading.Thread(target=bucle, name="metricas-firebase", daemon=True)
+        self._hilo_instantaneas.start()
+
+    def detener_instantaneas(self, directorio: str = "data") -> None:
+        """Detiene el hilo y deja una última instantánea (al cerrar la app)"""
+        if self._hilo_instantaneas is None:
+            return
+        self._detener_instantaneas.set()
+        self._hilo_instantaneas.join(timeout=2)
+        self._hilo_instantaneas = None
+        self.escribir_instantaneas(directorio)
+
     def mostrar_reporte_detallado(self):
         """Muestra un reporte detallado en consola"""
         resumen = self.obtener_resumen_completo()
-        
+
         print("\n" + "="*60)
         print("[CHART] REPORTE DETALLADO DE CONSULTAS FIREBASE")
         print("="*60)
@@ -89,35 +375,58 @@ class MonitorFirebase:
         print(f"✏️  Escrituras: {resumen['escrituras']} ({resumen['porcentaje_limite_diario_escrituras']:.2f}% del límite diario)")
         print(f"[ELIMINAR]  Eliminaciones: {resumen['eliminaciones']}")
         print(f"[RAPIDO] Consultas/minuto: {resumen['consultas_por_minuto']:.1f}")
-        
+
         if resumen['total_consultas'] > 0:
             print(f"\n[ALERT] PROYECCIÓN DIARIA:")
             lecturas_dia = (resumen['lecturas'] / (resumen['tiempo_sesion_minutos'] / (24 * 60)))
             escrituras_dia = (resumen['escrituras'] / (resumen['tiempo_sesion_minutos'] / (24 * 60)))
-            print(f"   📖 Lecturas proyectadas/día: {lecturas_dia:.0f} (límite: 50,000)")
-            print(f"   ✏️  Escrituras proyectadas/día: {escrituras_dia:.0f} (límite: 20,000)")
-            
-            if lecturas_dia > 50000:
+            print(f"   📖 Lecturas proyectadas/día: {lecturas_dia:.0f} (límite: {LIMITES_DIARIOS['lecturas']:,})")
+            print(f"   ✏️  Escrituras proyectadas/día: {escrituras_dia:.0f} (límite: {LIMITES_DIARIOS['escrituras']:,})")
+
+            if lecturas_dia > LIMITES_DIARIOS['lecturas']:
                 print(f"   [WARN]  ALERTA: Proyección de lecturas excede límite diario")
-            if escrituras_dia > 20000:
+            if escrituras_dia > LIMITES_DIARIOS['escrituras']:
                 print(f"   [WARN]  ALERTA: Proyección de escrituras excede límite diario")
-        
+
+        cuota = resumen['cuota_diaria']
+        print(f"\n[CHART] USO DEL DÍA POR FUNCIONALIDAD ({cuota['dia']}, "
+              f"{'todas las PCs' if cuota['compartida'] else 'esta PC'}):")
+        for funcionalidad, presupuesto in cuota['presupuestos'].items():
+            uso = cuota['uso'].get(funcionalidad, {})
+            detalle = ", ".join(f"{uso.get(op, 0)}/{limite} {op}" for op, limite in presupuesto.items())
+            print(f"   {funcionalidad}: {detalle}")
+
+        print("\n[CHART] POR COLECCIÓN:")
+        for m in resumen['metricas'][:10]:
+            latencia = m['latencia']
+            tiempos = (f" - p50 {latencia['p50_ms']:.0f} ms, p95 {latencia['p95_ms']:.0f} ms"
+                       if latencia['cuenta'] else "")
+            print(f"   {m['coleccion']} {m['tipo']}: {m['operaciones']} llamadas, {m['documentos']} docs{tiempos}")
+
+        latencia = resumen['latencia_event_loop']
+        if latencia['muestras']:
+            print(f"\n⏱️  Retraso del event loop: promedio {latencia['promedio_ms']:.1f} ms, "
+                  f"p95 {latencia['p95_ms']:.1f} ms, máximo {latencia['maximo_ms']:.0f} ms "
+                  f"({latencia['bloqueos']} bloqueos)")
+
         print("\n[LISTA] ÚLTIMAS 5 CONSULTAS:")
-        for consulta in self._consultas_sesion[-5:]:
+        for consulta in self.consultas_recientes(5):
             emoji = {'lectura': '📖', 'escritura': '✏️', 'eliminacion': '[ELIMINAR]'}.get(consulta['tipo'], '❓')
             print(f"   {emoji} {consulta['timestamp']} - {consulta['tipo']} - {consulta['coleccion']} - {consulta['descripcion']}")
-        
+
         print("="*60)
-    
+
     def reiniciar_sesion(self):
         """Reinicia el monitoreo para una nueva sesión"""
-        self._consultas_sesion.clear()
-        self._contadores = {
-            'lecturas': 0,
-            'escrituras': 0,
-            'eliminaciones': 0
-        }
-        self._inicio_sesion = datetime.now()
+        with self._lock:
+            self._consultas_sesion.clear()
+            self._metricas.clear()
+            self._contadores = {
+                'lecturas': 0,
+                'escrituras': 0,
+                'eliminaciones': 0
+            }
+            self._inicio_sesion = datetime.now()
         print("[PROCESO] Monitor Firebase reiniciado")
 
 # Instancia global del monitor
@@ -2,21 +2,50 @@
 """
 Sistema de sincronización automática entre inventario y ubicaciones.
 Mantiene las cantidades del inventario actualizadas basándose en las ubicaciones.
+
+Los modelos se comparan siempre por su clave normalizada (normalizar_modelo:
+sin espacios en los extremos y en minúsculas), la misma que usan el índice
+por modelo y la columna modelo_clave de las tablas del cache. Así la
+sincronización completa y la de modelos sueltos calculan el mismo total.
 """
 
-from typing import Dict, List
-from conexiones.firebase import db
-from app.utils.cache_firebase import cache_firebase
+from typing import Dict, Iterable, List, Tuple
+from app.models import normalizar_modelo
+from app.utils.cuota_firebase import atribuida
 from app.utils.monitor_firebase import monitor_firebase
+from app.utils.tablas_cache import existencias_por_modelo
+from app.utils.versiones_colecciones import sellar, subir_version
+from app.utils.firestore_async import ejecutar
 import asyncio
+import time
+
+TAMANO_LOTE = 499  # 500 operaciones por WriteBatch, una queda para la versión de la colección
 
 class SincronizadorInventario:
     """
     Clase para manejar la sincronización automática entre ubicaciones e inventario.
     """
     
-    def __init__(self):
+    def __init__(self, db=None, cache=None):
         self.debug_enabled = True
+        self._db_inyectada = db
+        self._cache_inyectado = cache
+        # Claves de modelo cuyas ubicaciones cambiaron y aún no se reflejan en productos
+        self._modelos_pendientes = set()
+
+    @property
+    def _db(self):
+        if self._db_inyectada is None:
+            from conexiones.firebase import db
+            return db
+        return self._db_inyectada
+
+    @property
+    def _cache(self):
+        if self._cache_inyectado is None:
+            from app.utils.cache_firebase import cache_firebase
+            return cache_firebase
+        return self._cache_inyectado
     
     def log(self, mensaje: str):
         """Función de logging para debug - DESHABILITADA para limpiar terminal"""
@@ -27,31 +56,17 @@ class SincronizadorInventario:
         Calcula las cantidades totales por modelo sumando todas las ubicaciones.
         
         Returns:
-            Dict con modelo como clave y cantidad total como valor
+            Dict con la clave normalizada del modelo y la cantidad total como valor
         """
         self.log("Calculando cantidades por modelo desde ubicaciones...")
         
         try:
-            # Obtener todas las ubicaciones
-            ubicaciones = await cache_firebase.obtener_ubicaciones()
+            # Agrupación vectorizada sobre el DataFrame de ubicaciones del cache
+            await self._cache.obtener_ubicaciones()
+            ubicaciones = await asyncio.to_thread(self._cache.tabla, 'ubicaciones')
             
-            cantidades_por_modelo = {}
-            
-            for ubicacion in ubicaciones:
-                modelo_raw = ubicacion.get('modelo', '')
-                modelo = str(modelo_raw).strip() if modelo_raw is not None else ''
-                cantidad = ubicacion.get('cantidad', 0)
-                
-                if modelo:  # Solo procesar si tiene modelo
-                    try:
-                        cantidad_int = int(cantidad) if cantidad else 0
-                        if modelo in cantidades_por_modelo:
-                            cantidades_por_modelo[modelo] += cantidad_int
-                        else:
-                            cantidades_por_modelo[modelo] = cantidad_int
-                    except (ValueError, TypeError):
-                        self.log(f"[WARN] Cantidad inválida para modelo {modelo}: {cantidad}")
-                        continue
+            totales = existencias_por_modelo(ubicaciones)
+            cantidades_por_modelo = dict(zip(totales['modelo_clave'].to_list(), totales['existencias'].to_list()))
             
             self.log(f"Cantidades calculadas para {len(cantidades_por_modelo)} modelos")
             return cantidades_por_modelo
@@ -60,6 +75,7 @@ class SincronizadorInventario:
             self.log(f"[ERROR] Error al calcular cantidades: {e}")
             return {}
     
+    @atribuida('sincronizacion')
     async def sincronizar_inventario_completo(self, mostrar_resultados: bool = True) -> Dict:
         """
         Sincroniza todo el inventario con las cantidades de ubicaciones.
@@ -77,18 +93,16 @@ class SincronizadorInventario:
             cantidades_ubicaciones = await self.calcular_cantidades_por_modelo()
             
             # Obtener productos del inventario
-            productos = await cache_firebase.obtener_productos()
+            productos = await self._cache.obtener_productos()
             
             # Estadísticas
-            productos_actualizados = 0
             productos_sin_ubicacion = 0
-            modelos_nuevos_en_ubicaciones = []
-            errores = []
+            modelos_en_inventario = set()
+            correcciones = []
             
-            # Actualizar productos existentes
+            # Comparar productos existentes; las diferencias se escriben al final en lotes
             for producto in productos:
-                modelo_raw = producto.get('modelo', '')
-                modelo = str(modelo_raw).strip() if modelo_raw is not None else ''
+                modelo = normalizar_modelo(producto.get('modelo'))
                 cantidad_actual = producto.get('cantidad', 0)
                 firebase_id = producto.get('firebase_id')
                 
@@ -100,37 +114,32 @@ class SincronizadorInventario:
                 
                 # Solo actualizar si las cantidades son diferentes
                 if cantidad_actual != cantidad_ubicaciones:
-                    try:
-                        # Actualizar en Firebase
-                        doc_ref = db.collection('productos').document(firebase_id)
-                        doc_ref.update({'cantidad': cantidad_ubicaciones})
-                        
-                        self.log(f"  {modelo}: {cantidad_actual} → {cantidad_ubicaciones}")
-                        productos_actualizados += 1
-                        
-                        # Registrar en monitor
-                        monitor_firebase.registrar_consulta(
-                            tipo='escritura',
-                            coleccion='productos',
-                            descripcion=f'Sync cantidad {modelo}: {cantidad_actual}→{cantidad_ubicaciones}',
-                            cantidad_docs=1
-                        )
-                        
-                    except Exception as e:
-                        errores.append(f"Error actualizando {modelo}: {e}")
-                        self.log(f"[ERROR] Error actualizando {modelo}: {e}")
+                    self.log(f"  {modelo}: {cantidad_actual} → {cantidad_ubicaciones}")
+                    correcciones.append((firebase_id, modelo, cantidad_ubicaciones))
                 
-                # Remover de cantidades_ubicaciones para detectar modelos nuevos
-                if modelo in cantidades_ubicaciones:
-                    del cantidades_ubicaciones[modelo]
-                else:
+                # Varios productos pueden compartir la clave: todos reciben el mismo total
+                modelos_en_inventario.add(modelo)
+                if modelo not in cantidades_ubicaciones:
                     productos_sin_ubicacion += 1
             
-            # Detectar modelos en ubicaciones que no están en inventario
-            modelos_nuevos_en_ubicaciones = list(cantidades_ubicaciones.keys())
+            productos_actualizados, errores = await ejecutar(
+                self._escribir_cantidades_en_lotes, correcciones, timeout=None
+            )
+            
+            # La sincronización completa cubre cualquier modelo pendiente
+            if not errores:
+                self._modelos_pendientes.clear()
+            
+            # Detectar modelos en ubicaciones que no están en inventario (con el nombre tal como se ubicó)
+            indice_ubicaciones = self._cache.indice('ubicaciones')
+            modelos_nuevos_en_ubicaciones = [
+                str(indice_ubicaciones.buscar(clave).get('modelo')).strip()
+                for clave in cantidades_ubicaciones if clave not in modelos_en_inventario
+            ]
             
             # Invalidar cache para refrescar datos
-            cache_firebase.invalidar_cache_productos()
+            if productos_actualizados:
+                self._cache.invalidar_cache_productos()
             
             # Preparar resultados
             resultado = {
@@ -164,64 +173,135 @@ class SincronizadorInventario:
                 'exito': False
             }
     
+    def _escribir_cantidades_en_lotes(self, correcciones: List[tuple]) -> Tuple[int, List[str]]:
+        """
+        Escribe las correcciones de cantidad con WriteBatch (máx. 500 operaciones por commit).
+
+        Args:
+            correcciones: Lista de (firebase_id, modelo, cantidad_nueva)
+
+        Returns:
+            Tupla (productos escritos, lista de errores)
+        """
+        escritos = 0
+        errores = []
+        for inicio in range(0, len(correcciones), TAMANO_LOTE):
+            lote = correcciones[inicio:inicio + TAMANO_LOTE]
+            try:
+                db = self._db
+                batch = db.batch()
+                for firebase_id, _, cantidad in lote:
+                    batch.update(db.collection('productos').document(firebase_id), sellar({'cantidad': cantidad}))
+                subir_version(batch, db, ['productos'])
+                inicio_lote = time.perf_counter()
+                batch.commit()
+                escritos += len(lote)
+                monitor_firebase.registrar_consulta(
+                    tipo='escritura',
+                    coleccion='productos',
+                    descripcion=f'Sync cantidades en lote ({len(lote)} productos)',
+                    cantidad_docs=len(lote),
+                    funcionalidad='sincronizacion',
+                    duracion=time.perf_counter() - inicio_lote
+                )
+            except Exception as e:
+                modelos = ", ".join(modelo for _, modelo, _ in lote[:5])
+                errores.append(f"Error actualizando lote ({modelos}...): {e}")
+        return escritos, errores
+
+    @atribuida('sincronizacion')
+    async def sincronizar_modelos(self, modelos) -> Dict:
+        """
+        Sincroniza solo los modelos indicados (p. ej. los tocados por una importación).
+        Las correcciones se confirman en lotes en lugar de un update por producto.
+
+        Args:
+            modelos: Conjunto de modelos a recalcular (se comparan por clave normalizada)
+
+        Returns:
+            Dict con productos_actualizados, errores y exito
+        """
+        modelos = {normalizar_modelo(m) for m in modelos} - {''}
+        if not modelos:
+            return {'productos_actualizados': 0, 'errores': [], 'exito': True}
+
+        try:
+            await self._cache.obtener_ubicaciones()
+            await self._cache.obtener_productos()
+            indice_ubicaciones = self._cache.indice('ubicaciones')
+            indice_productos = self._cache.indice('productos')
+
+            # Solo los productos de esos modelos, por el índice (sin recorrer el inventario)
+            correcciones = []
+            for modelo in modelos:
+                cantidad_nueva = indice_ubicaciones.total_modelo(modelo)
+                for producto in indice_productos.todos(modelo):
+                    firebase_id = producto.get('firebase_id')
+                    if firebase_id and producto.get('cantidad', 0) != cantidad_nueva:
+                        correcciones.append((firebase_id, modelo, cantidad_nueva))
+
+            escritos, errores = await ejecutar(self._escribir_cantidades_en_lotes, correcciones, timeout=None)
+
+            if escritos:
+                self._cache.invalidar_cache_productos()
+
+            return {
+                'productos_actualizados': escritos,
+                'errores': errores,
+                'exito': len(errores) == 0
+            }
+        except Exception as e:
+            self.log(f"[ERROR] Error sincronizando modelos: {e}")
+            return {'productos_actualizados': 0, 'errores': [str(e)], 'exito': False}
+
+    def marcar_modelos_modificados(self, modelos: Iterable) -> None:
+        """
+        Registra modelos cuyas ubicaciones se escribieron (alta, baja o cambio de cantidad).
+        Se recalculan en la siguiente llamada a sincronizar_pendientes().
+        """
+        self._modelos_pendientes.update(normalizar_modelo(modelo) for modelo in modelos)
+        self._modelos_pendientes.discard('')
+
+    def hay_pendientes(self) -> bool:
+        """True si hay modelos marcados sin sincronizar"""
+        return bool(self._modelos_pendientes)
+
+    async def sincronizar_pendientes(self) -> Dict:
+        """
+        Sincroniza solo los modelos marcados como modificados.
+        Si la escritura falla (o la llamada se cancela), los modelos vuelven
+        a quedar pendientes.
+
+        Returns:
+            Dict con productos_actualizados, errores y exito
+        """
+        pendientes, self._modelos_pendientes = self._modelos_pendientes, set()
+        try:
+            resultado = await self.sincronizar_modelos(pendientes)
+        except BaseException:
+            self._modelos_pendientes |= pendientes
+            raise
+        if not resultado['exito']:
+            self._modelos_pendientes |= pendientes
+        return resultado
+
     async def sincronizar_modelo_especifico(self, modelo: str) -> bool:
         """
-        Sincroniza la cantidad de un modelo específico.
+        Sincroniza la cantidad de un modelo específico (todos los productos con esa clave).
         
         Args:
             modelo: El modelo a sincronizar
             
         Returns:
-            True si se sincronizó exitosamente
+            True si el modelo está en el inventario y se sincronizó exitosamente
         """
         self.log(f"Sincronizando modelo específico: {modelo}")
         
-        try:
-            # Calcular cantidad para este modelo desde ubicaciones
-            ubicaciones = await cache_firebase.obtener_ubicaciones()
-            cantidad_total = 0
-            
-            for ubicacion in ubicaciones:
-                try:
-                    modelo_ubicacion = ubicacion.get('modelo', '')
-                    if modelo_ubicacion and str(modelo_ubicacion).strip().lower() == str(modelo).lower():
-                        try:
-                            cantidad_total += int(ubicacion.get('cantidad', 0))
-                        except (ValueError, TypeError):
-                            continue
-                except:
-                    continue
-            
-            # Buscar el producto en inventario
-            productos = await cache_firebase.obtener_productos()
-            for producto in productos:
-                try:
-                    modelo_producto = producto.get('modelo', '')
-                    if modelo_producto and str(modelo_producto).strip().lower() == str(modelo).lower():
-                        firebase_id = producto.get('firebase_id')
-                        cantidad_actual = producto.get('cantidad', 0)
-                        
-                        if firebase_id and cantidad_actual != cantidad_total:
-                            # Actualizar en Firebase
-                            doc_ref = db.collection('productos').document(firebase_id)
-                            doc_ref.update({'cantidad': cantidad_total})
-                            
-                            self.log(f"  {modelo}: {cantidad_actual} → {cantidad_total}")
-                            
-                            # Invalidar cache
-                            cache_firebase.invalidar_cache_productos()
-                            
-                            return True
-                except Exception as ex:
-                    print(f"Error procesando producto en sincronización: {ex}")
-                    continue
-            
+        resultado = await self.sincronizar_modelos([modelo])
+        if modelo not in self._cache.indice('productos'):
             self.log(f"[WARN] Modelo {modelo} no encontrado en inventario")
             return False
-            
-        except Exception as e:
-            self.log(f"[ERROR] Error sincronizando {modelo}: {e}")
-            return False
+        return resultado['exito']
 
 # Instancia global del sincronizador
 sincronizador_inventario = SincronizadorInventario()
@@ -234,3 +314,15 @@ async def sincronizar_inventario_completo(mostrar_resultados: bool = True):
 async def sincronizar_modelo(modelo: str):
     """Función de conveniencia para sincronizar un modelo específico"""
     return await sincronizador_inventario.sincronizar_modelo_especifico(modelo)
+
+async def sincronizar_modelos(modelos):
+    """Función de conveniencia para sincronizar un conjunto de modelos"""
+    return await sincronizador_inventario.sincronizar_modelos(modelos)
+
+def marcar_modelos_modificados(*modelos):
+    """Función de conveniencia para marcar modelos tras escribir en 'ubicaciones'"""
+    sincronizador_inventario.marcar_modelos_modificados(modelos)
+
+async def sincronizar_pendientes():
+    """Función de conveniencia para sincronizar los modelos marcados"""
+    return await sincronizador_inventario.sincronizar_pendientes()
@@ -0,0 +1,231 @@
+"""
+Tablas columnares (polars) sobre las colecciones del cache.
+
+CacheFirebase mantiene, junto a la tupla de registros, un DataFrame tipado
+por colección para los cálculos de conjunto: filtros, agrupaciones y joins
+(productos ⋈ ubicaciones) corren vectorizados y en varios hilos en lugar de
+recorrer los dicts en Python. Se piden con cache_firebase.tabla(coleccion).
+
+Las tablas siguen el contrato de los índices (ver indices_cache): se arman
+la primera vez que se piden y los deltas se acumulan con copiar() +
+aplicar(); el DataFrame se rehace al leerlo (quita las filas cambiadas y
+agrega las nuevas, sin volver a convertir la colección completa).
+Los DataFrames de polars son inmutables: se comparten sin copiar.
+"""
+
+import threading
+from collections.abc import Mapping
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import polars as pl
+
+from app.models import Registro
+
+# Deltas acumulados a partir de los cuales copiar() rehace el DataFrame
+MAX_PENDIENTES = 512
+
+
+def _entero(valor) -> Optional[int]:
+    """Entero o None; acepta números guardados como texto ('7', '7.0')"""
+    if valor == '':
+        return None
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        try:
+            return int(float(valor))
+        except (TypeError, ValueError, OverflowError):
+            return None
+
+
+def _decimal(valor) -> Optional[float]:
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _nombre_usuario(valor) -> Optional[str]:
+    """Los movimientos viejos guardan el usuario como dict"""
+    if isinstance(valor, Mapping):
+        valor = valor.get('nombre') or valor.get('username') or valor.get('email')
+    return None if valor is None else str(valor)
+
+
+def _texto_ubicacion(valor) -> Optional[str]:
+    """Ubicación de un movimiento: dict {'almacen', 'ubicacion'} -> 'Almacén X/Y'"""
+    if isinstance(valor, Mapping):
+        return f"Almacén {valor.get('almacen', 'N/A')}/{valor.get('ubicacion', 'N/A')}"
+    return None if valor is None else str(valor)
+
+
+def _convertir(valores: List, tipo: pl.DataType) -> List:
+    # El caso común (ya del tipo correcto) no llama a ninguna función: se recorre toda la colección
+    if tipo == pl.Utf8:
+        return [v if v.__class__ is str or v is None else str(v) for v in valores]
+    if tipo == pl.Int64:
+        return [v if v.__class__ is int or v is None else _entero(v) for v in valores]
+    if tipo == pl.Float64:
+        return [v if v.__class__ is float or v is None else _decimal(v) for v in valores]
+    return valores
+
+
+def _leer(documentos: Sequence[Registro], campo: str) -> List:
+    """Valor del campo en cada documento (None si falta), leyendo los slots sin pasar por Mapping"""
+    clase = documentos[0].__class__ if documentos else dict
+    if issubclass(clase, Registro) and all(d.__class__ is clase for d in documentos):
+        if campo in clase._CONJUNTO_FIJOS:
+            return [getattr(d, campo, None) for d in documentos]
+        return [d._extra.get(campo) if d._extra else None for d in documentos]
+    return [d.get(campo) for d in documentos]
+
+
+def clave_modelo(columna: str = 'modelo') -> pl.Expr:
+    """Modelo normalizado como en normalizar_modelo (sin espacios en los extremos, minúsculas)"""
+    return pl.col(columna).str.strip_chars().str.to_lowercase()
+
+
+class TablaColeccion:
+    """DataFrame de una colección, con los deltas pendientes de aplicar"""
+
+    __slots__ = ('_df', '_pendientes', '_lock')
+
+    # Columna -> (tipo de polars, campos de origen en orden de preferencia[, conversión propia])
+    COLUMNAS: Dict[str, Tuple] = {}
+    BAJO_DEMANDA = True
+
+    def __init__(self, documentos: Iterable[Registro] = ()):
+        unicos = {d.get('firebase_id'): d for d in documentos if d.get('firebase_id') is not None}
+        self._df: pl.DataFrame = self.frame(unicos.values())
+        self._pendientes: Dict[str, Optional[Registro]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def esquema(cls) -> Dict[str, pl.DataType]:
+        return {'firebase_id': pl.Utf8, **{nombre: columna[0] for nombre, columna in cls.COLUMNAS.items()}}
+
+    @classmethod
+    def frame(cls, documentos: Iterable[Registro]) -> pl.DataFrame:
+        """DataFrame tipado de los documentos (con modelo_clave si la colección tiene modelo)"""
+        documentos = list(documentos)
+        columnas = {'firebase_id': _leer(documentos, 'firebase_id')}
+        for nombre, (tipo, campos, *conversion) in cls.COLUMNAS.items():
+            valores = _leer(documentos, campos[0])
+            for alternativo in campos[1:]:
+                if any(v is None or v == '' for v in valores):
+                    otros = _leer(documentos, alternativo)
+                    valores = [o if v is None or v == '' else v for v, o in zip(valores, otros)]
+            if conversion:
+                columnas[nombre] = [conversion[0](v) for v in valores]
+            else:
+                columnas[nombre] = _convertir(valores, tipo)
+        df = pl.DataFrame(columnas, schema=cls.esquema())
+        if 'modelo' in cls.COLUMNAS:
+            df = df.with_columns(clave_modelo().alias('modelo_clave'))
+        return df
+
+    def copiar(self) -> 'TablaColeccion':
+        """Copia que comparte el DataFrame y copia solo los deltas pendientes"""
+        if len(self._pendientes) >= MAX_PENDIENTES:
+            self._consolidar()
+        nueva = self.__class__()
+        with self._lock:
+            nueva._df = self._df
+            nueva._pendientes = dict(self._pendientes)
+        return nueva
+
+    def aplicar(self, anterior: Optional[Registro], nuevo: Optional[Registro]) -> None:
+        """Refleja que el documento `anterior` pasó a ser `nuevo` (None = no existe)"""
+        documento = nuevo if nuevo is not None else anterior
+        doc_id = documento.get('firebase_id') if documento is not None else None
+        if doc_id is not None:
+            self._pendientes[doc_id] = nuevo
+
+    def _consolidar(self) -> pl.DataFrame:
+        """Aplica los deltas pendientes: fuera las filas cambiadas o eliminadas, dentro las nuevas"""
+        with self._lock:
+            if self._pendientes:
+                ids = list(self._pendientes)
+                nuevos = self.frame(d for d in self._pendientes.values() if d is not None)
+                self._df = pl.concat([self._df.filter(~pl.col('firebase_id').is_in(ids)), nuevos])
+                self._pendientes = {}
+            return self._df
+
+    @property
+    def df(self) -> pl.DataFrame:
+        """DataFrame al día (sin orden garantizado: ordenar en la consulta si hace falta)"""
+        return self._consolidar() if self._pendientes else self._df
+
+    def lazy(self) -> pl.LazyFrame:
+        return self.df.lazy()
+
+    def __len__(self) -> int:
+        return self.df.height
+
+
+class TablaProductos(TablaColeccion):
+    __slots__ = ()
+    COLUMNAS = {
+        'modelo': (pl.Utf8, ('modelo',)),
+        'nombre': (pl.Utf8, ('nombre',)),
+        'tipo': (pl.Utf8, ('tipo',)),
+        'categoria': (pl.Utf8, ('categoria',)),
+        'precio': (pl.Float64, ('precio',)),
+        'cantidad': (pl.Int64, ('cantidad',)),
+        'stock_min': (pl.Int64, ('stock_min',)),
+        'fecha_registro': (pl.Utf8, ('fecha_registro',)),
+        'estado': (pl.Utf8, ('estado',)),
+        'ubicacion': (pl.Utf8, ('ubicacion',)),
+    }
+
+
+class TablaUbicaciones(TablaColeccion):
+    __slots__ = ()
+    COLUMNAS = {
+        'modelo': (pl.Utf8, ('modelo',)),
+        'almacen': (pl.Utf8, ('almacen',)),
+        'estanteria': (pl.Utf8, ('estanteria',)),
+        'cantidad': (pl.Int64, ('cantidad',)),
+        'observaciones': (pl.Utf8, ('observaciones',)),
+        'fecha_asignacion': (pl.Utf8, ('fecha_asignacion',)),
+        'usuario_asignacion': (pl.Utf8, ('usuario_asignacion',)),
+    }
+
+
+class TablaMovimientos(TablaColeccion):
+    __slots__ = ()
+    COLUMNAS = {
+        'tipo': (pl.Utf8, ('tipo', 'tipo_movimiento')),
+        'modelo': (pl.Utf8, ('modelo', 'producto_modelo')),
+        'cantidad': (pl.Int64, ('cantidad',)),
+        'usuario': (pl.Utf8, ('usuario',), _nombre_usuario),
+        'fecha': (pl.Utf8, ('fecha_movimiento', 'fecha')),
+        'motivo': (pl.Utf8, ('motivo',)),
+        'comentarios': (pl.Utf8, ('comentarios',)),
+        'nombre_producto': (pl.Utf8, ('nombre_producto',)),
+        'almacen_origen': (pl.Utf8, ('almacen_origen',)),
+        'estanteria_origen': (pl.Utf8, ('estanteria_origen',)),
+        'almacen_destino': (pl.Utf8, ('almacen_destino',)),
+        'estanteria_destino': (pl.Utf8, ('estanteria_destino',)),
+        'ubicacion_origen': (pl.Utf8, ('ubicacion_origen',), _texto_ubicacion),
+        'ubicacion_destino': (pl.Utf8, ('ubicacion_destino',), _texto_ubicacion),
+    }
+
+
+# ----------------------------------------------------------------------
+# Consultas comunes
+# ----------------------------------------------------------------------
+
+def existencias_por_modelo(ubicaciones: pl.DataFrame) -> pl.DataFrame:
+    """modelo_clave, existencias (suma de cantidad en todas las ubicaciones), ubicaciones"""
+    return (ubicaciones.lazy()
+            .filter(pl.col('modelo_clave') != '')
+            .group_by('modelo_clave')
+            .agg(pl.col('cantidad').sum().alias('existencias'), pl.len().alias('ubicaciones'))
+            .collect())
+
+
+def productos_con_existencias(productos: pl.DataFrame, ubicaciones: pl.DataFrame) -> pl.DataFrame:
+    """Productos con sus existencias según ubicaciones (0 si el modelo no está ubicado)"""
+    return (productos.join(existencias_por_modelo(ubicaciones), on='modelo_clave', how='left')
+            .with_columns(pl.col('existencias').fill_null(0), pl.col('ubicaciones').fill_null(0)))
@@ -0,0 +1,114 @@
+"""
+Versión por colección para validar el cache con una sola lectura.
+
+Cada escritura en una colección cacheada, en el mismo commit:
+  - sella el documento con `updated_at` (hora del servidor)
+  - sube `_metadatos/{coleccion}.version` y su `updated_at`
+  - si es una eliminación, deja una lápida en `_metadatos/{coleccion}/eliminados/{doc_id}`
+
+Con eso CacheFirebase lee solo `_metadatos/{coleccion}`: si la versión no
+cambió el cache sigue siendo válido, y si cambió trae únicamente los
+documentos y lápidas con `updated_at` posterior a su marca de agua.
+"""
+
+from typing import Dict, Iterable, Optional
+
+from firebase_admin import firestore
+
+from app.utils.monitor_firebase import monitor_firebase
+
+COLECCION_METADATOS = '_metadatos'
+SUBCOLECCION_ELIMINADOS = 'eliminados'
+CAMPO_ACTUALIZADO = 'updated_at'
+
+
+def _obtener_db(db=None):
+    if db is None:
+        from conexiones.firebase import db as db_firebase
+        return db_firebase
+    return db
+
+
+def referencia_metadatos(db, coleccion: str):
+    """Documento con la versión de la colección"""
+    return db.collection(COLECCION_METADATOS).document(coleccion)
+
+
+def referencia_eliminados(db, coleccion: str):
+    """Subcolección de lápidas de la colección"""
+    return referencia_metadatos(db, coleccion).collection(SUBCOLECCION_ELIMINADOS)
+
+
+def sellar(datos: Dict) -> Dict:
+    """Agrega `updated_at` con la hora del servidor a los datos a escribir"""
+    datos[CAMPO_ACTUALIZADO] = firestore.SERVER_TIMESTAMP
+    return datos
+
+
+def subir_version(batch, db, colecciones: Iterable[str]) -> int:
+    """
+    Agrega al batch el incremento de versión de cada colección.
+    Devuelve cuántas operaciones se agregaron (cuentan para el límite de 500).
+    """
+    colecciones = set(colecciones)
+    for coleccion in colecciones:
+        batch.set(referencia_metadatos(db, coleccion), {
+            'version': firestore.Increment(1),
+            CAMPO_ACTUALIZADO: firestore.SERVER_TIMESTAMP,
+        }, merge=True)
+    return len(colecciones)
+
+
+def registrar_eliminacion(batch, db, coleccion: str, doc_id: str) -> None:
+    """Agrega al batch la lápida de un documento eliminado"""
+    batch.set(referencia_eliminados(db, coleccion).document(doc_id), sellar({'doc_id': doc_id}))
+
+
+def leer_version(coleccion: str, db=None) -> Optional[Dict]:
+    """
+    Lee `_metadatos/{coleccion}` (1 lectura).
+    Devuelve {'version', 'updated_at'} o None si la colección aún no tiene versión.
+    """
+    db = _obtener_db(db)
+    with monitor_firebase.medir('lectura', COLECCION_METADATOS, f'Validar versión de {coleccion}'):
+        doc = referencia_metadatos(db, coleccion).get()
+    if not doc.exists:
+        return None
+    datos = doc.to_dict() or {}
+    if datos.get('version') is None or datos.get(CAMPO_ACTUALIZADO) is None:
+        return None
+    return {'version': datos['version'], CAMPO_ACTUALIZADO: datos[CAMPO_ACTUALIZADO]}
+
+
+# ----------------------------------------------------------------------
+# Escrituras sueltas: documento + versión (+ lápida) en un solo commit
+# ----------------------------------------------------------------------
+
+def agregar_documento(coleccion: str, datos: Dict, db=None):
+    """Equivalente a collection(coleccion).add(datos); devuelve la referencia creada"""
+    db = _obtener_db(db)
+    doc_ref = db.collection(coleccion).document()
+    batch = db.batch()
+    batch.set(doc_ref, sellar(datos))
+    subir_version(batch, db, [coleccion])
+    batch.commit()
+    return doc_ref
+
+
+def actualizar_documento(coleccion: str, doc_id: str, datos: Dict, db=None) -> None:
+    """Equivalente a collection(coleccion).document(doc_id).update(datos)"""
+    db = _obtener_db(db)
+    batch = db.batch()
+    batch.update(db.collection(coleccion).document(doc_id), sellar(datos))
+    subir_version(batch, db, [coleccion])
+    batch.commit()
+
+
+def eliminar_documento(coleccion: str, doc_id: str, db=None) -> None:
+    """Equivalente a collection(coleccion).document(doc_id).delete(), dejando lápida"""
+    db = _obtener_db(db)
+    batch = db.batch()
+    batch.delete(db.collection(coleccion).document(doc_id))
+    registrar_eliminacion(batch, db, coleccion, doc_id)
+    subir_version(batch, db, [coleccion])
+    batch.commit()
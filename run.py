@@ -3,6 +3,7 @@
 TotalStock - Versión corregida para problemas de cierre/apertura
 """
 
+import asyncio
 import sys
 import os
 import atexit
@@ -57,6 +58,27 @@ def cleanup_session():
             gestor_sesiones.cerrar_sesion(usuario_para_cerrar)
             safe_print(f"Sesion cerrada para: {usuario_para_cerrar}")
         
+        # Cancelar escuchas de Firestore y dejar la copia local al día para el próximo inicio
+        from app.utils.cache_firebase import cache_firebase
+        cache_firebase.desactivar_escuchas()
+        cache_firebase.guardar_en_disco()
+        
+        # Escribir las actividades del historial que siguen en el buffer
+        from app.utils.historial_nube import historial_nube
+        historial_nube.cerrar()
+        
+        # Publicar y guardar el uso de Firebase del día
+        from app.utils.cuota_firebase import cuota_firebase
+        cuota_firebase.cerrar()
+        
+        # Última instantánea de las métricas de Firebase
+        from app.utils.monitor_firebase import monitor_firebase
+        monitor_firebase.detener_instantaneas()
+        
+        # Detener la medición del event loop
+        from app.utils.latencia_loop import monitor_latencia_loop
+        monitor_latencia_loop.detener()
+        
         # Limpiar archivo de bloqueo de instancia
         from app.utils.instancia_unica import instance_lock
         instance_lock._cleanup()
@@ -180,6 +202,10 @@ def main():
         # SIMPLIFICADO: Solo un event handler
         page.window.on_event = on_window_event
         
+        # Medir el retraso del event loop (UI trabada por llamadas bloqueantes)
+        from app.utils.latencia_loop import monitor_latencia_loop
+        page.run_task(monitor_latencia_loop.medir)
+        
         # Función para actualizar usuario global cuando haga login
         def actualizar_usuario_global():
             global _usuario_actual_global
@@ -227,6 +253,24 @@ def main():
             # Actualizar usuario global cuando haga login exitoso
             actualizar_usuario_global()
             
+            # Copia local del cache: las vistas se dibujan al instante y se revalidan en segundo plano
+            # (se lee en un hilo aparte para no frenar la UI tras el login)
+            from app.utils.cache_firebase import cache_firebase
+            await asyncio.to_thread(cache_firebase.cargar_desde_disco)
+            
+            # Cache en tiempo real (opcional): escuchas en lugar de recargas por TTL
+            from app.utils.configuracion import GestorConfiguracion
+            if GestorConfiguracion.obtener_configuracion_completa().get("cache_tiempo_real"):
+                await cache_firebase.activar_escuchas()
+            
+            # Uso diario de Firebase compartido con las demás PCs
+            from app.utils.cuota_firebase import cuota_firebase
+            cuota_firebase.iniciar()
+            
+            # Métricas de Firebase en data/ (JSON y texto de Prometheus)
+            from app.utils.monitor_firebase import monitor_firebase
+            monitor_firebase.iniciar_instantaneas()
+            
             page.controls.clear()
             await principal_view(page)
             page.update()
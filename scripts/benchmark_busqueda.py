@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+[CHART] BENCHMARK - Búsqueda con índice de trigramas vs recorrido lineal
+Mide, sobre N productos sintéticos:
+  - construcción del índice (una vez por carga completa)
+  - delta de un documento (copiar + aplicar, lo que cuesta cada cambio)
+  - búsqueda sin límite, la del diálogo (MAX_RESULTADOS_DIALOGO) y autocompletado (5)
+  - recorrido lineal con `in` como lo hacía buscar_en_firebase
+
+Falla (assert) si la búsqueda sin límite o la del diálogo no le gana al
+recorrido lineal.
+
+Uso:
+    python scripts/benchmark_busqueda.py [cantidad_productos]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models import Producto
+from app.services.busqueda import MAX_RESULTADOS_DIALOGO
+from app.utils.indices_cache import TextoProductos
+
+TIPOS = ("Cadena", "Engrane", "Banda", "Polea", "Rodamiento", "Chumacera", "Catarina", "Tornillo")
+CONSULTAS = ("M012345", "m0999", "cadena", "rodam", "ca", "polea 12", "rodamento", "tornilo")
+
+
+def crear_productos(cantidad):
+    aleatorio = random.Random(7)
+    return [
+        Producto(f"p{i}", modelo=f"M{i:06d}", tipo=aleatorio.choice(TIPOS),
+                 nombre=f"{aleatorio.choice(TIPOS)} {aleatorio.randint(1, 400)} {aleatorio.choice(('A', 'B', 'XL'))}")
+        for i in range(cantidad)
+    ]
+
+
+def lineal(productos, busqueda):
+    busqueda = busqueda.lower().strip()
+    return [p for p in productos
+            if busqueda in str(p.get('modelo', '')).lower() or busqueda in str(p.get('nombre', '')).lower()
+            or busqueda in str(p.get('tipo', '')).lower()]
+
+
+def medir(funcion, repeticiones=20):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1000, resultado
+
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    productos = crear_productos(cantidad)
+
+    inicio = time.perf_counter()
+    indice = TextoProductos(productos)
+    print(f"Índice de {cantidad} productos construido en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
+    inicio = time.perf_counter()
+    copia = indice.copiar()
+    copia.aplicar(productos[0], productos[0].reemplazar(nombre="Polea nueva"))
+    print(f"Delta de 1 documento (copiar + aplicar): {(time.perf_counter() - inicio) * 1000:.1f} ms\n")
+
+    indice.buscar(CONSULTAS[0])  # La primera búsqueda amplia arma el orden por modelo
+
+    print(f"{'consulta':<12} {'lineal':>10} {'sin límite':>11} {'diálogo':>10} {'autocompl.':>11} {'resultados':>11}")
+    lentas = []
+    for consulta in CONSULTAS:
+        ms_lineal, _ = medir(lambda: lineal(productos, consulta), repeticiones=3)
+        ms_todos, resultados = medir(lambda: indice.buscar(consulta))
+        ms_dialogo, _ = medir(lambda: indice.buscar(consulta, limite=MAX_RESULTADOS_DIALOGO))
+        ms_sugerencias, _ = medir(lambda: indice.buscar(consulta, limite=5))
+        print(f"{consulta:<12} {ms_lineal:>8.1f}ms {ms_todos:>9.1f}ms {ms_dialogo:>8.1f}ms "
+              f"{ms_sugerencias:>9.1f}ms {len(resultados):>11}")
+        if ms_todos >= ms_lineal or ms_dialogo >= ms_lineal:
+            lentas.append(consulta)
+
+    assert not lentas, f"El índice no le gana al recorrido lineal en: {', '.join(lentas)}"
+    print("\n[OK] El índice le gana al recorrido lineal en todas las consultas")
+
+
+if __name__ == "__main__":
+    main()
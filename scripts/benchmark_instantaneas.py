@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+[CHART] BENCHMARK DE MEMORIA - Instantáneas del cache
+Compara lo que cuesta cada "cache hit" al navegar entre vistas:
+  - antes: obtener_*() devolvía lista.copy() en cada llamada
+  - ahora: obtener_*() devuelve la tupla compartida del cache
+
+Uso:
+    python scripts/benchmark_instantaneas.py [cantidad_productos] [navegaciones]
+"""
+
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.cache_firebase import CacheFirebase
+from tests.test_cache_firebase import FirestoreCacheFalso
+
+
+def crear_cache(cantidad):
+    productos = {
+        f"p{i}": {"modelo": f"M{i:06d}", "nombre": f"Producto {i}", "tipo": "Cadena",
+                  "precio": float(i % 500), "cantidad": i % 40}
+        for i in range(cantidad)
+    }
+    cache = CacheFirebase(db=FirestoreCacheFalso({"productos": productos}))
+    asyncio.run(cache.obtener_productos(mostrar_loading=False))
+    return cache
+
+
+def medir(nombre, navegar, navegaciones):
+    """Devuelve (segundos, bytes asignados en total, pico) de N navegaciones"""
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    asignados = 0
+    for _ in range(navegaciones):
+        antes, _pico = tracemalloc.get_traced_memory()
+        resultado = navegar()
+        despues, _pico = tracemalloc.get_traced_memory()
+        asignados += max(0, despues - antes)
+        del resultado
+    segundos = time.perf_counter() - inicio
+    _actual, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{nombre:<28} {segundos * 1000:>9.1f} ms {asignados / 1024:>12.1f} KiB {pico / 1024:>10.1f} KiB")
+    return segundos, asignados, pico
+
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    navegaciones = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    print(f"[CHART] {cantidad} productos en cache, {navegaciones} navegaciones")
+    cache = crear_cache(cantidad)
+    loop = asyncio.new_event_loop()
+
+    def obtener():
+        return loop.run_until_complete(cache.obtener_productos(mostrar_loading=False))
+
+    print(f"{'caso':<28} {'tiempo':>12} {'asignado':>16} {'pico':>14}")
+    print("-" * 74)
+    _, copia, _ = medir("lista.copy() por hit", lambda: list(obtener()), navegaciones)
+    _, compartida, _ = medir("instantánea compartida", obtener, navegaciones)
+    loop.close()
+
+    print("-" * 74)
+    print(f"[OK] Memoria asignada por navegación: {copia / navegaciones / 1024:.1f} KiB -> "
+          f"{compartida / navegaciones / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
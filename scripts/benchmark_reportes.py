@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+[CHART] BENCHMARK - Motor de reportes (planes perezosos de Polars)
+Mide, sobre datos sintéticos:
+  - conversión de las colecciones a tablas (una vez por carga completa)
+  - cada reporte por separado
+  - todos los reportes en una pasada (generar_reportes)
+
+Uso:
+    python scripts/benchmark_reportes.py [cantidad_productos]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.funciones.motor_reportes import PLANES, EntradasReporte, generar_reporte, generar_reportes, historial_a_frame
+from app.models import Movimiento, Producto, Ubicacion
+from app.utils.tablas_cache import TablaMovimientos, TablaProductos, TablaUbicaciones
+
+TIPOS_MOVIMIENTO = ("entrada_inventario", "salida_inventario", "ajuste_inventario", "movimiento_ubicacion")
+USUARIOS = ("Admin", "Operador1", "Supervisor")
+
+
+def crear_datos(cantidad):
+    aleatorio = random.Random(7)
+    productos = [Producto(f"p{i}", modelo=f"M{i:06d}", nombre=f"Producto {i}", cantidad=aleatorio.randint(0, 50),
+                          stock_min=aleatorio.randint(0, 20)) for i in range(cantidad)]
+    ubicaciones = [Ubicacion(f"u{i}", modelo=f"M{aleatorio.randrange(cantidad):06d}", almacen=aleatorio.randint(1, 5),
+                             estanteria=f"E{aleatorio.randint(1, 300)}", cantidad=aleatorio.randint(0, 30))
+                   for i in range(cantidad * 2)]
+    movimientos = [Movimiento.desde_documento(f"m{i}", {
+        "tipo": aleatorio.choice(TIPOS_MOVIMIENTO), "modelo": f"M{aleatorio.randrange(cantidad):06d}",
+        "cantidad": aleatorio.randint(1, 10), "usuario": aleatorio.choice(USUARIOS),
+        "almacen_destino": aleatorio.randint(1, 5), "estanteria_destino": "E1",
+        "fecha_movimiento": f"2024-{aleatorio.randint(1, 12):02d}-{aleatorio.randint(1, 28):02d}T10:00:00",
+    }) for i in range(cantidad)]
+    historial = [{
+        "tipo": "crear_producto", "usuario": aleatorio.choice(USUARIOS),
+        "descripcion": f"Creó producto 'Producto {i}' (Modelo: M{i:06d})", "fecha": "2024-06-01T10:00:00",
+    } for i in range(1000)]
+    return productos, ubicaciones, movimientos, historial
+
+
+def medir(funcion, repeticiones=5):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1000, resultado
+
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    productos, ubicaciones, movimientos, historial = crear_datos(cantidad)
+
+    inicio = time.perf_counter()
+    entradas = EntradasReporte(TablaProductos(productos).df, TablaUbicaciones(ubicaciones).df,
+                               TablaMovimientos(movimientos).df, historial_a_frame(historial))
+    print(f"Tablas de {cantidad} productos, {cantidad * 2} ubicaciones y {cantidad} movimientos: "
+          f"{(time.perf_counter() - inicio) * 1000:.0f} ms\n")
+
+    total = 0
+    print(f"{'reporte':<16}{'tiempo':>10}{'filas':>10}")
+    for tipo in PLANES:
+        ms, reporte = medir(lambda: generar_reporte(tipo, entradas))
+        total += ms
+        print(f"{tipo:<16}{ms:>8.1f}ms{reporte.height:>10}")
+    ms, _ = medir(lambda: generar_reportes(entradas))
+    print(f"\nSuma por separado: {total:.1f} ms - todos en una pasada: {ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Completa 'fecha_orden' en los movimientos que no lo tienen.
+
+La vista de movimientos pagina en Firestore con order_by('fecha_orden') y
+Firestore deja fuera de esas consultas a los documentos sin el campo: los
+movimientos anteriores a este cambio no aparecerían. Se ejecuta una vez:
+
+    python scripts/migrar_fecha_orden.py            # solo muestra qué haría
+    python scripts/migrar_fecha_orden.py --aplicar
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models import Movimiento
+from app.utils.versiones_colecciones import sellar, subir_version
+
+# Cada lote sube una vez la versión de la colección: 498 + 1 operaciones
+ACTUALIZACIONES_POR_LOTE = 498
+
+
+def migrar(db, aplicar: bool = False) -> int:
+    """Agrega 'fecha_orden' a los movimientos que no lo tienen; devuelve cuántos se actualizaron"""
+    pendientes = []
+    sin_fecha = 0
+    for snapshot in db.collection(Movimiento.COLECCION).stream():
+        datos = snapshot.to_dict() or {}
+        if Movimiento.CAMPO_ORDEN in datos:
+            continue
+        fecha = Movimiento.fecha_orden_de(datos)
+        if fecha is None:
+            sin_fecha += 1
+            print(f"[WARN] Movimiento {snapshot.id} sin fecha reconocible, se omite")
+            continue
+        pendientes.append((snapshot.reference, fecha))
+
+    print(f"[CHART] Movimientos sin fecha_orden: {len(pendientes)} (sin fecha reconocible: {sin_fecha})")
+    if not aplicar:
+        print("[INFO] Modo prueba: no se escribió nada (usar --aplicar)")
+        return 0
+
+    for inicio in range(0, len(pendientes), ACTUALIZACIONES_POR_LOTE):
+        lote = pendientes[inicio:inicio + ACTUALIZACIONES_POR_LOTE]
+        batch = db.batch()
+        for referencia, fecha in lote:
+            batch.update(referencia, sellar({Movimiento.CAMPO_ORDEN: fecha}))
+        subir_version(batch, db, [Movimiento.COLECCION])
+        batch.commit()
+        print(f"[OK] {inicio + len(lote)}/{len(pendientes)} movimientos actualizados")
+    return len(pendientes)
+
+
+if __name__ == "__main__":
+    from conexiones.firebase import db
+    migrar(db, aplicar="--aplicar" in sys.argv)
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Firestore en memoria para los tests (imitación mínima de firestore.Client).
+
+Guarda los documentos en `colecciones` (ruta de la colección -> id -> datos)
+y entiende lo que usa la app: document() con get/set/update/delete, batch()
+con el límite de 500 operaciones, get_all(), consultas con where/order_by/
+start_after/limit/stream/count y on_snapshot(). Los valores especiales
+(SERVER_TIMESTAMP, Increment, ArrayUnion, DELETE_FIELD) se resuelven como en
+el servidor y set(merge=True) mezcla los mapas anidados. SERVER_TIMESTAMP
+es un entero que sube en cada commit, así se compara con las marcas que
+arman los tests.
+
+Contadores: `intentos` (commits intentados), `commits` (operaciones de cada
+commit confirmado), `escrituras`, `lecturas` (documentos leídos), `streams`
+(colecciones leídas completas) y `consultas` (consultas con filtros, orden
+o límite, en el orden en que se ejecutaron).
+
+Fallas: `fallar_commits` son los intentos (desde 1) que fallan sin escribir
+y `commits_sin_respuesta` los que se escriben pero el cliente recibe un
+error, como un timeout después de que el servidor confirmó.
+"""
+
+import threading
+from types import SimpleNamespace
+
+from google.cloud import firestore
+
+_OPERADORES = {
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+    'in': lambda a, b: a in b,
+    'array_contains': lambda a, b: b in a,
+}
+
+
+def cambio(tipo, doc_id, datos=None):
+    """Cambio de snapshot con la forma de google.cloud.firestore.DocumentChange"""
+    return SimpleNamespace(type=SimpleNamespace(name=tipo), document=Snapshot(doc_id, datos or {}))
+
+
+def _cumple(datos, campo, operador, valor) -> bool:
+    if campo not in datos:
+        return False
+    try:
+        return _OPERADORES[operador](datos[campo], valor)
+    except TypeError:  # Tipos distintos no se comparan en Firestore
+        return False
+
+
+class Snapshot:
+    def __init__(self, doc_id, datos, referencia=None):
+        self.id = doc_id
+        self.reference = referencia
+        self.exists = datos is not None
+        self._datos = datos
+
+    def to_dict(self):
+        return None if self._datos is None else dict(self._datos)
+
+    def get(self, campo):
+        return (self._datos or {}).get(campo)
+
+
+class Consulta:
+    def __init__(self, db, ruta, filtros=(), orden=None, cursor=None, limite=None):
+        self.db = db
+        self.ruta = ruta
+        self.filtros, self.orden, self.cursor, self.limite = filtros, orden, cursor, limite
+
+    def _con(self, **cambios):
+        datos = dict(filtros=self.filtros, orden=self.orden, cursor=self.cursor, limite=self.limite)
+        datos.update(cambios)
+        return Consulta(self.db, self.ruta, **datos)
+
+    def where(self, field_path=None, op_string=None, value=None, *, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._con(filtros=self.filtros + ((field_path, op_string, value),))
+
+    def order_by(self, campo, direction='ASCENDING'):
+        return self._con(orden=(campo, direction == 'DESCENDING'))
+
+    def start_after(self, snapshot):
+        return self._con(cursor=snapshot)
+
+    def limit(self, cantidad):
+        return self._con(limite=cantidad)
+
+    def _resultados(self):
+        documentos = self.db.colecciones.get(self.ruta, {})
+        ids = [doc_id for doc_id, datos in documentos.items()
+               if all(_cumple(datos, *filtro) for filtro in self.filtros)]
+        if self.orden:
+            campo, descendente = self.orden
+            ids = [i for i in ids if campo in documentos[i]]
+            clave = lambda i: (documentos[i][campo], i)
+        else:
+            descendente = False
+            clave = lambda i: i
+        ids.sort(key=clave, reverse=descendente)
+        if self.cursor is not None:
+            if self.orden:
+                marca = (self.cursor.get(self.orden[0]), self.cursor.id)
+            else:
+                marca = self.cursor.id
+            ids = [i for i in ids if (clave(i) < marca if descendente else clave(i) > marca)]
+        if self.limite is not None:
+            ids = ids[:self.limite]
+        return [Snapshot(i, dict(documentos[i]), Referencia(self.db, self.ruta, i)) for i in ids]
+
+    def stream(self):
+        if self.filtros or self.orden or self.cursor is not None or self.limite is not None:
+            self.db.consultas.append(self)
+        else:
+            self.db.streams.append(self.ruta)
+        resultados = self._resultados()
+        self.db.lecturas += len(resultados)
+        return iter(resultados)
+
+    def get(self):
+        return list(self.stream())
+
+    def count(self, alias=None):
+        consulta = self
+
+        class _Agregacion:
+            def get(self):
+                # Una agregación no lee documentos (se cobra una lectura cada 1000 entradas)
+                return [[SimpleNamespace(alias=alias, value=len(consulta._resultados()))]]
+        return _Agregacion()
+
+
+class Coleccion(Consulta):
+    def __init__(self, db, ruta):
+        super().__init__(db, ruta)
+        self.id = ruta.rsplit('/', 1)[-1]
+
+    def document(self, doc_id=None):
+        if doc_id is None:
+            self.db.auto_ids += 1
+            doc_id = f"auto{self.db.auto_ids}"
+        return Referencia(self.db, self.ruta, doc_id)
+
+    def add(self, datos):
+        referencia = self.document()
+        referencia.set(datos)
+        return None, referencia
+
+    def on_snapshot(self, callback):
+        self.db.callbacks[self.ruta] = callback
+        return SimpleNamespace(unsubscribe=lambda: self.db.cancelados.append(self.ruta))
+
+
+class Referencia:
+    def __init__(self, db, ruta_coleccion, doc_id):
+        self.db = db
+        self.ruta_coleccion = ruta_coleccion
+        self.id = doc_id
+        self.path = f"{ruta_coleccion}/{doc_id}"
+
+    def collection(self, nombre):
+        return Coleccion(self.db, f"{self.path}/{nombre}")
+
+    def get(self):
+        self.db.lecturas += 1
+        datos = self.db.documento(self.ruta_coleccion, self.id)
+        return Snapshot(self.id, None if datos is None else dict(datos), self)
+
+    def set(self, datos, merge=False):
+        self.db._escribir(('set', self, datos, merge))
+
+    def update(self, datos):
+        self.db._escribir(('update', self, datos, False))
+
+    def delete(self):
+        self.db._escribir(('delete', self, None, False))
+
+
+class Batch:
+    def __init__(self, db):
+        self.db = db
+        self.operaciones = []
+
+    def set(self, referencia, datos, merge=False):
+        self.operaciones.append(('set', referencia, datos, merge))
+
+    def create(self, referencia, datos):
+        self.operaciones.append(('set', referencia, datos, False))
+
+    def update(self, referencia, datos):
+        self.operaciones.append(('update', referencia, datos, False))
+
+    def delete(self, referencia):
+        self.operaciones.append(('delete', referencia, None, False))
+
+    def commit(self):
+        db = self.db
+        with db.lock:  # La importación de ubicaciones confirma varios lotes a la vez
+            db.intentos += 1
+            intento = db.intentos
+            if intento in db.fallar_commits:
+                raise RuntimeError("conexión perdida")
+            assert len(self.operaciones) <= 500, "Firestore acepta hasta 500 operaciones por batch"
+            db.reloj += 1
+            for operacion in self.operaciones:
+                db._aplicar(operacion)
+            db.commits.append([(tipo, ref.path, datos) for tipo, ref, datos, _ in self.operaciones])
+            db.escrituras += len(self.operaciones)
+        if intento in db.commits_sin_respuesta:
+            raise RuntimeError("tiempo de espera agotado")
+        return []
+
+
+class FirestoreFalso:
+    """Firestore en memoria: ver el docstring del módulo"""
+
+    def __init__(self, colecciones=None, fallar_commits=(), commits_sin_respuesta=()):
+        self.colecciones = {ruta: dict(documentos) for ruta, documentos in (colecciones or {}).items()}
+        self.fallar_commits = set(fallar_commits)
+        self.commits_sin_respuesta = set(commits_sin_respuesta)
+        self.intentos = 0
+        self.commits = []
+        self.escrituras = 0
+        self.lecturas = 0
+        self.streams = []
+        self.consultas = []
+        self.callbacks = {}
+        self.cancelados = []
+        self.auto_ids = 0
+        self.reloj = 0
+        self.lock = threading.Lock()
+
+    # API de firestore.Client
+    def collection(self, nombre):
+        return Coleccion(self, nombre)
+
+    def batch(self):
+        return Batch(self)
+
+    def get_all(self, referencias):
+        for referencia in referencias:
+            yield referencia.get()
+
+    # Ayudas para los tests
+    def documento(self, ruta_coleccion, doc_id):
+        """Datos guardados del documento, o None si no existe"""
+        return self.colecciones.get(ruta_coleccion, {}).get(doc_id)
+
+    def version(self, coleccion):
+        """Versión de la colección en _metadatos (ver versiones_colecciones)"""
+        return (self.documento('_metadatos', coleccion) or {}).get('version')
+
+    @property
+    def operaciones(self):
+        """(tipo, ruta del documento, datos) de todos los commits confirmados"""
+        return [operacion for commit in self.commits for operacion in commit]
+
+    def escritos_por_commit(self, coleccion):
+        """Operaciones sobre documentos de la colección en cada commit confirmado"""
+        return [sum(1 for _, ruta, _ in commit if ruta.rsplit('/', 1)[0] == coleccion) for commit in self.commits]
+
+    def emitir(self, coleccion, cambios):
+        """Entrega cambios al on_snapshot de la colección (read_time: el reloj actual)"""
+        self.callbacks[coleccion](None, cambios, self.reloj)
+
+    # Escritura
+    def _escribir(self, operacion):
+        """Escritura suelta (sin batch): se aplica enseguida"""
+        with self.lock:
+            self.reloj += 1
+            self.escrituras += 1
+            self._aplicar(operacion)
+
+    def _aplicar(self, operacion):
+        tipo, referencia, datos, merge = operacion
+        documentos = self.colecciones.setdefault(referencia.ruta_coleccion, {})
+        actual = documentos.get(referencia.id)
+        if tipo == 'delete':
+            documentos.pop(referencia.id, None)
+        elif tipo == 'update':
+            if actual is None:
+                raise KeyError(f"No existe el documento {referencia.path}")
+            nuevo = dict(actual)
+            for campo, valor in datos.items():
+                # En update() los puntos separan campos anidados ('conteo.login')
+                *ruta, hoja = campo.split('.')
+                destino = nuevo
+                for parte in ruta:
+                    anidado = destino.get(parte)
+                    destino[parte] = dict(anidado) if isinstance(anidado, dict) else {}
+                    destino = destino[parte]
+                self._asignar(destino, hoja, valor)
+            documentos[referencia.id] = nuevo
+        else:
+            documentos[referencia.id] = self._mezclar(dict(actual or {}) if merge else {}, datos, merge)
+
+    def _mezclar(self, destino, datos, merge):
+        for campo, valor in datos.items():
+            if isinstance(valor, dict) and merge:
+                anterior = destino.get(campo)
+                destino[campo] = self._mezclar(dict(anterior) if isinstance(anterior, dict) else {}, valor, True)
+            else:
+                self._asignar(destino, campo, valor)
+        return destino
+
+    def _asignar(self, destino, campo, valor):
+        if valor is firestore.DELETE_FIELD:
+            destino.pop(campo, None)
+        else:
+            destino[campo] = self._resolver(destino.get(campo), valor)
+
+    def _resolver(self, actual, valor):
+        if valor is firestore.SERVER_TIMESTAMP:
+            return self.reloj
+        if isinstance(valor, firestore.Increment):
+            return (actual if isinstance(actual, (int, float)) else 0) + valor.value
+        if isinstance(valor, firestore.ArrayUnion):
+            lista = list(actual) if isinstance(actual, list) else []
+            return lista + [v for v in valor.values if v not in lista]
+        if isinstance(valor, dict):
+            return {campo: self._resolver(None, v) for campo, v in valor.items()}
+        return valor
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Test del cache de Firebase con un Firestore falso:
+1. Modo escucha: la carga inicial llega por on_snapshot, no por stream; la versión
+   se lee en el pool de firestore_async
+2. Deltas agregados/modificados/eliminados se aplican al cache
+3. Con escucha activa, invalidar o forzar refresh no relee la colección: espera el
+   snapshot con la última versión, o revalida por versión si no llega a tiempo
+4. Revalidación por versión: 1 lectura sin cambios, delta + lápidas con cambios
+5. Single-flight: llamadas simultáneas comparten una sola lectura; si la lectura
+   se cuelga, se devuelve la copia en cache y la próxima llamada lanza otra
+6. Instantáneas: tuplas compartidas con revisión que cambia al publicar
+7. Índice por modelo: se reconstruye al cargar y se actualiza con los deltas
+8. Tabla de polars: se arma al pedirla y sigue los deltas sin reconvertir todo
+9. Los índices de un delta se arman fuera del lock; si otra publicación gana, el delta se rearma
+"""
+
+import asyncio
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models import Ubicacion
+from app.utils.cache_firebase import CacheFirebase
+from app.utils.indices_cache import IndiceUbicaciones
+from app.utils.versiones_colecciones import actualizar_documento
+from tests.firestore_falso import FirestoreFalso, cambio
+
+
+def test_escucha_carga_inicial_y_deltas():
+    db = FirestoreFalso()
+    cache = CacheFirebase(db=db)
+    leer_version = cache._leer_version_segura
+    hilos = []
+
+    def leer_en_hilo(coleccion):
+        hilos.append(threading.current_thread().name)
+        return leer_version(coleccion)
+    cache._leer_version_segura = leer_en_hilo
+    asyncio.run(cache.activar_escuchas(["productos"]))
+    assert hilos and hilos[0].startswith("firestore")  # La versión se lee en el pool, no en el event loop
+
+    db.emitir("productos", [
+        cambio("ADDED", "p1", {"modelo": "M1", "cantidad": 3}),
+        cambio("ADDED", "p2", {"modelo": "M2"}),
+    ])
+    productos = asyncio.run(cache.obtener_productos())
+    assert sorted(p["modelo"] for p in productos) == ["M1", "M2"]
+    assert next(p for p in productos if p["modelo"] == "M2")["cantidad"] == 0  # Defaults aplicados
+
+    db.emitir("productos", [
+        cambio("MODIFIED", "p1", {"modelo": "M1", "cantidad": 9}),
+        cambio("REMOVED", "p2"),
+        cambio("ADDED", "p3", {"modelo": "M3"}),
+    ])
+    productos = asyncio.run(cache.obtener_productos())
+    assert {p["firebase_id"]: p.get("cantidad") for p in productos} == {"p1": 9, "p3": 0}
+    assert db.streams == []
+
+
+def test_escucha_lectura_tras_escritura(monkeypatch):
+    db = FirestoreFalso({"ubicaciones": {"u1": {"modelo": "M1", "cantidad": 2, "updated_at": 1}}})
+    _con_version(db, "ubicaciones", 1, 1)
+    db.reloj = 1
+    cache = CacheFirebase(db=db)
+    asyncio.run(cache.activar_escuchas(["ubicaciones"]))
+    db.emitir("ubicaciones", [cambio("ADDED", "u1", {"modelo": "M1", "cantidad": 2})])
+    lecturas = db.lecturas
+
+    # Sin escrituras la escucha responde sola, aunque se invalide por TTL
+    assert asyncio.run(cache.obtener_ubicaciones())[0]["cantidad"] == 2
+    assert db.lecturas == lecturas
+
+    # Escritura local: la escucha aún no la vio; la lectura espera el snapshot que la incluye
+    actualizar_documento("ubicaciones", "u1", {"cantidad": 5}, db=db)
+    cache.invalidar_cache_ubicaciones()
+    threading.Timer(0.2, lambda: db.emitir("ubicaciones", [
+        cambio("MODIFIED", "u1", {"modelo": "M1", "cantidad": 5})])).start()
+    assert asyncio.run(cache.obtener_ubicaciones())[0]["cantidad"] == 5
+    assert db.streams == [] and db.consultas == []  # Solo la lectura de la versión
+
+    # Si el snapshot no llega a tiempo se revalida por versión (delta) en lugar de devolver lo viejo
+    monkeypatch.setattr("app.utils.cache_firebase.TIMEOUT_LECTURA_TRAS_ESCRITURA", 0.1)
+    actualizar_documento("ubicaciones", "u1", {"cantidad": 9}, db=db)
+    assert asyncio.run(cache.obtener_ubicaciones(forzar_refresh=True))[0]["cantidad"] == 9
+    assert db.streams == [] and len(db.consultas) == 2  # Delta: documentos y lápidas
+
+
+def test_sin_escucha_usa_ttl_y_stream():
+    db = FirestoreFalso({"productos": {"p1": {"modelo": "M1"}}})
+    cache = CacheFirebase(db=db)
+
+    asyncio.run(cache.obtener_productos())
+    asyncio.run(cache.obtener_productos())
+    cache.invalidar_cache_productos()
+    asyncio.run(cache.obtener_productos())
+
+    assert db.streams == ["productos", "productos"]
+
+
+def test_desactivar_escuchas_vuelve_al_ttl():
+    db = FirestoreFalso({"productos": {"p1": {"modelo": "M1"}}})
+    cache = CacheFirebase(db=db)
+    asyncio.run(cache.activar_escuchas(["productos"]))
+    db.emitir("productos", [cambio("ADDED", "p1", {"modelo": "M1"})])
+
+    cache.desactivar_escuchas()
+    cache.invalidar_cache_productos()
+    asyncio.run(cache.obtener_productos())
+
+    assert db.cancelados == ["productos"]
+    assert db.streams == ["productos"]
+
+
+def _con_version(db, coleccion, version, marca):
+    db.colecciones.setdefault("_metadatos", {})[coleccion] = {"version": version, "updated_at": marca}
+
+
+def test_version_sin_cambios_no_relee():
+    db = FirestoreFalso({"productos": {"p1": {"modelo": "M1", "updated_at": 1}}})
+    _con_version(db, "productos", 4, 1)
+    cache = CacheFirebase(db=db)
+
+    asyncio.run(cache.obtener_productos())
+    cache.invalidar_cache_productos()
+    productos = asyncio.run(cache.obtener_productos(forzar_refresh=True))
+
+    assert [p["modelo"] for p in productos] == ["M1"]
+    assert db.streams == ["productos"]
+    assert db.consultas == []
+
+
+def test_version_cambiada_trae_solo_delta_y_lapidas():
+    db = FirestoreFalso({"ubicaciones": {
+        "u1": {"modelo": "M1", "cantidad": 1, "updated_at": 1},
+        "u2": {"modelo": "M2", "cantidad": 2, "updated_at": 1},
+    }})
+    _con_version(db, "ubicaciones", 1, 1)
+    cache = CacheFirebase(db=db)
+    asyncio.run(cache.obtener_ubicaciones())
+
+    # Otra PC modifica u1, crea u3 y elimina u2
+    db.colecciones["ubicaciones"]["u1"] = {"modelo": "M1", "cantidad": 5, "updated_at": 2}
+    db.colecciones["ubicaciones"]["u3"] = {"modelo": "M3", "cantidad": 3, "updated_at": 3}
+    del db.colecciones["ubicaciones"]["u2"]
+    db.colecciones["_metadatos/ubicaciones/eliminados"] = {"u2": {"doc_id": "u2", "updated_at": 3}}
+    _con_version(db, "ubicaciones", 4, 3)
+
+    cache.invalidar_cache_ubicaciones()
+    ubicaciones = asyncio.run(cache.obtener_ubicaciones())
+
+    assert {u["firebase_id"]: u["cantidad"] for u in ubicaciones} == {"u1": 5, "u3": 3}
+    assert db.streams == ["ubicaciones"]
+    assert [c.ruta for c in db.consultas] == ["ubicaciones", "_metadatos/ubicaciones/eliminados"]
+
+
+def test_copia_en_disco_se_muestra_y_revalida(tmp_path):
+    from app.utils.cache_disco import CacheDisco
+
+    db = FirestoreFalso({"productos": {"p1": {"modelo": "M1", "updated_at": 1}}})
+    _con_version(db, "productos", 1, 1)
+    primera = CacheFirebase(db=db, disco=CacheDisco(str(tmp_path / "cache.sqlite")))
+    asyncio.run(primera.obtener_productos())
+    primera.guardar_en_disco()
+
+    # Nueva sesión: se muestra la copia sin consultar y luego se trae solo el delta
+    db.colecciones["productos"]["p2"] = {"modelo": "M2", "updated_at": 2}
+    _con_version(db, "productos", 2, 2)
+    segunda = CacheFirebase(db=db, disco=CacheDisco(str(tmp_path / "cache.sqlite")))
+    assert segunda.cargar_desde_disco() == {"productos": 1}
+    assert [p["modelo"] for p in segunda.obtener_productos_inmediato()] == ["M1"]
+    assert segunda.necesita_revalidar("productos")
+
+    assert asyncio.run(segunda.revalidar("productos")) is True
+    assert sorted(p["modelo"] for p in segunda.obtener_productos_inmediato()) == ["M1", "M2"]
+    assert not segunda.necesita_revalidar("productos")
+    assert db.streams == ["productos"]
+    assert [c.ruta for c in db.consultas] == ["productos", "_metadatos/productos/eliminados"]
+
+
+def test_copia_en_disco_no_guarda_usuarios(tmp_path):
+    from app.utils.cache_disco import CacheDisco
+
+    disco = CacheDisco(str(tmp_path / "cache.sqlite"))
+    assert disco.guardar("usuarios", [{"nombre": "a", "contrasena": "x"}], None) is False
+    assert disco.cargar("usuarios") is None
+
+
+class FirestoreLento(FirestoreFalso):
+    """stream() se bloquea hasta que el test lo libera (simula una red lenta)"""
+
+    def __init__(self, colecciones=None):
+        super().__init__(colecciones)
+        self.liberar = threading.Event()
+        self.en_stream = threading.Event()
+        self.entradas = 0  # Llamadas a stream(), también las que siguen esperando
+
+    def collection(self, nombre):
+        coleccion = super().collection(nombre)
+        stream_original = coleccion.stream
+
+        def stream_lento():
+            self.entradas += 1
+            self.en_stream.set()
+            self.liberar.wait(5)
+            return stream_original()
+
+        coleccion.stream = stream_lento
+        return coleccion
+
+
+def test_cargas_simultaneas_comparten_una_consulta():
+    db = FirestoreLento({"productos": {"p1": {"modelo": "M1"}}})
+    cache = CacheFirebase(db=db)
+
+    async def varios_clics():
+        tareas = [asyncio.create_task(cache.obtener_productos(forzar_refresh=True)) for _ in range(5)]
+        await asyncio.to_thread(db.en_stream.wait, 5)
+        db.liberar.set()
+        return await asyncio.gather(*tareas)
+
+    resultados = asyncio.run(varios_clics())
+
+    assert db.streams == ["productos"]
+    assert all([p["modelo"] for p in r] == ["M1"] for r in resultados)
+    # Todos comparten la misma instantánea, sin copias
+    assert len({id(r) for r in resultados}) == 1
+
+
+def test_invalidar_durante_la_carga_no_la_da_por_vigente():
+    db = FirestoreLento({"productos": {"p1": {"modelo": "M1"}}})
+    cache = CacheFirebase(db=db)
+
+    async def invalidar_a_mitad():
+        tarea = asyncio.create_task(cache.obtener_productos())
+        await asyncio.to_thread(db.en_stream.wait, 5)
+        cache.invalidar_cache_productos()
+        db.liberar.set()
+        return await tarea
+
+    assert [p["modelo"] for p in asyncio.run(invalidar_a_mitad())] == ["M1"]
+    assert not cache.tiene_productos_en_cache()
+    asyncio.run(cache.obtener_productos())
+    assert db.streams == ["productos", "productos"]
+
+
+def test_carga_colgada_devuelve_la_copia_y_se_olvida(monkeypatch):
+    from app.utils import firestore_async
+
+    db = FirestoreLento({"productos": {"p1": {"modelo": "M1"}}})
+    db.liberar.set()
+    cache = CacheFirebase(db=db)
+    anteriores = asyncio.run(cache.obtener_productos())
+
+    db.liberar.clear()
+    db.colecciones["productos"]["p2"] = {"modelo": "M2"}
+    monkeypatch.setattr(firestore_async, "TIMEOUT_FIRESTORE", 0.1)
+    assert asyncio.run(cache.obtener_productos(forzar_refresh=True)) is anteriores
+    assert "productos" not in cache._cargas_en_curso
+
+    # La siguiente llamada no se cuelga de la carga anterior: lanza su propia lectura
+    db.liberar.set()
+    monkeypatch.setattr(firestore_async, "TIMEOUT_FIRESTORE", 5)
+    productos = asyncio.run(cache.obtener_productos(forzar_refresh=True))
+    assert sorted(p["modelo"] for p in productos) == ["M1", "M2"]
+    assert db.entradas == 3
+
+
+def test_instantaneas_compartidas_y_revision():
+    db = FirestoreFalso({"productos": {"p1": {"modelo": "M1"}}})
+    cache = CacheFirebase(db=db)
+
+    primera = asyncio.run(cache.obtener_productos())
+    segunda = asyncio.run(cache.obtener_productos())
+    foto = cache.instantanea("productos")
+
+    assert isinstance(primera, tuple) and primera is segunda is foto.documentos
+    assert cache.obtener_productos_inmediato() is primera
+
+    db.colecciones["productos"]["p2"] = {"modelo": "M2"}
+    cache.invalidar_cache_productos()
+    asyncio.run(cache.obtener_productos())
+
+    nueva = cache.instantanea("productos")
+    assert nueva.revision == foto.revision + 1
+    assert len(nueva.documentos) == 2 and len(foto.documentos) == 1  # La foto vieja no cambia
+
+
+def test_indice_por_modelo_sigue_deltas_y_escuchas():
+    db = FirestoreFalso({"ubicaciones": {
+        "u1": {"modelo": "Ab-1", "cantidad": 1, "updated_at": 1},
+        "u2": {"modelo": "AB-1 ", "cantidad": 2, "updated_at": 1},
+    }})
+    _con_version(db, "ubicaciones", 1, 1)
+    cache = CacheFirebase(db=db)
+    asyncio.run(cache.obtener_ubicaciones())
+    indice_inicial = cache.indice("ubicaciones")
+    assert {u["firebase_id"] for u in indice_inicial.todos(" ab-1")} == {"u1", "u2"}
+
+    # u1 cambia de modelo y u2 se elimina: el índice se actualiza sin releer
+    db.colecciones["ubicaciones"]["u1"] = {"modelo": "CD-2", "cantidad": 1, "updated_at": 2}
+    del db.colecciones["ubicaciones"]["u2"]
+    db.colecciones["_metadatos/ubicaciones/eliminados"] = {"u2": {"doc_id": "u2", "updated_at": 3}}
+    _con_version(db, "ubicaciones", 3, 3)
+    cache.invalidar_cache_ubicaciones()
+    asyncio.run(cache.obtener_ubicaciones())
+
+    indice = cache.indice("ubicaciones")
+    assert "ab-1" not in indice and indice.buscar("cd-2")["firebase_id"] == "u1"
+    assert len(indice_inicial.todos("AB-1")) == 2  # El índice publicado antes no cambia
+
+    # Con escucha: el primer snapshot reemplaza todo y los siguientes se aplican por documento
+    asyncio.run(cache.activar_escuchas(["productos"]))
+    db.emitir("productos", [cambio("ADDED", "p1", {"modelo": "M1"}), cambio("ADDED", "p2", {"modelo": "M2"})])
+    db.emitir("productos", [cambio("MODIFIED", "p1", {"modelo": "M9"}), cambio("REMOVED", "p2")])
+    productos = cache.indice("productos")
+    assert productos.buscar("m9")["firebase_id"] == "p1"
+    assert productos.buscar("M1") is None and productos.buscar("M2") is None
+
+
+def test_tabla_sigue_los_deltas():
+    db = FirestoreFalso({"ubicaciones": {
+        "u1": {"modelo": "Ab-1", "cantidad": 1, "updated_at": 1},
+        "u2": {"modelo": "AB-1 ", "cantidad": "2", "updated_at": 1},
+    }})
+    _con_version(db, "ubicaciones", 1, 1)
+    cache = CacheFirebase(db=db)
+    asyncio.run(cache.obtener_ubicaciones())
+    inicial = cache.tabla("ubicaciones")
+    assert inicial.filter(inicial["modelo_clave"] == "ab-1")["cantidad"].sum() == 3
+
+    db.colecciones["ubicaciones"]["u1"] = {"modelo": "CD-2", "cantidad": 5, "updated_at": 2}
+    db.colecciones["ubicaciones"]["u3"] = {"modelo": "ab-1", "cantidad": 4, "updated_at": 2}
+    _con_version(db, "ubicaciones", 2, 2)
+    cache.invalidar_cache_ubicaciones()
+    asyncio.run(cache.obtener_ubicaciones())
+
+    tabla = cache.tabla("ubicaciones").sort("firebase_id")
+    assert tabla["firebase_id"].to_list() == ["u1", "u2", "u3"]
+    assert tabla["modelo_clave"].to_list() == ["cd-2", "ab-1", "ab-1"]
+    assert inicial.height == 2  # La tabla publicada antes no cambia
+
+
+def test_delta_indexa_fuera_del_lock_y_se_rearma(monkeypatch):
+    db = FirestoreFalso({"ubicaciones": {"u1": {"modelo": "AB-1", "cantidad": 1, "updated_at": 1}}})
+    _con_version(db, "ubicaciones", 1, 1)
+    cache = CacheFirebase(db=db)
+    asyncio.run(cache.obtener_ubicaciones())
+
+    # Mientras el delta copia el índice, otro hilo toma el lock y publica una lista más nueva
+    aplicar_original = IndiceUbicaciones.aplicar
+    otros_hilos = []
+
+    def aplicar(indice, anterior, nuevo):
+        if not otros_hilos:
+            def publicar_otra():
+                with cache._lock:  # Se bloquearía si el delta indexara bajo el lock
+                    actuales = list(cache.instantanea("ubicaciones").documentos)
+                    cache._publicar("ubicaciones", actuales + [Ubicacion("u9", modelo="ZZ-9", cantidad=1)])
+            hilo = threading.Thread(target=publicar_otra)
+            otros_hilos.append(hilo)
+            hilo.start()
+            hilo.join(timeout=5)
+            assert not hilo.is_alive()
+        aplicar_original(indice, anterior, nuevo)
+    monkeypatch.setattr(IndiceUbicaciones, "aplicar", aplicar)
+
+    db.colecciones["ubicaciones"]["u2"] = {"modelo": "CD-2", "cantidad": 2, "updated_at": 2}
+    _con_version(db, "ubicaciones", 2, 2)
+    cache.invalidar_cache_ubicaciones()
+    asyncio.run(cache.obtener_ubicaciones())
+
+    # El delta se rearmó sobre la lista que publicó el otro hilo: no la pisó
+    assert {u["firebase_id"] for u in cache.instantanea("ubicaciones").documentos} == {"u1", "u2", "u9"}
+    indice = cache.indice("ubicaciones")
+    assert indice.buscar("cd-2")["firebase_id"] == "u2" and indice.buscar("zz-9")["firebase_id"] == "u9"
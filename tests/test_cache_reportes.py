@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test del cache de resultados de reportes (app.funciones.cache_reportes):
+1. Volver a pedir el mismo reporte no recarga ni recalcula
+2. Cambiar una entrada del reporte (o sus filtros) lo recalcula; cambiar otra no
+3. Desalojo LRU por cantidad de entradas y por memoria
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import polars as pl
+
+from app.funciones.cache_reportes import CacheReportes
+from app.funciones.motor_reportes import EntradasReporte, Filtros, historial_a_frame
+from app.models import Producto
+from app.utils.tablas_cache import TablaMovimientos, TablaProductos, TablaUbicaciones
+
+
+class _Fuente:
+    """Versiones y entradas falsas: cuenta cuántas veces se cargó cada entrada"""
+
+    def __init__(self):
+        self.versiones = {"productos": 1, "ubicaciones": 1, "movimientos": 1, "historial": (0, None)}
+        self.cargas = []
+
+    async def versiones_de(self, nombres):
+        return {nombre: self.versiones[nombre] for nombre in nombres}
+
+    async def cargar(self, nombres):
+        self.cargas.append(tuple(nombres))
+        productos = TablaProductos([Producto("p1", modelo="CAD-25", nombre="Cadena", cantidad=0, stock_min=5)])
+        return EntradasReporte(productos.df, TablaUbicaciones().df, TablaMovimientos().df, historial_a_frame([]))
+
+
+def test_reporte_repetido_sale_del_cache():
+    fuente = _Fuente()
+    cache = CacheReportes(versiones=fuente.versiones_de, cargar=fuente.cargar)
+
+    primero = asyncio.run(cache.reporte("stock_critico"))
+    segundo = asyncio.run(cache.reporte("stock_critico", Filtros(usuario="Ana")))  # No usa filtros
+
+    assert segundo is primero and primero.height == 1
+    assert fuente.cargas == [("productos",)]
+    assert cache.estadisticas()["aciertos"] == 1
+
+
+def test_cambio_de_entrada_invalida_solo_sus_reportes():
+    fuente = _Fuente()
+    cache = CacheReportes(versiones=fuente.versiones_de, cargar=fuente.cargar)
+    asyncio.run(cache.reporte("stock_critico"))
+    asyncio.run(cache.reporte("altas", Filtros(usuario="Ana")))
+
+    fuente.versiones["movimientos"] = 2  # Ninguno de los dos depende de movimientos
+    asyncio.run(cache.reporte("stock_critico"))
+    asyncio.run(cache.reporte("altas", Filtros(usuario="Ana")))
+    assert len(fuente.cargas) == 2
+
+    fuente.versiones["productos"] = 2
+    asyncio.run(cache.reporte("stock_critico"))
+    asyncio.run(cache.reporte("altas", Filtros(usuario="Beto")))  # Otros filtros: otro resultado
+    assert len(fuente.cargas) == 4
+    assert cache.estadisticas()["entradas"] == 3  # La versión vieja de stock_critico se descartó
+
+
+def test_desalojo_por_cantidad_y_memoria():
+    cache = CacheReportes(max_entradas=2, max_bytes=10_000)
+    chico = pl.DataFrame({"x": [1, 2, 3]})
+
+    cache.guardar(cache.clave("altas", Filtros(usuario="a"), {"historial": 1}), chico)
+    cache.guardar(cache.clave("altas", Filtros(usuario="b"), {"historial": 1}), chico)
+    assert cache.obtener(cache.clave("altas", Filtros(usuario="a"), {"historial": 1})) is chico  # a es reciente
+    cache.guardar(cache.clave("altas", Filtros(usuario="c"), {"historial": 1}), chico)
+
+    assert cache.obtener(cache.clave("altas", Filtros(usuario="b"), {"historial": 1})) is None
+    assert cache.obtener(cache.clave("altas", Filtros(usuario="a"), {"historial": 1})) is chico
+
+    grande = pl.DataFrame({"x": list(range(5_000))})  # ~40 KB: supera el tope, no se guarda
+    cache.guardar(cache.clave("bajas", None, {"historial": 1}), grande)
+    assert cache.obtener(cache.clave("bajas", None, {"historial": 1})) is None
+    assert cache.estadisticas()["bytes"] <= 10_000
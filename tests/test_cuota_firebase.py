@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Test del presupuesto diario de Firebase (app.utils.cuota_firebase):
+1. El uso se atribuye por contexto (también dentro de firestore_async.ejecutar) y se
+   guarda en SQLite: dos instancias con el mismo archivo ven el total de ambas
+2. `_cuota/{dia}` suma el total de cada cliente; volver a sincronizar no duplica
+3. Cerca del presupuesto las revalidaciones pasan a solo cache y las operaciones
+   masivas devuelven un aviso
+4. MonitorFirebase cobra cada consulta a la funcionalidad indicada o a la del contexto
+5. solo_cache() estima en memoria sin tocar SQLite y el día es el del Pacífico
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import cuota_firebase as modulo_cuota
+from app.utils.cuota_firebase import CuotaFirebase, atribuida, atribuir, funcionalidad_actual
+from app.utils.firestore_async import ejecutar
+from app.utils.monitor_firebase import MonitorFirebase
+from tests.firestore_falso import FirestoreFalso
+
+
+def test_atribucion_y_uso_compartido_en_sqlite(tmp_path):
+    ruta = tmp_path / "cuota.sqlite"
+    una = CuotaFirebase(ruta, presupuestos={})
+    otra = CuotaFirebase(ruta, presupuestos={})
+
+    @atribuida('reportes')
+    async def reporte():
+        # El hilo del pool ve la funcionalidad del que lo lanzó
+        return await ejecutar(funcionalidad_actual)
+
+    assert asyncio.run(reporte()) == 'reportes'
+    assert funcionalidad_actual() == 'general'
+
+    with atribuir('importacion'):
+        una.registrar(funcionalidad_actual(), 'escritura', 400)
+    una.registrar('reportes', 'lectura', 30)
+    otra.registrar('reportes', 'lectura', 20)
+    otra.registrar('reportes', 'consulta_rara', 99)  # Tipos desconocidos no cuentan
+
+    assert una.uso_del_dia() == {'importacion': {'escrituras': 400}, 'reportes': {'lecturas': 30}}
+    assert otra.uso_del_dia() == {'importacion': {'escrituras': 400}, 'reportes': {'lecturas': 50}}
+
+    una.cerrar()
+    reabierta = CuotaFirebase(ruta, presupuestos={})
+    assert reabierta.uso_del_dia()['reportes'] == {'lecturas': 50}
+
+
+def test_total_global_entre_pcs(tmp_path, monkeypatch):
+    monkeypatch.setattr(MonitorFirebase, 'registrar_consulta', lambda *a, **k: None)
+    db = FirestoreFalso()
+    pc1 = CuotaFirebase(tmp_path / "pc1.sqlite", db=db, presupuestos={})
+    pc2 = CuotaFirebase(tmp_path / "pc2.sqlite", db=db, presupuestos={})
+
+    pc1.registrar('sincronizacion', 'lectura', 1000)
+    pc2.registrar('sincronizacion', 'lectura', 500)
+    pc2.registrar('dashboard', 'lectura', 7)
+    pc1.sincronizar_global()
+    pc2.sincronizar_global()
+    pc2.sincronizar_global()  # Valores absolutos por cliente: no se suma dos veces
+
+    assert pc2.uso_del_dia() == {'sincronizacion': {'lecturas': 1500}, 'dashboard': {'lecturas': 7}}
+    assert pc1.uso_del_dia()['sincronizacion'] == {'lecturas': 1000}  # Aún no leyó lo de pc2
+
+    pc1.registrar('sincronizacion', 'lectura', 10)
+    assert pc1.sincronizar_global()['sincronizacion'] == {'lecturas': 1510}
+    pc1.registrar('sincronizacion', 'lectura', 5)  # Consumido después de sincronizar
+    assert pc1.uso_del_dia()['sincronizacion'] == {'lecturas': 1515}
+    assert db.escrituras == 4 and db.lecturas == 4
+
+
+def test_solo_cache_y_aviso_masivo(tmp_path):
+    cuota = CuotaFirebase(tmp_path / "cuota.sqlite", umbral=0.9,
+                          presupuestos={'dashboard': {'lecturas': 100}, 'importacion': {'escrituras': 1000}})
+
+    cuota.registrar('dashboard', 'lectura', 80)
+    assert not cuota.solo_cache('dashboard')
+    cuota.registrar('dashboard', 'lectura', 10)
+    assert cuota.solo_cache('dashboard')
+    assert not cuota.solo_cache('reportes')  # Cada funcionalidad con su presupuesto
+    with atribuir('dashboard'):
+        assert cuota.solo_cache()
+
+    assert cuota.aviso_operacion_masiva('importacion', escrituras=800) is None
+    aviso = cuota.aviso_operacion_masiva('importacion', escrituras=950)
+    assert aviso and "950 de 1,000 escrituras" in aviso
+
+    cuota.registrar('general', 'escritura', 18_500)  # Límite diario, aunque la importación tenga margen
+    assert "Total del día" in cuota.aviso_operacion_masiva('importacion', escrituras=10)
+
+
+def test_monitor_cobra_a_la_funcionalidad(tmp_path):
+    cuota = CuotaFirebase(tmp_path / "cuota.sqlite", presupuestos={})
+    monitor = MonitorFirebase(cuota=cuota)
+
+    monitor.registrar_consulta('lectura', 'productos', cantidad_docs=12)
+    with atribuir('reportes'):
+        monitor.registrar_consulta('lectura', 'movimientos', cantidad_docs=3)
+        monitor.registrar_consulta('escritura', 'productos', cantidad_docs=2, funcionalidad='sincronizacion')
+
+    assert cuota.uso_del_dia() == {'general': {'lecturas': 12}, 'reportes': {'lecturas': 3},
+                                   'sincronizacion': {'escrituras': 2}}
+    assert monitor.obtener_resumen_completo()['cuota_diaria']['uso']['reportes'] == {'lecturas': 3}
+
+
+def test_solo_cache_en_memoria_y_dia_del_pacifico(tmp_path, monkeypatch):
+    ruta = tmp_path / "cuota.sqlite"
+    otra = CuotaFirebase(ruta, presupuestos={})
+    otra.registrar('dashboard', 'lectura', 60)
+    otra.volcar()
+    cuota = CuotaFirebase(ruta, presupuestos={'dashboard': {'lecturas': 100}})
+    cuota.registrar('dashboard', 'lectura', 1)
+    cuota.volcar()  # El volcado relee el día: ya ve las 60 de la otra instancia
+
+    def sin_sqlite():
+        raise AssertionError("solo_cache() no debe tocar SQLite")
+    monkeypatch.setattr(cuota, '_conectar', sin_sqlite)
+    cuota.registrar('dashboard', 'lectura', 30)
+    assert cuota.uso_estimado() == {'dashboard': {'lecturas': 91}}
+    assert cuota.solo_cache('dashboard')
+
+    class Reloj(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2024, 3, 2, 5, 30, tzinfo=timezone.utc).astimezone(tz)
+    monkeypatch.setattr(modulo_cuota, 'datetime', Reloj)
+    assert modulo_cuota._hoy() == '2024-03-01'  # 05:30 UTC son las 21:30 del día anterior en California
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test de la importación idempotente (diff_importacion):
+1. Reimportar el mismo catálogo no genera escrituras
+2. Solo se escriben nuevos y cambios reales, sin volver a consultar su existencia
+3. Emparejamiento por modelo normalizado
+"""
+
+import asyncio
+import os
+import sys
+
+import polars as pl
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.funciones.diff_importacion import calcular_diff_productos
+from app.funciones.importacion_lotes import ImportadorProductos
+from app.funciones.ingesta_excel import normalizar_productos
+from tests.firestore_falso import FirestoreFalso
+
+
+def _archivo(filas):
+    return normalizar_productos(pl.DataFrame(
+        filas, schema=["Modelo", "Tipo", "Nombre", "Precio"], orient="row"
+    ))
+
+
+CACHE = [
+    {"firebase_id": "abc123", "modelo": "Cadena 25", "tipo": "Cadena", "nombre": "Rodillo 1/4", "precio": 210, "cantidad": 7},
+    {"firebase_id": "Cadena 35", "modelo": "Cadena 35", "tipo": "Cadena", "nombre": "Rodillo 3/8", "precio": 210.0, "cantidad": 3},
+    {"firebase_id": "sin-tipo", "modelo": "X1", "tipo": "Sin tipo", "nombre": "Pieza", "precio": "15", "cantidad": 0},
+]
+
+
+def test_reimportar_sin_cambios_no_escribe():
+    archivo = _archivo([
+        ["Cadena 25", "Cadena", "Rodillo 1/4", 210],
+        ["Cadena 35", "Cadena", "Rodillo 3/8", "210"],
+        ["X1", None, "Pieza", 15],
+    ])
+
+    diff = calcular_diff_productos(archivo, CACHE)
+
+    assert diff.total_escrituras == 0
+    assert diff.resumen() == {"nuevos": 0, "cambiados": 0, "sin_cambios": 3, "invalidos": 0}
+
+
+def test_detecta_nuevos_cambiados_e_invalidos():
+    archivo = _archivo([
+        [" cadena 25 ", "Cadena", "Rodillo 1/4", 210],   # Mismo modelo, cambia mayúsculas -> cambio
+        ["Cadena 35", "Cadena", "Rodillo 3/8", 250],      # Precio distinto -> cambio
+        ["Nuevo 1", "Banda", "Banda A", 99.5],
+        [None, "Banda", "Sin modelo", 1],
+    ])
+
+    diff = calcular_diff_productos(archivo, CACHE)
+
+    assert diff.resumen() == {"nuevos": 1, "cambiados": 2, "sin_cambios": 0, "invalidos": 1}
+    assert diff.nuevos["modelo"].to_list() == ["Nuevo 1"]
+    assert sorted(diff.cambiados["firebase_id"].to_list()) == ["Cadena 35", "abc123"]
+
+
+def test_importar_cambios_usa_documento_existente_con_merge(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db = FirestoreFalso({"productos": {"abc123": {}}})
+    archivo = _archivo([
+        ["Cadena 25", "Cadena", "Rodillo 1/4 reforzado", 210],
+        ["Cadena 35", "Cadena", "Rodillo 3/8", 210],
+        ["Nuevo 1", "Banda", "Banda A", 99.5],
+    ])
+    diff = calcular_diff_productos(archivo, CACHE)
+
+    resultado = asyncio.run(ImportadorProductos(db=db).importar_cambios(diff))
+
+    assert db.escritos_por_commit("productos") == [2]
+    assert db.lecturas == 0  # La existencia sale del diff, sin get_all
+    assert resultado["nuevos"] == 1
+    assert resultado["actualizados"] == 1
+    assert resultado["sin_cambios"] == 1
+    # El cambio no incluye la cantidad, así no se pisa la calculada desde ubicaciones
+    assert "cantidad" not in db.documento("productos", "abc123")
+    assert db.documento("productos", "Nuevo 1")["cantidad"] == 0
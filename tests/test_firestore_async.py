@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test del acceso a Firestore fuera del event loop:
+1. leer() devuelve los documentos sin bloquear el loop
+2. Timeout: la UI queda libre y el hilo deja de leer el stream
+3. El monitor de latencia detecta un bloqueo del loop
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.firestore_async import ejecutar, leer
+from app.utils.latencia_loop import MonitorLatenciaLoop
+
+
+class ConsultaLenta:
+    """stream() que tarda `pausa` segundos por documento"""
+
+    def __init__(self, cantidad, pausa):
+        self.cantidad = cantidad
+        self.pausa = pausa
+        self.entregados = 0
+        self.termino = threading.Event()
+
+    def stream(self):
+        try:
+            for i in range(self.cantidad):
+                time.sleep(self.pausa)
+                self.entregados += 1
+                yield i
+        finally:
+            self.termino.set()
+
+
+def test_leer_no_bloquea_el_loop():
+    monitor = MonitorLatenciaLoop(intervalo=0.01, umbral_bloqueo=0.1)
+
+    async def escenario():
+        medicion = asyncio.create_task(monitor.medir())
+        documentos = await leer(ConsultaLenta(20, 0.01))
+        medicion.cancel()
+        return documentos
+
+    assert asyncio.run(escenario()) == list(range(20))
+    assert monitor.resumen()["bloqueos"] == 0
+
+
+def test_timeout_libera_la_ui_y_corta_el_stream():
+    consulta = ConsultaLenta(1000, 0.01)
+
+    async def escenario():
+        with pytest.raises(TimeoutError):
+            await leer(consulta, timeout=0.05)
+
+    asyncio.run(escenario())
+    assert consulta.termino.wait(2)
+    assert consulta.entregados < 1000
+
+
+def test_ejecutar_propaga_errores_del_sdk():
+    def falla():
+        raise ValueError("sin permisos")
+
+    with pytest.raises(ValueError):
+        asyncio.run(ejecutar(falla))
+
+
+def test_monitor_detecta_bloqueo():
+    monitor = MonitorLatenciaLoop(intervalo=0.01, umbral_bloqueo=0.05)
+
+    async def escenario():
+        medicion = asyncio.create_task(monitor.medir())
+        await asyncio.sleep(0.03)
+        time.sleep(0.15)  # Llamada bloqueante dentro del loop
+        await asyncio.sleep(0.03)
+        medicion.cancel()
+
+    asyncio.run(escenario())
+    resumen = monitor.resumen()
+    assert resumen["bloqueos"] == 1
+    assert resumen["maximo_ms"] >= 100
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test del registro local de actividades (app.utils.historial_local):
+1. Solo se agrega: no se recorta y las más recientes salen primero, con filtros
+2. Los conteos del día salen de la tabla de contadores
+3. Las consultas de recientes usan índices (sin ordenar todo el registro)
+4. El JSON anterior se importa una sola vez, en orden cronológico
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.historial_local import HistorialLocal
+
+
+def _actividad(i, dia="2024-03-01", tipo=None, usuario=None):
+    return {"tipo": tipo or ("login" if i % 2 else "crear_producto"), "usuario": usuario or f"u{i % 3}",
+            "descripcion": f"Actividad {i}", "fecha": f"{dia}T10:{i // 60:02d}:{i % 60:02d}",
+            "detalles": {"modelo": f"M-{i}"} if i % 2 == 0 else {}}
+
+
+def test_agrega_sin_recortar_y_lee_recientes(tmp_path):
+    registro = HistorialLocal(tmp_path / "historial.sqlite", json_anterior=None)
+    for i in range(300):
+        registro.agregar(_actividad(i))
+
+    recientes = registro.recientes(5)
+    assert [a["descripcion"] for a in recientes] == [f"Actividad {i}" for i in (299, 298, 297, 296, 295)]
+    assert recientes[1]["detalles"] == {"modelo": "M-298"} and recientes[0]["detalles"] == {}
+    assert len(registro.recientes(1000)) == 300  # Nada se descarta
+    assert all(a["tipo"] == "login" for a in registro.recientes(10, tipo="login"))
+    assert [a["descripcion"] for a in registro.recientes(2, usuario="u0", tipo="crear_producto")] == \
+        ["Actividad 294", "Actividad 288"]
+    assert registro.ultimo_id() == 300
+
+
+def test_conteo_del_dia(tmp_path):
+    registro = HistorialLocal(tmp_path / "historial.sqlite", json_anterior=None)
+    for i in range(10):
+        registro.agregar(_actividad(i, dia="2024-03-01"))
+    registro.agregar(_actividad(0, dia="2024-03-02", tipo="importar_excel"))
+
+    assert registro.conteo_del_dia("2024-03-01") == {"login": 5, "crear_producto": 5}
+    assert registro.conteo_del_dia("2024-03-02") == {"importar_excel": 1}
+    assert registro.conteo_del_dia("2024-03-03") == {}
+
+
+def test_recientes_usa_indices(tmp_path):
+    registro = HistorialLocal(tmp_path / "historial.sqlite", json_anterior=None)
+    registro.agregar(_actividad(0))
+    conexion = registro._conectar()
+
+    for where, parametros in (("", ()), (" WHERE tipo = ?", ("login",)), (" WHERE usuario = ?", ("u0",))):
+        plan = " ".join(str(fila[-1]) for fila in conexion.execute(
+            f"EXPLAIN QUERY PLAN SELECT * FROM actividades{where} ORDER BY fecha DESC, id DESC LIMIT 5", parametros))
+        assert "INDEX" in plan and "TEMP B-TREE" not in plan, plan
+
+
+def test_importa_json_anterior_una_vez(tmp_path):
+    anterior = tmp_path / "historial_local.json"
+    anterior.write_text(json.dumps([_actividad(2), _actividad(1)]), encoding="utf-8")  # Más reciente primero
+
+    registro = HistorialLocal(tmp_path / "historial.sqlite", json_anterior=anterior)
+    assert [a["descripcion"] for a in registro.recientes(5)] == ["Actividad 2", "Actividad 1"]
+    assert registro.conteo_del_dia("2024-03-01") == {"crear_producto": 1, "login": 1}
+    registro.cerrar()
+
+    otra_vez = HistorialLocal(tmp_path / "historial.sqlite", json_anterior=anterior)
+    assert len(otra_vez.recientes(10)) == 2
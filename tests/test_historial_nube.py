@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test del historial en Firestore con escritura diferida (app.utils.historial_nube):
+1. agregar() no escribe; vaciar() escribe un documento por hora en un solo batch
+2. Las recientes salen de los documentos por hora y de lo pendiente, sin repetir
+3. Las estadísticas del día cuentan las actividades de cada hora
+4. Si el batch falla las actividades vuelven a la cola; si se escribió pero no
+   llegó la respuesta, reintentar no duplica las actividades ni los conteos
+5. La versión del historial cambia cuando escribe otra PC (y GestorHistorial la usa)
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import historial as modulo_historial
+from app.utils.historial_nube import HistorialNube
+from tests.firestore_falso import FirestoreFalso
+
+
+def _actividad(i, hora=10, tipo="login", usuario="Ana"):
+    return {"tipo": tipo, "usuario": usuario, "descripcion": f"Actividad {i}",
+            "fecha": f"2024-03-01T{hora:02d}:{i % 60:02d}:00", "detalles": {}}
+
+
+def test_vaciar_agrupa_por_hora_en_un_batch():
+    db = FirestoreFalso()
+    historial = HistorialNube(db=db, intervalo=None)
+    for i in range(30):
+        historial.agregar(_actividad(i, hora=10 + i % 3))
+
+    assert db.intentos == 0 and historial.pendientes() == 30
+    assert historial.vaciar() == 30
+    assert db.intentos == 1 and historial.pendientes() == 0
+    assert sorted(db.colecciones["historial_horas"]) == ["2024-03-01T10", "2024-03-01T11", "2024-03-01T12"]
+    assert len(db.documento("historial_horas", "2024-03-01T10")["actividades"]) == 10
+    assert historial.vaciar() == 0 and db.intentos == 1  # Nada pendiente: no escribe
+
+
+def test_recientes_y_conteo_del_dia():
+    db = FirestoreFalso()
+    historial = HistorialNube(db=db, intervalo=None)
+    for i in range(20):
+        historial.agregar(_actividad(i, hora=i // 2, tipo="login" if i % 2 else "crear_producto"))
+    historial.vaciar()
+    historial.agregar(_actividad(99, hora=23, tipo="importar_excel", usuario="Beto"))  # Aún sin escribir
+
+    recientes = historial.recientes(5)
+    assert [a["descripcion"] for a in recientes] == ["Actividad 99", "Actividad 19", "Actividad 18",
+                                                      "Actividad 17", "Actividad 16"]
+    assert db.lecturas == 6  # Una página de horas, no una lectura por actividad
+    assert [a["descripcion"] for a in historial.recientes(3, tipo="crear_producto")] == \
+        ["Actividad 18", "Actividad 16", "Actividad 14"]
+    assert [a["usuario"] for a in historial.recientes(10, usuario="Beto")] == ["Beto"]
+
+    assert historial.conteo_del_dia("2024-03-01") == {"login": 10, "crear_producto": 10, "importar_excel": 1}
+
+    historial.vaciar()  # Lo pendiente ya escrito no se repite
+    assert [a["descripcion"] for a in historial.recientes(2)] == ["Actividad 99", "Actividad 19"]
+
+
+def test_falla_el_batch_y_se_reintenta():
+    db = FirestoreFalso(fallar_commits={1})
+    historial = HistorialNube(db=db, intervalo=None)
+    historial.agregar(_actividad(1))
+
+    assert historial.vaciar() == 0 and historial.pendientes() == 1
+    historial.agregar(_actividad(2))
+    historial.cerrar()
+    assert historial.pendientes() == 0
+    actividades = db.documento("historial_horas", "2024-03-01T10")["actividades"]
+    assert [a["descripcion"] for a in actividades] == ["Actividad 1", "Actividad 2"]
+
+
+def test_commit_sin_respuesta_no_duplica_conteos():
+    db = FirestoreFalso(commits_sin_respuesta={1})
+    historial = HistorialNube(db=db, intervalo=None)
+    historial.agregar(_actividad(1))
+    historial.agregar(_actividad(2, tipo="crear_producto"))
+
+    assert historial.vaciar() == 0 and historial.pendientes() == 2  # Escrito, pero el cliente no lo sabe
+    assert historial.conteo_del_dia("2024-03-01") == {"login": 1, "crear_producto": 1}
+
+    assert historial.vaciar() == 2 and db.intentos == 2
+    documento = db.documento("historial_horas", "2024-03-01T10")
+    assert len(documento["actividades"]) == 2 and "conteo" not in documento
+    assert historial.conteo_del_dia("2024-03-01") == {"login": 1, "crear_producto": 1}
+
+
+def test_version_cambia_cuando_escribe_otra_pc(monkeypatch):
+    db = FirestoreFalso()
+    esta, otra = HistorialNube(db=db, intervalo=None), HistorialNube(db=db, intervalo=None)
+    monkeypatch.setattr(modulo_historial, "MODO_ECONOMICO", False)
+    monkeypatch.setattr(modulo_historial, "historial_nube", esta)
+    gestor = modulo_historial.GestorHistorial()
+
+    antes = asyncio.run(gestor.version())
+    assert asyncio.run(gestor.version()) == antes  # Sin escrituras la clave no cambia
+    otra.agregar(_actividad(1))
+    otra.vaciar()
+
+    assert asyncio.run(gestor.version()) != antes
+    assert esta.version() == 1
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test del motor de importación por lotes:
+1. Un commit por lote (499 documentos + la versión de la colección)
+2. Conteo de nuevos/actualizados con get_all
+3. Reanudación desde el checkpoint tras una interrupción
+4. Reintentos por lote en la importación de ubicaciones
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.funciones.importacion_lotes import ImportadorProductos, ImportadorUbicaciones, CheckpointImportacion
+from tests.firestore_falso import FirestoreFalso
+
+
+def _productos(n):
+    return [
+        {"modelo": f"M{i:05d}", "tipo": "T", "nombre": f"Producto {i}", "precio": 1.0, "cantidad": 0}
+        for i in range(n)
+    ]
+
+
+def test_commit_por_lote(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db = FirestoreFalso({"productos": {"M00000": {}, "M00001": {}}})
+    progreso = []
+
+    resultado = asyncio.run(ImportadorProductos(db=db).importar(
+        _productos(1200), on_progreso=lambda p, t: progreso.append((p, t))
+    ))
+
+    assert db.escritos_por_commit("productos") == [499, 499, 202]
+    assert db.version("productos") == 3
+    assert resultado["nuevos"] == 1198
+    assert resultado["actualizados"] == 2
+    assert progreso[-1] == (1200, 1200)
+    assert not os.path.exists("data/checkpoint_importacion_productos.json")
+
+
+def test_filas_invalidas_y_duplicadas(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db = FirestoreFalso()
+    productos = _productos(3) + [{"modelo": "M00000", "tipo": "X", "nombre": "Nuevo", "precio": 2.0, "cantidad": 0},
+                                 {"modelo": None, "tipo": "T", "nombre": "Sin modelo", "precio": 1.0, "cantidad": 0},
+                                 {"modelo": "INCOMPLETO"}]
+
+    resultado = asyncio.run(ImportadorProductos(db=db).importar(productos))
+
+    assert resultado["invalidos"] == 2
+    assert resultado["nuevos"] == 3
+    assert db.documento("productos", "M00000")["nombre"] == "Nuevo"
+
+
+def test_reanuda_desde_checkpoint(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db = FirestoreFalso(fallar_commits={3})
+    productos = _productos(1600)
+
+    try:
+        asyncio.run(ImportadorProductos(db=db).importar(productos))
+    except RuntimeError:
+        pass
+    assert db.escritos_por_commit("productos") == [499, 499]
+
+    db.fallar_commits.clear()
+    resultado = asyncio.run(ImportadorProductos(db=db).importar(productos))
+
+    # Solo se escriben los dos lotes pendientes
+    assert db.escritos_por_commit("productos") == [499, 499, 499, 103]
+    assert resultado["reanudado"] is True
+    assert resultado["nuevos"] == 1600
+
+
+def test_checkpoint_de_otro_archivo_se_ignora(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    CheckpointImportacion("productos", "otra-clave").guardar(2, 1000, 0, 1000)
+    db = FirestoreFalso()
+
+    resultado = asyncio.run(ImportadorProductos(db=db).importar(_productos(10)))
+
+    assert resultado["reanudado"] is False
+    assert db.escritos_por_commit("productos") == [10]
+
+
+def _ubicaciones(n):
+    return [
+        {"modelo": f"M{i % 7}", "almacen": "Principal", "estanteria": "A1", "cantidad": 1}
+        for i in range(n)
+    ]
+
+
+def test_ubicaciones_reintenta_lote_fallido(monkeypatch):
+    db = FirestoreFalso(fallar_commits={2})  # El segundo intento de commit falla
+    monkeypatch.setattr(asyncio, "sleep", _sin_espera)
+
+    resultado = asyncio.run(ImportadorUbicaciones(db=db).importar(_ubicaciones(1100)))
+
+    assert resultado["guardados"] == 1100
+    assert resultado["errores"] == 0
+    assert db.intentos == 4
+    assert len(db.colecciones["ubicaciones"]) == 1100
+    assert resultado["modelos"] == {f"M{i}" for i in range(7)}
+
+
+def test_ubicaciones_lote_agotado_no_cuenta_modelos(monkeypatch):
+    db = FirestoreFalso()
+    monkeypatch.setattr(asyncio, "sleep", _sin_espera)
+    importador = ImportadorUbicaciones(db=db, tamano_lote=2, max_reintentos=2)
+    original = importador._confirmar_lote
+
+    def confirmar(lote, referencias):
+        if lote[0]["modelo"] == "ROTO":
+            raise RuntimeError("permiso denegado")
+        original(lote, referencias)
+
+    importador._confirmar_lote = confirmar
+    ubicaciones = [{"modelo": "OK", "cantidad": 1}] * 2 + [{"modelo": "ROTO", "cantidad": 1}] * 2
+
+    resultado = asyncio.run(importador.importar(ubicaciones))
+
+    assert resultado["guardados"] == 2
+    assert resultado["errores"] == 2
+    assert resultado["modelos"] == {"OK"}
+
+
+async def _sin_espera(segundos):
+    return None
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test de los índices del cache (app.utils.indices_cache):
+1. Ubicaciones por modelo y por (almacén, estantería) con totales de cantidad
+2. Los deltas actualizan grupos y totales sin reconstruir el índice
+3. copiar() deja intacto el índice publicado
+4. Búsqueda de texto: orden exacto > prefijo > contiene > aproximado, deltas incrementales
+5. Copias en capas encadenadas (y consolidadas) buscan igual que un índice reconstruido
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models import Producto, Ubicacion
+from app.utils import indices_cache
+from app.utils.indices_cache import IndiceUbicaciones, TextoProductos
+
+
+def _ubicacion(doc_id, modelo, almacen, estanteria, cantidad):
+    return Ubicacion(doc_id, modelo=modelo, almacen=almacen, estanteria=estanteria, cantidad=cantidad)
+
+
+def _indice():
+    return IndiceUbicaciones([
+        _ubicacion("u1", "AB-1", 1, "a1", 5),
+        _ubicacion("u2", "ab-1 ", "1", "A1", 3),
+        _ubicacion("u3", "CD-2", 2, "B2", 0),
+        _ubicacion("u4", "CD-2", 2, "B2", "7"),
+    ])
+
+
+def test_totales_por_modelo_y_estanteria():
+    indice = _indice()
+
+    assert indice.total_modelo("ab-1") == 8
+    assert indice.total_modelo("CD-2") == 7
+    assert indice.total_modelo("ZZ") == 0
+    assert {u["firebase_id"] for u in indice.en_estanteria("1", "a1")} == {"u1", "u2"}
+    assert indice.total_estanteria(2, " b2 ") == 7
+    assert indice.estanterias() == {("1", "A1"): 8, ("2", "B2"): 7}
+    assert {u["firebase_id"] for u in indice.con_existencias()} == {"u1", "u2", "u4"}
+
+
+def test_deltas_actualizan_totales():
+    publicado = _indice()
+    indice = publicado.copiar()
+    u1 = publicado.buscar("AB-1")
+
+    # u1 se mueve de estantería y cambia su cantidad; u4 se vacía; u2 se elimina
+    indice.aplicar(u1, u1.reemplazar(estanteria="C3", cantidad=2))
+    u4 = next(u for u in publicado.todos("CD-2") if u["firebase_id"] == "u4")
+    indice.aplicar(u4, u4.reemplazar(cantidad=0))
+    u2 = next(u for u in publicado.todos("AB-1") if u["firebase_id"] == "u2")
+    indice.aplicar(u2, None)
+
+    assert indice.total_modelo("AB-1") == 2
+    assert indice.total_estanteria(1, "A1") == 0 and indice.en_estanteria(1, "A1") == ()
+    assert indice.total_estanteria(1, "C3") == 2
+    assert indice.total_modelo("CD-2") == 0
+    assert [u["firebase_id"] for u in indice.con_existencias()] == ["u1"]
+
+    # Reconstruir desde cero da lo mismo que aplicar los deltas
+    lista = [indice.buscar("AB-1")] + list(indice.todos("CD-2"))
+    reconstruido = IndiceUbicaciones(lista)
+    assert reconstruido.estanterias() == indice.estanterias()
+
+    assert publicado.total_modelo("AB-1") == 8  # El índice publicado no cambió
+
+
+def _productos():
+    return TextoProductos([
+        Producto("p1", modelo="CAD-25", nombre="Cadena 25", tipo="Cadena"),
+        Producto("p2", modelo="CAD-250", nombre="Cadena reforzada", tipo="Cadena"),
+        Producto("p3", modelo="XCAD-25", nombre="Adaptador", tipo="Accesorio"),
+        Producto("p4", modelo="ENG-1", nombre="Engrane cad-25", tipo="Transmisión"),
+        Producto("p5", modelo="BAN-7", nombre="Banda", tipo="Transmisión"),
+        Producto("p6", modelo="TOR-8", nombre="Tornillo 8mm", tipo="Fijación"),
+    ])
+
+
+def test_busqueda_ordenada_por_relevancia():
+    indice = _productos()
+
+    ids = [p["firebase_id"] for p in indice.buscar("cad-25")]
+    assert ids == ["p1", "p2", "p4", "p3"]  # exacto, prefijo, prefijo de palabra, contiene
+    assert [p["firebase_id"] for p in indice.buscar("CAD-25", limite=2)] == ["p1", "p2"]
+    assert {p["firebase_id"] for p in indice.buscar("transmision")} == {"p4", "p5"}  # Sin acentos
+    assert [p["firebase_id"] for p in indice.buscar("ba")] == ["p5"]  # Consulta corta
+    assert [p["firebase_id"] for p in indice.buscar("bandda")] == ["p5"]  # Aproximado (error de tipeo)
+    assert [p["firebase_id"] for p in indice.buscar("tornilo 8")] == ["p6"]  # Corrige solo la palabra errada
+    assert indice.buscar("zzz") == [] and indice.buscar("  ") == []
+
+
+def test_busqueda_se_actualiza_por_delta_sin_tocar_el_publicado():
+    publicado = _productos()
+    indice = publicado.copiar()
+    p5 = publicado.buscar("BAN-7")[0]
+
+    indice.aplicar(p5, p5.reemplazar(modelo="POL-3", nombre="Polea"))
+    indice.aplicar(None, Producto("p7", modelo="BAN-8", nombre="Banda ancha"))
+
+    assert [p["firebase_id"] for p in indice.buscar("polea")] == ["p5"]
+    assert [p["firebase_id"] for p in indice.buscar("banda")] == ["p7"]
+    assert [p["firebase_id"] for p in publicado.buscar("banda")] == ["p5"]
+    assert publicado.buscar("polea") == []
+
+
+def test_copias_encadenadas_igual_que_reconstruir(monkeypatch):
+    monkeypatch.setattr(indices_cache, "MAX_CAMBIOS", 4)  # Consolidar la base varias veces
+    productos = {f"p{i}": Producto(f"p{i}", modelo=f"M{i:03d}", nombre=f"Cadena {i}", tipo="Cadena")
+                 for i in range(30)}
+    publicado = indice = TextoProductos(productos.values())
+
+    for i in range(0, 30, 3):
+        indice = indice.copiar()
+        anterior = productos[f"p{i}"]
+        productos[f"p{i}"] = anterior.reemplazar(nombre=f"Polea {i}", tipo="Polea")
+        indice.aplicar(anterior, productos[f"p{i}"])
+        indice.aplicar(productos.pop(f"p{i + 1}"), None)
+        productos[f"n{i}"] = Producto(f"n{i}", modelo=f"A{i:03d}", nombre="Banda", tipo="Banda")
+        indice.aplicar(None, productos[f"n{i}"])
+
+    reconstruido = TextoProductos(productos.values())
+    for consulta in ("cadena", "polea", "banda", "m0", "a0", "ca"):
+        esperado = [p["firebase_id"] for p in reconstruido.buscar(consulta)]
+        assert [p["firebase_id"] for p in indice.buscar(consulta)] == esperado
+        # Con límite se corta al tener suficientes del mejor nivel: salen en el mismo orden relativo
+        limitados = [p["firebase_id"] for p in indice.buscar(consulta, limite=3)]
+        assert len(limitados) == min(3, len(esperado))
+        assert sorted(limitados, key=esperado.index) == limitados
+    assert len(indice) == len(productos)
+    assert len(publicado.buscar("polea")) == 0 and len(publicado.buscar("cadena")) == 30
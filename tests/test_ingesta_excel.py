@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test de la lectura vectorizada de Excel (ingesta_excel):
+1. Resolución de encabezados alternativos una vez por archivo
+2. Valores por defecto de ubicaciones; un 0 o un vacío pasan al siguiente alias
+3. Validación de productos por columnas
+"""
+
+import os
+import sys
+import time
+
+import polars as pl
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.funciones.ingesta_excel import (
+    COLUMNAS_UBICACIONES,
+    normalizar_productos,
+    normalizar_ubicaciones,
+    resolver_columnas,
+    separar_productos_validos,
+)
+
+
+def test_resolver_columnas_respeta_prioridad():
+    mapeo = resolver_columnas(["Rack", "Material", "Ubicación", "Qty"], COLUMNAS_UBICACIONES)
+
+    assert mapeo["modelo"] == ["Material"]
+    assert mapeo["estanteria"] == ["Ubicación", "Rack"]
+    assert mapeo["cantidad"] == ["Qty"]
+    assert mapeo["observaciones"] == []
+
+
+def test_ubicaciones_valores_por_defecto():
+    crudo = pl.DataFrame({
+        "Material": ["  A-100 ", None, "none"],
+        "Almacen": ["Norte", "", None],
+        "Rack": ["R1", "R2", None],
+        "Estanteria": [None, "E7", None],
+        "Cantidad": ["4.9", "abc", "-3"],
+        "Stock": [None, 8, None],
+    })
+
+    resultado = normalizar_ubicaciones(crudo)
+
+    assert resultado["modelo"].to_list() == ["A-100", "UBICACION002", "UBICACION003"]
+    assert resultado["almacen"].to_list() == ["Norte", "Almacén Principal", "Almacén Principal"]
+    assert resultado["estanteria"].to_list() == ["R1", "E7", "A1"]
+    assert resultado["cantidad"].to_list() == [4, 8, 1]
+    assert resultado["observaciones"].to_list() == ["Sin observaciones"] * 3
+
+
+def test_ubicaciones_cantidad_cero_pasa_al_siguiente_alias():
+    crudo = pl.DataFrame({
+        "Material": ["A", "B", "C", "D"],
+        "Cantidad": [0, None, 0, 5],
+        "Qty": ["", "0", "7", "9"],
+        "Stock": [3, 4, None, 1],
+    })
+
+    resultado = normalizar_ubicaciones(crudo)
+
+    assert resultado["cantidad"].to_list() == [3, 4, 7, 5]
+
+
+def test_productos_invalidos_y_duplicados():
+    crudo = pl.DataFrame({
+        "Modelo": ["M1", "M2", None, "M1", "M3"],
+        "Tipo": ["T", "T", "T", "T2", "T"],
+        "Nombre": ["a", "b", "c", "d", "e"],
+        "Precio": ["10", "x", "5", "12.5", None],
+    })
+
+    validos, invalidos = separar_productos_validos(normalizar_productos(crudo))
+
+    assert validos["modelo"].to_list() == ["M1"]
+    assert validos["precio"].to_list() == [12.5]
+    assert validos["cantidad"].to_list() == [0]
+    assert invalidos.height == 3
+
+
+def test_productos_sin_columnas_requeridas():
+    try:
+        normalizar_productos(pl.DataFrame({"Modelo": ["M1"], "Nombre": ["a"]}))
+    except ValueError as e:
+        assert "Tipo" in str(e) and "Precio" in str(e)
+    else:
+        raise AssertionError("Se esperaba ValueError por columnas faltantes")
+
+
+def test_ubicaciones_100k_filas():
+    n = 100_000
+    crudo = pl.DataFrame({
+        "Modelo": [f"M{i % 5000}" for i in range(n)],
+        "Almacén": ["Principal"] * n,
+        "Estantería": [f"E{i % 40}" for i in range(n)],
+        "Cantidad": [i % 9 for i in range(n)],
+    })
+
+    inicio = time.perf_counter()
+    resultado = normalizar_ubicaciones(crudo)
+    print(f"⏱️ 100k filas normalizadas en {(time.perf_counter() - inicio) * 1000:.1f}ms")
+
+    assert resultado.height == n
+    assert resultado["cantidad"].min() == 1
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test de los registros (app.models) y repositorios (app.services):
+1. Un registro se lee como dict de solo lectura, con defaults y campos extra
+2. Movimiento completa fecha/fecha_movimiento entre sí
+3. crear() escribe sin firebase_id, registra en el monitor e invalida el cache
+4. eliminar_varios() agrupa en lotes con lápidas, reporta los lotes fallidos y
+   se cobra al presupuesto de eliminación masiva
+5. contar() cuenta en el servidor y autenticar() devuelve el usuario o None
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models import MODELOS, Movimiento, Producto, normalizar_modelo
+from app.services import repositorio as modulo_repositorio
+from app.services.repositorio import ELIMINACIONES_POR_LOTE, FUNCIONALIDAD_ELIMINACION
+from app.services.productos import RepositorioProductos
+from app.services.usuarios import RepositorioUsuarios
+from app.utils.indices_cache import IndiceModelo
+from tests.firestore_falso import FirestoreFalso
+
+
+class CacheFalso:
+    def __init__(self, productos=()):
+        self.productos = tuple(productos)
+        self.invalidaciones = 0
+
+    async def obtener_productos(self, forzar_refresh=False, mostrar_loading=True):
+        return self.productos
+
+    def indice(self, coleccion):
+        return IndiceModelo(self.productos)
+
+    def invalidar_cache_productos(self):
+        self.invalidaciones += 1
+
+
+def test_registro_se_lee_como_dict():
+    producto = Producto.desde_documento('abc', {'modelo': 'M-1', 'precio': 10, 'color': 'rojo'})
+
+    assert producto['firebase_id'] == 'abc'
+    assert producto['nombre'] == 'Sin nombre'
+    assert producto.get('precio') == 10
+    assert producto['color'] == 'rojo'
+    assert 'updated_at' not in producto
+    assert producto.get('categoria', 'x') == 'x'
+    assert dict(producto) == producto.copy()
+    assert 'firebase_id' not in producto.a_firestore()
+
+    editado = producto.reemplazar(precio=12)
+    assert editado['precio'] == 12 and producto['precio'] == 10
+    assert not hasattr(producto, '__dict__')
+
+
+def test_movimiento_completa_fechas():
+    movimiento = Movimiento.desde_documento('m1', {'fecha_movimiento': '2024-01-01'})
+    assert movimiento['fecha'] == '2024-01-01'
+    assert set(MODELOS) == {'productos', 'ubicaciones', 'movimientos', 'usuarios'}
+    assert normalizar_modelo('  AB-1 ') == 'ab-1'
+    assert normalizar_modelo(None) == ''
+
+
+def test_crear_escribe_sin_firebase_id_e_invalida():
+    db, cache = FirestoreFalso(), CacheFalso()
+    repositorio = RepositorioProductos(db=db, cache=cache)
+
+    producto = asyncio.run(repositorio.crear(Producto(firebase_id='x', modelo='N-1', nombre='Nuevo')))
+
+    escrito = next(datos for op, ruta, datos in db.operaciones if ruta.startswith('productos/'))
+    assert 'firebase_id' not in escrito and 'updated_at' in escrito
+    assert producto['firebase_id'].startswith('auto')
+    assert producto['modelo'] == 'N-1'
+    assert cache.invalidaciones == 1
+
+
+def test_buscar_por_modelo_normaliza():
+    cache = CacheFalso([Producto('p1', modelo='Ab-1'), Producto('p2', modelo='CD-2')])
+    repositorio = RepositorioProductos(db=FirestoreFalso(), cache=cache)
+
+    assert asyncio.run(repositorio.buscar_por_modelo(' ab-1 '))['firebase_id'] == 'p1'
+    assert asyncio.run(repositorio.buscar_por_modelo('zz')) is None
+
+
+def test_eliminar_varios_en_lotes_con_lapidas(monkeypatch):
+    cobros = []
+    monkeypatch.setattr(modulo_repositorio.monitor_firebase, 'registrar_consulta',
+                        lambda **datos: cobros.append((datos['funcionalidad'], datos['cantidad_docs'])))
+    db, cache = FirestoreFalso(fallar_commits={2}), CacheFalso()
+    repositorio = RepositorioProductos(db=db, cache=cache)
+    ids = [f"p{i}" for i in range(ELIMINACIONES_POR_LOTE * 2 + 10)]
+
+    eliminados, con_error = asyncio.run(repositorio.eliminar_varios(ids))
+
+    assert db.intentos == 3
+    assert con_error == ids[ELIMINACIONES_POR_LOTE:ELIMINACIONES_POR_LOTE * 2]
+    assert len(eliminados) == ELIMINACIONES_POR_LOTE + 10
+    lapidas = [ruta for op, ruta, _ in db.operaciones if '/eliminados/' in ruta]
+    assert len(lapidas) == len(eliminados)
+    assert cache.invalidaciones == 1
+    assert cobros == [(FUNCIONALIDAD_ELIMINACION, 2 * ELIMINACIONES_POR_LOTE), (FUNCIONALIDAD_ELIMINACION, 20)]
+
+
+def test_contar_y_autenticar_sin_leer_la_coleccion():
+    db = FirestoreFalso({'usuarios': {
+        'u1': {'nombre': 'ana', 'contrasena': 'x1', 'es_admin': True},
+        'u2': {'nombre': 'beto', 'contrasena': 'y2'},
+    }})
+    repositorio = RepositorioUsuarios(db=db, cache=object())
+
+    assert asyncio.run(repositorio.contar()) == 2
+    usuario = asyncio.run(repositorio.autenticar('ana', 'x1'))
+    assert usuario['firebase_id'] == 'u1' and usuario['es_admin'] is True
+    assert asyncio.run(repositorio.autenticar('ana', 'y2')) is None
+    assert db.lecturas == 1 and not db.streams
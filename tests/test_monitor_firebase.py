@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test de las métricas del monitor de Firebase (app.utils.monitor_firebase):
+1. Las consultas recientes quedan en un buffer acotado; los contadores siguen sumando
+2. Contadores e histograma de latencia por (colección, tipo); medir() toma el tiempo
+3. Sin imprimir por defecto; con imprimir, una línea por consulta
+4. Instantáneas JSON y Prometheus en la carpeta indicada, también por intervalo
+"""
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.cuota_firebase import CuotaFirebase
+from app.utils.monitor_firebase import (ARCHIVO_JSON, ARCHIVO_PROMETHEUS, HistogramaLatencia,
+                                        MonitorFirebase)
+
+
+def _monitor(tmp_path, **opciones):
+    opciones.setdefault('imprimir', False)
+    return MonitorFirebase(cuota=CuotaFirebase(tmp_path / "cuota.sqlite", presupuestos={}), **opciones)
+
+
+def test_buffer_acotado_y_contadores(tmp_path):
+    monitor = _monitor(tmp_path, max_recientes=50)
+    for i in range(1000):
+        monitor.registrar_consulta('lectura', 'productos', f'Consulta {i}', cantidad_docs=2)
+
+    recientes = monitor.consultas_recientes()
+    assert len(recientes) == 50 and recientes[-1]['descripcion'] == 'Consulta 999'
+    resumen = monitor.obtener_resumen_completo()
+    assert resumen['lecturas'] == 2000 and len(resumen['historial_consultas']) == 50
+    assert resumen['metricas'] == [{'coleccion': 'productos', 'tipo': 'lectura', 'operaciones': 1000,
+                                    'documentos': 2000, 'latencia': resumen['metricas'][0]['latencia']}]
+    assert resumen['metricas'][0]['latencia']['cuenta'] == 0  # Sin duración no hay latencia
+
+
+def test_histograma_por_coleccion_y_medir(tmp_path):
+    monitor = _monitor(tmp_path)
+    for duracion in (0.003, 0.02, 0.02, 0.3, 4.0):
+        monitor.registrar_consulta('lectura', 'ubicaciones', duracion=duracion)
+    monitor.registrar_consulta('escritura', 'ubicaciones', cantidad_docs=10, duracion=0.1)
+    with monitor.medir('lectura', 'movimientos', 'Página') as consulta:
+        time.sleep(0.01)
+        consulta['cantidad_docs'] = 50
+
+    por_clave = {(m['coleccion'], m['tipo']): m for m in monitor.metricas()}
+    lecturas = por_clave['ubicaciones', 'lectura']['latencia']
+    assert lecturas['cuenta'] == 5 and lecturas['p50_ms'] == 25.0 and lecturas['maximo_ms'] == 4000.0
+    assert por_clave['ubicaciones', 'escritura']['documentos'] == 10
+    medida = por_clave['movimientos', 'lectura']
+    assert medida['documentos'] == 50 and medida['latencia']['p50_ms'] >= 10
+
+    histograma = HistogramaLatencia()
+    histograma.observar(60.0)  # Más allá de la última cubeta
+    assert histograma.cubetas[-1] == 1 and histograma.percentil(0.99) == 60.0
+
+
+def test_sin_imprimir_por_defecto(tmp_path, capsys):
+    monitor = _monitor(tmp_path)
+    monitor.registrar_consulta('lectura', 'productos', 'Silenciosa')
+    assert capsys.readouterr().out == ""
+
+    monitor.imprimir = True
+    monitor.registrar_consulta('escritura', 'productos', 'Visible', duracion=0.05)
+    salida = capsys.readouterr().out.splitlines()
+    assert len(salida) == 1 and 'Visible' in salida[0] and '50 ms' in salida[0]
+
+
+def test_instantaneas_json_y_prometheus(tmp_path):
+    monitor = _monitor(tmp_path)
+    monitor.registrar_consulta('lectura', 'produ"ctos', cantidad_docs=3, duracion=0.02, funcionalidad='reportes')
+
+    assert monitor.escribir_instantaneas(tmp_path / "data") == monitor.ultima_instantanea
+    datos = json.loads((tmp_path / "data" / ARCHIVO_JSON).read_text(encoding='utf-8'))
+    assert datos['lecturas'] == 3 and datos['cuota_diaria']['uso'] == {'reportes': {'lecturas': 3}}
+
+    texto = (tmp_path / "data" / ARCHIVO_PROMETHEUS).read_text(encoding='utf-8')
+    etiquetas = 'coleccion="produ\\"ctos",tipo="lectura"'
+    assert f'totalstock_firestore_documentos_total{{{etiquetas}}} 3' in texto
+    assert f'totalstock_firestore_latencia_segundos_bucket{{{etiquetas},le="0.01"}} 0' in texto
+    assert f'totalstock_firestore_latencia_segundos_bucket{{{etiquetas},le="0.025"}} 1' in texto
+    assert f'totalstock_firestore_latencia_segundos_bucket{{{etiquetas},le="+Inf"}} 1' in texto
+    assert 'totalstock_firebase_uso_diario{funcionalidad="reportes",operacion="lecturas"} 3' in texto
+    assert not list((tmp_path / "data").glob("*.tmp"))
+
+
+def test_instantaneas_por_intervalo(tmp_path):
+    monitor = _monitor(tmp_path)
+    monitor.iniciar_instantaneas(intervalo=0.05, directorio=tmp_path)
+    time.sleep(0.2)
+    assert (tmp_path / ARCHIVO_PROMETHEUS).exists()
+
+    monitor.registrar_consulta('eliminacion', 'usuarios')
+    monitor.detener_instantaneas(directorio=tmp_path)  # Deja la última al detener
+    datos = json.loads((tmp_path / ARCHIVO_JSON).read_text(encoding='utf-8'))
+    assert datos['eliminaciones'] == 1
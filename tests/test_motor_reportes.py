@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test del motor de reportes (app.funciones.motor_reportes) sin Flet ni Firebase:
+1. Movimientos: origen/destino por tipo, campos viejos y traslados del historial
+2. Los filtros de período y usuario solo aplican a los reportes con fechas
+3. Modelos del historial desde detalles o descripción (altas, bajas, rotación)
+4. generar_reportes (una pasada) da lo mismo que cada reporte por separado
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.funciones.motor_reportes import (PLANES, EntradasReporte, Filtros, generar_reporte, generar_reportes,
+                                          historial_a_frame)
+from app.models import Movimiento, Producto, Ubicacion
+from app.utils.tablas_cache import TablaMovimientos, TablaProductos, TablaUbicaciones
+
+
+def _entradas():
+    productos = TablaProductos([
+        Producto("p1", modelo="CAD-25", nombre="Cadena", cantidad=0, stock_min=5),
+        Producto("p2", modelo="BAN-7", nombre="Banda", cantidad=2, stock_min=10),
+        Producto("p3", modelo="POL-3", nombre="Polea", cantidad=20, stock_min=5),
+    ]).df
+    ubicaciones = TablaUbicaciones([
+        Ubicacion("u1", modelo="CAD-25", almacen=1, estanteria="A1", cantidad=0),
+        Ubicacion("u2", modelo="BAN-7", almacen="Norte", estanteria="B", cantidad=3),
+    ]).df
+    movimientos = TablaMovimientos([
+        Movimiento.desde_documento("m1", {"tipo": "entrada_inventario", "modelo": "CAD-25", "cantidad": 4,
+                                          "almacen_destino": 1, "estanteria_destino": "A1",
+                                          "fecha_movimiento": "2024-02-01T10:00", "usuario": "Ana"}),
+        Movimiento.desde_documento("m2", {"tipo": "movimiento_ubicacion", "modelo": "BAN-7", "cantidad": 1,
+                                          "ubicacion_origen": {"almacen": 1, "ubicacion": "A"},
+                                          "fecha": "2024-03-01", "usuario": {"nombre": "Beto"}}),
+        Movimiento.desde_documento("m3", {"tipo_movimiento": "salida_inventario", "producto_modelo": "CAD-25",
+                                          "cantidad": "2", "almacen_origen": "1", "estanteria_origen": "A1",
+                                          "fecha": "2024-01-05", "comentarios": "venta"}),
+    ]).df
+    historial = historial_a_frame([
+        {"tipo": "crear_producto", "descripcion": "Creó producto 'Cadena' (Modelo: CAD-25)",
+         "usuario": "Ana", "fecha": "2024-02-02T00:00"},
+        {"tipo": "eliminar_productos_multiple", "descripcion": "Eliminó 3 productos (Errores: 0)",
+         "usuario": "Ana", "fecha": "2024-02-03"},
+        {"tipo": "eliminar_producto", "descripcion": "Eliminó producto 'Banda' (ID: x)",
+         "usuario": "Beto", "fecha": "2024-02-04"},
+        {"tipo": "movimiento_ubicacion", "descripcion": "Movió 2x BAN-7 de 1/A → 2/B",
+         "usuario": "Beto", "fecha": "2024-02-05", "detalles": {"modelo": "BAN-7"}},
+        {"tipo": "login", "descripcion": "Ingreso", "usuario": "Beto", "fecha": "2024-02-06"},
+    ])
+    return EntradasReporte(productos, ubicaciones, movimientos, historial)
+
+
+def test_reporte_de_movimientos():
+    filas = generar_reporte("movimientos", _entradas()).to_dicts()
+
+    assert [f["producto"] for f in filas][:3] == ["BAN-7", "CAD-25", "CAD-25"]  # Más recientes primero
+    traslado, entrada, salida, del_historial = filas
+    assert (traslado["origen"], traslado["usuario"]) == ("Almacén 1/A", "Beto")
+    assert (entrada["origen"], entrada["destino"]) == ("Entrada Externa", "Almacén 1/A1")
+    assert (salida["origen"], salida["motivo"], salida["cantidad"]) == ("Almacén 1/A1", "venta", "2")
+    assert del_historial["tipo"] == "Transferencia" and del_historial["cantidad"] == "Ver descripción"
+
+
+def test_filtros_solo_en_reportes_con_fechas():
+    entradas = _entradas()
+    filtros = Filtros.desde_texto("2024-02-01", "2024-02-28", "Beto")
+
+    assert Filtros.desde_texto("ayer", "", "todos") == Filtros()
+    assert [f["fecha"] for f in generar_reporte("movimientos", entradas, filtros).to_dicts()] == ["2024-02-05"]
+    usuarios = generar_reporte("usuarios", entradas, filtros)
+    assert usuarios.height == 3
+    assert "ip_origen" not in usuarios.columns  # El historial no guarda la IP: no se inventa
+    assert generar_reporte("productos", entradas, filtros).height == 3  # Estado actual: no filtra
+
+
+def test_modelos_del_historial():
+    reportes = generar_reportes(_entradas())
+
+    assert reportes["productos"].filter(reportes["productos"]["modelo"] == "CAD-25")["usuario_alta"][0] == "Ana"
+    assert reportes["altas"].select("modelo", "nombre").row(0) == ("CAD-25", "Cadena")
+    assert reportes["bajas"].select("modelo", "cantidad_baja").rows() == [("Múltiple", 3), ("Ver sistema", 1)]
+    rotacion = {f["modelo"]: f for f in reportes["rotacion"].to_dicts()}
+    assert set(rotacion) == {"CAD-25", "BAN-7"}  # Sin palabras sueltas de las descripciones
+    assert (rotacion["CAD-25"]["entradas"], rotacion["CAD-25"]["salidas"]) == (5, 2)
+    assert rotacion["BAN-7"]["movimientos_ubicacion"] == 2
+    assert reportes["stock_critico"].select("modelo", "prioridad").rows() == [("BAN-7", "ALTA"), ("CAD-25", "CRÍTICA")]
+
+
+def test_una_pasada_igual_que_por_separado():
+    entradas = _entradas()
+    filtros = Filtros("2024-01-01", "2024-12-31")
+    juntos = generar_reportes(entradas, filtros)
+
+    assert set(juntos) == set(PLANES)
+    for tipo, reporte in juntos.items():
+        assert reporte.equals(generar_reporte(tipo, entradas, filtros)), tipo
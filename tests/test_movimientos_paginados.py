@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test de la consulta paginada de movimientos (RepositorioMovimientos.pagina):
+1. con_fecha_orden entiende los dos formatos de fecha y ordena bien entre ellos
+2. Las páginas se piden con cursor: sin repetir ni saltear, y la última avisa que no hay más
+3. El rango de fechas y el tipo se filtran en la consulta, no en el cliente
+4. contar() usa la agregación del servidor
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models import Movimiento
+from app.services.movimientos import RepositorioMovimientos
+from tests.firestore_falso import FirestoreFalso
+
+
+def _movimientos(cantidad):
+    inicio = datetime(2024, 1, 1, 8, 0, 0)
+    documentos = {}
+    for i in range(cantidad):
+        fecha = inicio + timedelta(hours=i)
+        # Los viejos guardan 'fecha' con espacio, los nuevos 'fecha_movimiento' ISO
+        datos = ({'fecha': fecha.strftime("%Y-%m-%d %H:%M:%S")} if i % 2 else {'fecha_movimiento': fecha.isoformat()})
+        datos.update(tipo='entrada_inventario' if i % 3 else 'salida_inventario', cantidad=i)
+        documentos[f"m{i}"] = Movimiento.con_fecha_orden(datos)
+    return documentos
+
+
+def test_fecha_orden_unifica_formatos():
+    viejo = Movimiento.con_fecha_orden({'fecha': '2024-03-01 10:00:00'})
+    nuevo = Movimiento.con_fecha_orden({'fecha_movimiento': '2024-03-01T09:30:00.123456'})
+    assert nuevo['fecha_orden'] < viejo['fecha_orden']  # Como texto quedarían al revés
+    assert Movimiento.fecha_orden_de({'fecha': 'sin fecha'}) is None
+    assert isinstance(Movimiento.con_fecha_orden({})['fecha_orden'], datetime)  # Sin fecha: ahora
+
+
+def test_paginas_con_cursor():
+    db = FirestoreFalso({'movimientos': _movimientos(120)})
+    repositorio = RepositorioMovimientos(db=db)
+
+    vistos = []
+    pagina = asyncio.run(repositorio.pagina(limite=50))
+    while True:
+        vistos.extend(m['cantidad'] for m in pagina.registros)
+        if not pagina.hay_mas:
+            break
+        pagina = asyncio.run(repositorio.pagina(limite=50, despues_de=pagina.cursor))
+
+    assert vistos == list(range(119, -1, -1))  # Más recientes primero, sin huecos ni repetidos
+    assert len(db.consultas) == 3 and all(c.limite == 51 for c in db.consultas)
+    assert isinstance(pagina.registros[0], Movimiento)
+
+
+def test_filtros_en_el_servidor():
+    db = FirestoreFalso({'movimientos': _movimientos(120)})
+    repositorio = RepositorioMovimientos(db=db)
+    desde, hasta = datetime(2024, 1, 3), datetime(2024, 1, 4)
+
+    pagina = asyncio.run(repositorio.pagina(limite=50, desde=desde, hasta=hasta, tipo='salida_inventario'))
+
+    consulta = db.consultas[-1]
+    assert ('tipo', '==', 'salida_inventario') in consulta.filtros
+    assert ('fecha_orden', '>=', desde) in consulta.filtros and ('fecha_orden', '<', hasta) in consulta.filtros
+    assert consulta.orden == ('fecha_orden', True)
+    assert not pagina.hay_mas
+    assert all(m['tipo'] == 'salida_inventario' and desde <= m['fecha_orden'] < hasta for m in pagina.registros)
+    assert len(pagina.registros) == 8  # 24 horas del día 3, una de cada tres es salida
+
+
+def test_contar_por_agregacion():
+    db = FirestoreFalso({'movimientos': _movimientos(120)})
+    repositorio = RepositorioMovimientos(db=db)
+
+    assert asyncio.run(repositorio.contar(tipo='salida_inventario')) == 40
+    assert asyncio.run(repositorio.contar(desde=datetime(2024, 1, 5))) == 120 - 88
+    assert db.consultas == []  # No se leyó ningún documento
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test de la sincronización inventario <- ubicaciones (app.utils.sincronizacion_inventario):
+1. La sincronización completa y la de modelos sueltos agrupan por la misma clave
+   (sin mayúsculas ni espacios) y escriben las mismas cantidades
+2. Después de una, la otra no tiene nada que corregir
+3. Los modelos marcados se normalizan a la clave
+4. Si la sincronización falla o lanza una excepción, los modelos siguen pendientes
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.cache_firebase import CacheFirebase
+from app.utils.sincronizacion_inventario import SincronizadorInventario
+from tests.firestore_falso import FirestoreFalso
+
+
+def _firestore():
+    return FirestoreFalso({
+        "ubicaciones": {
+            "u1": {"modelo": "Cadena 25", "almacen": "1", "estanteria": "A1", "cantidad": 5},
+            "u2": {"modelo": "cadena 25 ", "almacen": "1", "estanteria": "A2", "cantidad": 3},
+            "u3": {"modelo": "Banda A", "almacen": "2", "estanteria": "B1", "cantidad": "2.0"},
+            "u4": {"modelo": "Piñón 12", "almacen": "2", "estanteria": "B2", "cantidad": 4},
+        },
+        "productos": {
+            "p1": {"modelo": "Cadena 25", "nombre": "Rodillo", "cantidad": 0},
+            "p2": {"modelo": "CADENA 25", "nombre": "Rodillo (duplicado)", "cantidad": 5},
+            "p3": {"modelo": "banda a", "nombre": "Banda", "cantidad": 0},
+            "p4": {"modelo": "Sin ubicar", "nombre": "Suelto", "cantidad": 7},
+        },
+    })
+
+
+def _cantidades(db):
+    return {doc_id: datos["cantidad"] for doc_id, datos in db.colecciones["productos"].items()}
+
+
+def _sincronizador(db):
+    return SincronizadorInventario(db=db, cache=CacheFirebase(db=db))
+
+
+def test_completa_y_por_modelo_coinciden():
+    esperadas = {"p1": 8, "p2": 8, "p3": 2, "p4": 0}
+
+    completa = _firestore()
+    resultado = asyncio.run(_sincronizador(completa).sincronizar_inventario_completo(mostrar_resultados=False))
+    assert resultado["exito"] and resultado["productos_actualizados"] == 4
+    assert resultado["modelos_nuevos"] == ["Piñón 12"]
+    assert resultado["productos_sin_ubicacion"] == 1
+    assert _cantidades(completa) == esperadas
+
+    por_modelo = _firestore()
+    modelos = ["cadena 25", "CADENA 25 ", "Banda A", "Sin ubicar", "Piñón 12"]
+    resultado = asyncio.run(_sincronizador(por_modelo).sincronizar_modelos(modelos))
+    assert resultado["exito"] and resultado["productos_actualizados"] == 4
+    assert _cantidades(por_modelo) == esperadas
+
+
+def test_una_despues_de_la_otra_no_corrige_nada():
+    db = _firestore()
+    sincronizador = _sincronizador(db)
+    asyncio.run(sincronizador.sincronizar_modelos(["Cadena 25", "Banda A", "Sin ubicar"]))
+    intentos = db.intentos
+
+    resultado = asyncio.run(sincronizador.sincronizar_inventario_completo(mostrar_resultados=False))
+    assert resultado["productos_actualizados"] == 0 and db.intentos == intentos
+
+    # 'CADENA 25' y 'cadena 25' son el mismo modelo pendiente
+    sincronizador.marcar_modelos_modificados([" CADENA 25", "cadena 25", None, ""])
+    assert sincronizador._modelos_pendientes == {"cadena 25"}
+    assert asyncio.run(sincronizador.sincronizar_pendientes())["productos_actualizados"] == 0
+    assert not sincronizador.hay_pendientes()
+
+
+def test_pendientes_se_conservan_si_la_sincronizacion_falla():
+    db = FirestoreFalso(_firestore().colecciones, fallar_commits={1})
+    sincronizador = _sincronizador(db)
+    sincronizador.marcar_modelos_modificados(["Cadena 25"])
+
+    assert not asyncio.run(sincronizador.sincronizar_pendientes())["exito"]
+    assert sincronizador._modelos_pendientes == {"cadena 25"}
+
+    async def sin_conexion(modelos):
+        raise TimeoutError("Firestore no respondió")
+    sincronizador.sincronizar_modelos = sin_conexion
+    try:
+        asyncio.run(sincronizador.sincronizar_pendientes())
+    except TimeoutError:
+        pass
+    assert sincronizador._modelos_pendientes == {"cadena 25"}  # Quedan para el próximo intento
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test de la tabla paginada compartida (app.tablas.tabla_paginada):
+1. Paginador: páginas acotadas, orden estable con valores mezclados y vacíos
+2. reemplazar() conserva orden y página
+3. TablaPaginada solo construye las filas de la página visible (50k registros)
+4. Seleccionar todas marca toda la colección, no solo la página; con filtro, solo las filtradas
+5. Reconciliación por id: reutiliza las filas sin cambios y parcha solo las cambiadas
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import flet as ft
+
+from app.tablas.tabla_paginada import Paginador, TablaPaginada
+
+
+def test_paginas_y_orden():
+    filas = [{"id": i, "cantidad": c} for i, c in enumerate([5, None, "7", 1, "", 3.5, "abc"])]
+    paginador = Paginador(filas, por_pagina=3)
+
+    assert paginador.total_paginas == 3 and paginador.rango() == "1–3 de 7"
+    assert not paginador.ir_a(-4) and paginador.pagina == 0
+    assert paginador.ir_a(99) and paginador.pagina == 2 and paginador.rango() == "7–7 de 7"
+
+    paginador.ordenar("cantidad", lambda f: f["cantidad"])
+    assert paginador.pagina == 0  # Ordenar vuelve a la primera página
+    assert [f["cantidad"] for f in paginador.filas] == [1, 3.5, 5, "7", "abc", None, ""]  # Vacíos al final
+
+    paginador.ordenar("cantidad", lambda f: f["cantidad"], ascendente=False)
+    assert [f["id"] for f in paginador.visibles()] == [1, 4, 6]
+
+
+def test_reemplazar_conserva_orden_y_pagina():
+    estado = {}
+    paginador = Paginador([{"n": i} for i in range(10)], por_pagina=4, estado=estado)
+    paginador.ordenar(0, lambda f: f["n"], ascendente=False)
+    paginador.ir_a(1)
+
+    paginador.reemplazar([{"n": i} for i in range(20)])
+    assert estado == {"pagina": 1, "orden": (0, False)}
+    assert [f["n"] for f in paginador.visibles()] == [15, 14, 13, 12]
+
+    paginador.reemplazar([{"n": 1}])  # La página queda acotada al nuevo total
+    assert paginador.pagina == 0 and paginador.visibles() == [{"n": 1}]
+
+
+def _tabla(filas, seleccion=None, estado=None):
+    return TablaPaginada(
+        filas,
+        [ft.DataColumn(ft.Text("Modelo")), ft.DataColumn(ft.Text("Cantidad"))],
+        lambda f: [ft.DataCell(ft.Text(f["modelo"])), ft.DataCell(ft.Text(str(f["cantidad"])))],
+        estado=estado,
+        ordenables={0: lambda f: f["modelo"], 1: lambda f: f["cantidad"]},
+        orden_inicial=(1, False),
+        seleccion=seleccion,
+        id_fila=lambda f: f["firebase_id"],
+    )
+
+
+def test_solo_construye_la_pagina_visible():
+    filas = [{"firebase_id": f"p{i}", "modelo": f"M-{i}", "cantidad": i} for i in range(50_000)]
+    estado = {}
+    tabla = _tabla(filas, estado=estado)
+
+    assert len(tabla.tabla.rows) == 50
+    assert tabla.tabla.rows[0].cells[0].content.value == "M-49999"  # Orden inicial: cantidad descendente
+    assert tabla.tabla.sort_column_index == 1 and tabla.tabla.sort_ascending is False
+
+    tabla.ir_a(999)
+    assert tabla.tabla.rows[-1].cells[0].content.value == "M-0"  # Sin recortar: la última fila existe
+
+    # Reconstruir la tabla con el mismo estado conserva página y orden
+    otra = _tabla(filas, estado=estado)
+    assert otra.paginador.pagina == 999 and len(otra.tabla.rows) == 50
+
+
+def test_seleccionar_todas_abarca_toda_la_coleccion():
+    filas = [{"firebase_id": f"p{i}", "modelo": f"M-{i}", "cantidad": i} for i in range(120)]
+    seleccion = set()
+    tabla = _tabla(filas, seleccion=seleccion)
+
+    tabla._seleccionar("p3", True)
+    assert tabla.checkbox_todas.value is None  # Indeterminado
+    tabla._seleccionar_todas(None)
+    assert len(seleccion) == 120 and tabla.checkbox_todas.value is True
+    assert all(fila.cells[0].content.content.value for fila in tabla.tabla.rows)
+    tabla._seleccionar_todas(None)
+    assert seleccion == set() and tabla.checkbox_todas.value is False
+
+
+def test_seleccionar_todas_con_filtro_cuenta_solo_las_filas_actuales():
+    filas = [{"firebase_id": f"p{i}", "modelo": f"M-{i}", "cantidad": i} for i in range(120)]
+    seleccion = set()
+    tabla = _tabla(filas, seleccion=seleccion)
+    tabla._seleccionar_todas(None)
+
+    # Filtrar a 10 filas: la selección de las ocultas no cuenta para el checkbox del encabezado
+    tabla.reemplazar(filas[:10], primera_pagina=True)
+    assert tabla.checkbox_todas.value is True
+    tabla._seleccionar("p3", False)
+    assert tabla.checkbox_todas.value is None
+    tabla._seleccionar_todas(None)
+    assert tabla.checkbox_todas.value is True and len(seleccion) == 120
+
+    # Desmarcar todas quita solo las filas filtradas
+    tabla._seleccionar_todas(None)
+    assert tabla.checkbox_todas.value is False and seleccion == {f"p{i}" for i in range(10, 120)}
+
+    # Con otra lista filtrada el conjunto de ids se vuelve a armar
+    tabla.reemplazar(filas[100:], primera_pagina=True)
+    assert tabla.checkbox_todas.value is True
+
+
+def test_reconciliacion_reutiliza_filas_sin_cambios():
+    filas = [{"firebase_id": f"p{i}", "modelo": f"M-{i}", "cantidad": i} for i in range(100)]
+    tabla = _tabla(filas)  # Cantidad descendente: p99, p98, p97, ...
+    antes = list(tabla.tabla.rows)
+
+    # Se edita un producto de la página visible y se elimina otro
+    nuevas = [dict(f, modelo="M-98b") if f["firebase_id"] == "p98" else f for f in filas if f["firebase_id"] != "p97"]
+    tabla.reemplazar(nuevas)
+    despues = tabla.tabla.rows
+
+    assert despues[0] is antes[0]  # p99 no cambió: mismo DataRow
+    assert despues[1] is antes[1] and despues[1].cells[0].content.value == "M-98b"  # Parchada en el lugar
+    assert tabla._parchadas == [antes[1]]
+    assert despues[2] is antes[3]  # p97 ya no está
+    assert despues[-1] not in antes and despues[-1].cells[0].content.value == "M-49"  # Entra a la página
+    assert tabla._estructura_cambio
+
+    # Los mismos registros: nada que parchar ni reordenar
+    tabla.reemplazar(nuevas)
+    assert tabla._parchadas == [] and not tabla._estructura_cambio
+    assert all(nueva is vieja for nueva, vieja in zip(tabla.tabla.rows, despues))
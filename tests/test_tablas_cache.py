@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Test de las tablas de polars del cache (app.utils.tablas_cache):
+1. Conversión tipada de registros (números como texto, campos alternativos)
+2. Los deltas se consolidan igual que reconstruir la tabla desde cero
+3. Existencias por modelo con join productos ⋈ ubicaciones
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models import Movimiento, Producto, Ubicacion
+from app.utils.tablas_cache import TablaMovimientos, TablaProductos, TablaUbicaciones, productos_con_existencias
+
+
+def _ubicaciones():
+    return [
+        Ubicacion("u1", modelo="AB-1", almacen=1, estanteria="A1", cantidad=5),
+        Ubicacion("u2", modelo=" ab-1", almacen="1", estanteria="A2", cantidad="3"),
+        Ubicacion("u3", modelo="CD-2", almacen=2, estanteria="B1", cantidad="x"),
+    ]
+
+
+def test_conversion_tipada():
+    tabla = TablaUbicaciones(_ubicaciones()).df.sort("firebase_id")
+    assert tabla["cantidad"].to_list() == [5, 3, None]
+    assert tabla["almacen"].to_list() == ["1", "1", "2"]
+    assert tabla["modelo_clave"].to_list() == ["ab-1", "ab-1", "cd-2"]
+
+    movimientos = TablaMovimientos([
+        Movimiento.desde_documento("m1", {"tipo_movimiento": "entrada", "producto_modelo": "AB-1",
+                                          "fecha": "2024-01-01", "usuario": {"nombre": "Ana"}}),
+    ]).df
+    assert movimientos.row(0, named=True)["tipo"] == "entrada"
+    assert movimientos["modelo"].to_list() == ["AB-1"] and movimientos["usuario"].to_list() == ["Ana"]
+    assert movimientos["fecha"].to_list() == ["2024-01-01"]
+
+
+def test_deltas_igual_que_reconstruir():
+    ubicaciones = _ubicaciones()
+    publicada = TablaUbicaciones(ubicaciones)
+    tabla = publicada.copiar()
+
+    tabla.aplicar(ubicaciones[0], ubicaciones[0].reemplazar(cantidad=9))
+    tabla.aplicar(ubicaciones[2], None)
+    nueva = Ubicacion("u4", modelo="EF-3", almacen=3, estanteria="C1", cantidad=1)
+    tabla.aplicar(None, nueva)
+
+    esperada = TablaUbicaciones([ubicaciones[0].reemplazar(cantidad=9), ubicaciones[1], nueva])
+    assert tabla.df.sort("firebase_id").equals(esperada.df.sort("firebase_id"))
+    assert len(publicada) == 3 and publicada.df["cantidad"].sum() == 8
+
+
+def test_existencias_por_join():
+    productos = TablaProductos([
+        Producto("p1", modelo="Ab-1", nombre="Cadena"),
+        Producto("p2", modelo="ZZ-9", nombre="Sin ubicar"),
+    ]).df
+    unido = productos_con_existencias(productos, TablaUbicaciones(_ubicaciones()).df).sort("firebase_id")
+
+    assert unido["existencias"].to_list() == [8, 0]
+    assert unido["ubicaciones"].to_list() == [2, 0]
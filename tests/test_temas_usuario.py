@@ -4,6 +4,7 @@ Script de prueba para crear usuarios con diferentes temas
 para probar el sistema de configuración por usuario.
 """
 
+import asyncio
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -45,11 +46,11 @@ def crear_usuarios_con_temas():
     for usuario in usuarios_prueba:
         try:
             # Crear usuario en Firebase
-            resultado = crear_usuario_firebase(
+            resultado = asyncio.run(crear_usuario_firebase(
                 nombre=usuario["nombre"],
                 contrasena=usuario["contrasena"],
                 es_admin=usuario["es_admin"]
-            )
+            ))
             
             if resultado:
                 print(f"[OK] Usuario '{usuario['nombre']}' creado exitosamente")
@@ -4,6 +4,7 @@ Script de prueba para crear un usuario normal (no administrador)
 para probar el control de acceso por roles.
 """
 
+import asyncio
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -16,11 +17,11 @@ def crear_usuario_prueba():
     
     try:
         # Crear usuario normal (no administrador)
-        resultado = crear_usuario_firebase(
+        resultado = asyncio.run(crear_usuario_firebase(
             nombre="UsuarioNormal",
             contrasena="123456",
             es_admin=False
-        )
+        ))
         
         if resultado:
             print("[OK] Usuario normal 'UsuarioNormal' creado exitosamente")